@@ -0,0 +1,148 @@
+"""
+AI候选回复生成模块
+==================
+
+玩家在每回合从N个AI生成的候选回复中选择一个。本模块经LLM网关并发发起N个请求，
+每个请求使用不同的随机种子，去除近似重复的候选，并在前K个候选就绪后立即返回。
+
+说明:
+- 并发度受LLM网关的每模型并发上限约束，超出部分在网关中排队
+- 近似重复判定: 规范化文本的字符二元组Jaccard相似度不低于阈值
+- 凑满K个候选后取消尚未完成的请求，释放网关槽位
+
+配置项(环境变量):
+- CANDIDATE_COUNT: 默认候选数N，默认4
+- CANDIDATE_TEMPERATURE: 候选生成的temperature，默认0.9
+- CANDIDATE_SIMILARITY: 近似重复阈值(0-1)，默认0.8
+"""
+import os
+import re
+import random
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional
+from backend.ai.llmGateway import LLMGateway, LLMGatewayBusy, LLMGatewayError, PRIORITY_SOLO
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_COUNT = int(os.getenv('CANDIDATE_COUNT', '4'))
+CANDIDATE_TEMPERATURE = float(os.getenv('CANDIDATE_TEMPERATURE', '0.9'))
+CANDIDATE_SIMILARITY = float(os.getenv('CANDIDATE_SIMILARITY', '0.8'))
+
+_NOISE = re.compile(r"[\s\W_]+")
+
+
+def _shingles(text: str) -> frozenset:
+    """规范化文本(去空白与标点、小写)后的字符二元组集合"""
+    normalized = _NOISE.sub("", text).lower()
+    if len(normalized) < 2:
+        return frozenset((normalized,))
+    return frozenset(normalized[i:i + 2] for i in range(len(normalized) - 1))
+
+
+def _jaccard(sa: frozenset, sb: frozenset) -> float:
+    union = len(sa | sb)
+    return len(sa & sb) / union if union else 1.0
+
+
+def similarity(a: str, b: str) -> float:
+    """两段文本的字符二元组Jaccard相似度"""
+    return _jaccard(_shingles(a), _shingles(b))
+
+
+class CandidateDeduper:
+    """近似重复过滤器"""
+
+    def __init__(self, threshold: float = CANDIDATE_SIMILARITY):
+        self.threshold = threshold
+        self._seen: List[frozenset] = []
+
+    def add(self, text: str) -> bool:
+        """候选与已接受的候选均不相似时接受并返回True"""
+        if not text.strip():
+            return False
+        shingles = _shingles(text)
+        if any(_jaccard(shingles, seen) >= self.threshold for seen in self._seen):
+            return False
+        self._seen.append(shingles)
+        return True
+
+
+async def iter_candidates(gateway: LLMGateway, model: str, prompt: str, n: int = CANDIDATE_COUNT,
+                          priority: int = PRIORITY_SOLO, options: Optional[dict] = None,
+                          threshold: float = CANDIDATE_SIMILARITY,
+                          seed: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    并发生成候选，按完成顺序产出去重后的候选
+
+    参数:
+    - gateway: LLM网关
+    - model: 模型名称
+    - prompt: 提示文本
+    - n: 并发请求数
+    - priority: 网关优先级
+    - options: 额外采样参数，seed由本函数为每个请求分配
+    - threshold: 近似重复阈值
+    - seed: 起始种子，默认随机；第i个请求使用seed+i
+
+    提前关闭该生成器会取消尚未完成的请求。单个请求失败时跳过；
+    全部请求均因网关排队已满被拒绝时抛出LLMGatewayBusy，由调用方返回429。
+    """
+    base_seed = random.randrange(1 << 30) if seed is None else seed
+    base_options = {"temperature": CANDIDATE_TEMPERATURE, **(options or {})}
+    tasks = [
+        asyncio.ensure_future(gateway.generate(
+            model, prompt, priority=priority, options={**base_options, "seed": base_seed + i}
+        ))
+        for i in range(n)
+    ]
+    deduper = CandidateDeduper(threshold)
+    busy = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                text = (await next_done).strip()
+            except LLMGatewayBusy:
+                busy += 1
+                continue
+            except LLMGatewayError as e:
+                logger.warning(f"候选生成失败: {e}")
+                continue
+            if deduper.add(text):
+                yield text
+        if tasks and busy == len(tasks):
+            raise LLMGatewayBusy("LLM请求排队已满")
+        if busy:
+            logger.warning(f"{busy}个候选请求因网关排队已满被拒绝")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def generate_candidates(gateway: LLMGateway, model: str, prompt: str, n: int = CANDIDATE_COUNT,
+                              k: Optional[int] = None, **kwargs) -> List[str]:
+    """
+    生成候选回复
+
+    参数:
+    - n: 并发请求数
+    - k: 需要的候选数，默认等于n；凑满k个即返回并取消其余请求
+    - 其余参数同iter_candidates
+
+    返回值:
+    - 去重后的候选列表(按完成顺序)，可能少于k个
+    """
+    k = n if k is None else min(k, n)
+    candidates: List[str] = []
+    if k <= 0:
+        return candidates
+    stream = iter_candidates(gateway, model, prompt, n, **kwargs)
+    try:
+        async for text in stream:
+            candidates.append(text)
+            if len(candidates) >= k:
+                break
+    finally:
+        await stream.aclose()
+    return candidates
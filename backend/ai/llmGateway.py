@@ -0,0 +1,271 @@
+"""
+LLM网关模块
+===========
+
+所有到Ollama的异步调用经由本网关，统一管理连接池、并发上限与排队。
+
+功能:
+- 共享的httpx.AsyncClient连接池(keep-alive复用连接)
+- 每个后端、每个模型的最大并发数(max_in_flight)，超出的请求排队
+- 排队按优先级出队: 团队回合(PRIORITY_TEAM) 先于单人探索(PRIORITY_SOLO)，同优先级先到先得
+- 多个Ollama地址间按最少负载路由(该模型并发数最少，其次总并发数最少)
+- 统计: 各模型排队深度，各后端并发数、请求数、错误数与延迟分位数
+
+配置项(环境变量):
+- OLLAMA_BASE_URLS: Ollama地址列表(逗号分隔)，默认取OLLAMA_BASE_URL
+- LLM_MAX_IN_FLIGHT: 每个后端每个模型的最大并发数，默认4
+- LLM_MAX_QUEUE: 最大排队请求数，超出时拒绝，默认256
+- LLM_MAX_CONNECTIONS: 连接池最大连接数，默认64
+- OLLAMA_TIMEOUT: 请求超时时间(秒)，默认120
+"""
+import os
+import json
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from typing import AsyncIterator, List, Optional
+import httpx
+from backend.utils.latencyHistogram import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# 请求优先级(数值越小越先出队)
+PRIORITY_TEAM = 0
+PRIORITY_SOLO = 1
+
+
+class LLMGatewayError(Exception):
+    """Ollama调用失败"""
+
+
+class LLMGatewayBusy(LLMGatewayError):
+    """排队请求数已达上限"""
+
+
+class OllamaBackend:
+    """单个Ollama服务的负载与延迟统计"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+        self.in_flight: dict[str, int] = {}
+        self.total_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def load(self, model: str) -> tuple:
+        """路由排序键: (该模型并发数, 总并发数)"""
+        return self.in_flight.get(model, 0), self.total_in_flight
+
+    def stats(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "in_flight": self.total_in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_p50_ms": self.latency.percentile(0.5) * 1000,
+            "latency_p99_ms": self.latency.percentile(0.99) * 1000
+        }
+
+
+class LLMGateway:
+    """Ollama请求网关(需在单个事件循环中使用)"""
+
+    def __init__(self, base_urls: List[str], max_in_flight: int = 4, max_queue: int = 256,
+                 timeout: float = 120, max_connections: int = 64):
+        """
+        参数:
+        - base_urls: Ollama地址列表
+        - max_in_flight: 每个后端每个模型的最大并发数
+        - max_queue: 最大排队请求数
+        - timeout: 请求超时时间(秒)
+        - max_connections: 连接池最大连接数
+        """
+        if not base_urls:
+            raise ValueError("至少需要一个Ollama地址")
+        self.backends = [OllamaBackend(url) for url in base_urls]
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._waiters: dict[str, list] = {}
+        self._queued = 0
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        """根据环境变量创建"""
+        urls = os.getenv('OLLAMA_BASE_URLS') or os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+        return cls(
+            [url.strip() for url in urls.split(',') if url.strip()],
+            max_in_flight=int(os.getenv('LLM_MAX_IN_FLIGHT', '4')),
+            max_queue=int(os.getenv('LLM_MAX_QUEUE', '256')),
+            timeout=float(os.getenv('OLLAMA_TIMEOUT', '120')),
+            max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '64'))
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共享连接池(首次使用时创建)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    # ---------- 调度 ----------
+
+    def _pick(self, model: str) -> Optional[OllamaBackend]:
+        """选择该模型仍有空闲并发的最少负载后端"""
+        candidates = [b for b in self.backends if b.in_flight.get(model, 0) < self.max_in_flight]
+        return min(candidates, key=lambda b: b.load(model)) if candidates else None
+
+    def _occupy(self, backend: OllamaBackend, model: str) -> None:
+        backend.in_flight[model] = backend.in_flight.get(model, 0) + 1
+        backend.total_in_flight += 1
+
+    async def _acquire(self, model: str, priority: int) -> OllamaBackend:
+        """获取一个并发槽位，无空闲时按优先级排队"""
+        backend = self._pick(model)
+        if backend is not None and not self._has_waiters(model):
+            self._occupy(backend, model)
+            return backend
+        if self._queued >= self.max_queue:
+            raise LLMGatewayBusy("LLM请求排队已满")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters.setdefault(model, []), (priority, next(self._seq), future))
+        self._queued += 1
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # 已分配槽位但调用方被取消时归还槽位
+            if future.done() and not future.cancelled():
+                self._release(future.result(), model)
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                self._queued -= 1
+
+    def _has_waiters(self, model: str) -> bool:
+        """是否有未取消的等待者(顺带清理堆顶已取消的条目)"""
+        waiters = self._waiters.get(model)
+        while waiters and waiters[0][2].cancelled():
+            heapq.heappop(waiters)
+        return bool(waiters)
+
+    def _release(self, backend: OllamaBackend, model: str) -> None:
+        """归还槽位，并将其直接交给该模型优先级最高的等待者"""
+        waiters = self._waiters.get(model)
+        while waiters:
+            _, _, future = heapq.heappop(waiters)
+            if future.cancelled():
+                continue
+            self._queued -= 1
+            future.set_result(backend)
+            return
+        backend.in_flight[model] -= 1
+        backend.total_in_flight -= 1
+
+    # ---------- 调用 ----------
+
+    def _payload(self, model: str, prompt: str, options: Optional[dict], stream: bool) -> dict:
+        payload = {"model": model, "prompt": prompt, "stream": stream}
+        if options:
+            payload["options"] = options
+        return payload
+
+    async def generate(self, model: str, prompt: str, priority: int = PRIORITY_SOLO,
+                       options: Optional[dict] = None) -> str:
+        """
+        生成完整回复
+
+        参数:
+        - model: 模型名称
+        - prompt: 提示文本
+        - priority: PRIORITY_TEAM 或 PRIORITY_SOLO
+        - options: Ollama采样参数(temperature/seed等)
+
+        异常:
+        - LLMGatewayBusy: 排队已满
+        - LLMGatewayError: Ollama调用失败
+        """
+        backend = await self._acquire(model, priority)
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(
+                f"{backend.base_url}/api/generate", json=self._payload(model, prompt, options, False)
+            )
+            response.raise_for_status()
+            backend.latency.record(time.perf_counter() - start)
+            return response.json().get("response", "")
+        except httpx.HTTPError as e:
+            backend.errors += 1
+            logger.error(f"Ollama调用失败({backend.base_url}): {e}")
+            raise LLMGatewayError(str(e)) from e
+        finally:
+            backend.requests += 1
+            self._release(backend, model)
+
+    async def stream(self, model: str, prompt: str, priority: int = PRIORITY_SOLO,
+                     options: Optional[dict] = None) -> AsyncIterator[str]:
+        """
+        流式生成回复，逐token产出
+
+        关闭该生成器会关闭上游连接并立即归还槽位。延迟统计记录完整生成耗时。
+        """
+        backend = await self._acquire(model, priority)
+        start = time.perf_counter()
+        try:
+            async with self.client.stream(
+                "POST", f"{backend.base_url}/api/generate", json=self._payload(model, prompt, options, True)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+            backend.latency.record(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            backend.errors += 1
+            logger.error(f"Ollama流式调用失败({backend.base_url}): {e}")
+            raise LLMGatewayError(str(e)) from e
+        finally:
+            backend.requests += 1
+            self._release(backend, model)
+
+    # ---------- 统计与关闭 ----------
+
+    def queue_depth(self, model: Optional[str] = None) -> int:
+        """排队请求数(可按模型)"""
+        if model is None:
+            return self._queued
+        return sum(1 for _, _, future in self._waiters.get(model, ()) if not future.cancelled())
+
+    def stats(self) -> dict:
+        """网关统计"""
+        return {
+            "queue_depth": self._queued,
+            "queues": {model: self.queue_depth(model) for model in self._waiters},
+            "max_in_flight": self.max_in_flight,
+            "backends": [backend.stats() for backend in self.backends]
+        }
+
+    async def close(self) -> None:
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# 全局LLM网关(连接池在首次请求时创建)
+llm_gateway = LLMGateway.from_env()
@@ -7,6 +7,7 @@ Ollama语言模型集成模块
 主要功能:
 - initialize_ollama_model: 初始化Ollama模型
 - create_tools: 创建对话工具集
+- create_app: 创建对话服务(含SSE流式接口)
 - main: 启动AI对话服务
 - 测试函数: 验证各功能模块
 
@@ -19,6 +20,9 @@ Ollama语言模型集成模块
 环境要求:
 - OLLAMA_BASE_URL: Ollama服务地址
 - OLLAMA_MODEL_NAME: 使用的模型名称
+- OLLAMA_TIMEOUT: 请求超时时间(秒)
+- LLM_CACHE_*: 响应缓存配置(见responseCache.py)
+- OLLAMA_BASE_URLS / LLM_MAX_*: 异步调用网关配置(见llmGateway.py)
 
 安全注意事项:
 1. 用户输入需进行验证和清理
@@ -26,6 +30,41 @@ Ollama语言模型集成模块
 3. 生产环境应配置HTTPS
 """
 
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from langchain_core.tools import Tool
+from langchain_core.prompts import PromptTemplate
+from langchain_ollama import OllamaLLM
+import uvicorn
+from backend.utils.latencyHistogram import LatencyHistogram
+from backend.ai.responseCache import response_cache, make_key
+from backend.ai.llmGateway import LLMGateway, LLMGatewayBusy, llm_gateway, PRIORITY_TEAM
+from backend.ai.candidateGenerator import CANDIDATE_COUNT, generate_candidates
+
+logger = logging.getLogger(__name__)
+
+# Ollama配置 - 从环境变量读取
+OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+OLLAMA_MODEL_NAME = os.getenv('OLLAMA_MODEL_NAME', 'deepseek-r1:1.5b')
+DEFAULT_TIMEOUT = float(os.getenv('OLLAMA_TIMEOUT', '120'))  # 请求超时时间(秒)
+
+# 系统提示模板
+SYSTEM_PROMPT = (
+    "你是《半数黑金》的AI叙事者，负责在里世界空间中推进故事、回应玩家行动。"
+    "回答需简洁、生动，并保持世界观一致。\n\n玩家: {input}\n叙事者:"
+)
+STORY_PROMPT = "请根据以下设定创作一段简短的冒险故事:\n{prompt}\n故事:"
+DIALOGUE_PROMPT = "请以叙事者身份回应玩家的发言，并引导对话继续:\n{message}\n回应:"
+
+# 提示模板版本，修改上述模板后递增，使旧的缓存响应失效
+PROMPT_TEMPLATE_VERSION = "1"
+
 def initialize_ollama_model(base_url: str, model_name: str) -> OllamaLLM:
     """
     初始化Ollama语言模型
@@ -51,7 +90,7 @@ def initialize_ollama_model(base_url: str, model_name: str) -> OllamaLLM:
             model=model_name,
             temperature=0.7,  # 中等随机性
             top_p=0.9,  # 高多样性
-            timeout=DEFAULT_TIMEOUT
+            client_kwargs={"timeout": DEFAULT_TIMEOUT}
         )
         logger.info(f"成功初始化Ollama模型: {model_name}")
         return llm
@@ -100,6 +139,295 @@ def create_tools() -> List[Tool]:
     ]
     return tools
 
+def load_prompt_template() -> PromptTemplate:
+    """
+    加载系统提示模板
+
+    返回值:
+    - PromptTemplate: 包含{input}占位符的提示模板
+    """
+    return PromptTemplate.from_template(SYSTEM_PROMPT)
+
+class ConversationAgent:
+    """
+    对话agent
+
+    属性:
+    - llm: 语言模型
+    - tools: 工具集
+    - prompt: 提示模板
+    - chain: 提示模板与模型组成的可运行链，支持invoke/astream
+    """
+    def __init__(self, llm: OllamaLLM, tools: List[Tool], prompt: PromptTemplate):
+        self.llm = llm
+        self.tools = tools
+        self.prompt = prompt
+        self.chain = prompt | llm
+
+def create_conversation_agent(llm: OllamaLLM, tools: List[Tool], prompt: PromptTemplate) -> ConversationAgent:
+    """创建对话agent"""
+    return ConversationAgent(llm, tools, prompt)
+
+def sampling_params(llm: OllamaLLM) -> dict:
+    """模型采样参数，参与缓存键计算"""
+    return {"temperature": llm.temperature, "top_p": llm.top_p, "top_k": llm.top_k, "seed": llm.seed}
+
+def cached_invoke(llm: OllamaLLM, template: str, context: str, generate, bypass_cache: bool = False) -> str:
+    """
+    经响应缓存调用模型
+
+    参数:
+    - llm: 语言模型(提供模型名与采样参数)
+    - template: 模板名称，与PROMPT_TEMPLATE_VERSION共同区分提示模板
+    - context: 模板变量内容
+    - generate: 未命中时的无参生成函数
+    - bypass_cache: 创作类请求可绕过缓存
+    """
+    params = sampling_params(llm)
+    key = make_key(llm.model, f"{template}:{PROMPT_TEMPLATE_VERSION}", context, params)
+    return response_cache.get_or_generate(key, generate, params=params, bypass=bypass_cache)
+
+def sampling_options(llm: OllamaLLM) -> dict:
+    """经LLM网关调用时传给Ollama的采样参数(省略未设置项)"""
+    return {name: value for name, value in sampling_params(llm).items() if value is not None}
+
+async def achat_with_agent(user_input: str, agent: ConversationAgent, gateway: Optional[LLMGateway] = None,
+                           bypass_cache: bool = False) -> dict:
+    """
+    经LLM网关与agent进行一次完整对话(与chat_with_agent共用缓存键)
+
+    异常:
+    - LLMGatewayBusy: 网关排队已满
+    - LLMGatewayError: Ollama调用失败
+    """
+    gateway = gateway or llm_gateway
+    llm = agent.llm
+    params = sampling_params(llm)
+    key = make_key(llm.model, f"agent:{PROMPT_TEMPLATE_VERSION}", user_input, params)
+    response = await response_cache.aget_or_generate(
+        key,
+        lambda: gateway.generate(llm.model, agent.prompt.format(input=user_input), options=sampling_options(llm)),
+        params=params, bypass=bypass_cache
+    )
+    return {"response": response}
+
+def chat_with_agent(user_input: str, agent: ConversationAgent, bypass_cache: bool = False) -> dict:
+    """
+    与agent进行一次完整对话(同步阻塞，async代码中应放入线程执行)
+
+    返回值:
+    - dict: {"response": 模型回复}
+    """
+    response = cached_invoke(
+        agent.llm, "agent", user_input,
+        lambda: agent.chain.invoke({"input": user_input}),
+        bypass_cache=bypass_cache
+    )
+    return {"response": response}
+
+_default_llm: Optional[OllamaLLM] = None
+
+def get_default_llm() -> OllamaLLM:
+    """获取按环境变量配置的默认模型(首次调用时初始化)"""
+    global _default_llm
+    if _default_llm is None:
+        _default_llm = initialize_ollama_model(OLLAMA_BASE_URL, OLLAMA_MODEL_NAME)
+    return _default_llm
+
+def generate_story(prompt: str, bypass_cache: bool = False) -> str:
+    """根据设定生成故事(经响应缓存)"""
+    llm = get_default_llm()
+    return cached_invoke(
+        llm, "story", prompt,
+        lambda: llm.invoke(STORY_PROMPT.format(prompt=prompt)),
+        bypass_cache=bypass_cache
+    )
+
+def manage_dialogue(message: str) -> str:
+    """生成对话回应"""
+    return get_default_llm().invoke(DIALOGUE_PROMPT.format(message=message))
+
+def handle_generate_story(theme: str, characters: List[str]) -> dict:
+    """按主题和角色生成故事，返回{"story": 故事内容}"""
+    return {"story": generate_story(f"主题: {theme}\n角色: {', '.join(characters)}")}
+
+def handle_manage_dialogue(message: str) -> dict:
+    """处理对话消息，返回{"response": 回应内容}"""
+    return {"response": manage_dialogue(message)}
+
+async def decide_team_turn(game_id: str, turn: int, tallies: list) -> str:
+    """
+    团队回合AI决策(供TeamTurnAggregator使用)
+
+    经LLM网关以团队优先级调用模型，排队时先于单人探索请求出队。
+    """
+    from backend.modules.teamTurn import build_turn_prompt
+    return await llm_gateway.generate(
+        OLLAMA_MODEL_NAME, build_turn_prompt(game_id, turn, tallies), priority=PRIORITY_TEAM
+    )
+
+async def stream_agent_tokens(user_input: str, agent: ConversationAgent,
+                              gateway: Optional[LLMGateway] = None) -> AsyncIterator[str]:
+    """
+    流式输出agent回复
+
+    经LLM网关逐token读取(受网关并发上限与排队约束)，不阻塞事件循环；
+    关闭该生成器会关闭到Ollama的连接并归还网关槽位，Ollama随之中止生成。
+    """
+    gateway = gateway or llm_gateway
+    async for chunk in gateway.stream(agent.llm.model, agent.prompt.format(input=user_input),
+                                      options=sampling_options(agent.llm)):
+        if chunk:
+            yield chunk
+
+class StreamStats:
+    """流式对话统计: 首token延迟(TTFT)分布及完成/中断计数"""
+    def __init__(self):
+        self.ttft = LatencyHistogram()
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "ttft_p50_ms": self.ttft.percentile(0.5) * 1000,
+            "ttft_p99_ms": self.ttft.percentile(0.99) * 1000,
+            "streams": self.ttft.total,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed
+        }
+
+def _sse(event: str, data: dict) -> str:
+    """格式化SSE事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def create_app(agent: ConversationAgent, gateway: Optional[LLMGateway] = None) -> FastAPI:
+    """
+    创建AI对话服务应用
+
+    参数:
+    - agent: 对话agent
+    - gateway: 异步调用网关，默认全局llm_gateway
+
+    接口:
+    - POST /chat: 完整回复，经LLM网关调用；请求体no_cache为真时绕过响应缓存
+    - POST /chat/stream: 经LLM网关的SSE流式回复，事件为token/done/error，done事件包含ttft_ms
+    - 以上接口在网关排队已满时返回429
+    - POST /chat/candidates: 并发生成n个候选回复(不同种子、去重)，返回前k个
+    - GET /chat/stats: 流式对话、响应缓存及LLM网关统计
+    """
+    gateway = gateway or llm_gateway
+    app = FastAPI()
+    stats = StreamStats()
+    app.state.stream_stats = stats
+
+    async def read_body(request: Request) -> dict:
+        data = await request.json()
+        if not data.get("message"):
+            raise HTTPException(status_code=400, detail="缺少消息内容")
+        return data
+
+    @app.post("/chat")
+    async def chat_endpoint(request: Request):
+        """处理用户聊天请求"""
+        data = await read_body(request)
+        try:
+            response = await achat_with_agent(data["message"], agent, gateway, bool(data.get("no_cache")))
+            return JSONResponse(content=response)
+        except LLMGatewayBusy:
+            raise HTTPException(status_code=429, detail="AI服务繁忙，请稍后再试")
+        except Exception as e:
+            logger.error(f"对话处理失败: {e}")
+            raise HTTPException(status_code=500, detail="对话处理失败")
+
+    @app.post("/chat/stream")
+    async def chat_stream_endpoint(request: Request):
+        """
+        流式处理用户聊天请求
+
+        先取得首个token(网关排队已满时返回429)再开始SSE响应；
+        客户端断开时Starlette取消该生成器，finally中关闭上游流以中止Ollama生成。
+        """
+        user_input = (await read_body(request))["message"]
+        start = time.perf_counter()
+        tokens = stream_agent_tokens(user_input, agent, gateway)
+        first = error = None
+        try:
+            first = await tokens.__anext__()
+        except StopAsyncIteration:
+            pass
+        except LLMGatewayBusy:
+            await tokens.aclose()
+            raise HTTPException(status_code=429, detail="AI服务繁忙，请稍后再试")
+        except asyncio.CancelledError:
+            await tokens.aclose()
+            raise
+        except Exception as e:
+            error = e
+
+        async def event_stream():
+            ttft = None
+            count = 0
+            try:
+                if error is not None:
+                    raise error
+                if first is not None:
+                    ttft = time.perf_counter() - start
+                    stats.ttft.record(ttft)
+                    count += 1
+                    yield _sse("token", {"token": first})
+                    async for token in tokens:
+                        count += 1
+                        yield _sse("token", {"token": token})
+                stats.completed += 1
+                yield _sse("done", {
+                    "tokens": count,
+                    "ttft_ms": round((ttft or 0) * 1000, 3),
+                    "total_ms": round((time.perf_counter() - start) * 1000, 3)
+                })
+            except asyncio.CancelledError:
+                stats.cancelled += 1
+                logger.info("客户端断开，已中止流式生成")
+                raise
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"流式对话失败: {e}")
+                yield _sse("error", {"message": "对话处理失败"})
+            finally:
+                await tokens.aclose()
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    @app.post("/chat/candidates")
+    async def chat_candidates_endpoint(request: Request):
+        """生成候选回复，请求体: {message, n, k}"""
+        data = await read_body(request)
+        n = int(data.get("n") or CANDIDATE_COUNT)
+        k = int(data.get("k") or n)
+        if not 1 <= n <= 16 or k < 1:
+            raise HTTPException(status_code=400, detail="候选数量无效")
+        try:
+            candidates = await generate_candidates(
+                gateway, agent.llm.model, agent.prompt.format(input=data["message"]), n=n, k=k
+            )
+        except LLMGatewayBusy:
+            raise HTTPException(status_code=429, detail="AI服务繁忙，请稍后再试")
+        if not candidates:
+            raise HTTPException(status_code=500, detail="候选生成失败")
+        return {"candidates": candidates}
+
+    @app.get("/chat/stats")
+    async def chat_stats_endpoint():
+        """流式对话、响应缓存及LLM网关统计"""
+        return {**stats.snapshot(), "cache": response_cache.stats(), "gateway": gateway.stats()}
+
+    return app
+
 def main():
     """
     启动AI对话服务
@@ -132,22 +460,7 @@ def main():
         agent = create_conversation_agent(llm, tools, prompt)
         
         # 配置FastAPI应用
-        app = FastAPI()
-        
-        @app.post("/chat")
-        async def chat_endpoint(request: Request):
-            """处理用户聊天请求"""
-            data = await request.json()
-            user_input = data.get("message")
-            if not user_input:
-                raise HTTPException(status_code=400, detail="缺少消息内容")
-            
-            try:
-                response = chat_with_agent(user_input, agent)
-                return JSONResponse(content=response)
-            except Exception as e:
-                logger.error(f"对话处理失败: {e}")
-                raise HTTPException(status_code=500, detail="对话处理失败")
+        app = create_app(agent)
         
         # 启动Uvicorn服务器
         uvicorn.run(app, host="0.0.0.0", port=8000)
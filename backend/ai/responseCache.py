@@ -0,0 +1,276 @@
+"""
+LLM响应缓存模块
+===============
+
+公共/固定空间中大量玩家重玩同一剧情，generate_story / chat_with_agent 会反复收到
+几乎相同的提示。本模块按规范化后的请求缓存模型输出，避免重复占用模型时间。
+
+缓存键:
+- (模型名, 提示模板版本, 上下文哈希, 采样参数) 的规范化JSON的sha256
+- 上下文规范化: 去除首尾空白，连续空白折叠为单个空格
+
+两级存储:
+- 内存层: TTLCache(LRU + TTL)
+- 磁盘层: SQLite(可选)，进程重启后仍可命中；按最近访问时间淘汰超出容量的条目
+- 磁盘命中的条目回填到内存层
+
+绕过缓存:
+- 调用方传入bypass=True(创作类请求)
+- temperature高于 LLM_CACHE_MAX_TEMPERATURE 的请求
+
+统计: 命中率、内存/磁盘命中数、绕过次数、节省的模型耗时(秒)
+
+配置项(环境变量):
+- LLM_CACHE_SIZE: 内存层条目数，默认1024，0表示禁用缓存
+- LLM_CACHE_TTL: 条目存活时间(秒)，默认86400
+- LLM_CACHE_PATH: SQLite文件路径，为空时不启用磁盘层，默认为空
+- LLM_CACHE_DISK_SIZE: 磁盘层最大条目数，默认100000
+- LLM_CACHE_MAX_TEMPERATURE: 可缓存的最高temperature，默认1.0
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+from backend.utils.ttlCache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_context(context: str) -> str:
+    """规范化上下文文本: 去除首尾空白并折叠连续空白"""
+    return _WHITESPACE.sub(" ", context).strip()
+
+
+def make_key(model: str, template_version: str, context: str, params: Optional[dict] = None) -> str:
+    """
+    生成缓存键
+
+    参数:
+    - model: 模型名称
+    - template_version: 提示模板版本，模板修改后应递增以使旧条目失效
+    - context: 提示上下文(模板变量或完整提示)
+    - params: 采样参数(temperature/top_p/seed等)，值为None的参数忽略
+    """
+    context_hash = hashlib.sha256(normalize_context(context).encode()).hexdigest()
+    sampling = {k: v for k, v in sorted((params or {}).items()) if v is not None}
+    payload = json.dumps([model, template_version, context_hash, sampling], separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """LLM响应两级缓存(线程安全，可在线程池中调用)"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 86400, path: Optional[str] = None,
+                 disk_max_entries: int = 100000, max_temperature: float = 1.0):
+        """
+        参数:
+        - maxsize: 内存层条目数，<=0 表示禁用缓存
+        - ttl: 条目存活时间(秒)
+        - path: SQLite文件路径，为空时不启用磁盘层
+        - disk_max_entries: 磁盘层最大条目数
+        - max_temperature: 可缓存的最高temperature
+        """
+        self.memory = TTLCache(maxsize, ttl, name="llm_response")
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self.max_temperature = max_temperature
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_count = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        if path and maxsize > 0:
+            self._open_disk(path)
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """根据环境变量创建"""
+        return cls(
+            maxsize=int(os.getenv('LLM_CACHE_SIZE', '1024')),
+            ttl=float(os.getenv('LLM_CACHE_TTL', '86400')),
+            path=os.getenv('LLM_CACHE_PATH', ''),
+            disk_max_entries=int(os.getenv('LLM_CACHE_DISK_SIZE', '100000')),
+            max_temperature=float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '1.0'))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.maxsize > 0
+
+    def _open_disk(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, model_seconds REAL NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_accessed ON llm_responses (accessed_at)")
+        self._db.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (time.time(),))
+        self._disk_count = self._db.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def should_bypass(self, params: Optional[dict] = None, bypass: bool = False) -> bool:
+        """判断请求是否绕过缓存"""
+        if bypass or not self.enabled:
+            return True
+        temperature = (params or {}).get("temperature")
+        return temperature is not None and temperature > self.max_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中返回None"""
+        with self._lock:
+            item = self.memory.get(key)
+            if item is not None:
+                self.memory_hits += 1
+                self.saved_seconds += item[1]
+                return item[0]
+            item = self._disk_get(key)
+            if item is not None:
+                response, model_seconds, expires_at = item
+                self.memory.put(key, (response, model_seconds), ttl=expires_at - time.time())
+                self.disk_hits += 1
+                self.saved_seconds += model_seconds
+                return response
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str, model_seconds: float = 0.0) -> None:
+        """写入缓存，model_seconds为生成该响应耗费的模型时间"""
+        with self._lock:
+            self.memory.put(key, (response, model_seconds))
+            if self._db is not None:
+                now = time.time()
+                try:
+                    cursor = self._db.execute(
+                        "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?)",
+                        (key, response, model_seconds, now + self.ttl, now)
+                    )
+                    self._disk_count += cursor.rowcount
+                    if self._disk_count > self.disk_max_entries:
+                        self._disk_evict()
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM缓存写入磁盘失败: {e}")
+
+    def _disk_get(self, key: str):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT response, model_seconds, expires_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row[2] <= now:
+                self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._disk_count -= 1
+                return None
+            self._db.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return row
+        except sqlite3.Error as e:
+            logger.warning(f"LLM缓存读取磁盘失败: {e}")
+            return None
+
+    def _disk_evict(self) -> None:
+        """淘汰过期条目及最久未访问的条目，保留容量的90%以减少淘汰频率"""
+        self._db.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (time.time(),))
+        count = self._db.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        keep = int(self.disk_max_entries * 0.9)
+        if count > keep:
+            self._db.execute(
+                "DELETE FROM llm_responses WHERE key IN ("
+                "SELECT key FROM llm_responses ORDER BY accessed_at LIMIT ?)", (count - keep,)
+            )
+            count = keep
+        self._disk_count = count
+
+    def get_or_generate(self, key: str, generate: Callable[[], str],
+                        params: Optional[dict] = None, bypass: bool = False) -> str:
+        """
+        读取缓存，未命中时调用generate生成并写入缓存
+
+        参数:
+        - key: make_key生成的缓存键
+        - generate: 无参生成函数(同步调用模型)
+        - params: 采样参数，用于判断是否绕过缓存
+        - bypass: 强制绕过缓存(不读不写)
+        """
+        if self.should_bypass(params, bypass):
+            with self._lock:
+                self.bypassed += 1
+            return generate()
+        response = self.get(key)
+        if response is not None:
+            return response
+        start = time.perf_counter()
+        response = generate()
+        self.put(key, response, time.perf_counter() - start)
+        return response
+
+    async def aget_or_generate(self, key: str, generate: Callable[[], Awaitable[str]],
+                               params: Optional[dict] = None, bypass: bool = False) -> str:
+        """异步版get_or_generate，generate为无参协程函数(经LLM网关调用模型)"""
+        if self.should_bypass(params, bypass):
+            with self._lock:
+                self.bypassed += 1
+            return await generate()
+        response = self.get(key)
+        if response is not None:
+            return response
+        start = time.perf_counter()
+        response = await generate()
+        self.put(key, response, time.perf_counter() - start)
+        return response
+
+    def clear(self) -> None:
+        """清空两级缓存(保留统计)"""
+        with self._lock:
+            self.memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_responses")
+                self._disk_count = 0
+
+    def close(self) -> None:
+        """关闭磁盘层"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        """返回缓存统计"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "name": self.memory.name,
+                "size": len(self.memory),
+                "maxsize": self.memory.maxsize,
+                "disk_size": self._disk_count,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.memory.evictions,
+                "hit_rate": hits / total if total else 0.0,
+                "saved_model_seconds": round(self.saved_seconds, 3)
+            }
+
+
+# 全局LLM响应缓存
+response_cache = ResponseCache.from_env()
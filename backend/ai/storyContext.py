@@ -0,0 +1,248 @@
+"""
+剧情上下文构建模块
+==================
+
+每个空间是一个按楼层号(floor_num)排序的回复串，AI续写剧情时需要上下文。
+若每次都发送整串回复，提示长度与延迟会随楼层线性增长。本模块为每个空间维护
+滚动摘要，提示只包含 空间设定 + 摘要 + 最近M条回复，并受token预算约束。
+
+滚动摘要:
+- 摘要存于space_summaries表，记录摘要已覆盖的最大楼层号(summarized_floor)
+- 最近窗口之前尚未摘要的楼层达到K层时，将其并入摘要(每K条新回复约更新一次)
+- 并入时按token预算分块调用摘要函数，每块完成后即保存进度
+- 同一空间的摘要更新在进程内串行执行，避免重复调用模型
+
+token预算:
+- 超出预算时依次: 丢弃最早的窗口回复 → 截断摘要 → 截断空间设定
+- token数为估算值: 中日韩字符按1个token计，其余字符按4个字符1个token计
+
+配置项(环境变量):
+- STORY_RECENT_REPLIES: 提示中包含的最近回复数M，默认20
+- STORY_SUMMARIZE_EVERY: 摘要更新间隔K(楼层数)，默认20
+- STORY_TOKEN_BUDGET: 提示token预算，默认2048
+- STORY_SUMMARY_MODEL: 摘要使用的模型，默认取OLLAMA_MODEL_NAME
+"""
+import os
+import re
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Tuple
+from sqlalchemy import select
+from backend.database.models import Reply, Space, SpaceSummary
+
+logger = logging.getLogger(__name__)
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+SUMMARY_PROMPT = (
+    "以下是一个冒险空间的前情提要与后续楼层内容。请将它们合并为一段不超过{limit}字的新前情提要，"
+    "保留关键人物、地点、物品与未解决的事件。\n"
+    "前情提要: {summary}\n楼层内容:\n{replies}\n新的前情提要:"
+)
+
+# 摘要函数: (原摘要, [(楼层号, 内容)]) -> 新摘要
+Summarizer = Callable[[str, List[Tuple[int, str]]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本token数"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """
+    将文本截断到不超过max_tokens
+
+    参数:
+    - keep_end: 保留结尾部分(摘要的最新内容在结尾)
+    """
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        part = text[-mid:] if keep_end else text[:mid]
+        if estimate_tokens(part) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return (text[-low:] if keep_end else text[:low]) if low else ""
+
+
+def format_reply(floor_num: int, content: str) -> str:
+    return f"#{floor_num} {content}"
+
+
+def llm_summarizer(gateway=None, model: Optional[str] = None, limit: int = 300) -> Summarizer:
+    """
+    创建经LLM网关调用模型的摘要函数
+
+    参数:
+    - gateway: LLM网关，默认全局llm_gateway
+    - model: 模型名称，默认STORY_SUMMARY_MODEL或OLLAMA_MODEL_NAME
+    - limit: 摘要字数上限
+    """
+    if gateway is None:
+        from backend.ai.llmGateway import llm_gateway
+        gateway = llm_gateway
+    model = model or os.getenv('STORY_SUMMARY_MODEL') or os.getenv('OLLAMA_MODEL_NAME', 'deepseek-r1:1.5b')
+
+    async def summarize(summary: str, replies: List[Tuple[int, str]]) -> str:
+        prompt = SUMMARY_PROMPT.format(
+            limit=limit, summary=summary or "(无)",
+            replies="\n".join(format_reply(floor, content) for floor, content in replies)
+        )
+        return (await gateway.generate(model, prompt)).strip()
+    return summarize
+
+
+@dataclass(slots=True)
+class StoryContext:
+    """构建出的剧情上下文"""
+    space_id: str
+    prompt: str
+    tokens: int
+    summary: str
+    summarized_floor: int
+    floors: List[int] = field(default_factory=list)
+
+
+class StoryContextBuilder:
+    """剧情上下文构建器"""
+
+    def __init__(self, summarize: Optional[Summarizer] = None, db_operator=None,
+                 recent_replies: int = None, summarize_every: int = None, token_budget: int = None):
+        """
+        参数:
+        - summarize: 摘要函数，默认llm_summarizer()
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - recent_replies: 提示中包含的最近回复数M
+        - summarize_every: 摘要更新间隔K
+        - token_budget: 提示token预算
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.db_operator = db_operator
+        self.summarize = summarize or llm_summarizer()
+        self.recent_replies = recent_replies if recent_replies is not None else \
+            int(os.getenv('STORY_RECENT_REPLIES', '20'))
+        self.summarize_every = summarize_every if summarize_every is not None else \
+            int(os.getenv('STORY_SUMMARIZE_EVERY', '20'))
+        self.token_budget = token_budget if token_budget is not None else \
+            int(os.getenv('STORY_TOKEN_BUDGET', '2048'))
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.summary_calls = 0
+
+    async def _load_summary(self, session, space_id: str) -> Tuple[str, int]:
+        row = (await session.execute(
+            select(SpaceSummary.summary, SpaceSummary.summarized_floor)
+            .where(SpaceSummary.space_id == space_id)
+        )).first()
+        return (row.summary, row.summarized_floor) if row else ("", 0)
+
+    async def build(self, space_id: str) -> StoryContext:
+        """
+        构建空间的剧情上下文
+
+        异常:
+        - ValueError: 空间不存在
+        """
+        async with self.db_operator.session() as session:
+            space = (await session.execute(
+                select(Space.title, Space.content).where(Space.id == space_id)
+            )).first()
+            if space is None:
+                raise ValueError(f"空间不存在: {space_id}")
+            summary, summarized_floor = await self._load_summary(session, space_id)
+            recent = (await session.execute(
+                select(Reply.floor_num, Reply.content)
+                .where(Reply.space_id == space_id, Reply.floor_num > summarized_floor)
+                .order_by(Reply.floor_num.desc())
+                .limit(self.recent_replies)
+            )).all()
+        recent = [(row.floor_num, row.content) for row in reversed(recent)]
+
+        # 窗口之前未摘要的楼层达到K层时并入摘要(楼层号可能不连续，按楼层差计)
+        if recent and recent[0][0] - 1 - summarized_floor >= self.summarize_every:
+            summary, summarized_floor = await self._refresh(space_id, recent[0][0] - 1)
+            recent = [reply for reply in recent if reply[0] > summarized_floor]
+        return self._assemble(space_id, space.title, space.content, summary, summarized_floor, recent)
+
+    async def _refresh(self, space_id: str, upto_floor: int) -> Tuple[str, int]:
+        """将(summarized_floor, upto_floor]的楼层并入摘要，返回(摘要, 覆盖楼层)"""
+        lock = self._locks.setdefault(space_id, asyncio.Lock())
+        async with lock:
+            async with self.db_operator.session() as session:
+                summary, summarized_floor = await self._load_summary(session, space_id)
+                if upto_floor - summarized_floor < self.summarize_every:
+                    return summary, summarized_floor  # 等待期间已由其他请求更新
+                pending = (await session.execute(
+                    select(Reply.floor_num, Reply.content)
+                    .where(Reply.space_id == space_id,
+                           Reply.floor_num > summarized_floor, Reply.floor_num <= upto_floor)
+                    .order_by(Reply.floor_num)
+                )).all()
+
+            for chunk in self._chunks([(row.floor_num, row.content) for row in pending]):
+                summary = truncate_tokens(
+                    await self.summarize(summary, chunk), self.token_budget // 4, keep_end=True
+                )
+                summarized_floor = chunk[-1][0]
+                self.summary_calls += 1
+                async with self.db_operator.session() as session:
+                    await session.merge(SpaceSummary(
+                        space_id=space_id, summary=summary, summarized_floor=summarized_floor
+                    ))
+            return summary, summarized_floor
+
+    def _chunks(self, replies: List[Tuple[int, str]]):
+        """按token预算将待摘要楼层分块"""
+        chunk, used = [], 0
+        for floor, content in replies:
+            cost = estimate_tokens(content) + 2
+            if chunk and used + cost > self.token_budget:
+                yield chunk
+                chunk, used = [], 0
+            chunk.append((floor, content))
+            used += cost
+        if chunk:
+            yield chunk
+
+    def _assemble(self, space_id: str, title: str, content: str, summary: str,
+                  summarized_floor: int, recent: List[Tuple[int, str]]) -> StoryContext:
+        """按预算组装提示文本"""
+        header = f"空间: {title}\n{content}"
+        lines = [format_reply(floor, text) for floor, text in recent]
+        costs = [estimate_tokens(line) + 1 for line in lines]
+        header_cost = estimate_tokens(header) + 1
+        summary_cost = estimate_tokens(summary) + 6 if summary else 0
+
+        # 依次丢弃最早的回复，至少保留最新一条
+        start = 0
+        total = header_cost + summary_cost + sum(costs)
+        while total > self.token_budget and start < len(lines) - 1:
+            total -= costs[start]
+            start += 1
+        remaining = self.token_budget - sum(costs[start:])
+        if summary and header_cost + summary_cost > remaining:
+            summary = truncate_tokens(summary, max(remaining - header_cost - 6, 0), keep_end=True)
+        header = truncate_tokens(header, remaining - (estimate_tokens(summary) + 6 if summary else 0))
+
+        parts = [header] if header else []
+        if summary:
+            parts.append(f"前情提要: {summary}")
+        parts.extend(lines[start:])
+        prompt = "\n".join(parts)
+        return StoryContext(
+            space_id=space_id,
+            prompt=prompt,
+            tokens=estimate_tokens(prompt),
+            summary=summary,
+            summarized_floor=summarized_floor,
+            floors=[floor for floor, _ in recent[start:]]
+        )
@@ -6,6 +6,11 @@ API路由主入口模块
 
 当前功能:
 - 注册认证相关路由到/api/auth路径
+- 注册空间查询路由到/api/game路径
+- 注册排行榜路由到/api/game路径
+- 注册空间事件推送(SSE)路由到/api/game路径
+- 注册团队回合提交路由到/api/game路径
+- 注册指标路由到/api/_metrics路径
 
 未来扩展:
 - 可在此添加其他模块的路由注册
@@ -20,6 +25,13 @@ API路由主入口模块
 from fastapi import APIRouter
 import logging
 from .modules.auth import router as auth_router
+from .modules.authCache import token_cache, user_cache
+from .modules.spaces import router as spaces_router
+from .modules.leaderboard import router as leaderboard_router
+from .modules.spaceEvents import router as space_events_router
+from .modules.teamTurn import router as team_turn_router
+from .modules.metrics import router as metrics_router, metrics_registry
+from .modules.serverConfig import server_config
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -36,6 +48,37 @@ router.include_router(
     tags=["auth"]
 )
 
+# 注册空间查询路由(空间列表、行动历史)
+router.include_router(
+    spaces_router,
+    prefix="/game"
+)
+
+# 注册排行榜路由(前N名、指定用户名次±k)
+router.include_router(
+    leaderboard_router,
+    prefix="/game"
+)
+
+# 注册空间事件推送路由(SSE订阅空间状态)
+router.include_router(
+    space_events_router,
+    prefix="/game"
+)
+
+# 注册团队回合提交路由(成员提交选择，回合结算后返回AI决策)
+router.include_router(
+    team_turn_router,
+    prefix="/game"
+)
+
+# 注册指标路由(/api/_metrics)，并导出认证缓存命中统计与服务器配置重新加载次数
+router.include_router(metrics_router)
+metrics_registry.register_cache(token_cache)
+metrics_registry.register_cache(user_cache)
+metrics_registry.register_counter("hbm_server_config_reloads_total", "服务器配置重新加载次数",
+                                  lambda: server_config.reloads)
+
 # 调试路由信息
 for route in auth_router.routes:
     logger.info(f"Auth route registered: {route.path}")
\ No newline at end of file
@@ -7,7 +7,7 @@ FastAPI应用主入口
 主要功能:
 - 配置CORS跨域设置
 - 挂载所有API路由
-- 请求日志记录
+- 请求延迟指标与访问日志
 - 开发服务器启动
 
 环境要求:
@@ -23,19 +23,82 @@ FastAPI应用主入口
 
 import os
 import sys
-from fastapi import FastAPI, Request
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # 将项目根目录添加到Python路径，确保模块导入正常
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from backend.api import router as api_router
+from backend.modules.metrics import RequestMetricsMiddleware
+from backend.modules.game import game_snapshotter
+from backend.ai.llmGateway import llm_gateway
+from backend.modules.logSink import log_sink
+from backend.modules.leaderboard import leaderboard_service
+from backend.modules.spaceHeat import space_heat
+from backend.modules.replyWriter import reply_writer
+from backend.modules.spaceEvents import space_events
+from backend.modules.rateLimiter import rate_limiter
+from backend.modules.serverConfig import server_config
+from backend.modules.teamTurn import team_turn
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期
+
+    - 启动: 加载服务器配置，从MySQL快照恢复游戏状态，加载排行榜与空间热度，启动配置刷新任务、
+      周期快照任务、日志批量写入任务、每日排名任务与空间热度写回任务
+    - 关闭: 停止快照任务并写入最后一次快照，写完缓冲的日志与待写回复，停止排名任务，写回空间热度，
+      停止配置刷新任务，关闭空间事件频道与LLM网关连接池
+    """
+    try:
+        loaded = await server_config.load()
+        logger.info(f"服务器配置加载: {loaded} 项")
+    except Exception as e:
+        logger.error(f"服务器配置加载失败，使用默认值: {e}")
+    try:
+        restored = await game_snapshotter.restore()
+        logger.info(f"从快照恢复游戏: {restored} 局")
+    except Exception as e:
+        logger.error(f"游戏快照恢复失败: {e}")
+    try:
+        loaded = await leaderboard_service.warm()
+        logger.info(f"排行榜加载: {loaded} 名用户")
+    except Exception as e:
+        logger.error(f"排行榜加载失败: {e}")
+    try:
+        loaded = await space_heat.warm()
+        logger.info(f"空间热度加载: {loaded} 个空间")
+    except Exception as e:
+        logger.error(f"空间热度加载失败: {e}")
+    server_config.start()
+    game_snapshotter.start()
+    log_sink.start()
+    leaderboard_service.start()
+    space_heat.start()
+    yield
+    await game_snapshotter.stop()
+    await log_sink.stop()
+    await reply_writer.drain()
+    await leaderboard_service.stop()
+    await space_heat.stop()
+    await server_config.stop()
+    await team_turn.close()
+    await space_events.close()
+    await rate_limiter.close()
+    await llm_gateway.close()
 
 # 创建FastAPI应用实例
 app = FastAPI(
     title="HBM API服务",
     description="提供游戏后端API服务",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # 配置CORS中间件
@@ -48,6 +111,9 @@ app.add_middleware(
     expose_headers=["*"]  # 新增：暴露所有响应头
 )
 
+# 配置请求指标中间件(延迟直方图 + 采样访问日志，指标见/api/_metrics)
+app.add_middleware(RequestMetricsMiddleware)
+
 # 挂载API路由到/api路径下
 app.include_router(
     api_router,
@@ -55,26 +121,6 @@ app.include_router(
     tags=["api"]
 )
 
-@app.middleware("http")
-async def log_request_url(request: Request, call_next):
-    """
-    请求日志中间件
-    
-    功能:
-    - 记录所有进入的请求URL
-    - 开发调试使用
-    
-    参数:
-    - request: 请求对象
-    - call_next: 下一个中间件或路由处理函数
-    
-    返回值:
-    - 响应对象
-    """
-    print(f"Request URL: {request.url}")  # 开发环境日志
-    response = await call_next(request)
-    return response
-
 if __name__ == "__main__":
     """开发服务器启动入口"""
     import uvicorn
@@ -3,13 +3,41 @@ MySQL数据库操作模块(优化版)
 =======================
 
 基于SQLAlchemy ORM重构的数据库操作模块，提供更高效的CRUD接口和事务管理
+
+读写路径:
+- 写入及需要ORM实例的读取: get_one/get_all/create/update/delete，
+  会话提交后不过期属性，返回的实例在会话关闭后仍可读取已加载的列
+- 只读查询: fetch_one/fetch_all 只查询指定列，返回不可变命名元组(见rowReader.py)，
+  不经过ORM实例化，适合列表与高频读取
+- model参数均可为模型类或表名(如"users")
+
+读写分离(见replicaRouter.py):
+- 配置 MYSQL_REPLICA_HOSTS 后，get_one/get_all/fetch_one/fetch_all 与 read_session() 读取只读副本
+- db_session() 及写入方法使用主库；会话提交了写入(INSERT/UPDATE/DELETE或ORM flush)时，
+  当前上下文随后一段时间的读取也使用主库(读己之写)，只读的主库会话不触发
+- 副本读取失败时本次改用主库；只有连接级错误(连接建立失败、连接断开)才将副本暂停使用，
+  查询本身导致的错误(锁等待超时、死锁等)不影响副本状态
+
+时区:
+- 每个MySQL连接建立时执行 SET time_zone = '+00:00'，NOW()/CURRENT_TIMESTAMP 写入UTC时间，
+  与应用中的utcnow()(见backend/utils/utcTime.py)一致
+
+配置项(环境变量):
+- MYSQL_HOST/MYSQL_PORT/MYSQL_USER/MYSQL_PASSWORD/MYSQL_DATABASE: 主库连接参数
+- MYSQL_REPLICA_HOSTS: 只读副本列表(逗号分隔的host[:port]，账号与库名同主库)，默认为空
 """
 
 from contextlib import contextmanager
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, scoped_session
+from sqlalchemy.exc import SQLAlchemyError, OperationalError, InterfaceError, DisconnectionError
 import os
+import logging
+from backend.database.models import get_model
+from backend.database.rowReader import read_query
+from backend.database.replicaRouter import ReplicaRouter, mark_write
+
+logger = logging.getLogger(__name__)
 
 # 数据库配置(从环境变量获取，带默认值)
 DB_CONFIG = {
@@ -20,34 +48,181 @@ DB_CONFIG = {
     'database': os.getenv('MYSQL_DATABASE', 'hbm_db')
 }
 
-DATABASE_URL = (
-    f"mysql+mysqlconnector://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
-    f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-)
+REPLICA_HOSTS = [host.strip() for host in os.getenv('MYSQL_REPLICA_HOSTS', '').split(',') if host.strip()]
+
+
+def database_url(host: str = None, driver: str = 'mysql+mysqlconnector') -> str:
+    """
+    拼接连接串
+
+    参数:
+    - host: host[:port]，默认主库
+    - driver: SQLAlchemy驱动名
+    """
+    host, _, port = (host or f"{DB_CONFIG['host']}:{DB_CONFIG['port']}").partition(':')
+    return (
+        f"{driver}://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
+        f"{host}:{port or DB_CONFIG['port']}/{DB_CONFIG['database']}"
+    )
+
+
+DATABASE_URL = database_url()
+REPLICA_URLS = [database_url(host) for host in REPLICA_HOSTS]
+
+# MySQL连接池参数
+POOL_OPTIONS = {
+    'pool_size': 20,
+    'max_overflow': 10,
+    'pool_pre_ping': True,
+    'pool_recycle': 3600
+}
+
+# 副本读取失败类错误(回退主库重试)
+REPLICA_ERRORS = (OperationalError, InterfaceError)
+# 会话info中标记本事务执行过写入的键
+WROTE_KEY = 'hbm_wrote'
+
+
+def connection_lost(error: Exception) -> bool:
+    """是否为连接级错误(此时暂停使用该副本)"""
+    return isinstance(error, DisconnectionError) or getattr(error, 'connection_invalidated', False)
+
+
+def _connect_failure_is_disconnect(context):
+    # 建立连接失败(此时尚无连接)按断开处理，使异常带有connection_invalidated
+    if context.connection is None and not context.is_pre_ping:
+        context.is_disconnect = True
+
+
+def replica_engine(engine):
+    """副本引擎: UTC会话时区，连接建立失败视为连接级错误(异步引擎传入其sync_engine)，返回engine"""
+    event.listen(engine, "handle_error", _connect_failure_is_disconnect)
+    return utc_session(engine)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_statement(orm_execute_state):
+    # 非SELECT语句(含text())均视为写入
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session, flush_context):
+    session.info[WROTE_KEY] = True
+
+
+def note_commit(session) -> None:
+    """事务提交后调用: 本事务执行过写入时标记读己之写"""
+    if session.info.pop(WROTE_KEY, False):
+        mark_write()
+
+
+def _set_utc_time_zone(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("SET time_zone = '+00:00'")
+    cursor.close()
+
+
+def utc_session(engine):
+    """MySQL引擎的新连接使用UTC会话时区(异步引擎传入其sync_engine)，返回engine"""
+    if engine.dialect.name == 'mysql':
+        event.listen(engine, "connect", _set_utc_time_zone)
+    return engine
+
 
 # 创建引擎和会话工厂
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=20,
-    max_overflow=10,
-    pool_pre_ping=True,
-    pool_recycle=3600
-)
+engine = utc_session(create_engine(DATABASE_URL, **POOL_OPTIONS))
 SessionLocal = scoped_session(
-    sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 )
+replica_router = ReplicaRouter([replica_engine(create_engine(url, **POOL_OPTIONS)) for url in REPLICA_URLS])
+
+
+def configure(url: str, replica_urls=(), **engine_kwargs):
+    """
+    重新配置同步引擎(测试或工具脚本指向其他数据库时使用)
+
+    参数:
+    - url: 主库连接串
+    - replica_urls: 只读副本连接串列表
+    - engine_kwargs: 透传给 create_engine 的参数
+    """
+    global engine
+    SessionLocal.remove()
+    engine.dispose()
+    for replica in replica_router.engines():
+        replica.dispose()
+    engine = utc_session(create_engine(url, **engine_kwargs))
+    SessionLocal.configure(bind=engine)
+    replica_router.set_engines([replica_engine(create_engine(replica, **engine_kwargs)) for replica in replica_urls])
+    return engine
+
+
+def _read(query):
+    """
+    在副本(或主库)上执行只读操作
+
+    参数:
+    - query: 以引擎为参数的函数
+    """
+    replica = replica_router.choose()
+    if replica is not None:
+        replica_router.acquire(replica)
+        try:
+            return query(replica.engine)
+        except REPLICA_ERRORS as e:
+            if connection_lost(e):
+                replica_router.mark_failed(replica, e)
+            else:
+                logger.warning(f"副本读取失败，本次改用主库({replica.name}): {e}")
+        finally:
+            replica_router.release(replica)
+    return query(engine)
+
+
+@contextmanager
+def read_session():
+    """
+    只读会话的上下文管理器(路由到副本，不提交)
+
+    进入时即建立连接，副本不可用时改用主库
+    """
+    replica = replica_router.choose()
+    session = None
+    if replica is not None:
+        replica_router.acquire(replica)
+        session = Session(bind=replica.engine, autoflush=False)
+        try:
+            session.connection()
+        except REPLICA_ERRORS as e:
+            session.close()
+            replica_router.release(replica)
+            replica_router.mark_failed(replica, e)
+            replica, session = None, None
+    if session is None:
+        session = Session(bind=engine, autoflush=False)
+    try:
+        yield session
+    finally:
+        session.close()
+        if replica is not None:
+            replica_router.release(replica)
+
 
 @contextmanager
 def db_session():
-    """提供数据库会话的上下文管理器"""
+    """提供数据库会话的上下文管理器(主库，读写)"""
     session = SessionLocal()
     try:
         yield session
         session.commit()
+        note_commit(session)
     except Exception:
         session.rollback()
         raise
     finally:
+        session.info.pop(WROTE_KEY, None)
         session.close()
 
 class DBOperator:
@@ -56,20 +231,66 @@ class DBOperator:
     @staticmethod
     def get_one(model, **filters):
         """获取单个记录"""
-        with db_session() as session:
-            return session.query(model).filter_by(**filters).first()
+        def query(bind):
+            with Session(bind=bind) as session:
+                return session.query(get_model(model)).filter_by(**filters).first()
+        return _read(query)
 
     @staticmethod
     def get_all(model, **filters):
         """获取多个记录"""
-        with db_session() as session:
-            return session.query(model).filter_by(**filters).all()
+        def query(bind):
+            with Session(bind=bind) as session:
+                return session.query(get_model(model)).filter_by(**filters).all()
+        return _read(query)
+
+    @staticmethod
+    def fetch_one(model, columns=None, **filters):
+        """
+        只读查询单行
+
+        参数:
+        - model: 模型类或表名
+        - columns: 列名序列，默认全部列
+        - filters: 等值过滤条件
+
+        返回值:
+        - 命名元组，不存在时返回None
+        """
+        statement, params, row_cls = read_query(model, columns, filters, limit=1)
+
+        def query(bind):
+            with bind.connect() as conn:
+                return conn.execute(statement, params).first()
+        row = _read(query)
+        return None if row is None else row_cls._make(row)
+
+    @staticmethod
+    def fetch_all(model, columns=None, limit=None, **filters):
+        """
+        只读查询多行
+
+        参数:
+        - model: 模型类或表名
+        - columns: 列名序列，默认全部列
+        - limit: 最大行数
+        - filters: 等值过滤条件
+
+        返回值:
+        - 命名元组列表
+        """
+        statement, params, row_cls = read_query(model, columns, filters, limit=limit)
+
+        def query(bind):
+            with bind.connect() as conn:
+                return conn.execute(statement, params).all()
+        return list(map(row_cls._make, _read(query)))
 
     @staticmethod
     def create(model, **data):
         """创建记录"""
         with db_session() as session:
-            instance = model(**data)
+            instance = get_model(model)(**data)
             session.add(instance)
             session.flush()
             return instance
@@ -77,6 +298,7 @@ class DBOperator:
     @staticmethod
     def bulk_create(model, data_list):
         """批量创建记录"""
+        model = get_model(model)
         with db_session() as session:
             instances = [model(**data) for data in data_list]
             session.bulk_save_objects(instances)
@@ -87,7 +309,7 @@ class DBOperator:
     def update(model, filters, **data):
         """更新记录"""
         with db_session() as session:
-            instances = session.query(model).filter_by(**filters)
+            instances = session.query(get_model(model)).filter_by(**filters)
             instances.update(data, synchronize_session=False)
             return instances.all()
 
@@ -95,7 +317,7 @@ class DBOperator:
     def delete(model, **filters):
         """删除记录"""
         with db_session() as session:
-            instances = session.query(model).filter_by(**filters)
+            instances = session.query(get_model(model)).filter_by(**filters)
             count = instances.delete(synchronize_session=False)
             return count
 
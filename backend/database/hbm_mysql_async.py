@@ -0,0 +1,255 @@
+"""
+MySQL异步数据库操作模块
+=======================
+
+基于SQLAlchemy异步引擎的数据库操作模块，与同步的DBOperator提供相同的CRUD接口，
+供FastAPI的async路由使用，避免数据库往返阻塞事件循环。
+只读查询fetch_one/fetch_all返回不可变命名元组(见rowReader.py)。
+
+读写分离与同步模块一致(见replicaRouter.py): get_one/get_all/fetch_one/fetch_all与read_session()
+读取只读副本，session()及写入方法使用主库，提交了写入时触发读己之写；副本读取失败时改用主库，
+连接级错误时暂停使用该副本。
+MySQL连接的会话时区同样设为UTC(见hbm_mysql.utc_session)。
+
+驱动说明:
+- 生产环境: mysql+aiomysql
+- 测试环境: sqlite+aiosqlite (通过 AsyncDBOperator.configure 指定)
+"""
+
+import os
+import logging
+from contextlib import asynccontextmanager
+from sqlalchemy import select, update, delete, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from backend.database.hbm_mysql import (
+    REPLICA_ERRORS, REPLICA_HOSTS, WROTE_KEY, connection_lost, database_url, note_commit, replica_engine, utc_session
+)
+from backend.database.models import get_model
+from backend.database.rowReader import read_query
+from backend.database.replicaRouter import ReplicaRouter
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or database_url(driver='mysql+aiomysql')
+ASYNC_REPLICA_URLS = [database_url(host, driver='mysql+aiomysql') for host in REPLICA_HOSTS]
+
+# MySQL连接池参数，与同步引擎保持一致
+MYSQL_POOL_OPTIONS = {
+    'pool_size': 20,
+    'max_overflow': 10,
+    'pool_pre_ping': True,
+    'pool_recycle': 3600
+}
+
+
+class AsyncDBOperator:
+    """异步数据库操作封装类"""
+
+    engine = None
+    session_factory = None
+    replica_router = ReplicaRouter()
+
+    @classmethod
+    def configure(cls, url: str = ASYNC_DATABASE_URL, replica_urls=None, **engine_kwargs):
+        """
+        配置异步引擎
+
+        参数:
+        - url: 主库连接串，默认读取 ASYNC_DATABASE_URL 或由 DB_CONFIG 拼接
+        - replica_urls: 只读副本连接串列表，默认在使用默认主库时取 MYSQL_REPLICA_HOSTS
+        - engine_kwargs: 透传给 create_async_engine 的参数，MySQL默认使用连接池参数
+        """
+        if replica_urls is None:
+            replica_urls = ASYNC_REPLICA_URLS if url == ASYNC_DATABASE_URL else ()
+        if not engine_kwargs and url.startswith('mysql'):
+            engine_kwargs = dict(MYSQL_POOL_OPTIONS)
+        cls.engine = create_async_engine(url, **engine_kwargs)
+        utc_session(cls.engine.sync_engine)
+        cls.session_factory = async_sessionmaker(
+            cls.engine, autoflush=False, expire_on_commit=False
+        )
+        replicas = [create_async_engine(replica, **engine_kwargs) for replica in replica_urls]
+        for replica in replicas:
+            replica_engine(replica.sync_engine)
+        cls.replica_router.set_engines(replicas)
+        return cls.engine
+
+    @classmethod
+    async def dispose(cls):
+        """释放连接池"""
+        if cls.engine is not None:
+            await cls.engine.dispose()
+        for replica in cls.replica_router.engines():
+            await replica.dispose()
+        cls.replica_router.set_engines([])
+        cls.engine = None
+        cls.session_factory = None
+
+    @classmethod
+    @asynccontextmanager
+    async def session(cls):
+        """提供异步数据库会话的上下文管理器(主库，读写)"""
+        if cls.session_factory is None:
+            cls.configure()
+        session = cls.session_factory()
+        try:
+            yield session
+            await session.commit()
+            note_commit(session)
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            session.info.pop(WROTE_KEY, None)
+            await session.close()
+
+    @classmethod
+    async def _read(cls, query):
+        """
+        在副本(或主库)上执行只读操作
+
+        参数:
+        - query: 以异步引擎为参数的协程函数
+        """
+        if cls.engine is None:
+            cls.configure()
+        router = cls.replica_router
+        replica = router.choose()
+        if replica is not None:
+            router.acquire(replica)
+            try:
+                return await query(replica.engine)
+            except REPLICA_ERRORS as e:
+                if connection_lost(e):
+                    router.mark_failed(replica, e)
+                else:
+                    logger.warning(f"副本读取失败，本次改用主库({replica.name}): {e}")
+            finally:
+                router.release(replica)
+        return await query(cls.engine)
+
+    @classmethod
+    @asynccontextmanager
+    async def read_session(cls):
+        """
+        只读会话的上下文管理器(路由到副本，不提交)
+
+        进入时即建立连接，副本不可用时改用主库
+        """
+        if cls.engine is None:
+            cls.configure()
+        router = cls.replica_router
+        replica = router.choose()
+        session = None
+        if replica is not None:
+            router.acquire(replica)
+            session = AsyncSession(replica.engine, autoflush=False)
+            try:
+                await session.connection()
+            except REPLICA_ERRORS as e:
+                await session.close()
+                router.release(replica)
+                router.mark_failed(replica, e)
+                replica, session = None, None
+        if session is None:
+            session = AsyncSession(cls.engine, autoflush=False)
+        try:
+            yield session
+        finally:
+            await session.close()
+            if replica is not None:
+                router.release(replica)
+
+    @classmethod
+    async def get_one(cls, model, **filters):
+        """获取单个记录"""
+        model = get_model(model)
+
+        async def query(bind):
+            async with AsyncSession(bind) as session:
+                result = await session.execute(select(model).filter_by(**filters).limit(1))
+                return result.scalars().first()
+        return await cls._read(query)
+
+    @classmethod
+    async def get_all(cls, model, **filters):
+        """获取多个记录"""
+        model = get_model(model)
+
+        async def query(bind):
+            async with AsyncSession(bind) as session:
+                result = await session.execute(select(model).filter_by(**filters))
+                return result.scalars().all()
+        return await cls._read(query)
+
+    @classmethod
+    async def fetch_one(cls, model, columns=None, **filters):
+        """只读查询单行，返回命名元组或None(参数同DBOperator.fetch_one)"""
+        statement, params, row_cls = read_query(model, columns, filters, limit=1)
+
+        async def query(bind):
+            async with bind.connect() as conn:
+                return (await conn.execute(statement, params)).first()
+        row = await cls._read(query)
+        return None if row is None else row_cls._make(row)
+
+    @classmethod
+    async def fetch_all(cls, model, columns=None, limit=None, **filters):
+        """只读查询多行，返回命名元组列表(参数同DBOperator.fetch_all)"""
+        statement, params, row_cls = read_query(model, columns, filters, limit=limit)
+
+        async def query(bind):
+            async with bind.connect() as conn:
+                return (await conn.execute(statement, params)).all()
+        return list(map(row_cls._make, await cls._read(query)))
+
+    @classmethod
+    async def create(cls, model, **data):
+        """创建记录"""
+        model = get_model(model)
+        async with cls.session() as session:
+            instance = model(**data)
+            session.add(instance)
+            await session.flush()
+            return instance
+
+    @classmethod
+    async def bulk_create(cls, model, data_list):
+        """批量创建记录(单条多行INSERT)"""
+        model = get_model(model)
+        if not data_list:
+            return []
+        async with cls.session() as session:
+            await session.execute(insert(model), data_list)
+            return [model(**data) for data in data_list]
+
+    @classmethod
+    async def update(cls, model, filters, **data):
+        """更新记录"""
+        model = get_model(model)
+        async with cls.session() as session:
+            await session.execute(
+                update(model).filter_by(**filters).values(**data)
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(select(model).filter_by(**filters))
+            return result.scalars().all()
+
+    @classmethod
+    async def delete(cls, model, **filters):
+        """删除记录"""
+        model = get_model(model)
+        async with cls.session() as session:
+            result = await session.execute(
+                delete(model).filter_by(**filters)
+                .execution_options(synchronize_session=False)
+            )
+            return result.rowcount
+
+    @classmethod
+    async def execute_raw(cls, sql, params=None):
+        """执行原生SQL"""
+        if isinstance(sql, str):
+            sql = text(sql)
+        async with cls.session() as session:
+            return await session.execute(sql, params or {})
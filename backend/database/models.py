@@ -96,16 +96,21 @@ class Space(Base):
     author_id = Column(String(36), nullable=False, comment='作者ID')
     title = Column(String(100), nullable=False, comment='空间标题')
     content = Column(Text, nullable=False, comment='空间内容')
-    heat = Column(Integer, default=0, comment='空间热度')
+    # 非空: 空间列表按 (heat, id) 键集分页，NULL会排在末尾且无法参与游标比较
+    heat = Column(Integer, nullable=False, default=0, server_default='0', comment='空间热度')
     stability = Column(Integer, default=100, comment='空间稳定度')
     turns_left = Column(Integer, default=10, comment='剩余回合数')
     creator_id = Column(String(36), nullable=False, comment='创建者ID')
+    floor_reserved = Column(Integer, nullable=False, default=0, server_default='0',
+                            comment='已预分配的最大楼层号(楼层号按块预分配)')
     created_at = Column(DateTime, server_default=func.now(), comment='创建时间')
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment='更新时间')
 
     __table_args__ = (
         Index('idx_creator', 'creator_id'),
-        Index('idx_type', 'type')
+        # 空间列表键集分页: WHERE type=? ORDER BY heat DESC, id DESC
+        Index('idx_type_heat', 'type', 'heat', 'id'),
+        Index('idx_heat', 'heat', 'id')
     )
 
 class Reply(Base):
@@ -122,7 +127,7 @@ class Reply(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment='更新时间')
 
     __table_args__ = (
-        Index('idx_space', 'space_id'),
+        # uq_space_floor同时服务于按空间查询与楼层键集分页
         Index('idx_parent', 'parent_id'),
         UniqueConstraint('space_id', 'floor_num', name='uq_space_floor')
     )
@@ -138,6 +143,8 @@ class Treasure(Base):
     is_replica = Column(Boolean, default=False, comment='是否为复制品')
     deviation = Column(Integer, default=0, comment='偏离度')
     heat = Column(Integer, default=0, comment='热度值')
+    use_count = Column(Integer, nullable=False, default=0, server_default='0', comment='使用次数')
+    effective_strength = Column(Integer, comment='衰减后强度(定时物化，NULL表示尚未计算)')
     owner_id = Column(String(36), nullable=False, comment='拥有者ID')
     created_at = Column(DateTime, server_default=func.now(), comment='创建时间')
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment='更新时间')
@@ -153,11 +160,67 @@ class ServerConfig(Base):
     id = Column(Integer, primary_key=True, comment='配置ID')
     config_key = Column(String(50), nullable=False, comment='配置键名')
     config_value = Column(String(255), nullable=False, comment='配置值')
-    data_type = Column(Enum('int', 'string', 'bool', name='config_types'), nullable=False, comment='数据类型')
+    data_type = Column(Enum('int', 'float', 'string', 'bool', name='config_types'), nullable=False, comment='数据类型')
     description = Column(String(255), comment='配置描述')
     created_at = Column(DateTime, server_default=func.now(), comment='创建时间')
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment='更新时间')
 
     __table_args__ = (
         UniqueConstraint('config_key', name='uq_config_key'),
-    )
\ No newline at end of file
+    )
+
+class GameSnapshot(Base):
+    """游戏状态快照表模型"""
+    __tablename__ = 'game_snapshots'
+
+    game_id = Column(String(36), primary_key=True, comment='游戏ID')
+    status = Column(String(16), nullable=False, comment='游戏状态')
+    current_turn = Column(Integer, nullable=False, default=0, comment='当前回合')
+    version = Column(Integer, nullable=False, default=0, comment='状态版本号')
+    state = Column(Text, nullable=False, comment='序列化的游戏状态(JSON)')
+    snapshot_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment='快照时间')
+
+class SpaceSummary(Base):
+    """空间剧情摘要表模型(AI上下文的滚动摘要)"""
+    __tablename__ = 'space_summaries'
+
+    space_id = Column(String(36), primary_key=True, comment='空间ID')
+    summary = Column(Text, nullable=False, comment='剧情摘要')
+    summarized_floor = Column(Integer, nullable=False, default=0, comment='摘要已覆盖的最大楼层号')
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment='更新时间')
+
+class TaskRun(Base):
+    """后台任务协调表模型(多worker中每个周期只由一个worker执行的任务，记录上次执行时刻)"""
+    __tablename__ = 'task_runs'
+
+    name = Column(String(64), primary_key=True, comment='任务名')
+    last_run_at = Column(BigInteger, nullable=False, comment='上次执行时刻(Unix秒)')
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment='更新时间')
+
+_MODEL_REGISTRY: dict = {}
+
+
+def get_model(model):
+    """
+    解析ORM模型
+
+    参数:
+    - model: 模型类或表名(如"users")
+
+    返回值:
+    - 对应的模型类
+
+    异常:
+    - KeyError: 表名未注册
+    """
+    if not isinstance(model, str):
+        return model
+    found = _MODEL_REGISTRY.get(model)
+    if found is None:
+        # 首次查询或有新模型注册时重建表名索引
+        _MODEL_REGISTRY.clear()
+        _MODEL_REGISTRY.update((mapper.class_.__tablename__, mapper.class_) for mapper in Base.registry.mappers)
+        found = _MODEL_REGISTRY.get(model)
+        if found is None:
+            raise KeyError(f"未知的数据表: {model}")
+    return found
@@ -0,0 +1,145 @@
+"""
+读副本路由模块
+==============
+
+为DBOperator/AsyncDBOperator在一个主库与N个只读副本之间选择读取目标，不涉及具体驱动，
+同步与异步引擎均可使用。
+
+路由规则:
+- 写入(及未标记只读的会话)始终使用主库；提交了写入的会话调用mark_write()标记当前上下文
+- 只读查询选择一个健康副本: round_robin(轮询) 或 least_connections(进行中读取数最少)
+- 读己之写: 当前上下文(每个请求/任务独立)写入后 REPLICA_STICKY_SECONDS 秒内的读取使用主库，
+  避免副本复制延迟导致读不到刚写入的数据
+- 故障回退: 副本连接失败(连接级错误)时标记为不可用 REPLICA_COOLDOWN 秒，本次读取改用主库
+
+配置项(环境变量):
+- DB_REPLICA_STRATEGY: round_robin|least_connections，默认round_robin
+- REPLICA_STICKY_SECONDS: 写入后读取主库的时长(秒)，默认5
+- REPLICA_COOLDOWN: 副本失败后暂停使用的时长(秒)，默认30
+"""
+import os
+import time
+import logging
+import itertools
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('round_robin', 'least_connections')
+
+# 当前上下文最近一次写入的时刻(time.monotonic)
+_last_write: ContextVar[Optional[float]] = ContextVar('db_last_write', default=None)
+
+
+def mark_write() -> None:
+    """标记当前上下文发生了写入(之后一段时间内的读取使用主库)"""
+    _last_write.set(time.monotonic())
+
+
+class Replica:
+    """单个只读副本的状态"""
+    __slots__ = ('engine', 'name', 'in_flight', 'down_until', 'reads', 'failures')
+
+    def __init__(self, engine, name: str):
+        self.engine = engine
+        self.name = name
+        self.in_flight = 0
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
+
+
+class ReplicaRouter:
+    """读副本路由器"""
+
+    def __init__(self, engines: list = (), strategy: str = None, sticky_seconds: float = None,
+                 cooldown: float = None, clock: Callable[[], float] = time.monotonic):
+        """
+        参数:
+        - engines: 副本引擎列表(同步Engine或AsyncEngine)
+        - strategy: round_robin 或 least_connections
+        - sticky_seconds: 写入后读取主库的时长(秒)
+        - cooldown: 副本失败后暂停使用的时长(秒)
+        - clock: 单调时钟(测试时可替换)
+        """
+        strategy = strategy or os.getenv('DB_REPLICA_STRATEGY', 'round_robin')
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的副本路由策略: {strategy}")
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds if sticky_seconds is not None else \
+            float(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv('REPLICA_COOLDOWN', '30'))
+        self.clock = clock
+        self.primary_reads = 0
+        self.fallbacks = 0
+        self.replicas: List[Replica] = []
+        self._cycle = None
+        self.set_engines(engines)
+
+    def set_engines(self, engines: list) -> None:
+        """替换副本引擎列表"""
+        self.replicas = [Replica(engine, str(getattr(engine, 'url', i)))
+                         for i, engine in enumerate(engines)]
+        self._cycle = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+
+    def engines(self) -> list:
+        return [replica.engine for replica in self.replicas]
+
+    def sticky(self) -> bool:
+        """当前上下文是否处于写入后的主库读取窗口内"""
+        last = _last_write.get()
+        return last is not None and time.monotonic() - last < self.sticky_seconds
+
+    def choose(self) -> Optional[Replica]:
+        """
+        选择读取使用的副本
+
+        返回值:
+        - 副本；应使用主库时(无副本、读己之写窗口内、副本均不可用)返回None
+        """
+        if not self.replicas or self.sticky():
+            self.primary_reads += 1
+            return None
+        now = self.clock()
+        if self.strategy == 'least_connections':
+            healthy = [replica for replica in self.replicas if replica.down_until <= now]
+            replica = min(healthy, key=lambda r: r.in_flight) if healthy else None
+        else:
+            replica = None
+            for _ in range(len(self.replicas)):
+                candidate = self.replicas[next(self._cycle)]
+                if candidate.down_until <= now:
+                    replica = candidate
+                    break
+        if replica is None:
+            self.primary_reads += 1
+        return replica
+
+    def acquire(self, replica: Replica) -> None:
+        replica.in_flight += 1
+        replica.reads += 1
+
+    def release(self, replica: Replica) -> None:
+        replica.in_flight -= 1
+
+    def mark_failed(self, replica: Replica, error: Exception) -> None:
+        """副本读取失败: 暂停使用并计数，调用方随后回退到主库"""
+        replica.failures += 1
+        replica.down_until = self.clock() + self.cooldown
+        self.fallbacks += 1
+        logger.warning(f"只读副本不可用，{self.cooldown:.0f}秒内改用主库({replica.name}): {error}")
+
+    def stats(self) -> dict:
+        """路由统计"""
+        now = self.clock()
+        return {
+            "strategy": self.strategy,
+            "primary_reads": self.primary_reads,
+            "fallbacks": self.fallbacks,
+            "replicas": [
+                {"name": replica.name, "reads": replica.reads, "in_flight": replica.in_flight,
+                 "failures": replica.failures, "healthy": replica.down_until <= now}
+                for replica in self.replicas
+            ]
+        }
@@ -0,0 +1,86 @@
+"""
+轻量行读取模块
+==============
+
+为DBOperator/AsyncDBOperator的只读查询(fetch_one/fetch_all)构建语句与行类型。
+读取结果为不可变的命名元组，不经过ORM实例化与会话身份映射，会话关闭后仍可安全访问。
+
+缓存:
+- 行类型: 按(模型, 列名)缓存命名元组类，类名为 <模型名>Row
+- 语句: 按(模型, 列名, 过滤列名, limit)缓存select语句(命中时不再解析与校验列名)，过滤值以绑定参数传入，
+  同一形态的查询复用同一语句对象，SQLAlchemy编译缓存随之稳定命中
+
+说明:
+- 过滤条件为列名=值的等值条件，值为None时匹配IS NULL(与get_one/get_all的filter_by一致)
+- 未知列名抛出ValueError
+"""
+from collections import namedtuple
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import select, bindparam
+from backend.database.models import get_model
+
+_ROW_TYPES: dict = {}
+_STATEMENTS: dict = {}
+
+
+def _column_names(table, columns: Optional[Sequence[str]]) -> Tuple[str, ...]:
+    if columns is None:
+        return tuple(table.columns.keys())
+    columns = tuple(columns)
+    unknown = [name for name in columns if name not in table.columns]
+    if unknown:
+        raise ValueError(f"{table.name}表不存在列: {', '.join(unknown)}")
+    return columns
+
+
+def row_type(model, columns: Optional[Sequence[str]] = None) -> type:
+    """
+    获取行类型(命名元组类)
+
+    参数:
+    - model: 模型类或表名
+    - columns: 列名，默认全部列(按表定义顺序)
+    """
+    model = get_model(model)
+    names = _column_names(model.__table__, columns)
+    key = (model, names)
+    cls = _ROW_TYPES.get(key)
+    if cls is None:
+        cls = _ROW_TYPES[key] = namedtuple(f"{model.__name__}Row", names)
+    return cls
+
+
+def read_query(model, columns: Optional[Sequence[str]], filters: dict,
+               limit: Optional[int] = None) -> tuple:
+    """
+    构建只读查询
+
+    参数:
+    - model: 模型类或表名
+    - columns: 列名，默认全部列
+    - filters: 等值过滤条件 {列名: 值}，值为None时匹配IS NULL
+    - limit: 最大行数
+
+    返回值:
+    - (select语句, 执行参数, 行类型)
+    """
+    model = get_model(model)
+    keys = tuple(sorted(name for name, value in filters.items() if value is not None))
+    null_keys = tuple(sorted(name for name, value in filters.items() if value is None))
+    cache_key = (model, None if columns is None else tuple(columns), keys, null_keys, limit)
+    cached = _STATEMENTS.get(cache_key)
+    if cached is None:
+        table = model.__table__
+        names = _column_names(table, columns)
+        _column_names(table, keys + null_keys)
+        statement = select(*(table.c[name] for name in names))
+        for name in keys:
+            statement = statement.where(table.c[name] == bindparam(name))
+        for name in null_keys:
+            statement = statement.where(table.c[name].is_(None))
+        if limit is not None:
+            statement = statement.limit(limit)
+        cached = _STATEMENTS[cache_key] = (statement, row_type(model, names))
+    statement, row_cls = cached
+    params = {name: filters[name] for name in keys} if null_keys else filters
+    return statement, params, row_cls
@@ -19,16 +19,33 @@
 1. 密码使用bcrypt算法哈希存储
 2. 敏感操作需要有效JWT令牌
 3. 密码重置链接应通过安全渠道发送
+4. 登录、注册、重置密码按IP(登录另按用户名)限流，超限返回429与Retry-After(见rateLimiter.py)
 """
 import os
+import uuid
+import logging
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from passlib.context import CryptContext
 import jwt
 import mysql.connector
-from backend.database.hbm_mysql import DBOperator
+from sqlalchemy.exc import SQLAlchemyError
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.passwordHasher import password_hasher, HasherBusyError
+from backend.modules.authCache import (
+    get_cached_username, cache_verified_token,
+    get_cached_user, cache_user, invalidate_user
+)
+from backend.modules.leaderboard import leaderboard_service
+from backend.modules.serverConfig import server_config, MAX_ENERGY
+from backend.modules.rateLimiter import (
+    rate_limiter, limit_by_ip, limit_by_username,
+    LOGIN, LOGIN_USER, REGISTER, RESET_PASSWORD
+)
+
+logger = logging.getLogger(__name__)
 
 # 认证路由，所有认证相关API都挂载在此路由下
 router = APIRouter(
@@ -36,8 +53,8 @@ router = APIRouter(
     responses={401: {"description": "未授权或认证失败"}}
 )
 
-# 密码加密上下文，使用bcrypt算法
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密码加密上下文，使用bcrypt算法(哈希计算由password_hasher在线程池中执行)
+pwd_context = password_hasher.context
 
 # JWT配置 - 生产环境应从环境变量读取
 SECRET_KEY = os.getenv('JWT_SECRET_KEY')
@@ -103,7 +120,15 @@ def create_error_response(code="ERROR", message="系统错误", status_code=stat
         status_code=status_code
     )
 
-@router.post("/register")
+def raise_hasher_busy():
+    """密码哈希队列已满时返回429"""
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="请求过于频繁，请稍后重试",
+        headers={"Retry-After": "1"}
+    )
+
+@router.post("/register", dependencies=[limit_by_ip(REGISTER)])
 async def register(user: User):
     """
     用户注册接口
@@ -146,37 +171,49 @@ async def register(user: User):
     """
     try:
         # 检查用户名是否已存在
-        existing_user = DBOperator.get_one("users", username=user.username)
+        existing_user = await AsyncDBOperator.get_one("users", username=user.username)
         if existing_user:
             raise HTTPException(status_code=400, detail="用户名已存在")
 
         # 检查邮箱是否已存在
-        existing_email = DBOperator.get_one("users", email=user.email)
+        existing_email = await AsyncDBOperator.get_one("users", email=user.email)
         if existing_email:
             raise HTTPException(status_code=400, detail="邮箱已被注册")
 
-        # 对密码进行bcrypt哈希处理
-        hashed_password = pwd_context.hash(user.password)
+        # 对密码进行bcrypt哈希处理(线程池执行，不阻塞事件循环)
+        hashed_password = await password_hasher.hash(user.password)
 
-        # 准备用户数据
+        # 准备用户数据(初始体力为服务器参数max_energy)
+        max_energy = server_config.get(MAX_ENERGY)
         user_data = {
+            "id": str(uuid.uuid4()),
             "username": user.username,
             "email": user.email,
             "password_hash": hashed_password,
             "status": 1,  # 默认激活状态
             "experience": 0,
-            "energy": 256,
-            "max_energy": 256
+            "energy": max_energy,
+            "max_energy": max_energy
         }
 
         # 创建新用户
-        DBOperator.create("users", **user_data)
+        await AsyncDBOperator.create("users", **user_data)
+
+        # 以0分加入排行榜(失败不影响注册，查询名次时会从users表补入)
+        try:
+            await leaderboard_service.add_user(user_data["id"])
+        except Exception as e:
+            logger.warning(f"排行榜加入失败: {e}")
         return create_success_response({"message": "注册成功"})
+    except HasherBusyError:
+        raise_hasher_busy()
+    except HTTPException:
+        raise
     except Exception as e:
         # 捕获未处理异常
         raise HTTPException(status_code=500, detail=f"服务器错误: {str(e)}")
 
-@router.post("/token")
+@router.post("/token", dependencies=[limit_by_ip(LOGIN), limit_by_username(LOGIN_USER)])
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     用户登录接口
@@ -211,23 +248,73 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     try:
         # 查询用户信息
-        user = DBOperator.get_one("users", username=form_data.username)
-        if not user or not pwd_context.verify(form_data.password, user.password_hash):
+        user = await AsyncDBOperator.get_one("users", username=form_data.username)
+        verified, new_hash = (False, None)
+        if user:
+            verified, new_hash = await password_hasher.verify_and_update(
+                form_data.password, user.password_hash
+            )
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="用户名或密码错误",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        # 已存哈希成本因子过期时透明重哈希
+        if new_hash:
+            await AsyncDBOperator.update("users", {"username": user.username}, password_hash=new_hash)
+            invalidate_user(user.username)
+
         # 生成JWT访问令牌
         access_token = {"sub": user.username}
         return {"access_token": access_token, "token_type": "bearer"}
-    except mysql.connector.Error as err:
+    except HasherBusyError:
+        raise_hasher_busy()
+    except (mysql.connector.Error, SQLAlchemyError) as err:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"数据库错误: {err}"
         )
 
+def verify_token(token: str):
+    """
+    验证JWT令牌，返回用户名(已验证令牌命中缓存时跳过解码)
+
+    异常:
+    - jwt.PyJWTError: 令牌无效或过期
+    """
+    username = get_cached_username(token)
+    if username is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username = payload.get("sub")
+        if username:
+            cache_verified_token(token, username, payload.get("exp"))
+    return username
+
+
+async def get_current_username(request: Request) -> str:
+    """
+    依赖项: 从Authorization头的Bearer令牌中取得当前用户名
+
+    异常:
+    - HTTPException 401: 未携带令牌或令牌无效
+    """
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        try:
+            username = verify_token(auth_header.split(" ")[1])
+            if username:
+                return username
+        except jwt.PyJWTError:
+            pass
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="未登录或令牌无效",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
 @router.get("/check")
 async def check_login_status(request: Request):
     """
@@ -270,31 +357,35 @@ async def check_login_status(request: Request):
 
     token = auth_header.split(" ")[1]
     
-    # 验证JWT令牌有效性
+    # 验证JWT令牌有效性(已验证令牌命中缓存时跳过解码)
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        
-        # 查询用户信息
-        user = DBOperator.get_one("users", username=username)
-        if user:
-            return {
-                "is_authenticated": True,
-                "user": {
+        username = verify_token(token)
+
+        # 查询用户信息(优先读取资料缓存)
+        profile = get_cached_user(username)
+        if profile is None:
+            user = await AsyncDBOperator.get_one("users", username=username)
+            if user:
+                profile = {
                     "username": user.username,
                     "avatar": user.avatar if hasattr(user, 'avatar') else "/images/default-avatar.png"
                 }
+                cache_user(username, profile)
+        if profile:
+            return {
+                "is_authenticated": True,
+                "user": profile
             }
     except jwt.PyJWTError:
         # 令牌无效或过期
         pass
-    except mysql.connector.Error as err:
+    except (mysql.connector.Error, SQLAlchemyError) as err:
         # 数据库错误不影响认证状态判断
         print(f"数据库查询错误: {err}")
     
     return {"is_authenticated": False}
 
-@router.post("/reset-password")
+@router.post("/reset-password", dependencies=[limit_by_ip(RESET_PASSWORD)])
 async def reset_password(request: Request):
     """
     密码重置接口
@@ -342,7 +433,7 @@ async def reset_password(request: Request):
         
         try:
             # 检查邮箱是否存在
-            user = DBOperator.get_one("users", email=email)
+            user = await AsyncDBOperator.get_one("users", email=email)
             if not user:
                 raise HTTPException(status_code=404, detail="邮箱未注册")
             
@@ -367,7 +458,7 @@ async def reset_password(request: Request):
                 "message": "密码重置链接已发送至您的邮箱",
                 "dev_note": "实际项目中链接应通过邮件发送"
             }
-        except mysql.connector.Error as err:
+        except (mysql.connector.Error, SQLAlchemyError) as err:
             raise HTTPException(status_code=500, detail=f"数据库错误: {err}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"服务器错误: {str(e)}")
@@ -375,11 +466,4 @@ async def reset_password(request: Request):
 def send_email(to, subject, content):
     """模拟邮件发送"""
     print(f"模拟发送邮件到 {to}: {subject}")
-    return True
-
-class SimpleRateLimiter:
-    """简单速率限制器"""
-    def check(self):
-        return True
-
-rate_limiter = SimpleRateLimiter()
\ No newline at end of file
+    return True
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+认证缓存模块
+============
+
+为 /auth/check 提供进程内缓存，重复检查无需访问MySQL。
+
+缓存说明:
+- token_cache: 已验证令牌缓存，键为JWT签名段，值为(签名输入, 用户名)，存活时间等于令牌剩余有效期
+- user_cache: 用户资料缓存，键为用户名，用户行变更时需调用 invalidate_user 显式失效
+
+配置项(环境变量):
+- AUTH_TOKEN_CACHE_SIZE: 令牌缓存容量，默认10000，0表示禁用
+- AUTH_USER_CACHE_SIZE: 用户资料缓存容量，默认10000，0表示禁用
+- AUTH_USER_CACHE_TTL: 用户资料缓存存活时间(秒)，默认60，兜底其他worker的变更
+"""
+import os
+import time
+from typing import Optional
+from backend.utils.ttlCache import TTLCache
+
+# 令牌无exp声明时的缓存时间(秒)，与令牌有效期一致
+DEFAULT_TOKEN_TTL = 30 * 60
+
+token_cache = TTLCache(
+    maxsize=int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '10000')),
+    ttl=DEFAULT_TOKEN_TTL,
+    name="auth_token"
+)
+user_cache = TTLCache(
+    maxsize=int(os.getenv('AUTH_USER_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('AUTH_USER_CACHE_TTL', '60')),
+    name="auth_user"
+)
+
+
+def get_cached_username(token: str) -> Optional[str]:
+    """
+    查询已验证令牌对应的用户名
+
+    命中时还会比对签名输入(header.payload)，防止复用签名拼接伪造载荷。
+    """
+    signing_input, _, signature = token.rpartition(".")
+    cached = token_cache.get(signature)
+    if cached is None or cached[0] != signing_input:
+        return None
+    return cached[1]
+
+
+def cache_verified_token(token: str, username: str, expires_at: Optional[float] = None) -> None:
+    """缓存已通过签名与有效期校验的令牌"""
+    signing_input, _, signature = token.rpartition(".")
+    ttl = expires_at - time.time() if expires_at else DEFAULT_TOKEN_TTL
+    token_cache.put(signature, (signing_input, username), ttl=ttl)
+
+
+def get_cached_user(username: str) -> Optional[dict]:
+    """查询缓存的用户资料"""
+    return user_cache.get(username)
+
+
+def cache_user(username: str, profile: dict) -> None:
+    """缓存用户资料"""
+    user_cache.put(username, profile)
+
+
+def invalidate_user(username: str) -> None:
+    """用户行变更时使资料缓存失效"""
+    user_cache.pop(username)
+
+
+def cache_stats() -> dict:
+    """返回两级缓存的命中统计"""
+    return {
+        "token": token_cache.stats(),
+        "user": user_cache.stats()
+    }
@@ -0,0 +1,269 @@
+"""
+卡牌强度衰减模块
+================
+
+卡牌强度随时间衰减，每次使用也会衰减；复制品有故事线偏离度减值，原版卡牌有热度加值。
+衰减后强度由闭式公式直接计算，不依赖逐次累积的中间状态:
+
+    有效强度 = floor(strength * exp(-(λ·age + μ·use_count)) * 修正系数)，限制在[0, 256]
+
+- λ = ln2 / 半衰期: 时间衰减速率，age为创建至今的秒数
+- μ = -ln(1 - 单次使用衰减比例): 使用衰减速率
+- 修正系数: 复制品为 1 - deviation/100；原版为 1 + 热度加值上限 * min(heat, 热度封顶)/热度封顶
+
+时间分桶:
+- 计算使用的当前时刻向下取整到分桶边界(默认1小时)，同一分桶内读取结果稳定，
+  且与该分桶内物化任务写入的effective_strength一致
+
+计算方式:
+- 读取时即时计算: effective_strength() / CardDecayEngine.get_strength()
+- 批量物化: CardDecayEngine.materialize() 按主键键集分块读取，NumPy向量化计算，
+  仅对数值变化的行以一条executemany UPDATE写回treasures.effective_strength
+
+配置项(环境变量):
+- CARD_HALF_LIFE_DAYS: 时间衰减半衰期(天)，默认30
+- CARD_USE_DECAY: 每次使用衰减的比例，默认0.05
+- CARD_HEAT_BONUS: 原版卡牌热度加值上限(比例)，默认0.25
+- CARD_HEAT_CAP: 热度加值封顶的热度值，默认1000
+- CARD_DECAY_BUCKET: 时间分桶(秒)，默认3600
+- CARD_DECAY_CHUNK: 物化任务每块行数，默认20000
+"""
+import os
+import math
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+import numpy as np
+from sqlalchemy import select, update, bindparam, func, false
+from backend.database.models import Treasure
+from backend.utils.utcTime import utcnow
+
+logger = logging.getLogger(__name__)
+
+# 卡牌强度上限(roll256)
+MAX_STRENGTH = 256
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True, slots=True)
+class DecayParams:
+    """衰减参数"""
+    half_life_days: float = 30.0
+    use_decay: float = 0.05
+    heat_bonus: float = 0.25
+    heat_cap: int = 1000
+    bucket_seconds: int = 3600
+
+    @classmethod
+    def from_env(cls) -> "DecayParams":
+        """根据环境变量创建"""
+        return cls(
+            half_life_days=float(os.getenv('CARD_HALF_LIFE_DAYS', '30')),
+            use_decay=float(os.getenv('CARD_USE_DECAY', '0.05')),
+            heat_bonus=float(os.getenv('CARD_HEAT_BONUS', '0.25')),
+            heat_cap=int(os.getenv('CARD_HEAT_CAP', '1000')),
+            bucket_seconds=int(os.getenv('CARD_DECAY_BUCKET', '3600'))
+        )
+
+    @property
+    def time_rate(self) -> float:
+        """每秒的时间衰减速率λ"""
+        return math.log(2) / (self.half_life_days * 86400)
+
+    @property
+    def use_rate(self) -> float:
+        """每次使用的衰减速率μ"""
+        return -math.log1p(-self.use_decay)
+
+    def bucket(self, now: datetime) -> datetime:
+        """将时刻向下取整到分桶边界"""
+        offset = int((now - _EPOCH).total_seconds()) % self.bucket_seconds
+        return now.replace(microsecond=0) - timedelta(seconds=offset)
+
+
+def decay_strength(strength, age_seconds, use_count, deviation, heat, is_replica,
+                   params: DecayParams) -> np.ndarray:
+    """
+    向量化计算有效强度
+
+    参数均为等长数组(或可广播的标量); age_seconds为负(时钟偏差)时按0计
+
+    返回值:
+    - int64数组
+    """
+    strength = np.asarray(strength, dtype=np.float64)
+    age = np.maximum(np.asarray(age_seconds, dtype=np.float64), 0.0)
+    uses = np.maximum(np.asarray(use_count, dtype=np.float64), 0.0)
+    penalty = 1.0 - np.clip(np.asarray(deviation, dtype=np.float64), 0, 100) / 100.0
+    bonus = 1.0 + params.heat_bonus * np.clip(np.asarray(heat, dtype=np.float64), 0, params.heat_cap) \
+        / params.heat_cap
+    modifier = np.where(np.asarray(is_replica, dtype=bool), penalty, bonus)
+    value = strength * np.exp(-(params.time_rate * age + params.use_rate * uses)) * modifier
+    return np.clip(np.floor(value), 0, MAX_STRENGTH).astype(np.int64)
+
+
+def effective_strength(strength: int, created_at: Optional[datetime], use_count: int = 0,
+                       deviation: int = 0, heat: int = 0, is_replica: bool = False,
+                       now: Optional[datetime] = None, params: Optional[DecayParams] = None) -> int:
+    """
+    计算单张卡牌当前分桶的有效强度(与物化任务使用同一实现，结果一致)
+
+    参数:
+    - created_at: 创建时间(UTC)，为空时按未衰减计
+    - now: 当前时刻，默认utcnow()
+    - params: 衰减参数，默认DEFAULT_PARAMS
+    """
+    params = params or DEFAULT_PARAMS
+    bucket = params.bucket(now or utcnow())
+    age = (bucket - created_at).total_seconds() if created_at else 0
+    return int(decay_strength(strength, age, use_count or 0, deviation or 0, heat or 0,
+                              bool(is_replica), params))
+
+
+@dataclass(slots=True)
+class DecayRunStats:
+    """一次物化任务的统计"""
+    bucket: datetime
+    scanned: int = 0
+    updated: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.scanned / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "bucket": self.bucket.isoformat(),
+            "scanned": self.scanned,
+            "updated": self.updated,
+            "chunks": self.chunks,
+            "seconds": self.seconds,
+            "rows_per_second": self.rows_per_second
+        }
+
+
+class CardDecayEngine:
+    """卡牌强度衰减引擎"""
+
+    # 物化任务读取的列(NULL按默认值处理，已物化值为NULL时记为-1以强制写入)
+    _COLUMNS = (
+        Treasure.id, Treasure.strength, Treasure.created_at,
+        func.coalesce(Treasure.use_count, 0).label('use_count'),
+        func.coalesce(Treasure.deviation, 0).label('deviation'),
+        func.coalesce(Treasure.heat, 0).label('heat'),
+        func.coalesce(Treasure.is_replica, false()).label('is_replica'),
+        func.coalesce(Treasure.effective_strength, -1).label('effective_strength')
+    )
+
+    def __init__(self, db_operator=None, params: Optional[DecayParams] = None,
+                 chunk_size: int = None, clock: Callable[[], datetime] = utcnow):
+        """
+        参数:
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - params: 衰减参数，默认DEFAULT_PARAMS
+        - chunk_size: 物化任务每块行数
+        - clock: 当前时间函数(测试与基准时可替换)
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.db_operator = db_operator
+        self.params = params or DEFAULT_PARAMS
+        self.chunk_size = chunk_size if chunk_size is not None else \
+            int(os.getenv('CARD_DECAY_CHUNK', '20000'))
+        self.clock = clock
+
+    async def get_strength(self, card_id: str) -> Optional[int]:
+        """即时计算卡牌有效强度，卡牌不存在时返回None"""
+        async with self.db_operator.session() as session:
+            row = (await session.execute(
+                select(*self._COLUMNS).where(Treasure.id == card_id)
+            )).first()
+        if row is None:
+            return None
+        return effective_strength(row.strength, row.created_at, row.use_count, row.deviation,
+                                  row.heat, row.is_replica, self.clock(), self.params)
+
+    async def record_use(self, card_id: str) -> Optional[int]:
+        """
+        记录一次使用(use_count原子加1)，返回使用后的有效强度
+
+        返回值:
+        - 有效强度，卡牌不存在时返回None
+        """
+        async with self.db_operator.session() as session:
+            result = await session.execute(
+                update(Treasure).where(Treasure.id == card_id)
+                .values(use_count=Treasure.use_count + 1)
+                .execution_options(synchronize_session=False)
+            )
+        if result.rowcount != 1:
+            return None
+        return await self.get_strength(card_id)
+
+    def compute_chunk(self, rows, bucket: datetime) -> tuple:
+        """
+        计算一块行的有效强度
+
+        返回值:
+        - (有效强度数组, 数值变化的掩码)
+        """
+        ids, strength, created_at, uses, deviation, heat, is_replica, current = zip(*rows)
+        created = np.array(created_at, dtype='datetime64[s]')
+        age = (np.datetime64(bucket, 's') - created).astype(np.int64)
+        age[np.isnat(created)] = 0
+        values = decay_strength(strength, age, uses, deviation, heat, is_replica, self.params)
+        return values, values != np.asarray(current, dtype=np.int64)
+
+    async def materialize(self, now: Optional[datetime] = None) -> DecayRunStats:
+        """
+        按当前分桶重新计算全部卡牌的有效强度并写回
+
+        每块在独立事务中完成读取与写回，任务中断后重新执行即可(结果幂等)。
+        """
+        bucket = self.params.bucket(now or self.clock())
+        stats = DecayRunStats(bucket)
+        started = time.perf_counter()
+        statement = (
+            update(Treasure.__table__)
+            .where(Treasure.__table__.c.id == bindparam('b_id'))
+            # 显式保持updated_at，避免衰减刷新被视为卡牌修改
+            .values(effective_strength=bindparam('b_value'), updated_at=Treasure.__table__.c.updated_at)
+        )
+        last_id = None
+        while True:
+            async with self.db_operator.session() as session:
+                query = select(*self._COLUMNS).order_by(Treasure.id).limit(self.chunk_size)
+                if last_id is not None:
+                    query = query.where(Treasure.id > last_id)
+                rows = (await session.execute(query)).all()
+                if not rows:
+                    break
+                values, changed = self.compute_chunk(rows, bucket)
+                params = [
+                    {"b_id": rows[i][0], "b_value": int(values[i])}
+                    for i in np.flatnonzero(changed)
+                ]
+                if params:
+                    await session.execute(statement, params)
+            stats.chunks += 1
+            stats.scanned += len(rows)
+            stats.updated += len(params)
+            last_id = rows[-1][0]
+            if len(rows) < self.chunk_size:
+                break
+        stats.seconds = time.perf_counter() - started
+        logger.info(f"卡牌衰减物化完成: 扫描{stats.scanned}, 更新{stats.updated}, "
+                    f"耗时{stats.seconds:.1f}s")
+        return stats
+
+
+DEFAULT_PARAMS = DecayParams.from_env()
+
+# 全局卡牌衰减引擎
+card_decay_engine = CardDecayEngine()
@@ -0,0 +1,192 @@
+"""
+紧凑游戏状态模块
+================
+
+活跃游戏状态的内部紧凑表示，仅在API边界转换为pydantic的GameState。
+
+设计说明:
+- CompactGameState: slots数据类，无逐实例__dict__
+- 玩家ID经PlayerRegistry驻留为整数句柄，存于array('I')，每名玩家4字节；
+  句柄按引用计数回收: intern即计入一次引用，状态对象持有其玩家句柄的引用，
+  需显式release(或用with语句)归还，不依赖对象回收时机；不再被引用的玩家ID随之释放
+- 状态字段编码为小整数，时间为时间戳浮点数
+- 每局玩家数上限MAX_PLAYERS(稳定空间最多256人)
+
+序列化:
+- encode/decode 使用按位置排列的JSON数组，玩家以字符串ID存储，
+  句柄仅在进程内有效，不会写入Redis或MySQL
+"""
+import json
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+# 每局玩家数上限
+MAX_PLAYERS = 256
+
+# 游戏状态编码
+STATUS_NAMES = ('waiting', 'playing', 'finished')
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+
+class PlayerRegistry:
+    """
+    玩家ID驻留表，为每个玩家ID分配进程内唯一的整数句柄
+
+    句柄按引用计数管理: intern返回的句柄已计入一次引用，归调用方所有，
+    不会在取得句柄与登记引用之间被其他释放回收；持有方用完后release，
+    计数归零的玩家ID被移除，句柄留待复用，驻留表大小随活跃游戏的玩家数而非历史玩家数增长
+    """
+
+    def __init__(self):
+        self._handles: dict[str, int] = {}
+        self._ids: list[Optional[str]] = []
+        self._refs: list[int] = []
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def intern(self, player_id: str) -> int:
+        """获取玩家句柄并增加一次引用，首次出现时分配(调用方用完后需release)"""
+        handle = self._handles.get(player_id)
+        if handle is not None:
+            self._refs[handle] += 1
+            return handle
+        if self._free:
+            handle = self._free.pop()
+            self._ids[handle] = player_id
+            self._refs[handle] = 1
+        else:
+            handle = len(self._ids)
+            self._ids.append(player_id)
+            self._refs.append(1)
+        self._handles[player_id] = handle
+        return handle
+
+    def find(self, player_id: str) -> Optional[int]:
+        """查找玩家句柄，不存在时返回None(不分配)"""
+        return self._handles.get(player_id)
+
+    def lookup(self, handle: int) -> str:
+        """根据句柄获取玩家ID"""
+        return self._ids[handle]
+
+    def acquire(self, handles: Iterable[int]) -> None:
+        """增加句柄的引用计数"""
+        refs = self._refs
+        for handle in handles:
+            refs[handle] += 1
+
+    def release(self, handles: Iterable[int]) -> None:
+        """减少句柄的引用计数，归零时移除玩家ID"""
+        refs = self._refs
+        for handle in handles:
+            refs[handle] -= 1
+            if refs[handle] == 0:
+                del self._handles[self._ids[handle]]
+                self._ids[handle] = None
+                self._free.append(handle)
+
+
+# 全局玩家驻留表
+player_registry = PlayerRegistry()
+
+
+@dataclass(slots=True)
+class CompactGameState:
+    """
+    紧凑游戏状态
+
+    状态对象拥有players中句柄的各一次引用(构造时传入的句柄须已由调用方intern或acquire)，
+    不再使用时调用release或以with语句管理，释放后players被清空
+    """
+    game_id: str
+    players: array = field(default_factory=lambda: array('I'))
+    current_turn: int = 0
+    status: int = 0
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    registry: PlayerRegistry = field(default=player_registry, repr=False, compare=False)
+
+    def __enter__(self) -> "CompactGameState":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def release(self) -> None:
+        """归还持有的玩家句柄(可重复调用)"""
+        self.registry.release(self.players)
+        del self.players[:]
+
+    @classmethod
+    def new(cls, game_id: str, creator_id: str, registry: PlayerRegistry = player_registry):
+        """创建新游戏状态"""
+        now = time.time()
+        return cls(
+            game_id=game_id,
+            players=array('I', [registry.intern(creator_id)]),
+            created_at=now,
+            updated_at=now,
+            registry=registry
+        )
+
+    def copy(self) -> "CompactGameState":
+        """复制状态(玩家数组为独立副本，副本另持一次句柄引用，需单独release)"""
+        self.registry.acquire(self.players)
+        return CompactGameState(
+            self.game_id, array('I', self.players), self.current_turn,
+            self.status, self.created_at, self.updated_at, self.registry
+        )
+
+    @property
+    def status_name(self) -> str:
+        return STATUS_NAMES[self.status]
+
+    def has_player(self, player_id: str) -> bool:
+        """判断玩家是否已在游戏中"""
+        handle = self.registry.find(player_id)
+        return handle is not None and handle in self.players
+
+    def add_player(self, player_id: str) -> bool:
+        """加入玩家，已满或已在游戏中时返回False"""
+        if len(self.players) >= MAX_PLAYERS:
+            return False
+        if self.has_player(player_id):
+            return False
+        self.players.append(self.registry.intern(player_id))
+        return True
+
+    def player_ids(self) -> list[str]:
+        """还原玩家ID列表"""
+        lookup = self.registry.lookup
+        return [lookup(handle) for handle in self.players]
+
+
+def encode(state: CompactGameState) -> str:
+    """序列化为JSON数组"""
+    return json.dumps([
+        state.game_id, state.status, state.current_turn,
+        state.created_at, state.updated_at, state.player_ids()
+    ], separators=(',', ':'))
+
+
+def decode(payload: str, registry: PlayerRegistry = player_registry) -> CompactGameState:
+    """从JSON数组反序列化(返回的状态归调用方所有，用完后需release)"""
+    game_id, status, current_turn, created_at, updated_at, players = json.loads(payload)
+    return CompactGameState(
+        game_id=game_id,
+        players=array('I', _intern_all(players, registry)),
+        current_turn=current_turn,
+        status=status,
+        created_at=created_at,
+        updated_at=updated_at,
+        registry=registry
+    )
+
+
+def _intern_all(player_ids: Iterable[str], registry: PlayerRegistry) -> list[int]:
+    intern = registry.intern
+    return [intern(player_id) for player_id in player_ids]
@@ -0,0 +1,208 @@
+"""
+体力模块
+========
+
+体力每 energy_recovery_rate 分钟恢复1点，上限为用户的max_energy。
+不使用定时任务批量写入，而是在读取时根据恢复起点计算当前体力，仅在消耗时写库。
+
+恢复间隔为服务器参数 energy_recovery_rate(server_configs表，见backend/modules/serverConfig.py)，
+每次计算时读取，修改后无需重启即生效；尚未写库的恢复进度按新间隔重新计算。
+
+存储约定(users表):
+- energy: 恢复起点时刻的体力值
+- energy_recovery_at: 恢复起点(UTC，精确到秒)；为NULL表示体力已满
+  (改造前由定时任务维护、恢复起点为NULL的存量用户视为已满)
+- 当前体力 = min(max_energy, energy + (now - energy_recovery_at) // 恢复间隔)
+
+消耗体力:
+- 读取-计算-条件UPDATE(比较energy与energy_recovery_at未变)，失败则重试，并发请求不会超额消耗
+- 同一事务内写入EnergyLog；指定日志缓冲(log_sink)时改为写后批量写入，消耗只执行一条UPDATE
+- 未满时恢复起点按已恢复点数前移，保留不足1点的恢复进度；已满时从当前时刻开始计时
+
+配置项(服务器参数):
+- energy_recovery_rate: 恢复1点体力的间隔(分钟)，默认10
+"""
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+from sqlalchemy import select, update, insert
+from backend.database.models import User, EnergyLog
+from backend.modules.logSink import log_sink
+from backend.modules.serverConfig import server_config, ENERGY_RECOVERY_RATE
+from backend.utils.utcTime import utcnow
+
+logger = logging.getLogger(__name__)
+
+# 默认恢复间隔(秒)
+DEFAULT_RECOVERY_INTERVAL = ENERGY_RECOVERY_RATE.default * 60
+
+
+class InsufficientEnergy(Exception):
+    """体力不足"""
+
+    def __init__(self, required: int, current: int):
+        super().__init__(f"体力不足: 需要{required}, 当前{current}")
+        self.required = required
+        self.current = current
+
+
+class EnergyConflict(Exception):
+    """条件更新重试次数耗尽"""
+
+
+def compute_energy(energy: int, max_energy: int, recovery_at: Optional[datetime],
+                   now: datetime, interval: int = DEFAULT_RECOVERY_INTERVAL) -> Tuple[int, Optional[datetime]]:
+    """
+    计算当前体力
+
+    返回值:
+    - (当前体力, 规范化后的恢复起点)；体力已满时恢复起点为None
+    """
+    if recovery_at is None:
+        return max(energy, max_energy), None
+    if energy >= max_energy:
+        return energy, None
+    points = max(int((now - recovery_at).total_seconds()) // interval, 0)
+    if energy + points >= max_energy:
+        return max_energy, None
+    return energy + points, recovery_at + timedelta(seconds=points * interval)
+
+
+@dataclass(slots=True)
+class EnergyStatus:
+    """体力状态"""
+    user_id: str
+    energy: int
+    max_energy: int
+    next_point_at: Optional[datetime]
+    full_at: Optional[datetime]
+
+    def to_dict(self) -> dict:
+        return {
+            "energy": self.energy,
+            "max_energy": self.max_energy,
+            "next_point_at": self.next_point_at.isoformat() if self.next_point_at else None,
+            "full_at": self.full_at.isoformat() if self.full_at else None
+        }
+
+
+class EnergyService:
+    """体力服务"""
+
+    # 条件更新冲突时的最大重试次数及退避基数(秒)
+    MAX_RETRIES = 16
+    RETRY_BACKOFF = 0.001
+
+    def __init__(self, db_operator=None, interval: int = None,
+                 clock: Callable[[], datetime] = utcnow, log_sink=None):
+        """
+        参数:
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - interval: 恢复1点体力的间隔(秒)，默认读取服务器参数energy_recovery_rate(分钟)
+        - clock: 当前时间函数(测试与模拟时可替换)
+        - log_sink: 日志写后缓冲(LogSink)，为空时EnergyLog与扣减在同一事务内写入
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.db_operator = db_operator
+        self._interval = interval
+        self.clock = clock
+        self.log_sink = log_sink
+
+    @property
+    def interval(self) -> int:
+        """恢复1点体力的间隔(秒)"""
+        if self._interval is not None:
+            return self._interval
+        # 配置为非正数时按1分钟计算，避免除零
+        return max(server_config.get(ENERGY_RECOVERY_RATE), 1) * 60
+
+    def _status(self, user_id: str, energy: int, max_energy: int,
+                recovery_at: Optional[datetime]) -> EnergyStatus:
+        """根据规范化后的存储值构造状态"""
+        if recovery_at is None:
+            return EnergyStatus(user_id, energy, max_energy, None, None)
+        step = timedelta(seconds=self.interval)
+        return EnergyStatus(
+            user_id, energy, max_energy,
+            next_point_at=recovery_at + step,
+            full_at=recovery_at + step * (max_energy - energy)
+        )
+
+    async def get_energy(self, user_id: str) -> Optional[EnergyStatus]:
+        """读取当前体力(不写库)，用户不存在时返回None"""
+        async with self.db_operator.session() as session:
+            row = (await session.execute(
+                select(User.energy, User.max_energy, User.energy_recovery_at).where(User.id == user_id)
+            )).first()
+        if row is None:
+            return None
+        energy, recovery_at = compute_energy(
+            row.energy, row.max_energy, row.energy_recovery_at, self.clock(), self.interval
+        )
+        return self._status(user_id, energy, row.max_energy, recovery_at)
+
+    async def spend(self, user_id: str, cost: int, action_type: str,
+                    related_id: Optional[str] = None) -> EnergyStatus:
+        """
+        消耗体力
+
+        参数:
+        - cost: 消耗点数(正整数)
+        - action_type: EnergyLog动作类型(explore/attack/recover/use)
+        - related_id: 关联对象ID
+
+        异常:
+        - ValueError: 用户不存在或cost无效
+        - InsufficientEnergy: 体力不足
+        - EnergyConflict: 重试次数耗尽
+        """
+        if cost <= 0:
+            raise ValueError(f"无效的体力消耗: {cost}")
+        for attempt in range(self.MAX_RETRIES):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, self.RETRY_BACKOFF * attempt))
+            async with self.db_operator.session() as session:
+                row = (await session.execute(
+                    select(User.energy, User.max_energy, User.energy_recovery_at).where(User.id == user_id)
+                )).first()
+                if row is None:
+                    raise ValueError(f"用户不存在: {user_id}")
+                now = self.clock()
+                current, recovery_at = compute_energy(
+                    row.energy, row.max_energy, row.energy_recovery_at, now, self.interval
+                )
+                if current < cost:
+                    raise InsufficientEnergy(cost, current)
+                new_energy = current - cost
+                new_recovery_at = recovery_at or now
+
+                # 条件更新: 读取后energy与恢复起点均未被其他请求修改
+                result = await session.execute(
+                    update(User)
+                    .where(User.id == user_id, User.energy == row.energy,
+                           User.energy_recovery_at.is_(None) if row.energy_recovery_at is None
+                           else User.energy_recovery_at == row.energy_recovery_at)
+                    .values(energy=new_energy, energy_recovery_at=new_recovery_at)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != 1:
+                    await session.rollback()
+                    continue
+                if self.log_sink is None:
+                    await session.execute(insert(EnergyLog).values(
+                        user_id=user_id, change_value=-cost, current_value=new_energy,
+                        action_type=action_type, related_id=related_id
+                    ))
+            if self.log_sink is not None:
+                self.log_sink.log_energy(user_id, -cost, new_energy, action_type, related_id)
+            return self._status(user_id, new_energy, row.max_energy, new_recovery_at)
+        raise EnergyConflict(f"体力更新冲突: {user_id}")
+
+
+# 全局体力服务(体力日志经全局日志缓冲写入)
+energy_service = EnergyService(log_sink=log_sink)
@@ -3,17 +3,28 @@
 ============
 
 包含游戏核心逻辑和状态管理
+
+状态存储:
+- 通过GAME_STATE_BACKEND选择内存或Redis存储，详见gameStore.py
 """
 
-from typing import Optional
+import time
+import uuid
+import random
+import asyncio
+from typing import Callable, Optional
 from datetime import datetime
 from pydantic import BaseModel
 from fastapi import APIRouter
+from backend.modules.compactGameState import CompactGameState, STATUS_CODES
+from backend.modules.gameStore import (
+    GameStateStore, GameStateConflict, GameSnapshotter, create_game_store
+)
 
 router = APIRouter(tags=["game"])
 
 class GameState(BaseModel):
-    """游戏状态模型"""
+    """游戏状态模型(API边界使用，内部以CompactGameState表示)"""
     game_id: str
     players: list[str]
     current_turn: int
@@ -21,41 +32,124 @@ class GameState(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+    @classmethod
+    def from_compact(cls, state: CompactGameState) -> "GameState":
+        """由紧凑状态构造API模型"""
+        return cls(
+            game_id=state.game_id,
+            players=state.player_ids(),
+            current_turn=state.current_turn,
+            status=state.status_name,
+            created_at=datetime.fromtimestamp(state.created_at),
+            updated_at=datetime.fromtimestamp(state.updated_at)
+        )
+
 class GameCore:
-    """游戏核心逻辑"""
-    
-    def __init__(self):
-        self.active_games: dict[str, GameState] = {}
-    
-    def create_game(self, creator_id: str) -> str:
+    """
+    游戏核心逻辑
+
+    游戏状态保存在可插拔的GameStateStore中(见gameStore.py)，多个worker可共享。
+    所有状态修改均为"读取-修改-比较并设置"，版本冲突时自动重试。
+    内部操作CompactGameState，仅get_game转换为pydantic的GameState。
+    """
+
+    # 乐观并发冲突时的最大重试次数及退避基数(秒)
+    MAX_RETRIES = 16
+    RETRY_BACKOFF = 0.001
+
+    def __init__(self, store: Optional[GameStateStore] = None):
+        self.store = store or create_game_store()
+
+    async def get_state(self, game_id: str) -> Optional[CompactGameState]:
+        """获取紧凑游戏状态(内部使用，用完后需release)"""
+        record = await self.store.get(game_id)
+        return None if record is None else record[1]
+
+    async def get_game(self, game_id: str) -> Optional[GameState]:
+        """获取游戏状态(API模型)"""
+        state = await self.get_state(game_id)
+        if state is None:
+            return None
+        with state:
+            return GameState.from_compact(state)
+
+    async def _mutate(self, game_id: str,
+                      mutator: Callable[[CompactGameState], bool]) -> Optional[CompactGameState]:
+        """
+        乐观并发修改游戏状态
+
+        参数:
+        - mutator: 修改函数，返回False表示放弃修改
+
+        返回值:
+        - 修改后的状态(用完后需release)；游戏不存在或放弃修改时返回None
+
+        异常:
+        - GameStateConflict: 重试次数耗尽
+        """
+        for attempt in range(self.MAX_RETRIES):
+            if attempt:
+                # 随机退避，错开冲突写入
+                await asyncio.sleep(random.uniform(0, self.RETRY_BACKOFF * attempt))
+            record = await self.store.get(game_id)
+            if record is None:
+                return None
+            version, state = record
+            if mutator(state) is False:
+                state.release()
+                return None
+            state.updated_at = time.time()
+            if await self.store.compare_and_set(game_id, version, state):
+                return state
+            state.release()
+        raise GameStateConflict(f"游戏状态更新冲突: {game_id}")
+
+    async def create_game(self, creator_id: str) -> str:
         """创建新游戏"""
         game_id = str(uuid.uuid4())
-        self.active_games[game_id] = GameState(
-            game_id=game_id,
-            players=[creator_id],
-            current_turn=0,
-            status='waiting',
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
+        with CompactGameState.new(game_id, creator_id) as state:
+            await self.store.create(game_id, state)
         return game_id
-    
-    def join_game(self, game_id: str, player_id: str) -> bool:
-        """加入游戏"""
-        if game_id not in self.active_games:
+
+    async def _apply(self, game_id: str, mutator: Callable[[CompactGameState], bool]) -> bool:
+        """修改游戏状态，只返回是否成功"""
+        state = await self._mutate(game_id, mutator)
+        if state is None:
             return False
-        self.active_games[game_id].players.append(player_id)
+        state.release()
         return True
-    
-    def start_game(self, game_id: str) -> bool:
+
+    async def join_game(self, game_id: str, player_id: str) -> bool:
+        """加入游戏(已在游戏中或人数已满时返回False)"""
+        def add_player(state: CompactGameState) -> bool:
+            return state.add_player(player_id)
+        return await self._apply(game_id, add_player)
+
+    async def start_game(self, game_id: str) -> bool:
         """开始游戏"""
-        if game_id not in self.active_games:
-            return False
-        self.active_games[game_id].status = 'playing'
-        return True
+        def start(state: CompactGameState) -> None:
+            state.status = STATUS_CODES['playing']
+        return await self._apply(game_id, start)
+
+    async def advance_turn(self, game_id: str, expected_turn: int) -> Optional[CompactGameState]:
+        """
+        推进回合
+
+        仅当当前回合等于expected_turn时推进，防止多个worker重复结算同一回合。
+
+        返回值:
+        - 推进后的状态(用完后需release)；回合已被推进或游戏不存在时返回None
+        """
+        def advance(state: CompactGameState) -> bool:
+            if state.current_turn != expected_turn:
+                return False
+            state.current_turn += 1
+            return True
+        return await self._mutate(game_id, advance)
 
-# 全局游戏核心实例
+# 全局游戏核心实例及其MySQL快照任务(由app.py的lifespan启停)
 game_core = GameCore()
+game_snapshotter = GameSnapshotter(game_core.store)
 
 @router.post("/create")
 async def create_game():
@@ -0,0 +1,334 @@
+"""
+游戏状态存储模块
+================
+
+为GameCore提供可插拔的游戏状态存储，使多个uvicorn worker可共享游戏状态，
+nginx无需会话粘滞。
+
+存储实现:
+- InMemoryGameStateStore: 进程内存储(单worker/测试)
+- RedisGameStateStore: Redis协议存储，可配置多个节点
+
+公共约定:
+- 状态为CompactGameState(见compactGameState.py)，附带单调递增的版本号
+- 内存存储直接保存对象，读取时返回副本；Redis存储保存其紧凑JSON编码
+- 写入不接管传入的状态；get/scan返回的状态归调用方所有，用完后需release归还玩家句柄
+- 游戏按 game_id 的crc32哈希分片
+- 所有写入均为乐观并发: compare_and_set 仅在版本号未变时成功
+- 每个存储实例记录经本实例写入的游戏(脏集合)，快照任务只写本worker修改过的游戏，
+  多个worker不会重复扫描、重写全部游戏
+
+配置项(环境变量):
+- GAME_STATE_BACKEND: memory|redis，默认memory
+- GAME_STATE_SHARDS: 内存存储分片数，默认16
+- REDIS_URLS: Redis节点列表(逗号分隔)，默认 redis://redis:6379/0
+- GAME_SNAPSHOT_INTERVAL: MySQL快照间隔(秒)，默认60，0表示禁用
+"""
+import os
+import zlib
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional, Tuple
+from sqlalchemy import select, update
+from backend.database.models import GameSnapshot
+from backend.modules.compactGameState import CompactGameState, encode, decode
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "hbm:game:"
+
+
+def shard_index(game_id: str, shard_count: int) -> int:
+    """按game_id哈希计算分片下标"""
+    return zlib.crc32(game_id.encode()) % shard_count
+
+
+class GameStateConflict(Exception):
+    """乐观并发冲突"""
+
+
+class GameStateStore(ABC):
+    """游戏状态存储接口"""
+
+    def __init__(self):
+        # 经本实例创建或修改、尚未快照的游戏
+        self.dirty: set[str] = set()
+
+    def take_dirty(self) -> set:
+        """取出并清空脏集合"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    @abstractmethod
+    async def get(self, game_id: str) -> Optional[Tuple[int, CompactGameState]]:
+        """读取游戏状态，返回(版本号, 状态副本)或None(状态用完后需release)"""
+
+    @abstractmethod
+    async def create(self, game_id: str, state: CompactGameState, version: int = 1) -> bool:
+        """创建游戏状态(从快照恢复时沿用快照的版本号)，已存在时返回False"""
+
+    @abstractmethod
+    async def compare_and_set(self, game_id: str, expected_version: int, state: CompactGameState) -> bool:
+        """版本号等于expected_version时写入并将版本号加1，否则返回False"""
+
+    @abstractmethod
+    async def delete(self, game_id: str) -> bool:
+        """删除游戏状态"""
+
+    @abstractmethod
+    def scan(self) -> AsyncIterator[Tuple[str, int, CompactGameState]]:
+        """遍历全部游戏，产出(game_id, 版本号, 状态)(状态用完后需release)"""
+
+    async def close(self) -> None:
+        """释放资源"""
+
+
+class InMemoryGameStateStore(GameStateStore):
+    """进程内游戏状态存储"""
+
+    def __init__(self, shard_count: int = 16):
+        super().__init__()
+        self.shards = [dict() for _ in range(shard_count)]
+
+    def _shard(self, game_id: str) -> dict:
+        return self.shards[shard_index(game_id, len(self.shards))]
+
+    async def get(self, game_id):
+        record = self._shard(game_id).get(game_id)
+        if record is None:
+            return None
+        return record[0], record[1].copy()
+
+    async def create(self, game_id, state, version=1):
+        shard = self._shard(game_id)
+        if game_id in shard:
+            return False
+        shard[game_id] = (version, state.copy())
+        self.dirty.add(game_id)
+        return True
+
+    async def compare_and_set(self, game_id, expected_version, state):
+        # 检查与写入之间没有await，在事件循环内是原子的
+        shard = self._shard(game_id)
+        current = shard.get(game_id)
+        if current is None or current[0] != expected_version:
+            return False
+        shard[game_id] = (expected_version + 1, state.copy())
+        current[1].release()
+        self.dirty.add(game_id)
+        return True
+
+    async def delete(self, game_id):
+        record = self._shard(game_id).pop(game_id, None)
+        if record is None:
+            return False
+        record[1].release()
+        return True
+
+    async def scan(self):
+        for shard in self.shards:
+            for game_id, (version, state) in list(shard.items()):
+                yield game_id, version, state.copy()
+
+
+class RedisGameStateStore(GameStateStore):
+    """
+    Redis协议游戏状态存储
+
+    每个游戏存为一个Hash: {prefix}{game_id} -> {version, state}，
+    写入使用 WATCH/MULTI 事务实现比较并设置。
+    """
+
+    def __init__(self, clients, key_prefix: str = REDIS_KEY_PREFIX):
+        """
+        参数:
+        - clients: redis.asyncio客户端列表，每个客户端对应一个分片
+        - key_prefix: 键前缀
+        """
+        super().__init__()
+        self.clients = list(clients)
+        self.key_prefix = key_prefix
+
+    @classmethod
+    def from_urls(cls, urls, **kwargs):
+        """根据Redis连接串列表创建"""
+        import redis.asyncio as redis
+        return cls([redis.from_url(url, decode_responses=True) for url in urls], **kwargs)
+
+    def _client(self, game_id: str):
+        return self.clients[shard_index(game_id, len(self.clients))]
+
+    def _key(self, game_id: str) -> str:
+        return f"{self.key_prefix}{game_id}"
+
+    async def get(self, game_id):
+        data = await self._client(game_id).hgetall(self._key(game_id))
+        if not data:
+            return None
+        return int(data["version"]), decode(data["state"])
+
+    async def _transact(self, game_id, check) -> bool:
+        """在WATCH下执行检查，通过则写入"""
+        from redis.exceptions import WatchError
+        key = self._key(game_id)
+        async with self._client(game_id).pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                fields = await check(pipe, key)
+                if fields is None:
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.hset(key, mapping=fields)
+                await pipe.execute()
+                self.dirty.add(game_id)
+                return True
+            except WatchError:
+                return False
+
+    async def create(self, game_id, state, version=1):
+        async def check(pipe, key):
+            if await pipe.exists(key):
+                return None
+            return {"version": version, "state": encode(state)}
+        return await self._transact(game_id, check)
+
+    async def compare_and_set(self, game_id, expected_version, state):
+        async def check(pipe, key):
+            version = await pipe.hget(key, "version")
+            if version is None or int(version) != expected_version:
+                return None
+            return {"version": expected_version + 1, "state": encode(state)}
+        return await self._transact(game_id, check)
+
+    async def delete(self, game_id):
+        return bool(await self._client(game_id).delete(self._key(game_id)))
+
+    async def scan(self):
+        for client in self.clients:
+            async for key in client.scan_iter(match=f"{self.key_prefix}*", count=500):
+                data = await client.hgetall(key)
+                if data:
+                    yield key[len(self.key_prefix):], int(data["version"]), decode(data["state"])
+
+    async def close(self):
+        for client in self.clients:
+            await client.aclose()
+
+
+def create_game_store() -> GameStateStore:
+    """根据环境变量创建游戏状态存储"""
+    backend = os.getenv('GAME_STATE_BACKEND', 'memory')
+    if backend == 'redis':
+        urls = os.getenv('REDIS_URLS', 'redis://redis:6379/0').split(',')
+        return RedisGameStateStore.from_urls([url.strip() for url in urls if url.strip()])
+    return InMemoryGameStateStore(int(os.getenv('GAME_STATE_SHARDS', '16')))
+
+
+class GameSnapshotter:
+    """
+    周期性将游戏状态快照写入MySQL(game_snapshots表)
+
+    只写入经本worker的存储实例修改过的游戏(store.take_dirty())，读取其最新状态后按版本号条件写入:
+    已有更新版本的快照不会被覆盖，多个worker修改同一游戏时各自写入一次，且不会回退版本
+    """
+
+    def __init__(self, store: GameStateStore, interval: float = None, db_operator=None):
+        """
+        参数:
+        - store: 游戏状态存储
+        - interval: 快照间隔(秒)
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.store = store
+        self.interval = interval if interval is not None else float(os.getenv('GAME_SNAPSHOT_INTERVAL', '60'))
+        self.db_operator = db_operator
+        self._task: Optional[asyncio.Task] = None
+
+    async def snapshot_once(self) -> int:
+        """写入本worker自上次快照以来修改过的游戏，返回写入条数"""
+        game_ids = self.store.take_dirty()
+        if not game_ids:
+            return 0
+        try:
+            changed = {}
+            for game_id in game_ids:
+                record = await self.store.get(game_id)
+                if record is not None:
+                    changed[game_id] = record
+            if not changed:
+                return 0
+            try:
+                return await self._write(changed)
+            finally:
+                for _, state in changed.values():
+                    state.release()
+        except Exception:
+            # 下一次快照重试
+            self.store.dirty.update(game_ids)
+            raise
+
+    async def _write(self, changed: dict) -> int:
+        """按版本号条件写入快照(只覆盖版本更旧的快照)"""
+        table = GameSnapshot.__table__
+        written = 0
+        async with self.db_operator.session() as session:
+            existing = dict((await session.execute(
+                select(table.c.game_id, table.c.version).where(table.c.game_id.in_(list(changed)))
+            )).all())
+            for game_id, (version, state) in changed.items():
+                values = {"status": state.status_name, "current_turn": state.current_turn,
+                          "version": version, "state": encode(state)}
+                if game_id not in existing:
+                    session.add(GameSnapshot(game_id=game_id, **values))
+                    written += 1
+                elif existing[game_id] < version:
+                    result = await session.execute(
+                        update(table).where(table.c.game_id == game_id, table.c.version < version).values(**values))
+                    written += result.rowcount
+        return written
+
+    async def restore(self) -> int:
+        """从快照恢复存储中不存在的游戏，返回恢复条数"""
+        restored = 0
+        for snapshot in await self.db_operator.get_all(GameSnapshot):
+            with decode(snapshot.state) as state:
+                created = await self.store.create(snapshot.game_id, state, max(snapshot.version, 1))
+            if created:
+                # 与快照一致，无需再次写入
+                self.store.dirty.discard(snapshot.game_id)
+                restored += 1
+        return restored
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                count = await self.snapshot_once()
+                if count:
+                    logger.info(f"游戏状态快照完成: {count} 条")
+            except Exception as e:
+                logger.error(f"游戏状态快照失败: {e}")
+
+    def start(self) -> None:
+        """启动后台快照任务(需在事件循环中调用)"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写入最后一次快照"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.snapshot_once()
+        except Exception as e:
+            logger.error(f"游戏状态最终快照失败: {e}")
@@ -0,0 +1,431 @@
+"""
+排行榜模块
+==========
+
+按用户分数(users.score)维护全服排行，避免每次查询对全表排序。
+
+排序规则:
+- 分数降序，同分按用户ID降序(与Redis有序集合ZREVRANK一致)；名次从1开始，不并列
+
+索引实现:
+- InMemoryLeaderboard: 进程内有序列表(sortedcontainers.SortedList)，更新与名次查询O(log n)；
+  每个worker各有一份，只在本worker内增量更新，仅适用于单worker(WEB_CONCURRENCY>1时启动告警)
+- RedisLeaderboard: Redis有序集合，多个worker共享同一份排行，多worker部署必须使用
+
+LeaderboardService:
+- warm(): 启动时从users表分块加载分数(Redis索引非空时跳过)
+- add_user(): 注册时以0分加入排行(已在榜时不覆盖)
+- record_score(): 分数变化时原子更新users.score，并按增量(ZINCRBY语义)更新索引，
+  并发更新不会以旧值覆盖新值；调用方为团队回合结算(见teamTurn.py)
+- top()/around(): 前N名与"我的名次±k"；around()查询的用户不在索引中时从users表补入
+- snapshot_yesterday_rank(): 每日任务，以一条UPDATE(窗口函数ROW_NUMBER)将当前名次写入yesterday_rank
+
+接口(挂载于/api/game):
+- GET /leaderboard?limit=: 前N名
+- GET /leaderboard/users/{user_id}?k=: 指定用户的名次及其前后k名
+
+配置项(环境变量):
+- LEADERBOARD_BACKEND: memory|redis，默认memory
+- REDIS_URLS: Redis节点列表(逗号分隔)，排行榜使用第一个节点
+- WEB_CONCURRENCY: uvicorn worker数，大于1且使用memory后端时告警
+- LEADERBOARD_SNAPSHOT_HOUR: 每日写入yesterday_rank的时刻(UTC小时)，默认0，-1表示禁用
+"""
+import os
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query
+from sortedcontainers import SortedList
+from sqlalchemy import select, update, func
+from backend.database.models import User
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "hbm:leaderboard"
+LOAD_CHUNK = 20000
+MAX_LIMIT = 100
+MAX_AROUND = 50
+
+# 排行条目: (名次, 用户ID, 分数)
+Entry = Tuple[int, str, int]
+
+
+class Leaderboard(ABC):
+    """排行索引接口"""
+
+    @abstractmethod
+    async def set_score(self, user_id: str, score: int) -> None:
+        """设置用户分数(新增或更新)"""
+
+    @abstractmethod
+    async def add(self, user_id: str, score: int) -> bool:
+        """用户不在榜上时加入，已在榜上时不修改，返回是否加入"""
+
+    @abstractmethod
+    async def incr_score(self, user_id: str, delta: int, initial: int) -> int:
+        """
+        原子增加已在榜用户的分数；不在榜上时以initial加入
+
+        返回值:
+        - 索引中的新分数
+        """
+
+    @abstractmethod
+    async def remove(self, user_id: str) -> bool:
+        """移除用户"""
+
+    @abstractmethod
+    async def load(self, scores: Iterable[Tuple[str, int]]) -> int:
+        """批量加载(覆盖已有用户分数)，返回加载条数"""
+
+    @abstractmethod
+    async def size(self) -> int:
+        """用户数"""
+
+    @abstractmethod
+    async def rank(self, user_id: str) -> Optional[int]:
+        """用户名次(从1开始)，不在榜上返回None"""
+
+    @abstractmethod
+    async def range(self, start: int, stop: int) -> List[Entry]:
+        """名次区间[start, stop]的条目(名次从1开始，含两端)"""
+
+    async def top(self, n: int) -> List[Entry]:
+        """前n名"""
+        return await self.range(1, n) if n > 0 else []
+
+    async def around(self, user_id: str, k: int) -> List[Entry]:
+        """用户名次前后各k名(含用户本身)，不在榜上返回空列表"""
+        rank = await self.rank(user_id)
+        if rank is None:
+            return []
+        return await self.range(max(rank - k, 1), rank + k)
+
+    async def close(self) -> None:
+        """释放资源"""
+
+
+class InMemoryLeaderboard(Leaderboard):
+    """进程内排行索引(单worker/测试)"""
+
+    def __init__(self):
+        self._scores: dict[str, int] = {}
+        # 升序保存(分数, 用户ID)，名次 = 总数 - 下标
+        self._index = SortedList()
+
+    async def set_score(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._index.remove((old, user_id))
+        self._scores[user_id] = score
+        self._index.add((score, user_id))
+
+    async def add(self, user_id, score):
+        if user_id in self._scores:
+            return False
+        self._scores[user_id] = score
+        self._index.add((score, user_id))
+        return True
+
+    async def incr_score(self, user_id, delta, initial):
+        old = self._scores.get(user_id)
+        if old is None:
+            await self.add(user_id, initial)
+            return initial
+        await self.set_score(user_id, old + delta)
+        return old + delta
+
+    async def remove(self, user_id):
+        old = self._scores.pop(user_id, None)
+        if old is None:
+            return False
+        self._index.remove((old, user_id))
+        return True
+
+    async def load(self, scores):
+        count = 0
+        for user_id, score in scores:
+            self._scores[user_id] = score
+            count += 1
+        self._index = SortedList((score, user_id) for user_id, score in self._scores.items())
+        return count
+
+    async def size(self):
+        return len(self._scores)
+
+    async def rank(self, user_id):
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return len(self._index) - self._index.index((score, user_id))
+
+    async def range(self, start, stop):
+        total = len(self._index)
+        start, stop = max(start, 1), min(stop, total)
+        if start > stop:
+            return []
+        # 名次r对应升序下标 total - r
+        items = self._index[total - stop:total - start + 1]
+        return [(stop - i, user_id, score) for i, (score, user_id) in enumerate(items)][::-1]
+
+
+class RedisLeaderboard(Leaderboard):
+    """Redis有序集合排行索引"""
+
+    def __init__(self, client, key: str = REDIS_KEY):
+        """
+        参数:
+        - client: redis.asyncio客户端(decode_responses=True)
+        - key: 有序集合键名
+        """
+        self.client = client
+        self.key = key
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs):
+        """根据Redis连接串创建"""
+        import redis.asyncio as redis
+        return cls(redis.from_url(url, decode_responses=True), **kwargs)
+
+    async def set_score(self, user_id, score):
+        await self.client.zadd(self.key, {user_id: score})
+
+    async def add(self, user_id, score):
+        return bool(await self.client.zadd(self.key, {user_id: score}, nx=True))
+
+    async def incr_score(self, user_id, delta, initial):
+        score = await self.client.zadd(self.key, {user_id: delta}, xx=True, incr=True)
+        if score is not None:
+            return int(score)
+        # 不在榜上: 以数据库中的新分数加入，并发加入时保留先写入的值
+        if await self.add(user_id, initial):
+            return initial
+        return int(await self.client.zscore(self.key, user_id))
+
+    async def remove(self, user_id):
+        return bool(await self.client.zrem(self.key, user_id))
+
+    async def load(self, scores):
+        count = 0
+        batch = {}
+        for user_id, score in scores:
+            batch[user_id] = score
+            if len(batch) >= LOAD_CHUNK:
+                await self.client.zadd(self.key, batch)
+                count += len(batch)
+                batch = {}
+        if batch:
+            await self.client.zadd(self.key, batch)
+            count += len(batch)
+        return count
+
+    async def size(self):
+        return await self.client.zcard(self.key)
+
+    async def rank(self, user_id):
+        rank = await self.client.zrevrank(self.key, user_id)
+        return None if rank is None else rank + 1
+
+    async def range(self, start, stop):
+        start = max(start, 1)
+        if start > stop:
+            return []
+        items = await self.client.zrevrange(self.key, start - 1, stop - 1, withscores=True)
+        return [(start + i, user_id, int(score)) for i, (user_id, score) in enumerate(items)]
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_leaderboard() -> Leaderboard:
+    """根据环境变量创建排行索引"""
+    if os.getenv('LEADERBOARD_BACKEND', 'memory') == 'redis':
+        url = os.getenv('REDIS_URLS', 'redis://redis:6379/0').split(',')[0].strip()
+        return RedisLeaderboard.from_url(url)
+    if int(os.getenv('WEB_CONCURRENCY', '1')) > 1:
+        logger.warning("内存排行榜只在本worker内更新，多worker部署请设置 LEADERBOARD_BACKEND=redis")
+    return InMemoryLeaderboard()
+
+
+class LeaderboardService:
+    """排行榜服务"""
+
+    def __init__(self, board: Leaderboard, db_operator=None, snapshot_hour: int = None):
+        """
+        参数:
+        - board: 排行索引
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - snapshot_hour: 每日写入yesterday_rank的时刻(UTC小时)，-1表示禁用
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.board = board
+        self.db_operator = db_operator
+        self.snapshot_hour = snapshot_hour if snapshot_hour is not None else \
+            int(os.getenv('LEADERBOARD_SNAPSHOT_HOUR', '0'))
+        self._task: Optional[asyncio.Task] = None
+
+    async def _iter_scores(self):
+        """按主键键集分块读取全部用户分数"""
+        last_id = None
+        while True:
+            query = select(User.id, func.coalesce(User.score, 0)).order_by(User.id).limit(LOAD_CHUNK)
+            if last_id is not None:
+                query = query.where(User.id > last_id)
+            async with self.db_operator.read_session() as session:
+                rows = (await session.execute(query)).all()
+            for row in rows:
+                yield row
+            if len(rows) < LOAD_CHUNK:
+                return
+            last_id = rows[-1][0]
+
+    async def warm(self, force: bool = False) -> int:
+        """
+        从users表加载排行索引
+
+        参数:
+        - force: 索引非空时也重新加载
+
+        返回值:
+        - 加载条数(跳过时为0)
+        """
+        if not force and await self.board.size():
+            return 0
+        rows = [(user_id, score) async for user_id, score in self._iter_scores()]
+        return await self.board.load(rows)
+
+    async def add_user(self, user_id: str, score: int = 0) -> bool:
+        """新用户加入排行(已在榜时不覆盖)"""
+        return await self.board.add(user_id, score)
+
+    async def record_score(self, user_id: str, delta: int) -> Optional[int]:
+        """
+        原子增加用户分数并按增量更新排行索引
+
+        返回值:
+        - 数据库中的新分数，用户不存在时返回None
+        """
+        async with self.db_operator.session() as session:
+            result = await session.execute(
+                update(User).where(User.id == user_id)
+                .values(score=func.coalesce(User.score, 0) + delta)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                return None
+            score = (await session.execute(select(User.score).where(User.id == user_id))).scalar()
+        await self.board.incr_score(user_id, delta, score)
+        return score
+
+    async def top(self, n: int) -> List[Entry]:
+        return await self.board.top(n)
+
+    async def around(self, user_id: str, k: int) -> List[Entry]:
+        entries = await self.board.around(user_id, k)
+        if entries:
+            return entries
+        # 索引加载后注册、或由其他worker加入的用户: 从users表补入
+        async with self.db_operator.read_session() as session:
+            score = (await session.execute(
+                select(func.coalesce(User.score, 0)).where(User.id == user_id)
+            )).scalar()
+        if score is None:
+            return []
+        await self.board.add(user_id, score)
+        return await self.board.around(user_id, k)
+
+    async def snapshot_yesterday_rank(self) -> int:
+        """
+        将当前名次写入yesterday_rank(单条UPDATE，名次由数据库窗口函数计算，与索引排序规则一致)
+
+        返回值:
+        - 更新行数
+        """
+        ranked = select(
+            User.id,
+            func.row_number().over(order_by=(func.coalesce(User.score, 0).desc(), User.id.desc())).label('rnk')
+        ).subquery()
+        async with self.db_operator.session() as session:
+            result = await session.execute(
+                update(User).where(User.id == ranked.c.id)
+                # 显式保持updated_at，避免每日名次刷新被视为资料修改
+                .values(yesterday_rank=ranked.c.rnk, updated_at=User.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+        logger.info(f"昨日排名已更新: {result.rowcount} 名用户")
+        return result.rowcount
+
+    def _seconds_until_snapshot(self, now: datetime) -> float:
+        target = now.replace(hour=self.snapshot_hour, minute=0, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return (target - now).total_seconds()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._seconds_until_snapshot(datetime.now(timezone.utc)))
+            try:
+                await self.snapshot_yesterday_rank()
+            except Exception as e:
+                logger.error(f"昨日排名更新失败: {e}")
+
+    def start(self) -> None:
+        """启动每日名次快照任务(需在事件循环中调用)"""
+        if self.snapshot_hour >= 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止每日任务并释放索引资源"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.board.close()
+
+
+# 全局排行榜服务(由应用生命周期加载与启动)
+leaderboard_service = LeaderboardService(create_leaderboard())
+
+router = APIRouter(tags=["game"])
+
+
+def _entries(entries: List[Entry]) -> list:
+    return [{"rank": rank, "user_id": user_id, "score": score} for rank, user_id, score in entries]
+
+
+@router.get("/leaderboard")
+async def leaderboard_top(limit: int = Query(10, ge=1, le=MAX_LIMIT)):
+    """
+    获取排行榜前N名
+
+    返回值:
+    {"entries": [{"rank", "user_id", "score"}]}
+    """
+    return {"entries": _entries(await leaderboard_service.top(limit))}
+
+
+@router.get("/leaderboard/users/{user_id}")
+async def leaderboard_around(user_id: str, k: int = Query(5, ge=0, le=MAX_AROUND)):
+    """
+    获取指定用户的名次及其前后k名
+
+    返回值:
+    {"rank", "entries": [{"rank", "user_id", "score"}]}
+
+    异常:
+    - HTTPException 404: 用户不在榜上
+    """
+    entries = await leaderboard_service.around(user_id, k)
+    rank = next((entry[0] for entry in entries if entry[1] == user_id), None)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="用户不在排行榜上")
+    return {"rank": rank, "entries": _entries(entries)}
@@ -0,0 +1,268 @@
+"""
+日志写后缓冲模块
+================
+
+体力日志(energy_logs)与资历日志(experience_logs)只追加、不参与业务读取，逐条开会话提交的代价
+远高于写入本身。本模块在内存中累积日志记录，由后台任务批量写入:
+
+- 缓冲记录数达到 LOG_SINK_BATCH_SIZE 条，或距上次写入满 LOG_SINK_FLUSH_MS 毫秒时写入一次
+- 每次写入在一个事务内完成，每张表每batch_size条记录执行一条多行INSERT
+- created_at在记录时生成(UTC)，不受写入延迟影响
+- 应用关闭时停止后台任务并写完剩余记录
+
+数据库不可用时:
+- 配置了 LOG_SINK_SPOOL_PATH 时，本批记录以JSON行追加到本地文件，数据库恢复后的下一次写入前重放并清空
+- 重放与本批写入相互独立，重放失败不影响新记录写入；无法解析的行(如崩溃时写了一半)记录错误后
+  移入 <LOG_SINK_SPOOL_PATH>.bad，其余行照常重放
+- 未配置时记录放回缓冲区等待下次写入；缓冲区超过 LOG_SINK_MAX_BUFFER 条时丢弃最早的记录并计数
+
+说明:
+- 进程被强制终止时，尚未写入的记录(最多约一个写入周期)会丢失，日志仅用于审计与统计，可接受
+- 需在单个事件循环中使用
+
+配置项(环境变量):
+- LOG_SINK_BATCH_SIZE: 触发写入的记录数，默认1000
+- LOG_SINK_FLUSH_MS: 最长写入间隔(毫秒)，默认200
+- LOG_SINK_MAX_BUFFER: 缓冲区记录数上限，默认100000
+- LOG_SINK_SPOOL_PATH: 数据库不可用时的本地追加文件路径，默认为空(不落盘)
+"""
+import os
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert
+from backend.database.models import EnergyLog, ExperienceLog, get_model
+from backend.utils.utcTime import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+class LogSink:
+    """日志写后缓冲"""
+
+    def __init__(self, db_operator=None, batch_size: int = None, flush_interval: float = None,
+                 max_buffer: int = None, spool_path: Optional[str] = None):
+        """
+        参数:
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - batch_size: 触发写入的记录数
+        - flush_interval: 最长写入间隔(秒)
+        - max_buffer: 缓冲区记录数上限
+        - spool_path: 数据库不可用时的本地追加文件路径
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.db_operator = db_operator
+        self.batch_size = batch_size if batch_size is not None else int(os.getenv('LOG_SINK_BATCH_SIZE', '1000'))
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            int(os.getenv('LOG_SINK_FLUSH_MS', '200')) / 1000
+        self.max_buffer = max_buffer if max_buffer is not None else int(os.getenv('LOG_SINK_MAX_BUFFER', '100000'))
+        self.spool_path = spool_path
+        self._buffers: dict = {}
+        self._count = 0
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushed = 0
+        self.flushes = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "LogSink":
+        """根据环境变量创建"""
+        return cls(spool_path=os.getenv('LOG_SINK_SPOOL_PATH') or None)
+
+    # ---------- 记录 ----------
+
+    def add(self, model, **row) -> None:
+        """
+        缓冲一条日志记录(不等待写入)
+
+        参数:
+        - model: 模型类或表名
+        - row: 列值，未提供created_at时使用当前UTC时间
+        """
+        if 'created_at' not in row:
+            row['created_at'] = utcnow()
+        self._buffers.setdefault(get_model(model), []).append(row)
+        self._count += 1
+        if self._count > self.max_buffer:
+            self._drop(self._count - self.max_buffer)
+        if self._count >= self.batch_size:
+            self._wakeup.set()
+
+    def log_energy(self, user_id: str, change_value: int, current_value: int, action_type: str,
+                   related_id: Optional[str] = None) -> None:
+        """缓冲一条体力日志"""
+        self.add(EnergyLog, user_id=user_id, change_value=change_value, current_value=current_value,
+                 action_type=action_type, related_id=related_id)
+
+    def log_experience(self, user_id: str, experience_change: int, current_experience: int,
+                       source_type: str, source_id: Optional[str] = None,
+                       description: Optional[str] = None) -> None:
+        """缓冲一条资历日志"""
+        self.add(ExperienceLog, id=str(uuid.uuid4()), user_id=user_id, experience_change=experience_change,
+                 current_experience=current_experience, source_type=source_type,
+                 source_id=source_id, description=description)
+
+    def _drop(self, count: int) -> None:
+        """丢弃最早的记录(按表依次丢弃，各表内按时间顺序)"""
+        for rows in self._buffers.values():
+            removed = min(count, len(rows))
+            del rows[:removed]
+            count -= removed
+            self._count -= removed
+            self.dropped += removed
+            if not count:
+                break
+
+    # ---------- 写入 ----------
+
+    async def _insert(self, batches: dict) -> None:
+        """
+        在一个事务内写入各表记录
+
+        每batch_size条执行一条多行INSERT(积压时限制单条语句大小)，使用Core表级插入跳过ORM逐行处理
+        """
+        async with self.db_operator.session() as session:
+            for model, rows in batches.items():
+                for start in range(0, len(rows), self.batch_size):
+                    await session.execute(insert(model.__table__), rows[start:start + self.batch_size])
+
+    async def flush(self) -> int:
+        """
+        写入当前缓冲的全部记录
+
+        返回值:
+        - 写入数据库的记录数(含重放的本地文件记录)
+        """
+        async with self._lock:
+            written = 0
+            try:
+                written += await self._replay_spool()
+            except Exception as e:
+                # 本地文件保留，下次写入时再重放
+                self.errors += 1
+                logger.error(f"本地日志文件重放失败: {e}")
+            batches, self._buffers, self._count = self._buffers, {}, 0
+            total = sum(len(rows) for rows in batches.values())
+            if not total:
+                return written
+            try:
+                await self._insert(batches)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"日志批量写入失败({total}条): {e}")
+                self._requeue_or_spool(batches)
+                return written
+            self.flushed += total
+            self.flushes += 1
+            return written + total
+
+    def _requeue_or_spool(self, batches: dict) -> None:
+        """写入失败的记录追加到本地文件，未配置时放回缓冲区头部"""
+        if self.spool_path:
+            try:
+                with open(self.spool_path, 'a', encoding='utf-8') as spool:
+                    for model, rows in batches.items():
+                        for row in rows:
+                            spool.write(json.dumps({"table": model.__tablename__, "row": row},
+                                                   ensure_ascii=False, default=datetime.isoformat) + "\n")
+                self.spooled += sum(len(rows) for rows in batches.values())
+                return
+            except OSError as e:
+                logger.error(f"日志本地落盘失败: {e}")
+        for model, rows in batches.items():
+            self._buffers[model] = rows + self._buffers.get(model, [])
+            self._count += len(rows)
+        if self._count > self.max_buffer:
+            self._drop(self._count - self.max_buffer)
+
+    def _parse_spool(self) -> dict:
+        """读取本地文件，无法解析的行移入.bad文件"""
+        batches: dict = {}
+        bad = []
+        with open(self.spool_path, encoding='utf-8', errors='replace') as spool:
+            for number, line in enumerate(spool, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    row = record["row"]
+                    if row.get('created_at'):
+                        row['created_at'] = datetime.fromisoformat(row['created_at'])
+                    model = get_model(record["table"])
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    self.errors += 1
+                    logger.error(f"本地日志文件第{number}行无法解析，已移入.bad文件: {e!r}")
+                    bad.append(line if line.endswith("\n") else line + "\n")
+                    continue
+                batches.setdefault(model, []).append(row)
+        if bad:
+            with open(self.spool_path + '.bad', 'a', encoding='utf-8') as f:
+                f.writelines(bad)
+        return batches
+
+    async def _replay_spool(self) -> int:
+        """重放本地文件中的记录，成功后删除文件"""
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return 0
+        batches = self._parse_spool()
+        count = sum(len(rows) for rows in batches.values())
+        if count:
+            await self._insert(batches)
+        os.remove(self.spool_path)
+        self.replayed += count
+        if count:
+            logger.info(f"已重放本地日志文件: {count} 条")
+        return count
+
+    # ---------- 后台任务 ----------
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """启动后台写入任务(需在事件循环中调用)"""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写完剩余记录(不取消任务，避免中断进行中的写入)"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        """缓冲统计"""
+        return {
+            "buffered": self._count,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
+
+
+# 全局日志缓冲(由应用生命周期启动与停止)
+log_sink = LogSink.from_env()
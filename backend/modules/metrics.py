@@ -0,0 +1,208 @@
+"""
+请求指标模块
+============
+
+替代原先逐请求print的日志中间件，提供:
+- RequestMetricsMiddleware: 纯ASGI中间件，按路由模板记录延迟直方图与状态码计数
+- 结构化访问日志: 经QueueHandler异步写出，按比例采样，5xx请求始终记录
+- /_metrics: 以Prometheus文本格式输出分位数延迟、请求计数、已注册缓存的命中统计及已注册的计数器
+
+配置项(环境变量):
+- ACCESS_LOG_SAMPLE_RATE: 访问日志采样率(0-1)，默认1.0
+- METRICS_TOKEN: 设置后访问 /_metrics 需携带 Authorization: Bearer {METRICS_TOKEN}
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from typing import Callable
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+from backend.utils.latencyHistogram import LatencyHistogram
+
+router = APIRouter(tags=["metrics"])
+
+# 输出的分位数
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+# 未匹配到路由的请求统一归类，避免标签基数失控
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsRegistry:
+    """进程内指标注册表"""
+
+    def __init__(self):
+        self.histograms: dict[tuple, LatencyHistogram] = {}
+        self.status_counts: dict[tuple, int] = {}
+        self.caches = []
+        self.counters = []
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float) -> None:
+        """记录一次请求"""
+        key = (method, route)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(seconds)
+        status_key = (method, route, status_code)
+        self.status_counts[status_key] = self.status_counts.get(status_key, 0) + 1
+
+    def register_cache(self, cache) -> None:
+        """注册需要导出命中统计的缓存(需提供stats()方法)"""
+        self.caches.append(cache)
+
+    def register_counter(self, name: str, description: str, read: Callable[[], int]) -> None:
+        """注册计数器(导出时调用read()取当前值)"""
+        self.counters.append((name, description, read))
+
+    def reset(self) -> None:
+        """清空请求指标"""
+        self.histograms.clear()
+        self.status_counts.clear()
+
+    def render_prometheus(self) -> str:
+        """渲染Prometheus文本格式"""
+        lines = [
+            "# HELP hbm_http_request_duration_seconds 请求延迟分位数",
+            "# TYPE hbm_http_request_duration_seconds summary"
+        ]
+        for (method, route), histogram in sorted(self.histograms.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for quantile, value in histogram.percentiles(QUANTILES).items():
+                lines.append(f'hbm_http_request_duration_seconds{{{labels},quantile="{quantile}"}} {value:.6f}')
+            lines.append(f"hbm_http_request_duration_seconds_sum{{{labels}}} {histogram.sum_seconds:.6f}")
+            lines.append(f"hbm_http_request_duration_seconds_count{{{labels}}} {histogram.total}")
+
+        lines += [
+            "# HELP hbm_http_requests_total 请求计数",
+            "# TYPE hbm_http_requests_total counter"
+        ]
+        for (method, route, status_code), count in sorted(self.status_counts.items()):
+            lines.append(
+                f'hbm_http_requests_total{{method="{method}",route="{_escape(route)}",status="{status_code}"}} {count}'
+            )
+
+        if self.caches:
+            lines += [
+                "# HELP hbm_cache_requests_total 缓存访问计数",
+                "# TYPE hbm_cache_requests_total counter"
+            ]
+            for cache in self.caches:
+                stats = cache.stats()
+                name = _escape(stats["name"])
+                lines.append(f'hbm_cache_requests_total{{cache="{name}",result="hit"}} {stats["hits"]}')
+                lines.append(f'hbm_cache_requests_total{{cache="{name}",result="miss"}} {stats["misses"]}')
+            lines += ["# HELP hbm_cache_size 缓存条目数", "# TYPE hbm_cache_size gauge"]
+            for cache in self.caches:
+                stats = cache.stats()
+                lines.append(f'hbm_cache_size{{cache="{_escape(stats["name"])}"}} {stats["size"]}')
+        for name, description, read in self.counters:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} counter", f"{name} {read()}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    """转义Prometheus标签值"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _route_template(scope) -> str:
+    """
+    获取请求匹配的完整路由模板
+
+    嵌套路由中scope["route"].path可能只是子路由内的相对路径(如"/check")，
+    此时用请求路径中对应层级的前缀补全(如"/api/auth/check")。
+    """
+    route_path = getattr(scope.get("route"), "path", None)
+    if not route_path:
+        return UNMATCHED_ROUTE
+    parts = scope["path"].split("/")
+    depth = route_path.count("/")
+    if len(parts) <= depth:
+        return route_path
+    return "/".join(parts[:len(parts) - depth]) + route_path
+
+
+def _create_access_logger() -> logging.Logger:
+    """创建经队列异步写出的访问日志记录器"""
+    access_logger = logging.getLogger("hbm.access")
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+    if not access_logger.handlers:
+        log_queue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+        listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        access_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return access_logger
+
+
+class RequestMetricsMiddleware:
+    """请求指标与访问日志中间件(纯ASGI实现，无BaseHTTPMiddleware开销)"""
+
+    def __init__(self, app, registry: MetricsRegistry = None, sample_rate: float = None):
+        self.app = app
+        self.registry = registry or metrics_registry
+        if sample_rate is None:
+            sample_rate = float(os.getenv('ACCESS_LOG_SAMPLE_RATE', '1.0'))
+        self.sample_rate = sample_rate
+        self.access_logger = _create_access_logger()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route_path = _route_template(scope)
+            status_code = status_holder[0]
+            self.registry.observe(scope["method"], route_path, status_code, elapsed)
+            if status_code >= 500 or random.random() < self.sample_rate:
+                self.access_logger.info(json.dumps({
+                    "ts": round(time.time(), 3),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route_path,
+                    "status": status_code,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "client": scope["client"][0] if scope.get("client") else None
+                }, ensure_ascii=False))
+
+
+# 全局指标注册表
+metrics_registry = MetricsRegistry()
+
+
+@router.get("/_metrics", response_class=PlainTextResponse)
+async def export_metrics(request: Request):
+    """
+    导出Prometheus格式指标
+
+    安全说明:
+    - 设置METRICS_TOKEN后需携带对应Bearer令牌
+    """
+    metrics_token = os.getenv('METRICS_TOKEN')
+    if metrics_token and request.headers.get("Authorization") != f"Bearer {metrics_token}":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权访问指标")
+    return PlainTextResponse(
+        metrics_registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
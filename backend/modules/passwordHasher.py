@@ -0,0 +1,143 @@
+"""
+密码哈希服务模块
+================
+
+将bcrypt哈希/校验从事件循环中移出，放入有界线程池执行。
+
+功能说明：
+- hash: 异步计算密码哈希
+- verify_and_update: 异步校验密码，哈希成本过期时返回新哈希(登录时透明重哈希)
+- 排队深度超过上限时抛出 HasherBusyError，由路由转换为429
+
+配置项(环境变量)：
+- BCRYPT_ROUNDS: bcrypt成本因子，默认12；设为"auto"时按 BCRYPT_TARGET_MS 自动校准
+- BCRYPT_TARGET_MS: 自动校准时单次哈希的目标耗时(毫秒)，默认250
+- PWD_HASH_WORKERS: 工作线程数，默认为CPU核数
+- PWD_HASH_MAX_PENDING: 允许排队+执行中的最大任务数，默认 workers*8
+
+说明：
+- bcrypt在C实现中会释放GIL，因此线程池即可获得多核并行，无需进程池的序列化开销
+"""
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BCRYPT_ROUNDS = 12
+MIN_BCRYPT_ROUNDS = 4
+MAX_BCRYPT_ROUNDS = 16
+
+
+class HasherBusyError(Exception):
+    """哈希任务队列已满"""
+
+
+def calibrate_rounds(target_ms: float = 250) -> int:
+    """
+    校准bcrypt成本因子
+
+    从最小成本开始逐级测量，返回耗时不超过 target_ms 的最大成本。
+    成本每加1耗时翻倍，因此只需测量到超过目标即可。
+    """
+    context = CryptContext(schemes=["bcrypt"])
+    rounds = MIN_BCRYPT_ROUNDS
+    while rounds < MAX_BCRYPT_ROUNDS:
+        start = time.perf_counter()
+        context.hash("calibration", rounds=rounds + 1)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > target_ms:
+            break
+        rounds += 1
+    return rounds
+
+
+def _rounds_from_env() -> int:
+    """从环境变量读取bcrypt成本因子"""
+    value = os.getenv('BCRYPT_ROUNDS', str(DEFAULT_BCRYPT_ROUNDS))
+    if value.lower() == 'auto':
+        rounds = calibrate_rounds(float(os.getenv('BCRYPT_TARGET_MS', '250')))
+        logger.info(f"bcrypt成本因子自动校准为: {rounds}")
+        return rounds
+    return int(value)
+
+
+class PasswordHasher:
+    """基于有界线程池的异步密码哈希服务"""
+
+    def __init__(self, rounds: int = DEFAULT_BCRYPT_ROUNDS,
+                 max_workers: Optional[int] = None,
+                 max_pending: Optional[int] = None):
+        """
+        初始化哈希服务
+
+        参数:
+        - rounds: bcrypt成本因子，低于该成本的已存哈希会在登录时重哈希
+        - max_workers: 工作线程数
+        - max_pending: 排队+执行中任务上限，超过即拒绝
+        """
+        self.rounds = rounds
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 8
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="pwd-hash"
+        )
+        # 仅在事件循环线程中增减，无需加锁
+        self.pending = 0
+        self.rejected = 0
+
+    async def _submit(self, func, *args):
+        """提交任务到线程池，超过排队上限时立即拒绝"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusyError("密码哈希任务繁忙")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """计算密码哈希"""
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """校验密码"""
+        return await self._submit(self.context.verify, password, password_hash)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """
+        校验密码并在需要时重哈希
+
+        返回值:
+        - (是否通过, 新哈希或None)，仅当校验通过且原哈希成本过期时返回新哈希
+        """
+        return await self._submit(self.context.verify_and_update, password, password_hash)
+
+    def needs_update(self, password_hash: str) -> bool:
+        """判断已存哈希是否使用了过期的成本因子"""
+        return self.context.needs_update(password_hash)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭线程池"""
+        self._executor.shutdown(wait=wait)
+
+
+# 全局密码哈希服务实例
+password_hasher = PasswordHasher(
+    rounds=_rounds_from_env(),
+    max_workers=int(os.getenv('PWD_HASH_WORKERS', '0')) or None,
+    max_pending=int(os.getenv('PWD_HASH_MAX_PENDING', '0')) or None
+)
@@ -0,0 +1,287 @@
+"""
+请求限流模块
+============
+
+按GCRA(通用信元速率算法，令牌桶的等价形式)限制每个IP/用户在各接口上的请求速率，
+作为FastAPI依赖挂在需要保护的路由上，超限返回429与Retry-After。
+
+算法:
+- 规则 limit/period: period秒内最多limit次，允许一次性突发limit次
+- 每个键只保存一个"理论到达时间"(TAT)；请求到达时 TAT' = max(TAT, now) + period/limit，
+  TAT' - now <= period 则放行并保存TAT'，否则拒绝，Retry-After = TAT' - now - period
+
+存储实现:
+- InMemoryRateLimiter: 进程内分片字典，每次检查O(1)；TAT早于当前时刻的键视为不存在，
+  每 SWEEP_EVERY 次检查清理一个分片中的过期键(惰性过期，单次清理量受分片大小限制)
+- RedisRateLimiter: Redis协议存储，多个worker共享计数；WATCH/MULTI保证读改写原子，键带过期时间
+
+存储不可用(如Redis连接失败、超时)时:
+- 默认放行请求并记录错误(fail open)，Redis故障不会使登录、注册等接口返回500
+- RATE_LIMIT_FAIL_OPEN=0 时改为拒绝请求，返回503
+
+规则(环境变量覆盖，格式 "次数/秒数"):
+- RATE_LIMIT_LOGIN: 登录，每IP，默认 20/60
+- RATE_LIMIT_LOGIN_USER: 登录，每用户名，默认 10/300
+- RATE_LIMIT_REGISTER: 注册，每IP，默认 5/3600
+- RATE_LIMIT_RESET_PASSWORD: 重置密码，每IP，默认 5/3600
+
+配置项(环境变量):
+- RATE_LIMIT_BACKEND: memory|redis，默认memory
+- RATE_LIMIT_SHARDS: 内存存储分片数，默认16
+- REDIS_URLS: Redis节点列表(逗号分隔)，限流使用第一个节点
+- RATE_LIMIT_TRUST_PROXY: 为1时使用nginx设置的X-Real-IP作为客户端IP，默认0
+- RATE_LIMIT_ENABLED: 为0时关闭限流，默认1
+- RATE_LIMIT_FAIL_OPEN: 存储不可用时是否放行，默认1
+"""
+import os
+import math
+import time
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "hbm:ratelimit:"
+# 内存存储每隔多少次检查清理一个分片
+SWEEP_EVERY = 1024
+# Redis乐观事务冲突的最大重试次数
+MAX_WATCH_RETRIES = 5
+
+
+@dataclass(frozen=True, slots=True)
+class RateRule:
+    """限流规则: period秒内最多limit次"""
+    name: str
+    limit: int
+    period: float
+
+    @property
+    def interval(self) -> float:
+        """每次请求占用的时间(秒)"""
+        return self.period / self.limit
+
+    @classmethod
+    def from_env(cls, name: str, env: str, default: str) -> "RateRule":
+        """根据环境变量("次数/秒数")创建"""
+        limit, period = os.getenv(env, default).split('/')
+        return cls(name, int(limit), float(period))
+
+
+class RateLimiterUnavailable(Exception):
+    """限流存储不可用"""
+
+
+class RateLimiter(ABC):
+    """限流存储接口"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+
+    @abstractmethod
+    async def check(self, rule: RateRule, key: str) -> bool:
+        """
+        记录一次请求，未超限返回True
+
+        异常:
+        - RateLimiterUnavailable: 存储不可用
+        """
+
+    @abstractmethod
+    async def retry_after(self, rule: RateRule, key: str) -> float:
+        """
+        下一次请求可放行前需等待的秒数(不记录请求)
+
+        异常:
+        - RateLimiterUnavailable: 存储不可用
+        """
+
+    async def close(self) -> None:
+        """释放资源"""
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """进程内限流存储(单worker/测试)"""
+
+    def __init__(self, shard_count: int = None, clock: Callable[[], float] = time.time):
+        super().__init__(clock)
+        shard_count = shard_count if shard_count is not None else int(os.getenv('RATE_LIMIT_SHARDS', '16'))
+        self.shards = [dict() for _ in range(shard_count)]
+        self._checks = 0
+        self._sweep_shard = 0
+
+    def _shard(self, key: str) -> dict:
+        return self.shards[hash(key) % len(self.shards)]
+
+    async def check(self, rule, key):
+        key = f"{rule.name}:{key}"
+        shard = self._shard(key)
+        now = self.clock()
+        tat = shard.get(key, now)
+        if tat < now:
+            tat = now
+        new_tat = tat + rule.interval
+        self._checks += 1
+        if self._checks % SWEEP_EVERY == 0:
+            self._sweep(now)
+        if new_tat - now > rule.period:
+            return False
+        shard[key] = new_tat
+        return True
+
+    async def retry_after(self, rule, key):
+        key = f"{rule.name}:{key}"
+        now = self.clock()
+        tat = max(self._shard(key).get(key, now), now)
+        return max(tat + rule.interval - now - rule.period, 0.0)
+
+    def _sweep(self, now: float) -> None:
+        """清理一个分片中TAT已过的键(这些键的桶已满，删除与保留等价)"""
+        shard = self.shards[self._sweep_shard]
+        self._sweep_shard = (self._sweep_shard + 1) % len(self.shards)
+        expired = [key for key, tat in shard.items() if tat <= now]
+        for key in expired:
+            del shard[key]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+
+class RedisRateLimiter(RateLimiter):
+    """Redis协议限流存储"""
+
+    def __init__(self, client, key_prefix: str = REDIS_KEY_PREFIX, clock: Callable[[], float] = time.time):
+        """
+        参数:
+        - client: redis.asyncio客户端(decode_responses=True)
+        - key_prefix: 键名前缀
+        - clock: 时钟(各worker使用本机时间，需保持时钟同步)
+        """
+        super().__init__(clock)
+        self.client = client
+        self.key_prefix = key_prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs):
+        """根据Redis连接串创建"""
+        import redis.asyncio as redis
+        return cls(redis.from_url(url, decode_responses=True), **kwargs)
+
+    def _key(self, rule: RateRule, key: str) -> str:
+        return f"{self.key_prefix}{rule.name}:{key}"
+
+    async def check(self, rule, key):
+        from redis.exceptions import RedisError
+        try:
+            return await self._check(rule, key)
+        except RedisError as e:
+            raise RateLimiterUnavailable(str(e)) from e
+
+    async def _check(self, rule, key):
+        from redis.exceptions import WatchError
+        redis_key = self._key(rule, key)
+        for _ in range(MAX_WATCH_RETRIES):
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(redis_key)
+                    stored = await pipe.get(redis_key)
+                    now = self.clock()
+                    new_tat = max(float(stored) if stored else now, now) + rule.interval
+                    if new_tat - now > rule.period:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.set(redis_key, repr(new_tat), px=max(math.ceil((new_tat - now) * 1000), 1))
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+        # 同一键持续冲突说明并发请求极多，按超限处理
+        logger.warning(f"限流键更新冲突次数过多: {redis_key}")
+        return False
+
+    async def retry_after(self, rule, key):
+        from redis.exceptions import RedisError
+        try:
+            stored = await self.client.get(self._key(rule, key))
+        except RedisError as e:
+            raise RateLimiterUnavailable(str(e)) from e
+        now = self.clock()
+        tat = max(float(stored) if stored else now, now)
+        return max(tat + rule.interval - now - rule.period, 0.0)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_rate_limiter() -> RateLimiter:
+    """根据环境变量创建限流存储"""
+    if os.getenv('RATE_LIMIT_BACKEND', 'memory') == 'redis':
+        url = os.getenv('REDIS_URLS', 'redis://redis:6379/0').split(',')[0].strip()
+        return RedisRateLimiter.from_url(url)
+    return InMemoryRateLimiter()
+
+
+LOGIN = RateRule.from_env('login', 'RATE_LIMIT_LOGIN', '20/60')
+LOGIN_USER = RateRule.from_env('login_user', 'RATE_LIMIT_LOGIN_USER', '10/300')
+REGISTER = RateRule.from_env('register', 'RATE_LIMIT_REGISTER', '5/3600')
+RESET_PASSWORD = RateRule.from_env('reset_password', 'RATE_LIMIT_RESET_PASSWORD', '5/3600')
+
+TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', '0') == '1'
+ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+FAIL_OPEN = os.getenv('RATE_LIMIT_FAIL_OPEN', '1') == '1'
+
+# 全局限流存储
+rate_limiter = create_rate_limiter()
+
+
+def client_ip(request: Request) -> str:
+    """客户端IP(信任代理时取nginx设置的X-Real-IP)"""
+    if TRUST_PROXY:
+        real_ip = request.headers.get('X-Real-IP')
+        if real_ip:
+            return real_ip
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce(rule: RateRule, key: str) -> None:
+    """
+    记录一次请求，超限时抛出429
+
+    异常:
+    - HTTPException 429: 超过限流规则，Retry-After为需等待的秒数(向上取整，至少1)
+    - HTTPException 503: 限流存储不可用且未配置放行
+    """
+    if not ENABLED:
+        return
+    try:
+        if await rate_limiter.check(rule, key):
+            return
+        retry_after = await rate_limiter.retry_after(rule, key)
+    except RateLimiterUnavailable as e:
+        logger.error(f"限流存储不可用({rule.name})，{'放行' if FAIL_OPEN else '拒绝'}请求: {e}")
+        if FAIL_OPEN:
+            return
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="服务暂不可用，请稍后重试")
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="请求过于频繁，请稍后重试",
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))}
+    )
+
+
+def limit_by_ip(rule: RateRule):
+    """按客户端IP限流的路由依赖"""
+    async def dependency(request: Request):
+        await enforce(rule, client_ip(request))
+    return Depends(dependency)
+
+
+def limit_by_username(rule: RateRule):
+    """按登录表单用户名限流的路由依赖(与接口共用同一份表单解析结果)"""
+    async def dependency(form_data: OAuth2PasswordRequestForm = Depends()):
+        await enforce(rule, form_data.username)
+    return Depends(dependency)
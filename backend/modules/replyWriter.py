@@ -0,0 +1,265 @@
+"""
+回复写入模块
+============
+
+热门空间中大量玩家同时回复时，逐条 SELECT MAX(floor_num) 再插入要么在唯一索引
+uq_space_floor(space_id, floor_num) 上冲突重试，要么以 FOR UPDATE 串行化。本模块将楼层号分配与
+回复插入拆开:
+
+FloorAllocator(楼层号分配):
+- 每个worker按空间从spaces.floor_reserved一次预分配一块楼层号(默认64个)，块内分配只在内存中递增
+- 预分配为一条原子UPDATE: floor_reserved = max(floor_reserved, 该空间已有最大楼层号) + 块大小，
+  各worker的块互不重叠；同一空间同一时刻只有一个协程执行预分配
+- 楼层号保证唯一，但允许空号(worker重启时未用完的块作废)；多个worker交替分配时楼层顺序与提交顺序大致一致
+
+ReplyWriter(批量插入):
+- post()分配楼层号后将回复放入待写队列并等待，队列达到 REPLY_BATCH_SIZE 条或等待满 REPLY_BATCH_MS 毫秒时
+  在一个事务内以一条多行INSERT写入，写入完成后所有等待的post()一并返回(组提交)
+- 整批因唯一约束失败时逐条重试；只有冲突在 uq_space_floor 上(楼层号被本模块以外的写入占用)的回复
+  作废当前块、重新分配楼层号，其他约束错误(如回复ID重复)直接失败
+- 回复写入后计为一次空间交互(空间热度见spaceHeat模块)
+
+配置项(环境变量):
+- FLOOR_BLOCK_SIZE: 每次预分配的楼层号数量，默认64
+- REPLY_BATCH_SIZE: 单批插入的最大回复数，默认256
+- REPLY_BATCH_MS: 组提交的最长等待时间(毫秒)，默认5
+"""
+import os
+import uuid
+import asyncio
+import logging
+from typing import List, Optional
+from sqlalchemy import select, update, insert, func, case
+from sqlalchemy.exc import IntegrityError
+from backend.database.models import Reply, Space
+
+logger = logging.getLogger(__name__)
+
+# 单条回复因楼层冲突重新分配的最大次数
+MAX_FLOOR_RETRIES = 3
+FLOOR_CONSTRAINT = "uq_space_floor"
+
+
+def is_floor_conflict(error: IntegrityError) -> bool:
+    """
+    判断唯一约束错误是否发生在楼层号上
+
+    MySQL的错误信息包含约束名(Duplicate entry ... for key 'replies.uq_space_floor')，
+    SQLite只列出列名(UNIQUE constraint failed: replies.space_id, replies.floor_num)
+    """
+    message = str(error.orig)
+    return FLOOR_CONSTRAINT in message or "replies.space_id, replies.floor_num" in message
+
+
+class FloorAllocator:
+    """按块预分配的楼层号分配器"""
+
+    def __init__(self, db_operator=None, block_size: int = None):
+        """
+        参数:
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - block_size: 每次预分配的楼层号数量
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.db_operator = db_operator
+        self.block_size = block_size if block_size is not None else int(os.getenv('FLOOR_BLOCK_SIZE', '64'))
+        # 空间ID -> [下一个可用楼层号, 块内最后一个楼层号]
+        self._blocks: dict = {}
+        self._locks: dict = {}
+        self.reservations = 0
+
+    async def allocate(self, space_id: str, count: int = 1) -> List[int]:
+        """
+        分配楼层号
+
+        返回值:
+        - count个递增的楼层号(跨块时可能不连续)
+
+        异常:
+        - ValueError: 空间不存在
+        """
+        floors: List[int] = []
+        while len(floors) < count:
+            block = self._blocks.get(space_id)
+            if block is None or block[0] > block[1]:
+                await self._reserve(space_id, count - len(floors))
+                continue
+            take = min(count - len(floors), block[1] - block[0] + 1)
+            floors.extend(range(block[0], block[0] + take))
+            block[0] += take
+        return floors
+
+    def invalidate(self, space_id: str) -> None:
+        """作废当前块(发现楼层号已被占用时调用)，下次分配重新预分配"""
+        self._blocks.pop(space_id, None)
+
+    async def _reserve(self, space_id: str, need: int) -> None:
+        """为空间预分配一块楼层号"""
+        lock = self._locks.setdefault(space_id, asyncio.Lock())
+        async with lock:
+            block = self._blocks.get(space_id)
+            if block is not None and block[0] <= block[1]:
+                # 等待期间已由其他协程预分配
+                return
+            size = max(self.block_size, need)
+            existing = select(func.coalesce(func.max(Reply.floor_num), 0)) \
+                .where(Reply.space_id == space_id).scalar_subquery()
+            async with self.db_operator.session() as session:
+                result = await session.execute(
+                    update(Space).where(Space.id == space_id)
+                    .values(floor_reserved=case((Space.floor_reserved >= existing, Space.floor_reserved),
+                                                else_=existing) + size,
+                            # 显式保持updated_at，楼层预分配不视为空间修改
+                            updated_at=Space.updated_at)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != 1:
+                    raise ValueError(f"空间不存在: {space_id}")
+                end = (await session.execute(
+                    select(Space.floor_reserved).where(Space.id == space_id)
+                )).scalar()
+            self._blocks[space_id] = [end - size + 1, end]
+            self.reservations += 1
+
+
+class ReplyWriter:
+    """回复批量写入(组提交)"""
+
+    def __init__(self, allocator: Optional[FloorAllocator] = None, db_operator=None,
+                 batch_size: int = None, batch_window: float = None, heat_engine=None):
+        """
+        参数:
+        - allocator: 楼层号分配器，默认使用同一db_operator新建
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - batch_size: 单批插入的最大回复数
+        - batch_window: 组提交的最长等待时间(秒)
+        - heat_engine: 空间热度引擎，默认全局space_heat
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.db_operator = db_operator
+        self.allocator = allocator or FloorAllocator(db_operator)
+        if heat_engine is None:
+            from backend.modules.spaceHeat import space_heat
+            heat_engine = space_heat
+        self.heat_engine = heat_engine
+        self.batch_size = batch_size if batch_size is not None else int(os.getenv('REPLY_BATCH_SIZE', '256'))
+        self.batch_window = batch_window if batch_window is not None else \
+            int(os.getenv('REPLY_BATCH_MS', '5')) / 1000
+        self._pending: list = []
+        self._full = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+        self.conflicts = 0
+
+    async def post(self, space_id: str, author_id: str, content: str,
+                   parent_id: Optional[str] = None) -> dict:
+        """
+        发表回复，写入数据库后返回
+
+        返回值:
+        - {"id", "space_id", "parent_id", "author_id", "content", "floor_num"}
+
+        异常:
+        - ValueError: 空间不存在
+        - 数据库异常: 所在批次写入失败
+        """
+        floor_num, = await self.allocator.allocate(space_id)
+        row = {"id": str(uuid.uuid4()), "space_id": space_id, "parent_id": parent_id,
+               "author_id": author_id, "content": content, "floor_num": floor_num}
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush_loop())
+        await future
+        self.heat_engine.record(space_id)
+        return row
+
+    async def _flush_loop(self):
+        while self._pending:
+            if len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.batch_window)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            await self._write(batch)
+
+    async def _write(self, batch: list) -> None:
+        """写入一批回复并通知等待者"""
+        try:
+            async with self.db_operator.session() as session:
+                await session.execute(insert(Reply.__table__), [row for row, _ in batch])
+        except IntegrityError:
+            self.conflicts += 1
+            logger.warning(f"回复批量写入楼层冲突，逐条重试({len(batch)}条)")
+            for row, future in batch:
+                await self._write_one(row, future)
+            return
+        except Exception as e:
+            logger.error(f"回复批量写入失败({len(batch)}条): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.written += len(batch)
+        self.batches += 1
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def _write_one(self, row: dict, future: asyncio.Future) -> None:
+        """逐条写入，楼层冲突时作废当前块并重新分配楼层号，其他错误直接失败"""
+        for attempt in range(MAX_FLOOR_RETRIES + 1):
+            try:
+                async with self.db_operator.session() as session:
+                    await session.execute(insert(Reply.__table__), [row])
+                self.written += 1
+                if not future.done():
+                    future.set_result(None)
+                return
+            except IntegrityError as e:
+                if attempt == MAX_FLOOR_RETRIES or not is_floor_conflict(e):
+                    error = e
+                    break
+                self.allocator.invalidate(row["space_id"])
+                try:
+                    row["floor_num"], = await self.allocator.allocate(row["space_id"])
+                except Exception as e:
+                    error = e
+                    break
+            except Exception as e:
+                error = e
+                break
+        logger.error(f"回复写入失败(空间{row['space_id']}): {error}")
+        if not future.done():
+            future.set_exception(error)
+
+    async def drain(self) -> None:
+        """等待已提交的回复全部写入(应用关闭时调用)"""
+        if self._flusher is not None:
+            self._full.set()
+            await self._flusher
+            self._flusher = None
+
+    def stats(self) -> dict:
+        """写入统计"""
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "batches": self.batches,
+            "conflicts": self.conflicts,
+            "reservations": self.allocator.reservations
+        }
+
+
+# 全局回复写入实例
+reply_writer = ReplyWriter()
@@ -0,0 +1,387 @@
+"""
+服务器配置模块
+==============
+
+启动时加载server_configs表全部配置，按data_type转换为Python类型后保存在进程内字典，
+热路径读取(如每次行动读取的权重系数)只做一次字典查找，不访问数据库。
+
+类型:
+- int / float / bool / string，bool接受 1/0、true/false、yes/no、on/off(不区分大小写)
+- 值无法按类型转换的行记录警告并忽略，读取时使用声明的默认值
+
+刷新:
+- 轮询: 每 SERVER_CONFIG_POLL_SECONDS 秒读取一次原始行(表只有数十行，一次查询与只读版本号开销相当，
+  且不受updated_at秒级精度影响)，内容变化时才重新转换并整体替换字典
+- 通知: SERVER_CONFIG_NOTIFY=redis 时订阅频道 hbm:server-config，set()写入后发布消息，
+  各worker收到后立即重新加载；轮询仍作为直接修改数据库时的兜底
+- 频道读取失败(如Redis断开)时关闭订阅，按指数退避(0.1秒起翻倍，不超过轮询间隔)等待后重新订阅，
+  重新订阅成功后立即轮询一次以补上断开期间错过的通知
+- 重新加载次数见stats()["reloads"]，并导出为指标 hbm_server_config_reloads_total
+
+声明:
+- define(key, data_type, default) 登记已知配置项，表中缺少该行或值无效时返回默认值
+
+配置项(环境变量):
+- SERVER_CONFIG_POLL_SECONDS: 轮询间隔(秒)，默认5
+- SERVER_CONFIG_NOTIFY: none|redis，默认none
+- REDIS_URLS: Redis节点列表(逗号分隔)，通知频道使用第一个节点
+"""
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from backend.database.models import ServerConfig
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "hbm:server-config"
+# 通知频道读取超时(秒)，超时后检查轮询与停止标记
+READ_TIMEOUT = 1.0
+# 通知频道读取失败后的初始退避(秒)，连续失败时翻倍
+MIN_BACKOFF = 0.1
+
+_TRUE = frozenset({"1", "true", "yes", "on"})
+_FALSE = frozenset({"0", "false", "no", "off"})
+
+
+def coerce(value: str, data_type: str) -> Any:
+    """
+    按data_type转换配置值
+
+    异常:
+    - ValueError: 值与类型不符或类型未知
+    """
+    if data_type == "int":
+        return int(value)
+    if data_type == "float":
+        return float(value)
+    if data_type == "bool":
+        lowered = value.strip().lower()
+        if lowered in _TRUE:
+            return True
+        if lowered in _FALSE:
+            return False
+        raise ValueError(f"无效的布尔值: {value!r}")
+    if data_type == "string":
+        return value
+    raise ValueError(f"未知的配置类型: {data_type!r}")
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigOption:
+    """已声明的配置项"""
+    key: str
+    data_type: str
+    default: Any
+    description: str = ""
+
+
+class ServerConfigRegistry:
+    """服务器配置注册表"""
+
+    def __init__(self, db_operator=None, redis_client=None, poll_interval: float = None,
+                 channel: str = NOTIFY_CHANNEL, read_timeout: float = READ_TIMEOUT,
+                 clock: Callable[[], float] = None):
+        """
+        参数:
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - redis_client: redis.asyncio客户端(decode_responses=True)，为None时只轮询
+        - poll_interval: 轮询间隔(秒)
+        - channel: 变更通知频道
+        - read_timeout: 通知频道读取超时(秒)
+        - clock: 单调时钟，默认事件循环时钟
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.db_operator = db_operator
+        self.redis = redis_client
+        self.poll_interval = poll_interval if poll_interval is not None else \
+            float(os.getenv('SERVER_CONFIG_POLL_SECONDS', '5'))
+        self.channel = channel
+        self.read_timeout = read_timeout
+        self.clock = clock
+        self.options: dict[str, ConfigOption] = {}
+        self._values: dict[str, Any] = {}
+        self._raw: Optional[tuple] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self.reloads = 0
+        self.polls = 0
+        self.notifications = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs):
+        """根据Redis连接串创建(启用变更通知)"""
+        import redis.asyncio as redis
+        return cls(redis_client=redis.from_url(url, decode_responses=True), **kwargs)
+
+    # ---------- 声明与读取 ----------
+
+    def define(self, key: str, data_type: str, default: Any, description: str = "") -> ConfigOption:
+        """声明配置项及其默认值(默认值按类型转换校验)"""
+        option = ConfigOption(key, data_type, coerce(str(default), data_type), description)
+        self.options[key] = option
+        return option
+
+    def get(self, key, default: Any = None) -> Any:
+        """
+        读取配置值(key可为键名或ConfigOption)
+
+        返回值:
+        - 表中的值；缺少或无效时依次为声明的默认值、参数default
+        """
+        if isinstance(key, ConfigOption):
+            return self._values.get(key.key, key.default)
+        value = self._values.get(key, self)
+        if value is self:
+            option = self.options.get(key)
+            return option.default if option is not None else default
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def snapshot(self) -> dict:
+        """当前全部配置(含未在表中出现的已声明项)"""
+        values = {key: option.default for key, option in self.options.items()}
+        values.update(self._values)
+        return values
+
+    # ---------- 加载与刷新 ----------
+
+    async def _read_rows(self, primary: bool = False) -> tuple:
+        """读取原始行；primary为True时读主库(收到变更通知时副本可能尚未同步)"""
+        query = select(ServerConfig.config_key, ServerConfig.config_value, ServerConfig.data_type) \
+            .order_by(ServerConfig.config_key)
+        session_factory = self.db_operator.session if primary else self.db_operator.read_session
+        async with session_factory() as session:
+            return tuple(tuple(row) for row in (await session.execute(query)).all())
+
+    def _apply(self, rows: tuple) -> None:
+        values = {}
+        for key, value, data_type in rows:
+            try:
+                values[key] = coerce(value, data_type)
+            except ValueError as e:
+                logger.warning(f"忽略无效的服务器配置 {key}: {e}")
+                continue
+            option = self.options.get(key)
+            if option is not None and option.data_type != data_type:
+                logger.warning(f"服务器配置 {key} 类型为{data_type}，声明为{option.data_type}")
+        # 整体替换，读取方不会看到部分更新的字典
+        self._values = values
+        self._raw = rows
+        self.reloads += 1
+
+    async def load(self, primary: bool = False) -> int:
+        """
+        重新加载全部配置
+
+        参数:
+        - primary: 是否从主库读取
+
+        返回值:
+        - 加载的有效配置数
+        """
+        async with self._lock:
+            self._apply(await self._read_rows(primary))
+            return len(self._values)
+
+    async def refresh(self) -> bool:
+        """
+        轮询一次，内容变化时重新加载
+
+        返回值:
+        - 是否重新加载
+        """
+        async with self._lock:
+            self.polls += 1
+            rows = await self._read_rows()
+            if rows == self._raw:
+                return False
+            self._apply(rows)
+            return True
+
+    async def set(self, key: str, value: Any, data_type: str = None, description: str = None) -> None:
+        """
+        写入配置并通知所有worker重新加载
+
+        参数:
+        - data_type: 数据类型，默认沿用声明类型或表中已有类型
+
+        异常:
+        - ValueError: 值与类型不符
+        """
+        option = self.options.get(key)
+        if data_type is None and option is not None:
+            data_type = option.data_type
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        value = str(value)
+        for attempt in range(2):
+            try:
+                await self._write(key, value, data_type, description, option)
+                break
+            except IntegrityError:
+                # 另一个set()同时插入了同一新项，重试时走UPDATE
+                if attempt:
+                    raise
+        await self.load(primary=True)
+        if self.redis is not None:
+            try:
+                await self.redis.publish(self.channel, key)
+            except Exception as e:
+                # 其他worker在下一次轮询时获取变更
+                logger.error(f"服务器配置变更通知失败: {e}")
+
+    async def _write(self, key: str, value: str, data_type: Optional[str], description: Optional[str],
+                     option: Optional[ConfigOption]) -> None:
+        """更新配置行，不存在时插入"""
+        async with self.db_operator.session() as session:
+            if data_type is None:
+                data_type = (await session.execute(
+                    select(ServerConfig.data_type).where(ServerConfig.config_key == key))).scalar()
+                if data_type is None:
+                    raise ValueError(f"未声明的配置项需指定类型: {key}")
+            coerce(value, data_type)
+            data = {"config_value": value, "data_type": data_type}
+            if description is not None:
+                data["description"] = description
+            result = await session.execute(update(ServerConfig).where(ServerConfig.config_key == key).values(**data))
+            if result.rowcount == 0:
+                if description is None and option is not None:
+                    data["description"] = option.description
+                session.add(ServerConfig(config_key=key, **data))
+
+    # ---------- 后台任务 ----------
+
+    def _now(self) -> float:
+        return self.clock() if self.clock is not None else asyncio.get_running_loop().time()
+
+    async def _wait_notification(self, pubsub, timeout: float) -> bool:
+        """等待变更通知，收到返回True"""
+        if pubsub is None:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            return False
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(timeout, self.read_timeout))
+        return message is not None
+
+    async def _subscribe(self):
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+        except BaseException:
+            await self._close_pubsub(pubsub)
+            raise
+        return pubsub
+
+    @staticmethod
+    async def _close_pubsub(pubsub) -> None:
+        try:
+            await pubsub.aclose()
+        except Exception as e:
+            logger.warning(f"关闭服务器配置通知订阅失败: {e}")
+
+    async def _backoff(self, delay: float) -> None:
+        """退避等待，stop()时立即返回"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        pubsub = None
+        backoff = 0.0
+        try:
+            next_poll = self._now() + self.poll_interval
+            while not self._stopping:
+                try:
+                    if self.redis is not None and pubsub is None:
+                        pubsub = await self._subscribe()
+                        if backoff:
+                            # 断开期间可能错过通知
+                            next_poll = self._now()
+                    notified = await self._wait_notification(pubsub, max(next_poll - self._now(), 0))
+                    backoff = 0.0
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"服务器配置变更通知读取失败: {e}")
+                    if pubsub is not None:
+                        await self._close_pubsub(pubsub)
+                        pubsub = None
+                    backoff = min(max(backoff * 2, MIN_BACKOFF), max(self.poll_interval, MIN_BACKOFF))
+                    await self._backoff(backoff)
+                    notified = False
+                try:
+                    if notified:
+                        self.notifications += 1
+                        await self.load(primary=True)
+                    elif self._now() >= next_poll:
+                        await self.refresh()
+                    else:
+                        continue
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"服务器配置刷新失败: {e}")
+                next_poll = self._now() + self.poll_interval
+        finally:
+            if pubsub is not None:
+                await self._close_pubsub(pubsub)
+
+    def start(self) -> None:
+        """启动后台刷新任务(需在事件循环中调用)"""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并释放连接"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    def stats(self) -> dict:
+        """注册表统计"""
+        return {
+            "configs": len(self._values),
+            "reloads": self.reloads,
+            "polls": self.polls,
+            "notifications": self.notifications,
+            "errors": self.errors
+        }
+
+
+def create_server_config() -> ServerConfigRegistry:
+    """根据环境变量创建配置注册表"""
+    if os.getenv('SERVER_CONFIG_NOTIFY', 'none') == 'redis':
+        url = os.getenv('REDIS_URLS', 'redis://redis:6379/0').split(',')[0].strip()
+        return ServerConfigRegistry.from_url(url)
+    return ServerConfigRegistry()
+
+
+# 全局配置注册表(由应用生命周期加载与启动)
+server_config = create_server_config()
+
+ENERGY_RECOVERY_RATE = server_config.define('energy_recovery_rate', 'int', 10, '体力恢复时间(分钟)')
+MAX_ENERGY = server_config.define('max_energy', 'int', 256, '最大体力值')
+ZERO_ENERGY_WEIGHT = server_config.define('zero_energy_weight', 'float', os.getenv('ZERO_ENERGY_WEIGHT', '0.5'),
+                                          '无体力成员的投票权重系数')
+TURN_SCORE = server_config.define('turn_score', 'int', 1, '每回合提交行动的成员获得的分数')
@@ -0,0 +1,314 @@
+"""
+空间事件推送模块
+================
+
+提供 GET /api/game/spaces/{space_id}/updates (Server-Sent Events)，向订阅同一空间的所有连接广播:
+- space_update: 空间状态，如 {"turns_left": 10}
+- participant_update: 参与者变化，如 {"action": "join", "user_id": "123"}
+
+扇出:
+- 每个空间只保留一份订阅(SpaceEventHub内的订阅者集合；Redis模式下每个worker每个空间订阅一个频道)
+- 事件只编码一次为SSE帧(bytes)，追加到各连接的有界队列，不按连接轮询数据库
+- 慢连接: space_update只保留最新一条(覆盖队列中未发送的旧值)；队列超过 SSE_QUEUE_SIZE 条时丢弃最早的事件并计数
+- 空闲连接只持有一个Subscription(__slots__)与一个待定的Future，每 SSE_KEEPALIVE_SECONDS 秒发送一次注释行保活
+
+跨worker投递:
+- memory: 事件直接投递到本进程的连接(单worker/测试)
+- redis: 事件发布到频道 hbm:space-events:<space_id>，各worker订阅本进程有连接的空间频道后投递；
+  空间最后一个连接断开后由读取任务退订
+
+配置项(环境变量):
+- SPACE_EVENTS_BACKEND: memory|redis，默认memory
+- REDIS_URLS: Redis节点列表(逗号分隔)，事件频道使用第一个节点
+- SSE_QUEUE_SIZE: 单个连接的待发送事件上限，默认16
+- SSE_KEEPALIVE_SECONDS: 保活间隔(秒)，默认15
+"""
+import os
+import json
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from backend.database.models import Space
+from backend.database.hbm_mysql_async import AsyncDBOperator
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "hbm:space-events:"
+# 只需保留最新值的事件
+COALESCED_EVENTS = frozenset({"space_update"})
+# Redis读取任务等待消息的超时(秒)，超时后检查退订与停止标记
+READ_TIMEOUT = 1.0
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def encode_event(event: str, data) -> bytes:
+    """编码一条SSE帧"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f"event: {event}\ndata: {payload}\n\n".encode()
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class Subscription:
+    """单个连接的有界事件队列"""
+    __slots__ = ('space_id', 'maxsize', 'dropped', '_pending', '_seq', '_waiter')
+
+    def __init__(self, space_id: str, maxsize: int):
+        self.space_id = space_id
+        self.maxsize = maxsize
+        self.dropped = 0
+        # 键为事件名(需合并的事件)或序号，空闲时为None以节省内存
+        self._pending: Optional[OrderedDict] = None
+        self._seq = 0
+        self._waiter: Optional[asyncio.Future] = None
+
+    def push(self, frame: bytes, key: Optional[str] = None) -> None:
+        """
+        追加一条SSE帧(不等待)
+
+        参数:
+        - key: 合并键，队列中同键的旧帧被替换(新帧排在末尾)
+        """
+        pending = self._pending
+        if pending is None:
+            pending = self._pending = OrderedDict()
+        if key is None:
+            key = self._seq
+            self._seq += 1
+        else:
+            pending.pop(key, None)
+        pending[key] = frame
+        if len(pending) > self.maxsize:
+            pending.popitem(last=False)
+            self.dropped += 1
+        if self._waiter is not None:
+            _wake(self._waiter)
+
+    async def get(self, timeout: float) -> List[bytes]:
+        """取出全部待发送的帧，队列为空时最多等待timeout秒(超时返回空列表)"""
+        if not self._pending:
+            loop = asyncio.get_running_loop()
+            waiter = self._waiter = loop.create_future()
+            # 直接等待Future并以定时回调超时，比asyncio.wait/wait_for少创建任务与回调，唤醒上万连接时开销更低
+            timer = loop.call_later(timeout, _wake, waiter)
+            try:
+                await waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+        pending, self._pending = self._pending, None
+        return list(pending.values()) if pending else []
+
+
+class SpaceEventHub:
+    """空间事件扇出中心"""
+
+    def __init__(self, redis_client=None, queue_size: int = None, channel_prefix: str = CHANNEL_PREFIX,
+                 read_timeout: float = READ_TIMEOUT):
+        """
+        参数:
+        - redis_client: redis.asyncio客户端(decode_responses=True)，为None时只在本进程内投递
+        - queue_size: 单个连接的待发送事件上限
+        - channel_prefix: Redis频道名前缀
+        - read_timeout: Redis读取任务等待消息的超时(秒)
+        """
+        self.redis = redis_client
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv('SSE_QUEUE_SIZE', '16'))
+        self.channel_prefix = channel_prefix
+        self.read_timeout = read_timeout
+        self._spaces: dict = {}
+        self._pubsub = None
+        self._subscribed: set = set()
+        self._lock = asyncio.Lock()
+        self._reader: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs):
+        """根据Redis连接串创建"""
+        import redis.asyncio as redis
+        return cls(redis.from_url(url, decode_responses=True), **kwargs)
+
+    # ---------- 订阅 ----------
+
+    async def subscribe(self, space_id: str) -> Subscription:
+        """为一个连接订阅空间事件"""
+        subscription = Subscription(space_id, self.queue_size)
+        self._spaces.setdefault(space_id, set()).add(subscription)
+        if self.redis is not None:
+            async with self._lock:
+                if space_id not in self._subscribed:
+                    if self._pubsub is None:
+                        self._pubsub = self.redis.pubsub()
+                    await self._pubsub.subscribe(self.channel_prefix + space_id)
+                    self._subscribed.add(space_id)
+            if self._reader is None or self._reader.done():
+                self._stopping = False
+                self._reader = asyncio.get_running_loop().create_task(self._read())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """连接断开时调用(Redis频道由读取任务稍后退订)"""
+        subscribers = self._spaces.get(subscription.space_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        self.dropped += subscription.dropped
+        if not subscribers:
+            del self._spaces[subscription.space_id]
+
+    def subscribers(self, space_id: str) -> int:
+        """空间在本进程的连接数"""
+        return len(self._spaces.get(space_id, ()))
+
+    # ---------- 发布与投递 ----------
+
+    async def publish(self, space_id: str, event: str, data) -> None:
+        """发布空间事件(Redis模式下经频道投递到所有worker，包括本进程)"""
+        self.published += 1
+        if self.redis is None:
+            self.deliver(space_id, event, data)
+        else:
+            await self.redis.publish(self.channel_prefix + space_id,
+                                     json.dumps({"event": event, "data": data}, ensure_ascii=False))
+
+    async def publish_space_update(self, space_id: str, **fields) -> None:
+        """发布空间状态(如turns_left)，慢连接只收到最新一条"""
+        await self.publish(space_id, "space_update", fields)
+
+    async def publish_participant(self, space_id: str, action: str, user_id: str) -> None:
+        """发布参与者变化(join/leave)"""
+        await self.publish(space_id, "participant_update", {"action": action, "user_id": user_id})
+
+    def deliver(self, space_id: str, event: str, data) -> int:
+        """
+        投递到本进程订阅该空间的连接
+
+        返回值:
+        - 投递的连接数
+        """
+        subscribers = self._spaces.get(space_id)
+        if not subscribers:
+            return 0
+        frame = encode_event(event, data)
+        key = event if event in COALESCED_EVENTS else None
+        for subscription in subscribers:
+            subscription.push(frame, key)
+        self.delivered += len(subscribers)
+        return len(subscribers)
+
+    # ---------- Redis读取任务 ----------
+
+    async def _read(self):
+        prefix_length = len(self.channel_prefix)
+        try:
+            while not self._stopping and self._subscribed:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=self.read_timeout)
+                if message is not None:
+                    try:
+                        payload = json.loads(message["data"])
+                        self.deliver(message["channel"][prefix_length:], payload["event"], payload["data"])
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning(f"无效的空间事件消息: {e}")
+                await self._reconcile()
+        except Exception as e:
+            logger.error(f"空间事件频道读取失败: {e}")
+            async with self._lock:
+                # 下一次subscribe()重新建立订阅
+                self._subscribed.clear()
+                self._pubsub = None
+
+    async def _reconcile(self) -> None:
+        """退订本进程已无连接的空间频道"""
+        stale = [space_id for space_id in self._subscribed if space_id not in self._spaces]
+        if not stale:
+            return
+        async with self._lock:
+            stale = [space_id for space_id in self._subscribed if space_id not in self._spaces]
+            if stale:
+                await self._pubsub.unsubscribe(*(self.channel_prefix + space_id for space_id in stale))
+                self._subscribed.difference_update(stale)
+
+    async def close(self) -> None:
+        """停止读取任务并释放连接"""
+        if self._reader is not None:
+            self._stopping = True
+            await self._reader
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscribed.clear()
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    def stats(self) -> dict:
+        """扇出统计"""
+        return {
+            "spaces": len(self._spaces),
+            "connections": sum(len(subscribers) for subscribers in self._spaces.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped + sum(subscription.dropped for subscribers in self._spaces.values()
+                                          for subscription in subscribers)
+        }
+
+
+def create_event_hub() -> SpaceEventHub:
+    """根据环境变量创建事件中心"""
+    if os.getenv('SPACE_EVENTS_BACKEND', 'memory') == 'redis':
+        url = os.getenv('REDIS_URLS', 'redis://redis:6379/0').split(',')[0].strip()
+        return SpaceEventHub.from_url(url)
+    return SpaceEventHub()
+
+
+async def event_stream(hub: SpaceEventHub, space_id: str, initial: Optional[bytes] = None,
+                       keepalive: float = None) -> AsyncIterator[bytes]:
+    """
+    SSE响应体: 订阅空间后先发送初始帧，之后发送订阅到的事件，空闲时发送保活注释
+
+    在响应开始时订阅、连接断开时(生成器被取消或关闭)退订，未开始发送的响应不会遗留订阅
+    """
+    keepalive = keepalive if keepalive is not None else float(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+    subscription = await hub.subscribe(space_id)
+    try:
+        yield initial or b": connected\n\n"
+        while True:
+            frames = await subscription.get(keepalive)
+            yield b"".join(frames) if frames else b": keepalive\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+# 全局事件中心(由应用生命周期关闭)
+space_events = create_event_hub()
+
+router = APIRouter(tags=["game"])
+
+
+@router.get("/spaces/{space_id}/updates")
+async def space_updates(space_id: str):
+    """
+    订阅空间状态(SSE)
+
+    连接建立时先发送一条space_update(当前turns_left与stability)，之后推送space_update与participant_update
+
+    异常:
+    - HTTPException 404: 空间不存在
+    """
+    space = await AsyncDBOperator.fetch_one(Space, ("turns_left", "stability"), id=space_id)
+    if space is None:
+        raise HTTPException(status_code=404, detail="空间不存在")
+    initial = encode_event("space_update", {"turns_left": space.turns_left, "stability": space.stability})
+    return StreamingResponse(event_stream(space_events, space_id, initial),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,451 @@
+"""
+空间热度与稳定度模块
+====================
+
+在内存中为每个空间维护两个按时间指数衰减的计数器，定期将本worker的增量批量写回spaces表:
+
+- 热度(heat): 每次用户交互累加权重(默认1)，半衰期 SPACE_HEAT_HALF_LIFE_HOURS
+- 稳定度(stability): 稳定/破坏行动调整，取值[0, 100]，半衰期 SPACE_STABILITY_HALF_LIFE_HOURS
+
+前向衰减:
+- 计数器保存 值 * exp(λ·(t - 基准时刻))，记录一次事件只需一次加法，不必衰减其他空间
+- 当前值 = 保存值 * exp(-λ·(t - 基准时刻))；所有空间乘同一系数，保存值的大小顺序即当前值的顺序
+- 指数超过 REBASE_EXPONENT 时整体折算到新的基准时刻，避免浮点溢出
+
+存储:
+- 空间ID映射到连续槽位，计数器保存在array('d')中，查询与写回时以NumPy零拷贝视图向量化计算
+- hottest()/coldest(): argpartition选出前N个，O(空间数)，100万空间约10毫秒(大量空间同为0热度时约数十毫秒)
+多worker写回:
+- 每个空间另记本worker自上次写回以来的未写回增量(热度加权次数、稳定度调整量)
+- flush(): 增量的整数部分以 heat = heat + ?、stability = 限制在[0, 100](stability + ?) 写回，
+  小数部分留待下次；各worker只写自己的增量，互不覆盖。按块以一条executemany UPDATE写入(保持updated_at不变)
+- decay(): 数据库中的值由一次衰减任务按上次衰减至今的时长整体衰减，写回同样为减量；
+  各worker经task_runs表中 space_heat_decay 行的条件更新抢占，每个周期只有一个worker执行。
+  整数值衰减使用随机舍入，期望值与连续衰减一致，小热度空间不会停滞也不会过快归零
+
+说明:
+- 启动时由warm()从spaces表加载当前热度与稳定度作为本worker的视图(hottest/coldest/heat/stability)，
+  其后只叠加本worker的事件；数据库中的值为各worker增量之和，是权威值
+- 加载之后新出现的空间在首次事件时加入，其稳定度在adjust_stability()之前视为未知
+- 需在单个事件循环中使用
+
+配置项(环境变量):
+- SPACE_HEAT_HALF_LIFE_HOURS: 热度半衰期(小时)，默认24
+- SPACE_STABILITY_HALF_LIFE_HOURS: 稳定度半衰期(小时)，默认168
+- SPACE_HEAT_FLUSH_SECONDS: 写回间隔(秒)，默认30
+- SPACE_HEAT_DECAY_SECONDS: 数据库衰减周期(秒)，默认3600，0表示禁用
+- SPACE_HEAT_CHUNK: 每条UPDATE语句的行数，默认5000
+"""
+import os
+import math
+import time
+import asyncio
+import logging
+from array import array
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select, update, bindparam, func, case, or_
+from sqlalchemy.exc import IntegrityError
+from backend.database.models import Space, TaskRun
+
+logger = logging.getLogger(__name__)
+
+MAX_STABILITY = 100
+DEFAULT_STABILITY = 100
+# 前向衰减指数超过该值时折算基准时刻
+REBASE_EXPONENT = 30.0
+LOAD_CHUNK = 20000
+# task_runs表中记录上次数据库衰减时刻的任务名
+DECAY_TASK = "space_heat_decay"
+
+_NAN = float('nan')
+
+
+class SpaceHeatEngine:
+    """空间热度与稳定度引擎"""
+
+    def __init__(self, db_operator=None, heat_half_life: float = None, stability_half_life: float = None,
+                 flush_interval: float = None, chunk_size: int = None, decay_interval: float = None,
+                 clock: Callable[[], float] = time.monotonic, wall_clock: Callable[[], float] = time.time,
+                 rng: np.random.Generator = None):
+        """
+        参数:
+        - db_operator: 异步数据库操作类，默认AsyncDBOperator
+        - heat_half_life: 热度半衰期(秒)
+        - stability_half_life: 稳定度半衰期(秒)
+        - flush_interval: 写回间隔(秒)
+        - chunk_size: 每条UPDATE语句的行数
+        - decay_interval: 数据库衰减周期(秒)，0表示禁用
+        - clock: 单调时钟(秒，测试与基准时可替换)
+        - wall_clock: 墙上时钟(秒)，数据库衰减时刻在各worker间共享
+        - rng: 衰减随机舍入使用的随机数生成器
+        """
+        if db_operator is None:
+            from backend.database.hbm_mysql_async import AsyncDBOperator
+            db_operator = AsyncDBOperator
+        self.db_operator = db_operator
+        heat_half_life = heat_half_life if heat_half_life is not None else \
+            float(os.getenv('SPACE_HEAT_HALF_LIFE_HOURS', '24')) * 3600
+        stability_half_life = stability_half_life if stability_half_life is not None else \
+            float(os.getenv('SPACE_STABILITY_HALF_LIFE_HOURS', '168')) * 3600
+        self.heat_rate = math.log(2) / heat_half_life
+        self.stability_rate = math.log(2) / stability_half_life
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            float(os.getenv('SPACE_HEAT_FLUSH_SECONDS', '30'))
+        self.chunk_size = chunk_size if chunk_size is not None else int(os.getenv('SPACE_HEAT_CHUNK', '5000'))
+        self.decay_interval = decay_interval if decay_interval is not None else \
+            float(os.getenv('SPACE_HEAT_DECAY_SECONDS', '3600'))
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.rng = rng or np.random.default_rng()
+        self._next_decay = 0.0
+        self._epoch = clock()
+        self._slots: dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        # 前向衰减后的保存值；空槽位的热度为NaN，未知稳定度为NaN
+        self._heat = array('d')
+        self._stability = array('d')
+        # 本worker尚未写回的增量
+        self._pending_heat = array('d')
+        self._pending_stability = array('d')
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.events = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.decays = 0
+        self.errors = 0
+
+    # ---------- 槽位 ----------
+
+    def _track(self, space_id: str, heat: float = 0.0, stability: float = _NAN) -> int:
+        """为空间分配槽位(当前值按当前时刻折算为保存值)"""
+        exponent = self.clock() - self._epoch
+        heat *= math.exp(self.heat_rate * exponent)
+        stability *= math.exp(self.stability_rate * exponent)
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = space_id
+            self._heat[slot], self._stability[slot] = heat, stability
+            self._pending_heat[slot] = self._pending_stability[slot] = 0.0
+        else:
+            slot = len(self._ids)
+            self._ids.append(space_id)
+            self._heat.append(heat)
+            self._stability.append(stability)
+            self._pending_heat.append(0.0)
+            self._pending_stability.append(0.0)
+        self._slots[space_id] = slot
+        return slot
+
+    def track(self, space_id: str, heat: float = 0.0, stability: float = DEFAULT_STABILITY) -> None:
+        """登记空间及其当前热度与稳定度(新建空间时调用；已登记时忽略)"""
+        if space_id not in self._slots:
+            self._track(space_id, heat, stability)
+
+    def forget(self, space_id: str) -> bool:
+        """移除空间(空间被清除后调用)，槽位留待复用"""
+        slot = self._slots.pop(space_id, None)
+        if slot is None:
+            return False
+        self._ids[slot] = None
+        self._heat[slot] = self._stability[slot] = _NAN
+        self._free.append(slot)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # ---------- 事件 ----------
+
+    def record(self, space_id: str, weight: float = 1.0) -> None:
+        """记录一次交互(热度加weight)"""
+        slot = self._slots.get(space_id)
+        if slot is None:
+            slot = self._track(space_id)
+        self._heat[slot] += weight * math.exp(self.heat_rate * (self.clock() - self._epoch))
+        self._pending_heat[slot] += weight
+        self.events += 1
+
+    def adjust_stability(self, space_id: str, delta: float) -> int:
+        """
+        调整稳定度(结果限制在[0, 100]；写回时在数据库中按同一规则限制)
+
+        返回值:
+        - 本worker视图中调整后的稳定度
+        """
+        slot = self._slots.get(space_id)
+        if slot is None:
+            slot = self._track(space_id)
+        scale = math.exp(self.stability_rate * (self.clock() - self._epoch))
+        current = self._stability[slot] / scale
+        if math.isnan(current):
+            current = DEFAULT_STABILITY
+        value = min(max(current + delta, 0.0), MAX_STABILITY)
+        self._stability[slot] = value * scale
+        self._pending_stability[slot] += delta
+        return int(value)
+
+    # ---------- 查询 ----------
+
+    def _current(self, saved: array, rate: float) -> np.ndarray:
+        """全部槽位的当前值(新数组，不持有saved的缓冲区)"""
+        return np.frombuffer(saved, dtype=np.float64) * math.exp(-rate * (self.clock() - self._epoch))
+
+    def heat(self, space_id: str) -> Optional[float]:
+        """当前热度，未登记时返回None"""
+        slot = self._slots.get(space_id)
+        if slot is None:
+            return None
+        return self._heat[slot] * math.exp(-self.heat_rate * (self.clock() - self._epoch))
+
+    def stability(self, space_id: str) -> Optional[float]:
+        """当前稳定度，未登记或未知时返回None"""
+        slot = self._slots.get(space_id)
+        if slot is None or math.isnan(self._stability[slot]):
+            return None
+        return self._stability[slot] * math.exp(-self.stability_rate * (self.clock() - self._epoch))
+
+    def _select(self, n: int, hottest: bool) -> List[Tuple[str, float]]:
+        k = min(n, len(self._slots))
+        if k <= 0:
+            return []
+        values = self._current(self._heat, self.heat_rate)
+        # 空槽位为NaN，argpartition将其排在末尾；k不超过有效空间数，因此不会被选中
+        keys = -values if hottest else values
+        chosen = np.argpartition(keys, k - 1)[:k] if k < len(keys) else np.arange(len(keys))
+        chosen = chosen[np.argsort(keys[chosen], kind='stable')]
+        return [(self._ids[slot], float(values[slot])) for slot in chosen]
+
+    def hottest(self, n: int) -> List[Tuple[str, float]]:
+        """热度最高的n个空间 [(空间ID, 热度)]，按热度降序"""
+        return self._select(n, hottest=True)
+
+    def coldest(self, n: int) -> List[Tuple[str, float]]:
+        """热度最低的n个空间 [(空间ID, 热度)]，按热度升序(供清除任务使用)"""
+        return self._select(n, hottest=False)
+
+    # ---------- 加载与写回 ----------
+
+    async def warm(self) -> int:
+        """
+        从spaces表加载全部空间的热度与稳定度(已登记的空间保持内存中的值)
+
+        返回值:
+        - 新登记的空间数
+        """
+        loaded = 0
+        last_id = None
+        while True:
+            query = select(Space.id, func.coalesce(Space.heat, 0), func.coalesce(Space.stability, DEFAULT_STABILITY)) \
+                .order_by(Space.id).limit(LOAD_CHUNK)
+            if last_id is not None:
+                query = query.where(Space.id > last_id)
+            async with self.db_operator.read_session() as session:
+                rows = (await session.execute(query)).all()
+            for space_id, heat, stability in rows:
+                if space_id not in self._slots:
+                    self._track(space_id, heat, stability)
+                    loaded += 1
+            if len(rows) < LOAD_CHUNK:
+                return loaded
+            last_id = rows[-1][0]
+
+    def _rebase(self) -> None:
+        """将保存值折算到当前时刻为新基准"""
+        now = self.clock()
+        exponent = now - self._epoch
+        if self.heat_rate * exponent < REBASE_EXPONENT and self.stability_rate * exponent < REBASE_EXPONENT:
+            return
+        for saved, rate in ((self._heat, self.heat_rate), (self._stability, self.stability_rate)):
+            view = np.frombuffer(saved, dtype=np.float64)
+            view *= math.exp(-rate * exponent)
+            del view
+        self._epoch = now
+
+    def _changes(self) -> tuple:
+        """计算需写回的增量: (热度与稳定度行, 仅热度行)，每行为(槽位, 空间ID, 热度增量, 稳定度增量)"""
+        live = ~np.isnan(np.frombuffer(self._heat, dtype=np.float64))
+        heat = np.trunc(np.frombuffer(self._pending_heat, dtype=np.float64)).astype(np.int64)
+        stability = np.trunc(np.frombuffer(self._pending_stability, dtype=np.float64)).astype(np.int64)
+        both, heat_only = [], []
+        for slot in np.flatnonzero(live & ((heat != 0) | (stability != 0))).tolist():
+            row = (slot, self._ids[slot], int(heat[slot]), int(stability[slot]))
+            (both if row[3] else heat_only).append(row)
+        return both, heat_only
+
+    @staticmethod
+    def _clamped(value, low: int, high: int):
+        return case((value < low, low), (value > high, high), else_=value)
+
+    async def _execute(self, rows: list, heat_only: list) -> None:
+        """以增量形式写回(两类行分别为一条executemany UPDATE)"""
+        table = Space.__table__
+        heat = self._clamped(func.coalesce(table.c.heat, 0) + bindparam('b_heat'), 0, 2 ** 31 - 1)
+        stability = self._clamped(func.coalesce(table.c.stability, DEFAULT_STABILITY) + bindparam('b_stability'),
+                                  0, MAX_STABILITY)
+        # 显式保持updated_at，避免热度刷新被视为空间修改
+        statements = (
+            (rows, update(table).where(table.c.id == bindparam('b_id')).values(
+                heat=heat, stability=stability, updated_at=table.c.updated_at)),
+            (heat_only, update(table).where(table.c.id == bindparam('b_id')).values(
+                heat=heat, updated_at=table.c.updated_at)),
+        )
+        async with self.db_operator.session() as session:
+            for chunk_rows, statement in statements:
+                for start in range(0, len(chunk_rows), self.chunk_size):
+                    chunk = chunk_rows[start:start + self.chunk_size]
+                    await session.execute(statement, [
+                        {"b_id": space_id, "b_heat": heat, "b_stability": stability}
+                        for _, space_id, heat, stability in chunk
+                    ])
+
+    async def flush(self) -> int:
+        """
+        写回本worker的增量(只写整数部分非0的空间)
+
+        返回值:
+        - 写回的行数
+        """
+        async with self._lock:
+            self._rebase()
+            both, heat_only = self._changes()
+            if not both and not heat_only:
+                return 0
+            try:
+                await self._execute(both, heat_only)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"空间热度写回失败({len(both) + len(heat_only)}行): {e}")
+                return 0
+            for slot, space_id, heat, stability in both + heat_only:
+                # 写回期间槽位可能已被移除或复用；写回期间新增的增量保留
+                if self._ids[slot] == space_id:
+                    self._pending_heat[slot] -= heat
+                    self._pending_stability[slot] -= stability
+            count = len(both) + len(heat_only)
+            self.flushed += count
+            self.flushes += 1
+            return count
+
+    async def _claim_decay(self, now: float) -> Optional[float]:
+        """
+        抢占本周期的数据库衰减
+
+        返回值:
+        - 上次衰减时刻(Unix秒)；未到周期或已被其他worker抢占时返回None
+        """
+        key = TaskRun.name == DECAY_TASK
+        try:
+            async with self.db_operator.session() as session:
+                last = (await session.execute(select(TaskRun.last_run_at).where(key))).scalar()
+                if last is None:
+                    # 首次运行只记录起点
+                    session.add(TaskRun(name=DECAY_TASK, last_run_at=int(now)))
+                    return None
+                if now - last < self.decay_interval:
+                    return None
+                result = await session.execute(
+                    update(TaskRun).where(key, TaskRun.last_run_at == last)
+                    .values(last_run_at=int(now))
+                    .execution_options(synchronize_session=False)
+                )
+                return float(last) if result.rowcount == 1 else None
+        except IntegrityError:
+            # 其他worker同时写入了起点
+            return None
+
+    def _decrements(self, values: np.ndarray, factor: float) -> np.ndarray:
+        """衰减后的整数值以随机舍入计算，返回减量"""
+        values = values.astype(np.float64)
+        return (values - np.floor(values * factor + self.rng.random(len(values)))).astype(np.int64)
+
+    async def decay(self) -> int:
+        """
+        对数据库中的热度与稳定度执行一次衰减(每个周期只由一个worker执行)
+
+        返回值:
+        - 更新的行数
+        """
+        now = self.wall_clock()
+        last = await self._claim_decay(now)
+        if last is None:
+            return 0
+        elapsed = now - last
+        heat_factor = math.exp(-self.heat_rate * elapsed)
+        stability_factor = math.exp(-self.stability_rate * elapsed)
+        updated = 0
+        last_id = None
+        while True:
+            query = select(Space.id, func.coalesce(Space.heat, 0), func.coalesce(Space.stability, DEFAULT_STABILITY)) \
+                .where(or_(Space.heat > 0, Space.stability > 0)).order_by(Space.id).limit(LOAD_CHUNK)
+            if last_id is not None:
+                query = query.where(Space.id > last_id)
+            async with self.db_operator.session() as session:
+                rows = (await session.execute(query)).all()
+            if rows:
+                ids = [row[0] for row in rows]
+                heat = self._decrements(np.fromiter((row[1] for row in rows), np.int64, len(rows)), heat_factor)
+                stability = self._decrements(np.fromiter((row[2] for row in rows), np.int64, len(rows)),
+                                             stability_factor)
+                changed = [(None, ids[i], -int(heat[i]), -int(stability[i]))
+                           for i in np.flatnonzero((heat != 0) | (stability != 0)).tolist()]
+                await self._execute([row for row in changed if row[3]], [row for row in changed if not row[3]])
+                updated += len(changed)
+            if len(rows) < LOAD_CHUNK:
+                break
+            last_id = rows[-1][0]
+        self.decays += 1
+        logger.info(f"空间热度衰减: {updated} 个空间，间隔 {elapsed:.0f} 秒")
+        return updated
+
+    # ---------- 后台任务 ----------
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if self.decay_interval > 0 and self.wall_clock() >= self._next_decay:
+                self._next_decay = self.wall_clock() + self.decay_interval
+                try:
+                    await self.decay()
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"空间热度衰减失败: {e}")
+
+    def start(self) -> None:
+        """启动后台写回任务(需在事件循环中调用)"""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写回最后一次"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        """引擎统计"""
+        return {
+            "spaces": len(self._slots),
+            "events": self.events,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "decays": self.decays,
+            "errors": self.errors
+        }
+
+
+# 全局空间热度引擎(由应用生命周期加载与启动)
+space_heat = SpaceHeatEngine()
@@ -0,0 +1,220 @@
+"""
+空间查询模块
+============
+
+提供空间列表与行动(回复)历史的分页查询接口及回复提交接口，挂载于/api/game下。
+
+接口:
+- POST /actions: 在空间内发表回复(需登录)，经replyWriter分配楼层号并组提交写入
+- GET /spaces?type=&limit=&cursor=: 按热度降序列出空间
+- GET /actions/history?space_id=&limit=&cursor=&order=: 按楼层列出空间内的回复
+
+分页方式:
+- 键集(游标)分页，不使用OFFSET: 第500页与第1页代价相同
+- 响应的pagination.next_cursor原样作为下一次请求的cursor参数，为null表示没有下一页
+- 空间列表按 (heat DESC, id DESC) 排序，使用索引 idx_type_heat(type, heat, id) / idx_heat(heat, id)
+- 回复历史按 floor_num 排序，使用唯一索引 uq_space_floor(space_id, floor_num)
+
+说明:
+- 查询经只读会话执行，配置副本时读取副本
+- 热度变化会使空间在列表中移动，翻页期间可能出现少量重复或遗漏，属键集分页的预期行为
+"""
+import logging
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from backend.database.models import Reply, Space, User
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.auth import get_current_username
+from backend.modules.replyWriter import reply_writer
+from backend.utils.keysetCursor import encode_cursor, decode_cursor
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["game"])
+
+MAX_PAGE_SIZE = 100
+
+SPACE_COLUMNS = (Space.id, Space.title, Space.type, Space.heat, Space.stability,
+                 Space.turns_left, Space.content)
+REPLY_COLUMNS = (Reply.id, Reply.author_id, Reply.content, Reply.floor_num,
+                 Reply.parent_id, Reply.created_at)
+
+
+def space_page_query(space_type: Optional[str], limit: int, after: Optional[tuple] = None):
+    """
+    构建空间列表查询(多取一行用于判断是否有下一页)
+
+    参数:
+    - space_type: 空间类型，为空时不过滤
+    - limit: 每页条数
+    - after: 上一页最后一行的 (heat, id)
+    """
+    query = select(*SPACE_COLUMNS)
+    if space_type:
+        query = query.where(Space.type == space_type)
+    if after is not None:
+        # 展开的行比较，MySQL对行构造器比较不一定能用上 (heat, id) 索引做范围扫描
+        heat, space_id = after
+        query = query.where(or_(Space.heat < heat, and_(Space.heat == heat, Space.id < space_id)))
+    return query.order_by(Space.heat.desc(), Space.id.desc()).limit(limit + 1)
+
+
+def reply_page_query(space_id: str, limit: int, after: Optional[int] = None, descending: bool = False):
+    """
+    构建回复历史查询(多取一行用于判断是否有下一页)
+
+    参数:
+    - space_id: 空间ID
+    - limit: 每页条数
+    - after: 上一页最后一行的楼层号
+    - descending: 是否按楼层倒序(最新在前)
+    """
+    query = select(*REPLY_COLUMNS).where(Reply.space_id == space_id)
+    if after is not None:
+        query = query.where(Reply.floor_num < after if descending else Reply.floor_num > after)
+    order = Reply.floor_num.desc() if descending else Reply.floor_num
+    return query.order_by(order).limit(limit + 1)
+
+
+def reply_offset_query(space_id: str, limit: int, page: int):
+    """OFFSET分页的回复历史查询(仅用于基准对比)"""
+    return (select(*REPLY_COLUMNS).where(Reply.space_id == space_id)
+            .order_by(Reply.floor_num).offset((page - 1) * limit).limit(limit))
+
+
+def _page(rows: list, limit: int, key) -> tuple:
+    """截取一页，返回(本页行, 下一页游标)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
+
+
+def _decode(cursor: Optional[str], types) -> Optional[tuple]:
+    try:
+        return decode_cursor(cursor, types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _fetch(query) -> list:
+    try:
+        async with AsyncDBOperator.read_session() as session:
+            return (await session.execute(query)).all()
+    except SQLAlchemyError as e:
+        logger.error(f"分页查询失败: {e}")
+        raise HTTPException(status_code=500, detail="查询失败")
+
+
+@router.get("/spaces")
+async def list_spaces(
+    type: Optional[Literal['temp', 'stable', 'fixed']] = None,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    获取空间列表(按热度降序)
+
+    返回值:
+    {
+        "spaces": [{"id", "name", "type", "heat", "stability", "turns_left", "description"}],
+        "pagination": {"per_page", "next_cursor", "has_more"}
+    }
+    """
+    after = _decode(cursor, (int, str))
+    rows, next_cursor = _page(await _fetch(space_page_query(type, limit, after)), limit,
+                              lambda row: (row.heat, row.id))
+    return {
+        "spaces": [
+            {
+                "id": row.id,
+                "name": row.title,
+                "type": row.type,
+                "heat": row.heat,
+                "stability": row.stability,
+                "turns_left": row.turns_left,
+                "description": row.content
+            }
+            for row in rows
+        ],
+        "pagination": {"per_page": limit, "next_cursor": next_cursor, "has_more": next_cursor is not None}
+    }
+
+
+@router.get("/actions/history")
+async def action_history(
+    space_id: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    order: Literal['asc', 'desc'] = 'asc'
+):
+    """
+    获取空间内的行动(回复)历史
+
+    参数:
+    - order: asc按楼层顺序阅读，desc从最新楼层开始
+
+    返回值:
+    {
+        "history": [{"action_id", "user_id", "content", "floor_num", "parent_id", "timestamp"}],
+        "pagination": {"per_page", "next_cursor", "has_more"}
+    }
+    """
+    after = _decode(cursor, (int,))
+    query = reply_page_query(space_id, limit, after[0] if after else None, descending=order == 'desc')
+    rows, next_cursor = _page(await _fetch(query), limit, lambda row: (row.floor_num,))
+    return {
+        "history": [
+            {
+                "action_id": row.id,
+                "user_id": row.author_id,
+                "content": row.content,
+                "floor_num": row.floor_num,
+                "parent_id": row.parent_id,
+                "timestamp": int(row.created_at.timestamp()) if row.created_at else None
+            }
+            for row in rows
+        ],
+        "pagination": {"per_page": limit, "next_cursor": next_cursor, "has_more": next_cursor is not None}
+    }
+
+
+class ActionRequest(BaseModel):
+    """回复内容"""
+    space_id: str = Field(..., min_length=1, max_length=36)
+    content: str = Field(..., min_length=1)
+    parent_id: Optional[str] = Field(None, max_length=36)
+
+
+@router.post("/actions")
+async def post_action(body: ActionRequest, username: str = Depends(get_current_username)):
+    """
+    在空间内发表回复，写入后返回
+
+    返回值:
+    {"action_id", "space_id", "parent_id", "floor_num"}
+
+    异常:
+    - HTTPException 401: 未登录
+    - HTTPException 404: 空间不存在
+    - HTTPException 500: 写入失败
+    """
+    user = await AsyncDBOperator.fetch_one(User, ("id",), username=username)
+    if user is None:
+        raise HTTPException(status_code=401, detail="用户不存在")
+    try:
+        row = await reply_writer.post(body.space_id, user.id, body.content, body.parent_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="空间不存在")
+    except SQLAlchemyError as e:
+        logger.error(f"回复写入失败: {e}")
+        raise HTTPException(status_code=500, detail="写入失败")
+    return {
+        "action_id": row["id"],
+        "space_id": row["space_id"],
+        "parent_id": row["parent_id"],
+        "floor_num": row["floor_num"]
+    }
@@ -0,0 +1,509 @@
+"""
+团队回合汇总模块
+================
+
+稳定空间中最多256名队员各自提交选择，由本模块汇总后交给AI决定实际行动。
+
+流程:
+1. 某回合首个提交打开回合窗口，记录应行动的成员(游戏当前玩家)，截止时间写入选票存储，各worker共用
+2. 成员提交的选择写入选票存储(同一成员重复提交以最后一次为准)
+3. 全员提交或到达截止时间时关闭窗口(本worker的窗口每 TEAM_TURN_POLL 秒检查一次共享票数与截止时间)
+4. 汇总全部worker收到的选票，向量化计算加权票数，抢占推进回合(GameCore.advance_turn)成功后调用一次AI决策
+5. 决策结果写入选票存储，通过Future返回给该回合所有提交者；抢占失败的worker读取存储中的结果
+6. 抢占成功的worker为每名提交者增加服务器参数 turn_score 分(LeaderboardService.record_score)
+
+选票存储:
+- InMemoryBallotStore: 进程内存储(单worker/测试)
+- RedisBallotStore: Redis存储，键 hbm:turn:{game_id}:{turn}:{ballots|deadline|outcome}，一小时后过期
+
+接口:
+- POST /game/{game_id}/turn  {"choice": "..."}，需Bearer令牌，等待回合结算后返回结果
+
+权重:
+- weight = max(等级, 1) × (1 + ln(1 + 经验))
+- 体力为0的成员权重乘以服务器参数 zero_energy_weight(server_configs表，见backend/modules/serverConfig.py)
+
+配置项(环境变量):
+- TEAM_TURN_WINDOW: 回合窗口时长(秒)，默认30
+- TEAM_TURN_POLL: 窗口检查共享票数、截止时间与结算结果的间隔(秒)，默认0.2
+- TEAM_TURN_OUTCOME_TIMEOUT: 抢占失败时等待其他worker写入结果的最长时间(秒)，默认120
+- TEAM_TURN_BACKEND: memory|redis，默认memory；多worker部署需为redis(并配合GAME_STATE_BACKEND=redis)
+- REDIS_URLS: Redis节点列表(逗号分隔)，选票存储使用第一个节点
+- ZERO_ENERGY_WEIGHT: 表中未配置zero_energy_weight时的默认值，默认0.5
+
+说明:
+- 回合推进通过GameCore的乐观并发保证每回合只结算一次、只调用一次AI
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Optional
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.database.models import User
+from backend.modules.auth import get_current_username
+from backend.modules.energy import energy_service
+from backend.modules.game import GameCore, game_core
+from backend.modules.leaderboard import leaderboard_service
+from backend.modules.serverConfig import server_config, TURN_SCORE, ZERO_ENERGY_WEIGHT
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "hbm:turn:"
+# 选票、截止时间与结果的保留时间(秒)
+BALLOT_TTL = 3600
+
+
+@dataclass(slots=True)
+class MemberAction:
+    """成员提交的行动选择"""
+    player_id: str
+    choice: str
+    experience: int = 0
+    current_level: int = 1
+    energy: int = 1
+
+
+@dataclass(slots=True)
+class VoteTally:
+    """单个选项的汇总结果"""
+    choice: str
+    weight: float
+    votes: int
+
+
+@dataclass(slots=True)
+class TurnOutcome:
+    """回合结算结果"""
+    game_id: str
+    turn: int
+    action: Optional[str]
+    tallies: list
+    voters: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TurnOutcome":
+        return cls(
+            game_id=data["game_id"], turn=data["turn"], action=data["action"],
+            tallies=[VoteTally(**tally) for tally in data["tallies"]], voters=data["voters"]
+        )
+
+
+class GameNotFound(ValueError):
+    """游戏不存在"""
+
+
+class NotAMember(ValueError):
+    """提交者不是该空间的成员"""
+
+
+def tally_votes(actions: list, zero_energy_weight: float = 0.5) -> list:
+    """
+    向量化计算加权票数
+
+    返回值:
+    - VoteTally列表，按权重降序(权重相同按票数降序)
+    """
+    if not actions:
+        return []
+    choices = np.array([action.choice for action in actions])
+    experience = np.fromiter((action.experience for action in actions), dtype=np.float64, count=len(actions))
+    levels = np.fromiter((action.current_level for action in actions), dtype=np.float64, count=len(actions))
+    energy = np.fromiter((action.energy for action in actions), dtype=np.float64, count=len(actions))
+
+    weights = np.maximum(levels, 1.0) * (1.0 + np.log1p(np.maximum(experience, 0.0)))
+    weights = np.where(energy <= 0, weights * zero_energy_weight, weights)
+
+    options, inverse = np.unique(choices, return_inverse=True)
+    option_weights = np.bincount(inverse, weights=weights, minlength=len(options))
+    option_votes = np.bincount(inverse, minlength=len(options))
+    order = np.lexsort((-option_votes, -option_weights))
+    return [
+        VoteTally(str(options[i]), float(option_weights[i]), int(option_votes[i]))
+        for i in order
+    ]
+
+
+def build_turn_prompt(game_id: str, turn: int, tallies: list) -> str:
+    """构建交给AI的回合决策提示"""
+    lines = [f"空间 {game_id} 第 {turn + 1} 回合，队员的选择汇总如下(按加权票数排序):"]
+    for tally in tallies:
+        lines.append(f"- {tally.choice}: 权重 {tally.weight:.2f}，{tally.votes} 票")
+    lines.append("请综合队员意见，决定团队实际采取的行动，并用一段话描述行动过程。")
+    return "\n".join(lines)
+
+
+class BallotStore(ABC):
+    """选票存储接口(按游戏与回合隔离)"""
+
+    @abstractmethod
+    async def open(self, game_id: str, turn: int, deadline: float) -> float:
+        """登记回合截止时间(已存在时保留原值)，返回生效的截止时间(Unix时间戳)"""
+
+    @abstractmethod
+    async def put(self, game_id: str, turn: int, action: MemberAction) -> int:
+        """写入成员选票(覆盖该成员此前的选票)，返回当前票数"""
+
+    @abstractmethod
+    async def count(self, game_id: str, turn: int) -> int:
+        """当前票数"""
+
+    @abstractmethod
+    async def collect(self, game_id: str, turn: int) -> list:
+        """读取全部选票(MemberAction列表)"""
+
+    @abstractmethod
+    async def set_outcome(self, outcome: TurnOutcome) -> None:
+        """写入回合结算结果"""
+
+    @abstractmethod
+    async def get_outcome(self, game_id: str, turn: int) -> Optional[TurnOutcome]:
+        """读取回合结算结果，尚未结算时返回None"""
+
+    async def close(self) -> None:
+        """释放资源"""
+
+
+class InMemoryBallotStore(BallotStore):
+    """进程内选票存储"""
+
+    def __init__(self):
+        self._deadlines: dict[tuple, float] = {}
+        self._ballots: dict[tuple, dict] = {}
+        # 每个游戏只保留最近一次结算结果
+        self._outcomes: dict[str, TurnOutcome] = {}
+
+    async def open(self, game_id, turn, deadline):
+        return self._deadlines.setdefault((game_id, turn), deadline)
+
+    async def put(self, game_id, turn, action):
+        ballots = self._ballots.setdefault((game_id, turn), {})
+        ballots[action.player_id] = action
+        return len(ballots)
+
+    async def count(self, game_id, turn):
+        return len(self._ballots.get((game_id, turn), ()))
+
+    async def collect(self, game_id, turn):
+        return list(self._ballots.get((game_id, turn), {}).values())
+
+    async def set_outcome(self, outcome):
+        key = (outcome.game_id, outcome.turn)
+        self._deadlines.pop(key, None)
+        self._ballots.pop(key, None)
+        self._outcomes[outcome.game_id] = outcome
+
+    async def get_outcome(self, game_id, turn):
+        outcome = self._outcomes.get(game_id)
+        return outcome if outcome is not None and outcome.turn == turn else None
+
+
+class RedisBallotStore(BallotStore):
+    """
+    Redis选票存储
+
+    选票为Hash: {prefix}{game_id}:{turn}:ballots -> {player_id: MemberAction JSON}，
+    截止时间以SET NX写入，结果为JSON字符串，均在BALLOT_TTL后过期。
+    """
+
+    def __init__(self, redis_client, key_prefix: str = REDIS_KEY_PREFIX, ttl: int = BALLOT_TTL):
+        """
+        参数:
+        - redis_client: redis.asyncio客户端(decode_responses=True)
+        - key_prefix: 键前缀
+        - ttl: 键过期时间(秒)
+        """
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs):
+        """根据Redis连接串创建"""
+        import redis.asyncio as redis
+        return cls(redis.from_url(url, decode_responses=True), **kwargs)
+
+    def _key(self, game_id: str, turn: int, kind: str) -> str:
+        return f"{self.key_prefix}{game_id}:{turn}:{kind}"
+
+    async def open(self, game_id, turn, deadline):
+        key = self._key(game_id, turn, "deadline")
+        if await self.redis.set(key, repr(deadline), nx=True, ex=self.ttl):
+            return deadline
+        current = await self.redis.get(key)
+        return float(current) if current is not None else deadline
+
+    async def put(self, game_id, turn, action):
+        key = self._key(game_id, turn, "ballots")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, action.player_id, json.dumps(asdict(action)))
+            pipe.hlen(key)
+            pipe.expire(key, self.ttl)
+            _, count, _ = await pipe.execute()
+        return count
+
+    async def count(self, game_id, turn):
+        return await self.redis.hlen(self._key(game_id, turn, "ballots"))
+
+    async def collect(self, game_id, turn):
+        ballots = await self.redis.hgetall(self._key(game_id, turn, "ballots"))
+        return [MemberAction(**json.loads(data)) for data in ballots.values()]
+
+    async def set_outcome(self, outcome):
+        await self.redis.set(self._key(outcome.game_id, outcome.turn, "outcome"),
+                             json.dumps(outcome.to_dict()), ex=self.ttl)
+
+    async def get_outcome(self, game_id, turn):
+        data = await self.redis.get(self._key(game_id, turn, "outcome"))
+        return TurnOutcome.from_dict(json.loads(data)) if data is not None else None
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_ballot_store() -> BallotStore:
+    """根据环境变量创建选票存储"""
+    if os.getenv('TEAM_TURN_BACKEND', 'memory') == 'redis':
+        url = os.getenv('REDIS_URLS', 'redis://redis:6379/0').split(',')[0].strip()
+        return RedisBallotStore.from_url(url)
+    return InMemoryBallotStore()
+
+
+@dataclass
+class _TurnWindow:
+    """单个空间某一回合在本worker的提交窗口"""
+    turn: int
+    members: frozenset
+    deadline: float
+    result: Optional[asyncio.Future] = None
+    watcher: Optional[asyncio.Task] = None
+    closed: bool = False
+
+
+class TeamTurnAggregator:
+    """团队回合汇总器"""
+
+    def __init__(self, game_core: GameCore,
+                 decide: Callable[[str, int, list], Awaitable[str]],
+                 window_seconds: float = None,
+                 zero_energy_weight: float = None,
+                 ballots: BallotStore = None,
+                 poll_interval: float = None,
+                 outcome_timeout: float = None,
+                 on_settled: Callable[[TurnOutcome, list], Awaitable[None]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        参数:
+        - game_core: 游戏核心实例
+        - decide: AI决策函数 (game_id, turn, tallies) -> 行动描述，每回合调用一次
+        - window_seconds: 回合窗口时长(秒)
+        - zero_energy_weight: 无体力成员的权重系数，为None时每回合读取服务器配置
+        - ballots: 选票存储，默认进程内存储
+        - poll_interval: 检查共享票数、截止时间与结算结果的间隔(秒)
+        - outcome_timeout: 抢占失败时等待结算结果的最长时间(秒)
+        - on_settled: 结算回调 (结果, 全部选票)，每回合只由抢占成功的worker调用一次
+        - clock: 墙上时钟(截止时间在各worker间共享，不能使用单调时钟)
+        """
+        self.game_core = game_core
+        self.decide = decide
+        self.window_seconds = window_seconds if window_seconds is not None else \
+            float(os.getenv('TEAM_TURN_WINDOW', '30'))
+        self.zero_energy_weight = zero_energy_weight
+        self.ballots = ballots if ballots is not None else InMemoryBallotStore()
+        self.poll_interval = poll_interval if poll_interval is not None else \
+            float(os.getenv('TEAM_TURN_POLL', '0.2'))
+        self.outcome_timeout = outcome_timeout if outcome_timeout is not None else \
+            float(os.getenv('TEAM_TURN_OUTCOME_TIMEOUT', '120'))
+        self.on_settled = on_settled
+        self.clock = clock
+        self._windows: dict[str, _TurnWindow] = {}
+        self.decisions = 0
+
+    async def submit(self, game_id: str, action: MemberAction) -> asyncio.Future:
+        """
+        提交成员行动
+
+        返回值:
+        - 回合结算的Future(TurnOutcome)
+
+        异常:
+        - GameNotFound: 游戏不存在
+        - NotAMember: 提交者不是该空间的成员
+        """
+        window = self._windows.get(game_id)
+        if window is None or window.closed:
+            state = await self.game_core.get_state(game_id)
+            if state is None:
+                raise GameNotFound(f"游戏不存在: {game_id}")
+            with state:
+                turn, members = state.current_turn, frozenset(state.player_ids())
+            deadline = await self.ballots.open(game_id, turn, self.clock() + self.window_seconds)
+            # 等待期间可能已有其他提交打开窗口
+            window = self._windows.get(game_id)
+            if window is None or window.closed:
+                window = self._open(game_id, turn, members, deadline)
+
+        if action.player_id not in window.members:
+            raise NotAMember(f"玩家不在该空间中: {action.player_id}")
+        if await self.ballots.put(game_id, window.turn, action) >= len(window.members):
+            self._close(game_id, window)
+        return window.result
+
+    def _open(self, game_id: str, turn: int, members: frozenset, deadline: float) -> _TurnWindow:
+        """打开回合窗口并启动检查任务"""
+        loop = asyncio.get_running_loop()
+        window = _TurnWindow(turn=turn, members=members, deadline=deadline, result=loop.create_future())
+        window.watcher = loop.create_task(self._watch(game_id, window))
+        self._windows[game_id] = window
+        return window
+
+    def _detach(self, game_id: str, window: _TurnWindow) -> None:
+        window.closed = True
+        if window.watcher is not None and window.watcher is not asyncio.current_task():
+            window.watcher.cancel()
+        if self._windows.get(game_id) is window:
+            del self._windows[game_id]
+
+    def _close(self, game_id: str, window: _TurnWindow) -> None:
+        """关闭窗口(只执行一次)并异步结算"""
+        if window.closed:
+            return
+        self._detach(game_id, window)
+        asyncio.get_running_loop().create_task(self._settle(game_id, window))
+
+    async def _watch(self, game_id: str, window: _TurnWindow) -> None:
+        """检查其他worker是否已结算、共享票数是否已满以及截止时间"""
+        try:
+            while not window.closed:
+                outcome = await self.ballots.get_outcome(game_id, window.turn)
+                if window.closed:
+                    return
+                if outcome is not None:
+                    self._detach(game_id, window)
+                    window.result.set_result(outcome)
+                    return
+                if self.clock() >= window.deadline or \
+                        await self.ballots.count(game_id, window.turn) >= len(window.members):
+                    self._close(game_id, window)
+                    return
+                await asyncio.sleep(min(self.poll_interval, max(window.deadline - self.clock(), 0)))
+        except Exception as e:
+            logger.error(f"团队回合窗口检查失败: {e}")
+            self._close(game_id, window)
+
+    async def _wait_outcome(self, game_id: str, turn: int) -> Optional[TurnOutcome]:
+        """等待抢占成功的worker写入结算结果"""
+        deadline = self.clock() + self.outcome_timeout
+        while True:
+            outcome = await self.ballots.get_outcome(game_id, turn)
+            if outcome is not None or self.clock() >= deadline:
+                return outcome
+            await asyncio.sleep(self.poll_interval)
+
+    async def _settle(self, game_id: str, window: _TurnWindow) -> None:
+        """汇总全部选票、抢占回合并调用一次AI决策"""
+        try:
+            actions = await self.ballots.collect(game_id, window.turn)
+            tallies = tally_votes(actions,
+                                  self.zero_energy_weight if self.zero_energy_weight is not None
+                                  else server_config.get(ZERO_ENERGY_WEIGHT))
+            state = await self.game_core.advance_turn(game_id, window.turn)
+            won = state is not None
+            if won:
+                state.release()
+                self.decisions += 1
+                outcome = TurnOutcome(
+                    game_id=game_id, turn=window.turn,
+                    action=await self.decide(game_id, window.turn, tallies),
+                    tallies=tallies, voters=len(actions)
+                )
+                await self.ballots.set_outcome(outcome)
+            else:
+                logger.info(f"回合已由其他实例结算: {game_id} 第{window.turn}回合")
+                outcome = await self._wait_outcome(game_id, window.turn)
+                if outcome is None:
+                    logger.warning(f"等待回合结算结果超时: {game_id} 第{window.turn}回合")
+                    outcome = TurnOutcome(game_id=game_id, turn=window.turn, action=None,
+                                          tallies=tallies, voters=len(actions))
+            window.result.set_result(outcome)
+        except Exception as e:
+            logger.error(f"团队回合结算失败: {e}")
+            window.result.set_exception(e)
+            return
+        if won and self.on_settled is not None:
+            try:
+                await self.on_settled(outcome, actions)
+            except Exception as e:
+                logger.error(f"团队回合结算回调失败: {e}")
+
+    async def close(self) -> None:
+        """停止窗口检查任务并释放选票存储"""
+        for game_id, window in list(self._windows.items()):
+            self._detach(game_id, window)
+        await self.ballots.close()
+
+
+async def _award_turn_score(outcome: TurnOutcome, actions: list) -> None:
+    """每名提交行动的成员获得 turn_score 分"""
+    points = server_config.get(TURN_SCORE)
+    if points:
+        for action in actions:
+            await leaderboard_service.record_score(action.player_id, points)
+
+
+async def _decide_with_ai(game_id: str, turn: int, tallies: list) -> str:
+    # 延迟导入: AI模块依赖langchain，且反向引用本模块的build_turn_prompt
+    from backend.ai.ollamaByLangchain import decide_team_turn
+    return await decide_team_turn(game_id, turn, tallies)
+
+
+# 全局团队回合汇总器(由应用生命周期关闭)
+team_turn = TeamTurnAggregator(game_core, _decide_with_ai, ballots=create_ballot_store(),
+                               on_settled=_award_turn_score)
+
+router = APIRouter(tags=["game"])
+
+
+class TurnChoice(BaseModel):
+    """成员提交的行动选择"""
+    choice: str = Field(..., min_length=1, max_length=64)
+
+
+@router.post("/{game_id}/turn")
+async def submit_turn(game_id: str, body: TurnChoice, username: str = Depends(get_current_username)):
+    """
+    提交团队回合选择，等待本回合结算后返回
+
+    返回值:
+    {"game_id", "turn", "action", "voters", "tallies": [{"choice", "weight", "votes"}]}
+
+    异常:
+    - HTTPException 401: 未登录
+    - HTTPException 404: 游戏不存在
+    - HTTPException 403: 不是该空间的成员
+    """
+    user = await AsyncDBOperator.fetch_one(User, ("id", "experience", "current_level"), username=username)
+    if user is None:
+        raise HTTPException(status_code=401, detail="用户不存在")
+    status = await energy_service.get_energy(user.id)
+    action = MemberAction(user.id, body.choice, experience=user.experience or 0,
+                          current_level=user.current_level or 1,
+                          energy=status.energy if status is not None else 0)
+    try:
+        future = await team_turn.submit(game_id, action)
+    except GameNotFound:
+        raise HTTPException(status_code=404, detail="游戏不存在")
+    except NotAMember:
+        raise HTTPException(status_code=403, detail="不是该空间的成员")
+    # 结果由同回合全部提交者共享，客户端断开不能取消它
+    outcome = await asyncio.shield(future)
+    return outcome.to_dict()
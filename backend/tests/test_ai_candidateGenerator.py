@@ -0,0 +1,114 @@
+"""
+AI候选回复生成测试模块
+======================
+
+测试backend/ai/candidateGenerator.py中的并发候选生成与去重(模拟Ollama服务)
+"""
+
+import time
+import asyncio
+import unittest
+from fastapi.testclient import TestClient
+from backend.ai import ollamaByLangchain
+from backend.ai.llmGateway import LLMGateway
+from backend.ai.candidateGenerator import CandidateDeduper, generate_candidates, similarity
+from backend.tools.fakeOllamaServer import FakeOllamaServer
+
+
+class TestDeduper(unittest.TestCase):
+    """测试近似重复判定"""
+
+    def test_similarity(self):
+        """测试空白与标点不影响相似度"""
+        self.assertEqual(similarity("队伍向左前进。", "队伍 向左前进!"), 1.0)
+        self.assertLess(similarity("队伍向左前进", "原地扎营休整"), 0.2)
+
+    def test_rejects_near_duplicates(self):
+        """测试过滤近似重复与空候选"""
+        deduper = CandidateDeduper(threshold=0.8)
+        self.assertTrue(deduper.add("队伍决定向左侧通道前进"))
+        self.assertFalse(deduper.add("队伍决定向左侧通道前进。"))
+        self.assertFalse(deduper.add("  "))
+        self.assertTrue(deduper.add("队伍决定原地扎营休整"))
+
+
+class TestGenerateCandidates(unittest.TestCase):
+    """测试并发候选生成"""
+
+    def setUp(self):
+        self.server = FakeOllamaServer(token_delay=0.01).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def run_candidates(self, max_in_flight=4, **kwargs):
+        async def scenario():
+            gateway = LLMGateway([self.server.base_url], max_in_flight=max_in_flight)
+            try:
+                result = await generate_candidates(gateway, "fake-model", "岔路口", **kwargs)
+                return result, gateway.stats()
+            finally:
+                await gateway.close()
+        return asyncio.run(scenario())
+
+    def test_distinct_seeds_in_parallel(self):
+        """测试每个请求使用不同种子并发执行"""
+        candidates, _ = self.run_candidates(n=4, seed=10)
+        self.assertEqual(len(candidates), 4)
+        seeds = sorted(body["options"]["seed"] for body in self.server.requests)
+        self.assertEqual(seeds, [10, 11, 12, 13])
+        self.assertEqual(self.server.max_in_flight, 4)
+
+    def test_deduplicates(self):
+        """测试去除近似重复的候选"""
+        self.server.responder = lambda body: (
+            ["原地", "扎营"] if body["options"]["seed"] == 0 else ["向左", "前进", "。"]
+        )
+        candidates, _ = self.run_candidates(n=4, seed=0)
+        self.assertEqual(sorted(candidates), ["原地扎营", "向左前进。"])
+
+    def test_first_k_returns_early(self):
+        """测试凑满k个即返回并取消其余请求"""
+        self.server.responder = lambda body: (
+            ["快"] if body["options"]["seed"] == 0 else [f"慢{i}" for i in range(100)]
+        )
+        start = time.perf_counter()
+        candidates, stats = self.run_candidates(n=4, k=1, seed=0)
+        self.assertEqual(candidates, ["快"])
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(stats["backends"][0]["in_flight"], 0)
+
+
+class TestCandidatesEndpoint(unittest.TestCase):
+    """测试候选回复接口"""
+
+    def test_endpoint(self):
+        """测试/chat/candidates返回k个候选"""
+        with FakeOllamaServer() as server:
+            llm = ollamaByLangchain.initialize_ollama_model(server.base_url, "fake-model")
+            agent = ollamaByLangchain.create_conversation_agent(
+                llm, [], ollamaByLangchain.load_prompt_template()
+            )
+            app = ollamaByLangchain.create_app(agent, LLMGateway([server.base_url]))
+            with TestClient(app) as client:
+                response = client.post("/chat/candidates", json={"message": "岔路口", "n": 4, "k": 3})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["candidates"]), 3)
+                self.assertEqual(client.post("/chat/candidates",
+                                             json={"message": "岔路口", "n": 99}).status_code, 400)
+
+    def test_endpoint_busy(self):
+        """测试网关饱和(无并发槽位且不允许排队)时返回429而非500"""
+        with FakeOllamaServer() as server:
+            llm = ollamaByLangchain.initialize_ollama_model(server.base_url, "fake-model")
+            agent = ollamaByLangchain.create_conversation_agent(
+                llm, [], ollamaByLangchain.load_prompt_template()
+            )
+            gateway = LLMGateway([server.base_url], max_in_flight=0, max_queue=0)
+            with TestClient(ollamaByLangchain.create_app(agent, gateway)) as client:
+                response = client.post("/chat/candidates", json={"message": "岔路口", "n": 4})
+                self.assertEqual(response.status_code, 429)
+
+
+if __name__ == "__main__":
+    unittest.main()
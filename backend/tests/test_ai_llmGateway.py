@@ -0,0 +1,152 @@
+"""
+LLM网关测试模块
+===============
+
+测试backend/ai/llmGateway.py中的并发上限、优先级排队与多后端路由(模拟Ollama服务)
+"""
+
+import asyncio
+import unittest
+from backend.ai.llmGateway import (
+    LLMGateway, LLMGatewayBusy, LLMGatewayError, PRIORITY_TEAM, PRIORITY_SOLO
+)
+from backend.tools.fakeOllamaServer import FakeOllamaServer
+
+
+def run_async(coro):
+    return asyncio.run(coro)
+
+
+class TestLLMGateway(unittest.TestCase):
+    """测试LLM网关"""
+
+    def setUp(self):
+        self.server = FakeOllamaServer(token_delay=0.01).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def gateway(self, **kwargs):
+        return LLMGateway([self.server.base_url], **kwargs)
+
+    def test_generate(self):
+        """测试完整回复与统计"""
+        async def scenario():
+            gateway = self.gateway()
+            text = await gateway.generate("fake-model", "你好", options={"seed": 3})
+            stats = gateway.stats()
+            await gateway.close()
+            return text, stats
+        text, stats = run_async(scenario())
+        self.assertIn("第3号", text)
+        self.assertEqual(stats["backends"][0]["requests"], 1)
+        self.assertEqual(stats["backends"][0]["in_flight"], 0)
+
+    def test_max_in_flight(self):
+        """测试每个模型的并发上限"""
+        async def scenario():
+            gateway = self.gateway(max_in_flight=2)
+            await asyncio.gather(*(gateway.generate("fake-model", str(i)) for i in range(6)))
+            await gateway.close()
+        run_async(scenario())
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_priority_queue(self):
+        """测试团队回合请求先于先到的单人请求出队"""
+        async def scenario():
+            gateway = self.gateway(max_in_flight=1)
+            first = asyncio.create_task(gateway.generate("fake-model", "first"))
+            await asyncio.sleep(0.01)
+            solo = [asyncio.create_task(gateway.generate("fake-model", f"solo{i}", PRIORITY_SOLO))
+                    for i in range(2)]
+            await asyncio.sleep(0.01)
+            team = asyncio.create_task(gateway.generate("fake-model", "team", PRIORITY_TEAM))
+            await asyncio.sleep(0.01)
+            depth = gateway.queue_depth("fake-model")
+            await asyncio.gather(first, team, *solo)
+            await gateway.close()
+            return depth
+        self.assertEqual(run_async(scenario()), 3)
+        prompts = [body["prompt"] for body in self.server.requests]
+        self.assertEqual(prompts, ["first", "team", "solo0", "solo1"])
+
+    def test_queue_full(self):
+        """测试排队已满时拒绝"""
+        async def scenario():
+            gateway = self.gateway(max_in_flight=1, max_queue=1)
+            tasks = [asyncio.create_task(gateway.generate("fake-model", str(i))) for i in range(2)]
+            await asyncio.sleep(0.01)
+            with self.assertRaises(LLMGatewayBusy):
+                await gateway.generate("fake-model", "overflow")
+            await asyncio.gather(*tasks)
+            await gateway.close()
+        run_async(scenario())
+
+    def test_cancelled_waiter_releases_queue(self):
+        """测试取消排队请求后槽位与排队计数正确"""
+        async def scenario():
+            gateway = self.gateway(max_in_flight=1)
+            first = asyncio.create_task(gateway.generate("fake-model", "first"))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(gateway.generate("fake-model", "cancelled"))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            await first
+            await gateway.generate("fake-model", "after")
+            stats = gateway.stats()
+            await gateway.close()
+            return stats
+        stats = run_async(scenario())
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["backends"][0]["in_flight"], 0)
+        self.assertNotIn("cancelled", [body["prompt"] for body in self.server.requests])
+
+    def test_stream_close_releases_slot(self):
+        """测试关闭流时归还槽位并中止上游"""
+        self.server.responder = lambda body: [f"t{i}" for i in range(100)]
+
+        async def scenario():
+            gateway = self.gateway(max_in_flight=1)
+            tokens = gateway.stream("fake-model", "你好")
+            received = [await tokens.__anext__() for _ in range(2)]
+            await tokens.aclose()
+            in_flight = gateway.stats()["backends"][0]["in_flight"]
+            await gateway.close()
+            return received, in_flight
+        self.assertEqual(run_async(scenario()), (["t0", "t1"], 0))
+
+    def test_backend_error(self):
+        """测试后端不可用"""
+        async def scenario():
+            gateway = LLMGateway(["http://127.0.0.1:9"], timeout=1)
+            with self.assertRaises(LLMGatewayError):
+                await gateway.generate("fake-model", "你好")
+            stats = gateway.stats()
+            await gateway.close()
+            return stats
+        stats = run_async(scenario())
+        self.assertEqual((stats["backends"][0]["errors"], stats["backends"][0]["in_flight"]), (1, 0))
+
+
+class TestLeastLoadedRouting(unittest.TestCase):
+    """测试多后端最少负载路由"""
+
+    def test_spreads_across_backends(self):
+        """测试并发请求均匀分配到各后端"""
+        servers = [FakeOllamaServer(token_delay=0.02).start() for _ in range(2)]
+        try:
+            async def scenario():
+                gateway = LLMGateway([server.base_url for server in servers], max_in_flight=2)
+                await asyncio.gather(*(gateway.generate("fake-model", str(i)) for i in range(4)))
+                await gateway.close()
+            run_async(scenario())
+            self.assertEqual([len(server.requests) for server in servers], [2, 2])
+            self.assertEqual([server.max_in_flight for server in servers], [2, 2])
+        finally:
+            for server in servers:
+                server.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Ollama对话服务测试模块
+=====================
+
+测试backend/ai/ollamaByLangchain.py中的对话与流式接口(模拟Ollama服务)
+"""
+
+import json
+import time
+import asyncio
+import unittest
+from fastapi.testclient import TestClient
+from backend.ai.llmGateway import LLMGateway
+from backend.ai.ollamaByLangchain import (
+    initialize_ollama_model, load_prompt_template, create_tools,
+    create_conversation_agent, create_app, stream_agent_tokens
+)
+from backend.tools.fakeOllamaServer import FakeOllamaServer
+
+
+def parse_sse(text):
+    """解析SSE文本为(事件, 数据)列表"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestOllamaChat(unittest.TestCase):
+    """测试对话服务"""
+
+    def setUp(self):
+        self.server = FakeOllamaServer(token_delay=0.01).start()
+        llm = initialize_ollama_model(self.server.base_url, "fake-model")
+        self.agent = create_conversation_agent(llm, create_tools(), load_prompt_template())
+        self.gateway = LLMGateway([self.server.base_url])
+        self.client = TestClient(create_app(self.agent, self.gateway)).__enter__()
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        self.server.stop()
+
+    def test_chat(self):
+        """测试完整回复"""
+        response = self.client.post("/chat", json={"message": "你好", "no_cache": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["response"])
+        self.assertEqual(self.client.get("/chat/stats").json()["gateway"]["backends"][0]["requests"], 1)
+
+    def test_gateway_busy(self):
+        """测试网关排队已满时对话与流式接口返回429"""
+        self.gateway.max_in_flight = 0
+        self.gateway.max_queue = 0
+        for path in ("/chat", "/chat/stream"):
+            response = self.client.post(path, json={"message": "你好", "no_cache": True})
+            self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.server.max_in_flight, 0)
+
+    def test_chat_missing_message(self):
+        """测试缺少消息内容"""
+        self.assertEqual(self.client.post("/chat/stream", json={}).status_code, 400)
+
+    def test_chat_stream(self):
+        """测试SSE流式输出与首token延迟"""
+        response = self.client.post("/chat/stream", json={"message": "你好"})
+        self.assertEqual(response.headers["content-type"].split(";")[0], "text/event-stream")
+        events = parse_sse(response.text)
+        tokens = [data["token"] for event, data in events if event == "token"]
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual(events[-1][0], "done")
+        self.assertEqual(events[-1][1]["tokens"], len(tokens))
+        self.assertGreater(events[-1][1]["ttft_ms"], 0)
+        self.assertEqual(self.client.get("/chat/stats").json()["completed"], 1)
+
+    def test_close_aborts_upstream(self):
+        """测试关闭流时中止上游生成"""
+        self.server.responder = lambda body: [f"t{i}" for i in range(200)]
+        self.server.token_delay = 0.02
+
+        async def run():
+            gateway = LLMGateway([self.server.base_url])
+            tokens = stream_agent_tokens("你好", self.agent, gateway)
+            received = [await tokens.__anext__() for _ in range(2)]
+            await tokens.aclose()
+            await gateway.close()
+            return received
+        self.assertEqual(asyncio.run(run()), ["t0", "t1"])
+        deadline = time.time() + 3
+        while self.server.aborted == 0 and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.server.aborted, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
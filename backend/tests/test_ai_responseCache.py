@@ -0,0 +1,130 @@
+"""
+LLM响应缓存测试模块
+===================
+
+测试backend/ai/responseCache.py中的两级缓存及其在对话函数中的使用
+"""
+
+import os
+import time
+import tempfile
+import unittest
+from unittest import mock
+from backend.ai import ollamaByLangchain
+from backend.ai.responseCache import ResponseCache, make_key
+from backend.tools.fakeOllamaServer import FakeOllamaServer
+
+
+class TestMakeKey(unittest.TestCase):
+    """测试缓存键"""
+
+    def test_normalizes_whitespace(self):
+        """测试空白差异不影响缓存键"""
+        self.assertEqual(
+            make_key("m", "1", "  进入 \n 第三层 ", {"temperature": 0.7}),
+            make_key("m", "1", "进入 第三层", {"temperature": 0.7})
+        )
+
+    def test_distinguishes_fields(self):
+        """测试模型、模板版本与采样参数参与缓存键"""
+        base = make_key("m", "1", "上下文", {"seed": 1})
+        self.assertNotEqual(base, make_key("n", "1", "上下文", {"seed": 1}))
+        self.assertNotEqual(base, make_key("m", "2", "上下文", {"seed": 1}))
+        self.assertNotEqual(base, make_key("m", "1", "上下文", {"seed": 2}))
+        self.assertEqual(base, make_key("m", "1", "上下文", {"seed": 1, "top_k": None}))
+
+
+class TestResponseCache(unittest.TestCase):
+    """测试两级缓存"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "llm.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_memory_hit_counts_saved_seconds(self):
+        """测试内存命中并累计节省的模型耗时"""
+        cache = ResponseCache(maxsize=8)
+        cache.put("k", "回复", model_seconds=1.5)
+        self.assertEqual(cache.get("k"), "回复")
+        self.assertEqual(cache.get("k"), "回复")
+        stats = cache.stats()
+        self.assertEqual(stats["memory_hits"], 2)
+        self.assertEqual(stats["saved_model_seconds"], 3.0)
+
+    def test_disk_tier_survives_restart(self):
+        """测试磁盘层在新实例中命中并回填内存层"""
+        cache = ResponseCache(maxsize=8, path=self.path)
+        cache.put("k", "回复", model_seconds=2.0)
+        cache.close()
+
+        cache = ResponseCache(maxsize=8, path=self.path)
+        self.assertEqual(cache.get("k"), "回复")
+        self.assertEqual(cache.get("k"), "回复")
+        stats = cache.stats()
+        self.assertEqual((stats["disk_hits"], stats["memory_hits"]), (1, 1))
+        cache.close()
+
+    def test_disk_ttl(self):
+        """测试磁盘层条目过期"""
+        cache = ResponseCache(maxsize=8, ttl=60, path=self.path)
+        cache.put("k", "回复")
+        cache.memory.clear()
+        with mock.patch("backend.ai.responseCache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["disk_size"], 0)
+        cache.close()
+
+    def test_disk_size_eviction(self):
+        """测试磁盘层超出容量时淘汰最久未访问的条目"""
+        cache = ResponseCache(maxsize=2, path=self.path, disk_max_entries=10)
+        for i in range(11):
+            cache.put(f"k{i}", f"v{i}")
+        self.assertEqual(cache.stats()["disk_size"], 9)
+        cache.memory.clear()
+        self.assertIsNone(cache.get("k0"))
+        self.assertEqual(cache.get("k10"), "v10")
+        cache.close()
+
+    def test_bypass(self):
+        """测试绕过标记与高temperature请求不读写缓存"""
+        cache = ResponseCache(maxsize=8, max_temperature=1.0)
+        calls = []
+
+        def generate():
+            calls.append(1)
+            return "回复"
+        cache.get_or_generate("k", generate, params={"temperature": 1.5})
+        cache.get_or_generate("k", generate, bypass=True)
+        self.assertEqual(len(calls), 2)
+        self.assertIsNone(cache.get("k"))
+        cache.get_or_generate("k", generate, params={"temperature": 0.7})
+        cache.get_or_generate("k", generate, params={"temperature": 0.7})
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(cache.stats()["bypassed"], 2)
+
+
+class TestCachedChat(unittest.TestCase):
+    """测试对话函数经缓存调用模型"""
+
+    def test_repeated_prompt_calls_model_once(self):
+        """测试重复提示只调用一次模型"""
+        cache = ResponseCache(maxsize=8)
+        with FakeOllamaServer() as server, \
+                mock.patch.object(ollamaByLangchain, "response_cache", cache):
+            llm = ollamaByLangchain.initialize_ollama_model(server.base_url, "fake-model")
+            agent = ollamaByLangchain.create_conversation_agent(
+                llm, [], ollamaByLangchain.load_prompt_template()
+            )
+            first = ollamaByLangchain.chat_with_agent("进入第三层", agent)
+            second = ollamaByLangchain.chat_with_agent(" 进入第三层\n", agent)
+            self.assertEqual(first, second)
+            self.assertEqual(len(server.requests), 1)
+            ollamaByLangchain.chat_with_agent("进入第三层", agent, bypass_cache=True)
+            self.assertEqual(len(server.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+剧情上下文构建测试模块
+======================
+
+测试backend/ai/storyContext.py中的滚动摘要与token预算(aiosqlite内存库)
+"""
+
+import asyncio
+import unittest
+from backend.database.models import Base, Reply, Space, SpaceSummary
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.ai.storyContext import StoryContextBuilder, estimate_tokens, truncate_tokens
+
+
+class TestTokenHelpers(unittest.TestCase):
+    """测试token估算与截断"""
+
+    def test_estimate(self):
+        """测试中文按字计、其余按4字符计"""
+        self.assertEqual(estimate_tokens("队伍前进"), 4)
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+
+    def test_truncate(self):
+        """测试截断保留开头或结尾"""
+        self.assertEqual(truncate_tokens("一二三四五", 2), "一二")
+        self.assertEqual(truncate_tokens("一二三四五", 2, keep_end=True), "四五")
+        self.assertEqual(truncate_tokens("一二", 5), "一二")
+        self.assertEqual(truncate_tokens("一二", 0), "")
+
+
+class TestStoryContextBuilder(unittest.TestCase):
+    """测试剧情上下文构建器"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite://")
+        self.calls = []
+        self.run_async(self._setup_db())
+
+    def tearDown(self):
+        self.run_async(AsyncDBOperator.dispose())
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    async def _setup_db(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all,
+                                tables=[Space.__table__, Reply.__table__, SpaceSummary.__table__])
+        await AsyncDBOperator.create(Space, id="s1", type="fixed", author_id="u", creator_id="u",
+                                     title="遗迹", content="古老的地下遗迹")
+
+    async def summarize(self, summary, chunk):
+        await asyncio.sleep(0.01)
+        self.calls.append((chunk[0][0], chunk[-1][0]))
+        return f"{summary}[{chunk[0][0]}-{chunk[-1][0]}]"
+
+    def add_replies(self, start, end, content="队伍继续前进"):
+        self.run_async(AsyncDBOperator.bulk_create(Reply, [
+            {"id": f"r{i}", "space_id": "s1", "author_id": "u", "content": f"{content}{i}", "floor_num": i}
+            for i in range(start, end + 1)
+        ]))
+
+    def builder(self, **kwargs):
+        options = {"recent_replies": 20, "summarize_every": 20, "token_budget": 2048, **kwargs}
+        return StoryContextBuilder(self.summarize, AsyncDBOperator, **options)
+
+    def test_short_thread_without_summary(self):
+        """测试楼层少于窗口时不生成摘要"""
+        self.add_replies(1, 10)
+        context = self.run_async(self.builder().build("s1"))
+        self.assertEqual(context.floors, list(range(1, 11)))
+        self.assertEqual(context.summary, "")
+        self.assertEqual(self.calls, [])
+        self.assertIn("古老的地下遗迹", context.prompt)
+
+    def test_incremental_summary(self):
+        """测试每K条新回复更新一次摘要"""
+        self.add_replies(1, 100)
+        builder = self.builder()
+        context = self.run_async(builder.build("s1"))
+        self.assertEqual(self.calls, [(1, 80)])
+        self.assertEqual((context.summary, context.summarized_floor), ("[1-80]", 80))
+        self.assertEqual(context.floors, list(range(81, 101)))
+        self.assertIn("前情提要: [1-80]", context.prompt)
+
+        self.add_replies(101, 119)
+        self.run_async(builder.build("s1"))
+        self.assertEqual(len(self.calls), 1)
+
+        self.add_replies(120, 120)
+        context = self.run_async(builder.build("s1"))
+        self.assertEqual(self.calls[-1], (81, 100))
+        self.assertEqual(context.floors, list(range(101, 121)))
+
+    def test_summary_is_persisted(self):
+        """测试摘要已保存，新实例无需重新计算"""
+        self.add_replies(1, 100)
+        self.run_async(self.builder().build("s1"))
+        context = self.run_async(self.builder().build("s1"))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(context.summary, "[1-80]")
+
+    def test_concurrent_builds_summarize_once(self):
+        """测试并发构建只调用一次摘要"""
+        self.add_replies(1, 100)
+        builder = self.builder()
+
+        async def scenario():
+            return await asyncio.gather(*(builder.build("s1") for _ in range(5)))
+        contexts = self.run_async(scenario())
+        self.assertEqual(self.calls, [(1, 80)])
+        self.assertTrue(all(c.summarized_floor == 80 for c in contexts))
+
+    def test_token_budget(self):
+        """测试超出预算时丢弃最早的回复并保留最新回复"""
+        self.add_replies(1, 30, content="长" * 50)
+        context = self.run_async(self.builder(recent_replies=30, token_budget=300).build("s1"))
+        self.assertLessEqual(context.tokens, 300)
+        self.assertEqual(context.floors[-1], 30)
+        self.assertLess(len(context.floors), 30)
+
+    def test_large_backlog_is_chunked(self):
+        """测试大量未摘要楼层按预算分块摘要"""
+        self.add_replies(1, 220, content="长" * 50)
+        context = self.run_async(self.builder(token_budget=600).build("s1"))
+        self.assertGreater(len(self.calls), 1)
+        self.assertEqual(self.calls[0][0], 1)
+        self.assertEqual(self.calls[-1][1], 200)
+        self.assertEqual(context.summarized_floor, 200)
+
+    def test_missing_space(self):
+        """测试空间不存在"""
+        with self.assertRaises(ValueError):
+            self.run_async(self.builder().build("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
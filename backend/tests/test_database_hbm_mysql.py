@@ -0,0 +1,97 @@
+"""
+MySQL同步数据库操作测试模块(SQLite)
+===================================
+
+测试backend/database/hbm_mysql.py中DBOperator的ORM读取与只读行查询(SQLite内存库)，
+以及backend/database/rowReader.py中的行类型与语句缓存
+"""
+
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine, event
+from backend.database import hbm_mysql
+from backend.database.hbm_mysql import DBOperator
+from backend.database.models import Base, User
+from backend.database.rowReader import read_query, row_type
+
+
+class TestDBOperatorSQLite(unittest.TestCase):
+    """测试DBOperator读取路径"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = hbm_mysql.configure("sqlite://")
+        Base.metadata.create_all(cls.engine, tables=[User.__table__])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.dispose()
+
+    def setUp(self):
+        DBOperator.bulk_create("users", [
+            {"id": f"id_{i}", "username": f"test_{i}", "password_hash": "hash",
+             "email": f"test_{i}@test.com" if i else None, "birthdate": date(2000, 1, i + 1)}
+            for i in range(4)
+        ])
+
+    def tearDown(self):
+        DBOperator.delete(User)
+
+    def test_orm_instance_usable_after_session(self):
+        """测试会话关闭后ORM实例属性仍可读取，模型可按表名解析"""
+        user = DBOperator.get_one("users", username="test_1")
+        self.assertEqual((user.email, user.birthdate), ("test_1@test.com", date(2000, 1, 2)))
+        self.assertEqual(len(DBOperator.get_all("users", password_hash="hash")), 4)
+
+    def test_fetch_rows(self):
+        """测试只读查询返回不可变命名元组"""
+        row = DBOperator.fetch_one("users", ("username", "birthdate"), id="id_2")
+        self.assertEqual(row, ("test_2", date(2000, 1, 3)))
+        self.assertEqual(row.username, "test_2")
+        with self.assertRaises(AttributeError):
+            row.username = "other"
+        self.assertIsNone(DBOperator.fetch_one(User, id="missing"))
+
+        rows = DBOperator.fetch_all(User, password_hash="hash")
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]._fields, tuple(User.__table__.columns.keys()))
+        self.assertEqual([row.username for row in DBOperator.fetch_all(User, ["username"], email=None)],
+                         ["test_0"])
+
+    def test_unknown_column(self):
+        """测试未知列名与未知表名"""
+        with self.assertRaises(ValueError):
+            DBOperator.fetch_all(User, ["missing"])
+        with self.assertRaises(ValueError):
+            DBOperator.fetch_one(User, missing=1)
+        with self.assertRaises(KeyError):
+            DBOperator.fetch_one("missing_table")
+
+    def test_statement_cache(self):
+        """测试同一形态的查询复用语句与行类型"""
+        first = read_query("users", ("id",), {"username": "a"})
+        second = read_query(User, ["id"], {"username": "b"})
+        self.assertIs(first[0], second[0])
+        self.assertEqual(second[1], {"username": "b"})
+        self.assertIs(first[2], row_type(User, ("id",)))
+
+
+
+class TestUtcSession(unittest.TestCase):
+    """测试MySQL连接的UTC会话时区"""
+
+    def test_mysql_engine_sets_time_zone(self):
+        engine = hbm_mysql.utc_session(create_engine("mysql+mysqlconnector://u:p@localhost/hbm"))
+        self.assertTrue(event.contains(engine, "connect", hbm_mysql._set_utc_time_zone))
+        connection = MagicMock()
+        hbm_mysql._set_utc_time_zone(connection, None)
+        connection.cursor.return_value.execute.assert_called_once_with("SET time_zone = '+00:00'")
+
+    def test_other_dialects_untouched(self):
+        engine = hbm_mysql.utc_session(create_engine("sqlite://"))
+        self.assertFalse(event.contains(engine, "connect", hbm_mysql._set_utc_time_zone))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+MySQL异步数据库操作测试模块
+==========================
+
+测试backend/database/hbm_mysql_async.py中的AsyncDBOperator功能(aiosqlite内存库)
+"""
+
+import asyncio
+import unittest
+from backend.database.models import Base, User
+from backend.database.hbm_mysql_async import AsyncDBOperator
+
+
+class TestAsyncDBOperator(unittest.TestCase):
+    """测试AsyncDBOperator数据库操作"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite://")
+        self.run_async(self._create_tables())
+
+    def tearDown(self):
+        self.run_async(AsyncDBOperator.dispose())
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    async def _create_tables(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__])
+
+    def _user(self, name):
+        return {"id": f"id_{name}", "username": name,
+                "email": f"{name}@test.com", "password_hash": "hash"}
+
+    def test_create_and_get_one(self):
+        """测试创建与按表名查询"""
+        self.run_async(AsyncDBOperator.create(User, **self._user("test_a")))
+        user = self.run_async(AsyncDBOperator.get_one("users", username="test_a"))
+        self.assertIsNotNone(user)
+        self.assertEqual(user.email, "test_a@test.com")
+        self.assertIsNone(self.run_async(AsyncDBOperator.get_one("users", username="missing")))
+
+    def test_bulk_create_and_get_all(self):
+        """测试批量创建与查询"""
+        self.run_async(AsyncDBOperator.bulk_create(User, [self._user(f"test_{i}") for i in range(5)]))
+        users = self.run_async(AsyncDBOperator.get_all(User, password_hash="hash"))
+        self.assertEqual(len(users), 5)
+
+    def test_update(self):
+        """测试更新记录"""
+        self.run_async(AsyncDBOperator.create(User, **self._user("test_u")))
+        updated = self.run_async(AsyncDBOperator.update(User, {"username": "test_u"}, email="new@test.com"))
+        self.assertEqual(updated[0].email, "new@test.com")
+
+    def test_delete(self):
+        """测试删除记录"""
+        self.run_async(AsyncDBOperator.create(User, **self._user("test_d")))
+        self.assertEqual(self.run_async(AsyncDBOperator.delete(User, username="test_d")), 1)
+        self.assertIsNone(self.run_async(AsyncDBOperator.get_one(User, username="test_d")))
+
+    def test_fetch_rows(self):
+        """测试只读查询返回命名元组"""
+        self.run_async(AsyncDBOperator.bulk_create(User, [self._user(f"test_{i}") for i in range(3)]))
+        row = self.run_async(AsyncDBOperator.fetch_one("users", ("id", "email"), username="test_1"))
+        self.assertEqual(row, ("id_test_1", "test_1@test.com"))
+        self.assertEqual(row.email, "test_1@test.com")
+        self.assertIsNone(self.run_async(AsyncDBOperator.fetch_one(User, username="missing")))
+        rows = self.run_async(AsyncDBOperator.fetch_all(User, ["username"], limit=2, password_hash="hash"))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(type(rows[0]).__name__, "UserRow")
+
+    def test_execute_raw(self):
+        """测试原生SQL"""
+        result = self.run_async(AsyncDBOperator.execute_raw("SELECT 1"))
+        self.assertEqual(result.scalar(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
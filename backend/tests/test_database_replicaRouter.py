@@ -0,0 +1,200 @@
+"""
+读副本路由测试
+==============
+
+测试backend/database/replicaRouter.py中的路由策略、故障回退与读己之写，
+以及DBOperator/AsyncDBOperator在多个SQLite文件库(一主多副本)间的路由
+"""
+
+import os
+import asyncio
+import tempfile
+import unittest
+import contextvars
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from backend.database import hbm_mysql
+from backend.database.hbm_mysql import DBOperator
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.database.models import Base, User
+from backend.database.replicaRouter import ReplicaRouter
+
+
+def fresh(fn, *args):
+    """在新的上下文(相当于新请求)中执行"""
+    return contextvars.Context().run(fn, *args)
+
+
+class TestReplicaRouter(unittest.TestCase):
+    """测试路由器"""
+
+    def setUp(self):
+        self.now = 0.0
+
+    def router(self, strategy):
+        return ReplicaRouter(["r0", "r1", "r2"], strategy=strategy, sticky_seconds=5,
+                             cooldown=30, clock=lambda: self.now)
+
+    def test_round_robin_skips_failed(self):
+        """测试轮询跳过失败副本，冷却后恢复"""
+        router = self.router('round_robin')
+        self.assertEqual([fresh(router.choose).engine for _ in range(4)], ["r0", "r1", "r2", "r0"])
+        router.mark_failed(router.replicas[1], RuntimeError("down"))
+        self.assertEqual([fresh(router.choose).engine for _ in range(3)], ["r2", "r0", "r2"])
+        self.now = 31
+        self.assertEqual([fresh(router.choose).engine for _ in range(3)], ["r0", "r1", "r2"])
+
+    def test_least_connections(self):
+        """测试选择进行中读取数最少的副本"""
+        router = self.router('least_connections')
+        router.acquire(router.replicas[0])
+        router.acquire(router.replicas[1])
+        self.assertEqual(fresh(router.choose).engine, "r2")
+        router.release(router.replicas[0])
+        self.assertEqual(fresh(router.choose).engine, "r0")
+
+    def test_all_failed_uses_primary(self):
+        """测试副本均不可用时使用主库"""
+        router = self.router('round_robin')
+        for replica in router.replicas:
+            router.mark_failed(replica, RuntimeError("down"))
+        self.assertIsNone(fresh(router.choose))
+        self.assertEqual(router.stats()["fallbacks"], 3)
+
+    def test_invalid_strategy(self):
+        with self.assertRaises(ValueError):
+            ReplicaRouter([], strategy="random")
+
+
+class TestDBOperatorRouting(unittest.TestCase):
+    """测试同步DBOperator在一主两副本间的路由"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        paths = [os.path.join(self.tmp.name, f"{name}.db") for name in ("primary", "r1", "r2")]
+        for path in paths:
+            engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(engine, tables=[User.__table__])
+            with engine.begin() as conn:
+                # 各库写入不同email以区分读取来源
+                conn.execute(insert(User), {"id": "u1", "username": "alice", "password_hash": "x",
+                                            "email": os.path.basename(path)})
+            engine.dispose()
+        urls = [f"sqlite:///{path}" for path in paths]
+        hbm_mysql.configure(urls[0], replica_urls=urls[1:])
+        self.router = hbm_mysql.replica_router
+
+    def tearDown(self):
+        hbm_mysql.configure("sqlite://")
+        self.tmp.cleanup()
+
+    def read_email(self):
+        return DBOperator.fetch_one(User, ("email",), id="u1").email
+
+    def test_reads_use_replicas(self):
+        """测试读取轮询副本，ORM读取与只读会话同样路由"""
+        self.assertEqual([fresh(self.read_email) for _ in range(4)], ["r1.db", "r2.db", "r1.db", "r2.db"])
+        self.assertEqual(fresh(lambda: DBOperator.get_one("users", id="u1").email), "r1.db")
+
+        def read_session_email():
+            with hbm_mysql.read_session() as session:
+                return session.get(User, "u1").email
+        self.assertEqual(fresh(read_session_email), "r2.db")
+
+    def test_read_your_writes(self):
+        """测试同一上下文写入后的读取使用主库，其他上下文不受影响"""
+        def write_then_read():
+            DBOperator.update(User, {"id": "u1"}, email="updated")
+            return self.read_email()
+        self.assertEqual(fresh(write_then_read), "updated")
+        self.assertEqual(fresh(self.read_email), "r1.db")
+
+    def test_read_only_primary_session_not_sticky(self):
+        """测试只读的主库会话不触发读己之写，提交了写入的会话才触发"""
+        def read_in_primary_session():
+            with hbm_mysql.db_session() as session:
+                session.get(User, "u1")
+            return self.read_email()
+
+        def write_in_primary_session():
+            with hbm_mysql.db_session() as session:
+                session.get(User, "u1").email = "orm"
+            return self.read_email()
+        self.assertEqual(fresh(read_in_primary_session), "r1.db")
+        self.assertEqual(fresh(write_in_primary_session), "orm")
+
+    def test_query_error_keeps_replica(self):
+        """测试查询本身导致的错误(如锁等待超时)改用主库重试，但不暂停使用副本"""
+        def query(bind):
+            if bind is not hbm_mysql.engine:
+                raise OperationalError("SELECT 1", {}, Exception("Lock wait timeout exceeded"))
+            return "primary"
+        self.assertEqual(fresh(hbm_mysql._read, query), "primary")
+        stats = self.router.stats()
+        self.assertEqual(stats["fallbacks"], 0)
+        self.assertTrue(all(replica["healthy"] for replica in stats["replicas"]))
+
+    def test_replica_failure_falls_back(self):
+        """测试副本不可用时回退主库并暂停使用该副本"""
+        broken = os.path.join(self.tmp.name, "missing", "r.db")
+        hbm_mysql.configure(f"sqlite:///{os.path.join(self.tmp.name, 'primary.db')}",
+                            replica_urls=[f"sqlite:///{broken}", f"sqlite:///{os.path.join(self.tmp.name, 'r2.db')}"])
+        self.assertEqual([fresh(self.read_email) for _ in range(3)], ["primary.db", "r2.db", "r2.db"])
+        stats = hbm_mysql.replica_router.stats()
+        self.assertEqual((stats["fallbacks"], stats["replicas"][0]["healthy"]), (1, False))
+
+
+class TestAsyncDBOperatorRouting(unittest.TestCase):
+    """测试AsyncDBOperator的副本路由"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.loop = asyncio.new_event_loop()
+        self.paths = [os.path.join(self.tmp.name, f"{name}.db") for name in ("primary", "r1")]
+        for path in self.paths:
+            engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(engine, tables=[User.__table__])
+            with engine.begin() as conn:
+                conn.execute(insert(User), {"id": "u1", "username": "alice", "password_hash": "x",
+                                            "email": os.path.basename(path)})
+            engine.dispose()
+        AsyncDBOperator.configure(f"sqlite+aiosqlite:///{self.paths[0]}",
+                                  replica_urls=[f"sqlite+aiosqlite:///{self.paths[1]}"])
+
+    def tearDown(self):
+        self.loop.run_until_complete(AsyncDBOperator.dispose())
+        self.loop.close()
+        self.tmp.cleanup()
+
+    def test_routing_and_stickiness(self):
+        """测试读取副本，写入后同一任务读取主库"""
+        async def request(write: bool):
+            if write:
+                await AsyncDBOperator.update(User, {"id": "u1"}, email="updated")
+            row = await AsyncDBOperator.fetch_one(User, ("email",), id="u1")
+            user = await AsyncDBOperator.get_one("users", id="u1")
+            return row.email, user.email
+
+        async def scenario():
+            # 每个任务拥有独立上下文，相当于独立请求
+            return (await asyncio.create_task(request(False)),
+                    await asyncio.create_task(request(True)),
+                    await asyncio.create_task(request(False)))
+        self.assertEqual(fresh(self.loop.run_until_complete, scenario()),
+                         (("r1.db", "r1.db"), ("updated", "updated"), ("r1.db", "r1.db")))
+
+    def test_read_only_session_not_sticky(self):
+        """测试只读的主库会话不触发读己之写，Core写入语句触发"""
+        async def request(statement):
+            async with AsyncDBOperator.session() as session:
+                await session.execute(statement)
+            return (await AsyncDBOperator.fetch_one(User, ("email",), id="u1")).email
+
+        async def scenario():
+            return (await asyncio.create_task(request(select(User.email))),
+                    await asyncio.create_task(request(User.__table__.update().values(email="core"))))
+        self.assertEqual(fresh(self.loop.run_until_complete, scenario()), ("r1.db", "core"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+认证缓存测试模块
+===============
+
+测试backend/modules/authCache.py及/auth/check的缓存行为
+"""
+
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+import jwt
+from fastapi.testclient import TestClient
+from backend.app import app
+from backend.modules import auth, authCache
+
+SECRET = "test-secret-key-with-at-least-32-bytes"
+
+
+class TestAuthCache(unittest.TestCase):
+    """测试/auth/check缓存"""
+
+    def setUp(self):
+        authCache.token_cache.clear()
+        authCache.user_cache.clear()
+        self.client = TestClient(app)
+        self.user = SimpleNamespace(username="cached")
+        self.token = jwt.encode({"sub": "cached", "exp": int(time.time()) + 600},
+                                SECRET, algorithm=auth.ALGORITHM)
+
+    def check(self, token):
+        return self.client.get("/api/auth/check", headers={"Authorization": f"Bearer {token}"}).json()
+
+    def test_repeat_check_skips_db(self):
+        """测试重复检查不访问数据库"""
+        token_hits, user_hits = authCache.token_cache.hits, authCache.user_cache.hits
+        with patch.object(auth, "SECRET_KEY", SECRET), \
+                patch.object(auth.AsyncDBOperator, "get_one", new=AsyncMock(return_value=self.user)) as get_one:
+            for _ in range(3):
+                self.assertTrue(self.check(self.token)["is_authenticated"])
+            self.assertEqual(get_one.await_count, 1)
+        self.assertEqual(authCache.token_cache.hits - token_hits, 2)
+        self.assertEqual(authCache.user_cache.hits - user_hits, 2)
+
+    def test_invalidate_user(self):
+        """测试用户变更后重新查询"""
+        with patch.object(auth, "SECRET_KEY", SECRET), \
+                patch.object(auth.AsyncDBOperator, "get_one", new=AsyncMock(return_value=self.user)) as get_one:
+            self.check(self.token)
+            authCache.invalidate_user("cached")
+            self.check(self.token)
+            self.assertEqual(get_one.await_count, 2)
+
+    def test_forged_payload_not_cached(self):
+        """测试复用签名伪造载荷不会命中缓存"""
+        with patch.object(auth, "SECRET_KEY", SECRET), \
+                patch.object(auth.AsyncDBOperator, "get_one", new=AsyncMock(return_value=self.user)):
+            self.check(self.token)
+            header, _, signature = self.token.split(".")
+            forged_payload = jwt.utils.base64url_encode(b'{"sub":"admin"}').decode()
+            forged = f"{header}.{forged_payload}.{signature}"
+            self.assertIsNone(authCache.get_cached_username(forged))
+            self.assertFalse(self.check(forged)["is_authenticated"])
+
+    def test_expired_token_ttl(self):
+        """测试缓存存活时间不超过令牌有效期"""
+        authCache.cache_verified_token(self.token, "cached", time.time() - 1)
+        self.assertIsNone(authCache.get_cached_username(self.token))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+卡牌强度衰减模块测试
+====================
+
+测试backend/modules/cardDecay.py中的闭式衰减公式、时间分桶与批量物化(aiosqlite内存库)
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from backend.database.models import Base, Treasure
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.cardDecay import (
+    CardDecayEngine, DecayParams, decay_strength, effective_strength
+)
+
+T0 = datetime(2026, 1, 1)
+PARAMS = DecayParams(half_life_days=10, use_decay=0.5, heat_bonus=0.25, heat_cap=1000, bucket_seconds=3600)
+
+
+class TestDecayFormula(unittest.TestCase):
+    """测试衰减公式"""
+
+    def test_half_life_and_uses(self):
+        """测试经过一个半衰期减半，每次使用按比例衰减"""
+        self.assertEqual(effective_strength(200, T0, now=T0, params=PARAMS), 200)
+        self.assertEqual(effective_strength(200, T0, now=T0 + timedelta(days=10), params=PARAMS), 100)
+        self.assertEqual(effective_strength(200, T0, use_count=2, now=T0, params=PARAMS), 50)
+
+    def test_replica_penalty_and_heat_bonus(self):
+        """测试复制品偏离度减值与原版热度加值(封顶)"""
+        self.assertEqual(effective_strength(200, T0, deviation=30, heat=1000, is_replica=True,
+                                            now=T0, params=PARAMS), 140)
+        self.assertEqual(effective_strength(200, T0, heat=500, now=T0, params=PARAMS), 225)
+        self.assertEqual(effective_strength(200, T0, heat=5000, now=T0, params=PARAMS), 250)
+        self.assertEqual(effective_strength(250, T0, heat=1000, now=T0, params=PARAMS), 256)
+
+    def test_time_bucket(self):
+        """测试同一分桶内结果稳定，时钟早于创建时间不增益"""
+        created = T0 + timedelta(minutes=30)
+        self.assertEqual(effective_strength(200, created, now=T0 + timedelta(minutes=59), params=PARAMS), 200)
+        self.assertEqual(PARAMS.bucket(T0 + timedelta(minutes=59, seconds=5)), T0)
+
+    def test_vectorized_matches_scalar(self):
+        """测试向量化计算与逐张计算一致"""
+        rng = np.random.default_rng(1)
+        n = 1000
+        strength = rng.integers(0, 257, n)
+        age = rng.integers(-3600, 90 * 86400, n)
+        uses = rng.integers(0, 10, n)
+        deviation = rng.integers(0, 101, n)
+        heat = rng.integers(0, 3000, n)
+        replica = rng.integers(0, 2, n).astype(bool)
+        values = decay_strength(strength, age, uses, deviation, heat, replica, PARAMS)
+        now = T0 + timedelta(days=100)
+        for i in range(0, n, 37):
+            created = now - timedelta(seconds=int(age[i]))
+            self.assertEqual(values[i], effective_strength(
+                int(strength[i]), created, int(uses[i]), int(deviation[i]), int(heat[i]),
+                bool(replica[i]), now, PARAMS))
+
+
+class TestCardDecayEngine(unittest.TestCase):
+    """测试衰减引擎"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite:///:memory:")
+        self.now = T0 + timedelta(days=10)
+        self.engine = CardDecayEngine(AsyncDBOperator, PARAMS, chunk_size=3, clock=lambda: self.now)
+        self.run_async(self._setup_db())
+
+    def tearDown(self):
+        self.run_async(AsyncDBOperator.dispose())
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    async def _setup_db(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Treasure.__table__])
+        await AsyncDBOperator.bulk_create(Treasure, [
+            {"id": f"card{i}", "name": f"卡{i}", "effect": "效果", "strength": 200,
+             "owner_id": "u1", "created_at": T0, "updated_at": T0,
+             "is_replica": i % 2 == 1, "deviation": 50 if i % 2 else 0}
+            for i in range(7)
+        ])
+
+    async def _values(self):
+        async with AsyncDBOperator.session() as session:
+            rows = (await session.execute(
+                select(Treasure.id, Treasure.effective_strength, Treasure.updated_at).order_by(Treasure.id)
+            )).all()
+        return {row.id: (row.effective_strength, row.updated_at) for row in rows}
+
+    def test_materialize_in_chunks(self):
+        """测试分块物化写回，未变化的行不重复写入，updated_at保持不变"""
+        stats = self.run_async(self.engine.materialize())
+        self.assertEqual((stats.scanned, stats.updated, stats.chunks), (7, 7, 3))
+        values = self.run_async(self._values())
+        self.assertEqual(values["card0"], (100, T0))
+        self.assertEqual(values["card1"], (50, T0))
+        self.assertEqual(self.run_async(self.engine.get_strength("card1")), 50)
+
+        stats = self.run_async(self.engine.materialize())
+        self.assertEqual((stats.scanned, stats.updated), (7, 0))
+
+    def test_record_use(self):
+        """测试使用后强度下降，卡牌不存在时返回None"""
+        self.assertEqual(self.run_async(self.engine.record_use("card0")), 50)
+        self.assertIsNone(self.run_async(self.engine.record_use("missing")))
+        self.assertIsNone(self.run_async(self.engine.get_strength("missing")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+紧凑游戏状态测试模块
+===================
+
+测试backend/modules/compactGameState.py中的紧凑表示与序列化
+"""
+
+import unittest
+from backend.modules.compactGameState import (
+    CompactGameState, PlayerRegistry, encode, decode, MAX_PLAYERS
+)
+from backend.modules.game import GameState
+
+
+class TestCompactGameState(unittest.TestCase):
+    """测试CompactGameState"""
+
+    def setUp(self):
+        self.registry = PlayerRegistry()
+
+    def test_interned_handles(self):
+        """测试玩家ID驻留为共享句柄"""
+        first = CompactGameState.new("g1", "alice", self.registry)
+        second = CompactGameState.new("g2", "alice", self.registry)
+        self.assertEqual(first.players[0], second.players[0])
+        self.assertEqual(len(self.registry), 1)
+
+    def test_add_player_rules(self):
+        """测试重复加入与人数上限"""
+        state = CompactGameState.new("g1", "p0", self.registry)
+        self.assertFalse(state.add_player("p0"))
+        for i in range(1, MAX_PLAYERS):
+            self.assertTrue(state.add_player(f"p{i}"))
+        self.assertFalse(state.add_player("overflow"))
+        self.assertTrue(state.has_player("p255"))
+
+    def test_encode_roundtrip(self):
+        """测试序列化往返(跨驻留表)"""
+        state = CompactGameState.new("g1", "alice", self.registry)
+        state.add_player("bob")
+        state.current_turn, state.status = 4, 1
+        restored = decode(encode(state), PlayerRegistry())
+        self.assertEqual(restored.current_turn, 4)
+        self.assertEqual(restored.status_name, "playing")
+
+    def test_handles_released(self):
+        """测试显式释放后归还句柄，句柄被复用且驻留表不随历史玩家增长"""
+        first = CompactGameState.new("g1", "alice", self.registry)
+        copy = first.copy()
+        first.add_player("bob")
+        bob = first.players[1]
+        first.release()
+        first.release()
+        self.assertEqual(len(first.players), 0)
+        self.assertEqual(len(self.registry), 1)
+        self.assertIsNone(self.registry.find("bob"))
+        with CompactGameState.new("g2", "carol", self.registry) as second:
+            self.assertEqual(second.players[0], bob)
+        copy.release()
+        self.assertEqual(len(self.registry), 0)
+        for i in range(1000):
+            with CompactGameState.new(f"g{i}", f"p{i}", self.registry) as state:
+                decode(encode(state), self.registry).release()
+        self.assertEqual(len(self.registry), 0)
+
+    def test_intern_holds_reference(self):
+        """测试intern返回的句柄已计入引用，其他持有者释放后不会被回收"""
+        handle = self.registry.intern("alice")
+        CompactGameState.new("g1", "alice", self.registry).release()
+        self.assertEqual(self.registry.find("alice"), handle)
+        with CompactGameState.new("g2", "bob", self.registry) as other:
+            self.assertNotEqual(other.players[0], handle)
+        self.registry.release((handle,))
+        self.assertEqual(len(self.registry), 0)
+
+    def test_unreleased_state_keeps_handles(self):
+        """测试句柄不依赖对象回收释放"""
+        state = CompactGameState.new("g1", "alice", self.registry)
+        handle = state.players[0]
+        del state
+        self.assertEqual(self.registry.find("alice"), handle)
+
+    def test_api_model_conversion(self):
+        """测试转换为API模型"""
+        state = CompactGameState.new("g1", "alice")
+        state.add_player("bob")
+        model = GameState.from_compact(state)
+        self.assertEqual(model.players, ["alice", "bob"])
+        self.assertEqual(model.status, "waiting")
+
+
+if __name__ == "__main__":
+    unittest.main()
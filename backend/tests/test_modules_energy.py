@@ -0,0 +1,135 @@
+"""
+体力模块测试
+============
+
+测试backend/modules/energy.py中的惰性恢复计算与条件更新消耗(aiosqlite临时文件库)
+"""
+
+import os
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import select, func
+from backend.database.models import Base, User, EnergyLog
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.energy import EnergyService, InsufficientEnergy, compute_energy
+from backend.modules.serverConfig import server_config
+
+T0 = datetime(2026, 1, 1)
+
+
+class TestComputeEnergy(unittest.TestCase):
+    """测试当前体力计算"""
+
+    def test_full_without_recovery_point(self):
+        """测试恢复起点为空时视为已满"""
+        self.assertEqual(compute_energy(100, 256, None, T0), (256, None))
+
+    def test_partial_recovery_keeps_progress(self):
+        """测试恢复整点后起点前移，保留不足1点的进度"""
+        now = T0 + timedelta(seconds=1500)
+        self.assertEqual(compute_energy(10, 256, T0, now, 600), (12, T0 + timedelta(seconds=1200)))
+
+    def test_caps_at_max(self):
+        """测试恢复不超过上限"""
+        self.assertEqual(compute_energy(250, 256, T0, T0 + timedelta(days=1), 600), (256, None))
+
+    def test_clock_skew(self):
+        """测试当前时间早于恢复起点"""
+        self.assertEqual(compute_energy(10, 256, T0, T0 - timedelta(minutes=5), 600), (10, T0))
+
+
+class TestRecoveryInterval(unittest.TestCase):
+    """测试恢复间隔读取服务器参数"""
+
+    def test_interval_follows_server_config(self):
+        """测试未指定间隔时按energy_recovery_rate(分钟)计算，修改后立即生效"""
+        service = EnergyService(object())
+        self.assertEqual(service.interval, 600)
+        with patch.object(server_config, "_values", {"energy_recovery_rate": 5}):
+            self.assertEqual(service.interval, 300)
+        with patch.object(server_config, "_values", {"energy_recovery_rate": 0}):
+            self.assertEqual(service.interval, 60)
+        self.assertEqual(EnergyService(object(), interval=30).interval, 30)
+
+
+class TestEnergyService(unittest.TestCase):
+    """测试体力服务"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure(f"sqlite+aiosqlite:///{os.path.join(self.tmp.name, 'energy.db')}")
+        self.now = T0
+        self.service = EnergyService(AsyncDBOperator, interval=600, clock=lambda: self.now)
+        self.run_async(self._setup_db())
+
+    def tearDown(self):
+        self.run_async(AsyncDBOperator.dispose())
+        self.loop.close()
+        self.tmp.cleanup()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    async def _setup_db(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__, EnergyLog.__table__])
+        await AsyncDBOperator.create(User, id="u1", username="u1", password_hash="x",
+                                     energy=256, max_energy=256)
+
+    async def _log_count(self):
+        async with AsyncDBOperator.session() as session:
+            return (await session.execute(select(func.count()).select_from(EnergyLog))).scalar()
+
+    def test_spend_and_recover(self):
+        """测试消耗后按时间恢复，读取不写库"""
+        status = self.run_async(self.service.spend("u1", 56, "explore", related_id="s1"))
+        self.assertEqual((status.energy, status.next_point_at), (200, T0 + timedelta(minutes=10)))
+        self.assertEqual(status.full_at, T0 + timedelta(minutes=560))
+
+        self.now = T0 + timedelta(minutes=25)
+        self.assertEqual(self.run_async(self.service.get_energy("u1")).energy, 202)
+        user = self.run_async(AsyncDBOperator.get_one(User, id="u1"))
+        self.assertEqual((user.energy, user.energy_recovery_at), (200, T0))
+
+        status = self.run_async(self.service.spend("u1", 2, "use"))
+        self.assertEqual((status.energy, status.next_point_at), (200, T0 + timedelta(minutes=30)))
+        self.assertEqual(self.run_async(self._log_count()), 2)
+
+    def test_insufficient(self):
+        """测试体力不足时不写库"""
+        with self.assertRaises(InsufficientEnergy) as ctx:
+            self.run_async(self.service.spend("u1", 300, "attack"))
+        self.assertEqual((ctx.exception.required, ctx.exception.current), (300, 256))
+        self.assertEqual(self.run_async(self._log_count()), 0)
+
+    def test_invalid(self):
+        """测试无效参数与用户不存在"""
+        with self.assertRaises(ValueError):
+            self.run_async(self.service.spend("u1", 0, "use"))
+        with self.assertRaises(ValueError):
+            self.run_async(self.service.spend("missing", 1, "use"))
+        self.assertIsNone(self.run_async(self.service.get_energy("missing")))
+
+    def test_concurrent_spends_cannot_overspend(self):
+        """测试并发消耗不会超额"""
+        async def attempt():
+            try:
+                await self.service.spend("u1", 30, "explore")
+                return True
+            except InsufficientEnergy:
+                return False
+
+        async def scenario():
+            return await asyncio.gather(*(attempt() for _ in range(12)))
+        results = self.run_async(scenario())
+        self.assertEqual(sum(results), 8)
+        self.assertEqual(self.run_async(self.service.get_energy("u1")).energy, 256 - 8 * 30)
+        self.assertEqual(self.run_async(self._log_count()), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
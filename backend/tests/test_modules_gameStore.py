@@ -0,0 +1,196 @@
+"""
+游戏状态存储测试模块
+===================
+
+测试backend/modules/gameStore.py中的存储实现、快照，以及GameCore的乐观并发
+"""
+
+import asyncio
+import unittest
+import fakeredis
+from backend.database.models import Base, GameSnapshot
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.game import GameCore
+from backend.modules.compactGameState import CompactGameState, MAX_PLAYERS, player_registry
+from backend.modules.gameStore import (
+    InMemoryGameStateStore, RedisGameStateStore, GameSnapshotter
+)
+
+
+class StoreContractMixin:
+    """两种存储实现共用的测试用例"""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.store = self.make_store()
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.store.close())
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_create_get_cas(self):
+        """测试创建、读取与比较并设置"""
+        state = CompactGameState.new("g1", "creator")
+        self.assertTrue(self.run_async(self.store.create("g1", state)))
+        self.assertFalse(self.run_async(self.store.create("g1", state)))
+        version, loaded = self.run_async(self.store.get("g1"))
+        self.assertEqual((version, loaded.player_ids()), (1, ["creator"]))
+        loaded.current_turn = 3
+        self.assertTrue(self.run_async(self.store.compare_and_set("g1", 1, loaded)))
+        self.assertFalse(self.run_async(self.store.compare_and_set("g1", 1, loaded)))
+        version, loaded = self.run_async(self.store.get("g1"))
+        self.assertEqual((version, loaded.current_turn), (2, 3))
+
+    def test_get_returns_copy(self):
+        """测试读取结果修改后不影响存储"""
+        self.run_async(self.store.create("g1", CompactGameState.new("g1", "creator")))
+        _, loaded = self.run_async(self.store.get("g1"))
+        loaded.add_player("intruder")
+        _, again = self.run_async(self.store.get("g1"))
+        self.assertEqual(again.player_ids(), ["creator"])
+
+    def test_scan_across_shards(self):
+        """测试跨分片遍历"""
+        for i in range(20):
+            self.run_async(self.store.create(f"g{i}", CompactGameState.new(f"g{i}", "creator")))
+
+        async def collect():
+            return {game_id async for game_id, _, _ in self.store.scan()}
+        self.assertEqual(len(self.run_async(collect())), 20)
+
+    def test_concurrent_joins_not_lost(self):
+        """测试并发加入不丢失更新"""
+        core = GameCore(self.store)
+
+        async def run():
+            game_id = await core.create_game("creator")
+            await asyncio.gather(*(core.join_game(game_id, f"p{i}") for i in range(30)))
+            return await core.get_game(game_id)
+        state = self.run_async(run())
+        self.assertEqual(len(state.players), 31)
+
+    def test_player_capacity(self):
+        """测试玩家人数上限"""
+        core = GameCore(self.store)
+
+        async def run():
+            game_id = await core.create_game("p0")
+            for i in range(1, MAX_PLAYERS):
+                await core.join_game(game_id, f"p{i}")
+            return await core.join_game(game_id, "overflow"), await core.get_game(game_id)
+        joined, game = self.run_async(run())
+        self.assertFalse(joined)
+        self.assertEqual(len(game.players), MAX_PLAYERS)
+
+    def test_advance_turn_once(self):
+        """测试同一回合只能推进一次"""
+        core = GameCore(self.store)
+
+        async def run():
+            game_id = await core.create_game("creator")
+            return await asyncio.gather(*(core.advance_turn(game_id, 0) for _ in range(5)))
+        results = self.run_async(run())
+        self.assertEqual(sum(result is not None for result in results), 1)
+
+    def test_handles_returned(self):
+        """测试游戏操作与删除后玩家句柄全部归还驻留表"""
+        core = GameCore(self.store)
+        baseline = len(player_registry)
+        # 内存存储保存的状态持有句柄，Redis存储只保存编码
+        held = 11 if isinstance(self.store, InMemoryGameStateStore) else 0
+
+        async def run():
+            game_id = await core.create_game("handle-creator")
+            await asyncio.gather(*(core.join_game(game_id, f"handle-p{i}") for i in range(10)))
+            await core.start_game(game_id)
+            await core.get_game(game_id)
+            (await core.advance_turn(game_id, 0)).release()
+            self.assertEqual(len(player_registry), baseline + held)
+            await self.store.delete(game_id)
+        self.run_async(run())
+        self.assertEqual(len(player_registry), baseline)
+
+
+class TestInMemoryGameStateStore(StoreContractMixin, unittest.TestCase):
+    """测试内存存储"""
+
+    def make_store(self):
+        return InMemoryGameStateStore(shard_count=4)
+
+
+class TestRedisGameStateStore(StoreContractMixin, unittest.TestCase):
+    """测试Redis协议存储(fakeredis，两个分片)"""
+
+    def make_store(self):
+        return RedisGameStateStore([
+            fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+            for _ in range(2)
+        ])
+
+
+class TestGameSnapshotter(unittest.TestCase):
+    """测试MySQL快照(aiosqlite)"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite://")
+        self.loop.run_until_complete(self._create_tables())
+
+    def tearDown(self):
+        self.loop.run_until_complete(AsyncDBOperator.dispose())
+        self.loop.close()
+
+    async def _create_tables(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[GameSnapshot.__table__])
+
+    def test_snapshot_and_restore(self):
+        """测试快照只写入变化的游戏并可恢复"""
+        async def run():
+            core = GameCore(InMemoryGameStateStore())
+            snapshotter = GameSnapshotter(core.store, interval=0)
+            game_id = await core.create_game("creator")
+            self.assertEqual(await snapshotter.snapshot_once(), 1)
+            self.assertEqual(await snapshotter.snapshot_once(), 0)
+            await core.advance_turn(game_id, 0)
+            self.assertEqual(await snapshotter.snapshot_once(), 1)
+
+            restored_core = GameCore(InMemoryGameStateStore())
+            restored_snapshotter = GameSnapshotter(restored_core.store, interval=0)
+            self.assertEqual(await restored_snapshotter.restore(), 1)
+            self.assertEqual(await restored_snapshotter.snapshot_once(), 0)
+            return await restored_core.store.get(game_id)
+        version, state = self.loop.run_until_complete(run())
+        self.assertEqual((version, state.current_turn), (2, 1))
+
+    def test_workers_snapshot_own_changes(self):
+        """测试多个worker只快照各自修改过的游戏，不回退版本"""
+        async def run():
+            server = fakeredis.FakeServer()
+            cores = [GameCore(RedisGameStateStore([fakeredis.FakeAsyncRedis(server=server, decode_responses=True)]))
+                     for _ in range(2)]
+            snapshotters = [GameSnapshotter(core.store, interval=0) for core in cores]
+            game_id = await cores[0].create_game("creator")
+            await cores[0].create_game("other")
+            await cores[1].join_game(game_id, "p2")
+            counts = [await snapshotter.snapshot_once() for snapshotter in snapshotters]
+            await cores[1].advance_turn(game_id, 0)
+            counts += [await snapshotter.snapshot_once() for snapshotter in reversed(snapshotters)]
+            snapshots = await AsyncDBOperator.get_all(GameSnapshot)
+            for core in cores:
+                await core.store.close()
+            return counts, {snapshot.game_id: snapshot.version for snapshot in snapshots}[game_id]
+        counts, version = self.loop.run_until_complete(run())
+        # worker1读取到的已是最新版本，与worker0写入的快照相同，不再重复写入
+        self.assertEqual(counts, [2, 0, 1, 0])
+        self.assertEqual(version, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
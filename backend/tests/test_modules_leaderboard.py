@@ -0,0 +1,162 @@
+"""
+排行榜测试模块
+==============
+
+测试backend/modules/leaderboard.py中的两种排行索引，以及LeaderboardService的加载、
+增量更新与昨日排名快照(aiosqlite)
+"""
+
+import asyncio
+import unittest
+import fakeredis
+from sqlalchemy import insert, select
+from backend.database.models import Base, User
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.leaderboard import InMemoryLeaderboard, RedisLeaderboard, LeaderboardService
+
+
+class LeaderboardContractMixin:
+    """两种排行索引共用的测试用例"""
+
+    def make_board(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.board = self.make_board()
+        self.run_async(self.board.load([("a", 10), ("b", 30), ("c", 20), ("d", 20), ("e", 5)]))
+
+    def tearDown(self):
+        self.run_async(self.board.close())
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_rank_order(self):
+        """测试分数降序、同分按用户ID降序"""
+        self.assertEqual(self.run_async(self.board.top(10)),
+                         [(1, "b", 30), (2, "d", 20), (3, "c", 20), (4, "a", 10), (5, "e", 5)])
+        self.assertEqual(self.run_async(self.board.rank("c")), 3)
+        self.assertIsNone(self.run_async(self.board.rank("missing")))
+
+    def test_incremental_update(self):
+        """测试分数变化与移除后名次更新"""
+        self.run_async(self.board.set_score("e", 25))
+        self.run_async(self.board.set_score("f", 1))
+        self.assertEqual(self.run_async(self.board.rank("e")), 2)
+        self.assertEqual(self.run_async(self.board.rank("f")), 6)
+        self.assertTrue(self.run_async(self.board.remove("b")))
+        self.assertFalse(self.run_async(self.board.remove("b")))
+        self.assertEqual(self.run_async(self.board.top(2)), [(1, "e", 25), (2, "d", 20)])
+        self.assertEqual(self.run_async(self.board.size()), 5)
+
+    def test_add_and_incr(self):
+        """测试add不覆盖已在榜用户，incr_score按增量更新、不在榜时以初始值加入"""
+        self.assertFalse(self.run_async(self.board.add("a", 99)))
+        self.assertTrue(self.run_async(self.board.add("g", 0)))
+        self.assertEqual(self.run_async(self.board.incr_score("a", 5, 999)), 15)
+        self.assertEqual(self.run_async(self.board.incr_score("h", 3, 7)), 7)
+        self.assertEqual(self.run_async(self.board.around("a", 0)), [(4, "a", 15)])
+        self.assertEqual(self.run_async(self.board.rank("g")), 7)
+
+    def test_around(self):
+        """测试名次±k在榜首与榜尾截断"""
+        self.assertEqual([entry[1] for entry in self.run_async(self.board.around("c", 1))], ["d", "c", "a"])
+        self.assertEqual([entry[0] for entry in self.run_async(self.board.around("b", 2))], [1, 2, 3])
+        self.assertEqual([entry[0] for entry in self.run_async(self.board.around("e", 2))], [3, 4, 5])
+        self.assertEqual(self.run_async(self.board.around("missing", 2)), [])
+
+
+class TestInMemoryLeaderboard(LeaderboardContractMixin, unittest.TestCase):
+    """测试内存排行索引"""
+
+    def make_board(self):
+        return InMemoryLeaderboard()
+
+
+class TestRedisLeaderboard(LeaderboardContractMixin, unittest.TestCase):
+    """测试Redis有序集合排行索引(fakeredis)"""
+
+    def make_board(self):
+        return RedisLeaderboard(fakeredis.FakeAsyncRedis(decode_responses=True))
+
+
+class TestLeaderboardService(unittest.TestCase):
+    """测试排行榜服务(aiosqlite)"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite://")
+        self.loop.run_until_complete(self._seed())
+        self.service = LeaderboardService(InMemoryLeaderboard(), snapshot_hour=-1)
+
+    def tearDown(self):
+        self.loop.run_until_complete(AsyncDBOperator.dispose())
+        self.loop.close()
+
+    async def _seed(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__])
+            await conn.execute(insert(User), [
+                {"id": f"u{i}", "username": f"user{i}", "password_hash": "x", "email": f"u{i}@test.com",
+                 "score": score}
+                for i, score in enumerate([50, 80, None, 80])
+            ])
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_warm_and_record(self):
+        """测试从数据库加载，分数变化后增量更新"""
+        self.assertEqual(self.run_async(self.service.warm()), 4)
+        self.assertEqual(self.run_async(self.service.warm()), 0)
+        self.assertEqual(self.run_async(self.service.top(4)),
+                         [(1, "u3", 80), (2, "u1", 80), (3, "u0", 50), (4, "u2", 0)])
+        self.assertEqual(self.run_async(self.service.record_score("u2", 100)), 100)
+        self.assertIsNone(self.run_async(self.service.record_score("missing", 1)))
+        self.assertEqual(self.run_async(self.service.board.rank("u2")), 1)
+
+    def test_concurrent_record_score(self):
+        """测试并发加分后索引与数据库一致(增量更新，不以旧值覆盖)"""
+        async def run():
+            await self.service.warm()
+            await asyncio.gather(*(self.service.record_score("u0", 1) for _ in range(20)))
+            async with AsyncDBOperator.session() as session:
+                stored = (await session.execute(select(User.score).where(User.id == "u0"))).scalar()
+            return stored, await self.service.board.around("u0", 0)
+        stored, entries = self.run_async(run())
+        self.assertEqual(stored, 70)
+        self.assertEqual(entries[0][2], 70)
+
+    def test_new_user_visible(self):
+        """测试注册加入与索引加载后新增用户的补入"""
+        async def run():
+            await self.service.warm()
+            self.assertTrue(await self.service.add_user("u_new"))
+            async with AsyncDBOperator.session() as session:
+                await session.execute(insert(User), [{"id": "u_late", "username": "late", "password_hash": "x",
+                                                      "email": "late@test.com", "score": 60}])
+            return await self.service.around("u_late", 1), await self.service.around("nobody", 1)
+        late, missing = self.run_async(run())
+        self.assertIn((3, "u_late", 60), late)
+        self.assertEqual(missing, [])
+        self.assertEqual(self.run_async(self.service.board.size()), 6)
+
+    def test_snapshot_yesterday_rank(self):
+        """测试单条UPDATE写入的名次与索引一致，且不修改updated_at"""
+        async def run():
+            await self.service.warm()
+            async with AsyncDBOperator.session() as session:
+                before = dict((await session.execute(select(User.id, User.updated_at))).all())
+            self.assertEqual(await self.service.snapshot_yesterday_rank(), 4)
+            async with AsyncDBOperator.session() as session:
+                rows = (await session.execute(select(User.id, User.yesterday_rank, User.updated_at))).all()
+            return before, rows, await self.service.top(4)
+        before, rows, top = self.run_async(run())
+        self.assertEqual({row.id: row.yesterday_rank for row in rows}, {user_id: rank for rank, user_id, _ in top})
+        self.assertEqual({row.id: row.updated_at for row in rows}, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+"""
+日志写后缓冲模块测试
+====================
+
+测试backend/modules/logSink.py中的批量写入、后台任务、关闭时写完与本地文件落盘重放(aiosqlite内存库)
+"""
+
+import os
+import asyncio
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+from sqlalchemy import select, func
+from sqlalchemy.schema import CreateTable
+from backend.database.models import Base, User, EnergyLog, ExperienceLog
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.energy import EnergyService
+from backend.modules.logSink import LogSink
+
+
+class FlakyDB:
+    """可模拟数据库不可用的数据库操作类"""
+    down = False
+
+    @classmethod
+    @asynccontextmanager
+    async def session(cls):
+        if cls.down:
+            raise ConnectionError("数据库不可用")
+        async with AsyncDBOperator.session() as session:
+            yield session
+
+
+class TestLogSink(unittest.TestCase):
+    """测试日志写后缓冲"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite:///:memory:")
+        FlakyDB.down = False
+        self.run_async(self._setup_db())
+
+    def tearDown(self):
+        self.run_async(AsyncDBOperator.dispose())
+        self.loop.close()
+        self.tmp.cleanup()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    async def _setup_db(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__, EnergyLog.__table__])
+            # SQLite索引名全库唯一，experience_logs的idx_user与energy_logs冲突，仅建表不建索引
+            await conn.execute(CreateTable(ExperienceLog.__table__))
+        await AsyncDBOperator.create(User, id="u1", username="u1", password_hash="x",
+                                     energy=256, max_energy=256)
+
+    async def _count(self, model):
+        async with AsyncDBOperator.session() as session:
+            return (await session.execute(select(func.count()).select_from(model))).scalar()
+
+    def test_flush_multiple_tables(self):
+        """测试一次写入多张表"""
+        sink = LogSink(FlakyDB, batch_size=100, flush_interval=10)
+        for i in range(5):
+            sink.log_energy("u1", -1, 255 - i, "explore")
+        sink.log_experience("u1", 10, 10, "game", description="通关")
+        self.assertEqual(self.run_async(sink.flush()), 6)
+        self.assertEqual(self.run_async(self._count(EnergyLog)), 5)
+        self.assertEqual(self.run_async(self._count(ExperienceLog)), 1)
+        self.assertEqual(sink.stats()["flushes"], 1)
+
+    def test_background_flush_by_size_and_interval(self):
+        """测试达到批量大小立即写入、未达到时按间隔写入，关闭时写完"""
+        async def scenario():
+            sink = LogSink(FlakyDB, batch_size=10, flush_interval=0.05)
+            sink.start()
+            for _ in range(10):
+                sink.log_energy("u1", -1, 200, "use")
+            await asyncio.sleep(0.01)
+            by_size = await self._count(EnergyLog)
+            sink.log_energy("u1", -1, 200, "use")
+            await asyncio.sleep(0.1)
+            by_interval = await self._count(EnergyLog)
+            sink.log_energy("u1", -1, 200, "use")
+            await sink.stop()
+            return by_size, by_interval, await self._count(EnergyLog)
+        self.assertEqual(self.run_async(scenario()), (10, 11, 12))
+
+    def test_spool_and_replay(self):
+        """测试数据库不可用时落盘，恢复后重放"""
+        path = os.path.join(self.tmp.name, "spool.jsonl")
+        sink = LogSink(FlakyDB, batch_size=100, flush_interval=10, spool_path=path)
+        FlakyDB.down = True
+        sink.log_energy("u1", -5, 251, "attack", related_id="s1")
+        sink.log_experience("u1", 3, 3, "system")
+        self.assertEqual(self.run_async(sink.flush()), 0)
+        self.assertEqual(sink.stats()["spooled"], 2)
+        self.assertTrue(os.path.exists(path))
+
+        FlakyDB.down = False
+        sink.log_energy("u1", -1, 250, "use")
+        self.assertEqual(self.run_async(sink.flush()), 3)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.run_async(self._count(EnergyLog)), 2)
+        log = self.run_async(AsyncDBOperator.get_one(EnergyLog, related_id="s1"))
+        self.assertEqual((log.change_value, log.action_type), (-5, "attack"))
+        self.assertIsNotNone(log.created_at)
+
+    def test_corrupt_spool_line(self):
+        """测试本地文件中写了一半的行移入.bad文件，其余行与新记录照常写入"""
+        path = os.path.join(self.tmp.name, "spool.jsonl")
+        sink = LogSink(FlakyDB, batch_size=100, flush_interval=10, spool_path=path)
+        FlakyDB.down = True
+        sink.log_energy("u1", -5, 251, "attack")
+        self.run_async(sink.flush())
+        with open(path, "a", encoding="utf-8") as spool:
+            spool.write('{"table": "energy_logs", "row": {"user_id": "u1", "chan')
+
+        FlakyDB.down = False
+        sink.log_energy("u1", -1, 250, "use")
+        self.assertEqual(self.run_async(sink.flush()), 2)
+        self.assertFalse(os.path.exists(path))
+        with open(path + ".bad", encoding="utf-8") as bad:
+            self.assertTrue(bad.read().startswith('{"table": "energy_logs"'))
+        self.assertEqual(self.run_async(self._count(EnergyLog)), 2)
+        self.assertEqual((sink.stats()["replayed"], sink.stats()["errors"]), (1, 2))
+
+        sink.log_energy("u1", -1, 249, "use")
+        self.assertEqual(self.run_async(sink.flush()), 1)
+
+    def test_spool_replay_failure_does_not_block(self):
+        """测试本地文件重放失败(如记录列与表结构不符)时保留文件，新记录仍写入"""
+        path = os.path.join(self.tmp.name, "spool.jsonl")
+        with open(path, "w", encoding="utf-8") as spool:
+            spool.write('{"table": "energy_logs", "row": {"no_such_column": 1}}\n')
+        sink = LogSink(FlakyDB, batch_size=100, flush_interval=10, spool_path=path)
+        sink.log_energy("u1", -1, 250, "use")
+        self.assertEqual(self.run_async(sink.flush()), 1)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.run_async(self._count(EnergyLog)), 1)
+
+    def test_requeue_and_drop_without_spool(self):
+        """测试未配置落盘时放回缓冲区，超过上限丢弃最早记录"""
+        sink = LogSink(FlakyDB, batch_size=100, flush_interval=10, max_buffer=3)
+        FlakyDB.down = True
+        for i in range(3):
+            sink.log_energy("u1", -1, i, "use")
+        self.run_async(sink.flush())
+        sink.log_energy("u1", -1, 3, "use")
+        self.assertEqual(sink.stats()["buffered"], 3)
+        self.assertEqual(sink.stats()["dropped"], 1)
+
+        FlakyDB.down = False
+        self.assertEqual(self.run_async(sink.flush()), 3)
+        values = self.run_async(AsyncDBOperator.get_all(EnergyLog))
+        self.assertEqual(sorted(log.current_value for log in values), [1, 2, 3])
+
+    def test_energy_service_with_sink(self):
+        """测试体力消耗经日志缓冲写入"""
+        sink = LogSink(FlakyDB, batch_size=100, flush_interval=10)
+        service = EnergyService(AsyncDBOperator, log_sink=sink)
+        self.run_async(service.spend("u1", 6, "explore"))
+        self.assertEqual(self.run_async(self._count(EnergyLog)), 0)
+        self.run_async(sink.flush())
+        log = self.run_async(AsyncDBOperator.get_one(EnergyLog, user_id="u1"))
+        self.assertEqual((log.change_value, log.current_value), (-6, 250))
+
+
+if __name__ == "__main__":
+    unittest.main()
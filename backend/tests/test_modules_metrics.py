@@ -0,0 +1,45 @@
+"""
+请求指标测试模块
+===============
+
+测试backend/modules/metrics.py中的中间件与/api/_metrics接口
+"""
+
+import unittest
+from fastapi.testclient import TestClient
+from backend.app import app
+from backend.modules.metrics import metrics_registry
+
+
+class TestMetrics(unittest.TestCase):
+    """测试请求指标"""
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.client = TestClient(app)
+
+    def test_route_template_recorded(self):
+        """测试按路由模板记录延迟"""
+        self.client.get("/api/auth/check")
+        self.client.get("/api/auth/check")
+        histogram = metrics_registry.histograms[("GET", "/api/auth/check")]
+        self.assertEqual(histogram.total, 2)
+
+    def test_unmatched_route_grouped(self):
+        """测试未匹配路由归类"""
+        self.client.get("/no/such/path/1")
+        self.client.get("/no/such/path/2")
+        self.assertEqual(metrics_registry.status_counts[("GET", "<unmatched>", 404)], 2)
+
+    def test_prometheus_export(self):
+        """测试Prometheus文本输出"""
+        self.client.get("/api/auth/check")
+        body = self.client.get("/api/_metrics").text
+        self.assertIn('hbm_http_request_duration_seconds{method="GET",route="/api/auth/check",quantile="0.99"}', body)
+        self.assertIn('hbm_http_requests_total{method="GET",route="/api/auth/check",status="200"} 1', body)
+        self.assertIn('hbm_cache_requests_total{cache="auth_token",result="hit"}', body)
+        self.assertIn('hbm_server_config_reloads_total ', body)
+
+
+if __name__ == "__main__":
+    unittest.main()
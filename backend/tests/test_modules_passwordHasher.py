@@ -0,0 +1,73 @@
+"""
+密码哈希服务测试模块
+===================
+
+测试backend/modules/passwordHasher.py中的PasswordHasher功能
+"""
+
+import asyncio
+import unittest
+from backend.modules.passwordHasher import PasswordHasher, HasherBusyError
+
+
+class TestPasswordHasher(unittest.TestCase):
+    """测试PasswordHasher"""
+
+    def setUp(self):
+        self.hasher = PasswordHasher(rounds=5, max_workers=2, max_pending=4)
+
+    def tearDown(self):
+        self.hasher.shutdown()
+
+    def test_hash_and_verify(self):
+        """测试哈希与校验"""
+        async def run():
+            hashed = await self.hasher.hash("Secret123!")
+            self.assertTrue(await self.hasher.verify("Secret123!", hashed))
+            self.assertFalse(await self.hasher.verify("wrong", hashed))
+        asyncio.run(run())
+
+    def test_rehash_outdated_cost(self):
+        """测试成本因子过期时登录重哈希"""
+        old = PasswordHasher(rounds=4, max_workers=1)
+        try:
+            async def run():
+                old_hash = await old.hash("Secret123!")
+                self.assertTrue(self.hasher.needs_update(old_hash))
+                verified, new_hash = await self.hasher.verify_and_update("Secret123!", old_hash)
+                self.assertTrue(verified)
+                self.assertIsNotNone(new_hash)
+                self.assertFalse(self.hasher.needs_update(new_hash))
+                verified, again = await self.hasher.verify_and_update("Secret123!", new_hash)
+                self.assertTrue(verified)
+                self.assertIsNone(again)
+            asyncio.run(run())
+        finally:
+            old.shutdown()
+
+    def test_wrong_password_no_rehash(self):
+        """测试密码错误时不返回新哈希"""
+        async def run():
+            hashed = await self.hasher.hash("Secret123!")
+            self.assertEqual(await self.hasher.verify_and_update("wrong", hashed), (False, None))
+        asyncio.run(run())
+
+    def test_backpressure(self):
+        """测试排队超限时拒绝"""
+        hasher = PasswordHasher(rounds=8, max_workers=1, max_pending=1)
+        try:
+            async def run():
+                return await asyncio.gather(
+                    hasher.hash("a"), hasher.hash("b"), return_exceptions=True
+                )
+            results = asyncio.run(run())
+            self.assertIsInstance(results[0], str)
+            self.assertIsInstance(results[1], HasherBusyError)
+            self.assertEqual(hasher.rejected, 1)
+            self.assertEqual(hasher.pending, 0)
+        finally:
+            hasher.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+请求限流测试模块
+================
+
+测试backend/modules/rateLimiter.py中的GCRA限流(内存与Redis协议存储)及路由依赖
+"""
+
+import asyncio
+import unittest
+import fakeredis
+from unittest.mock import patch
+from fastapi import FastAPI, Depends
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.testclient import TestClient
+from backend.modules import rateLimiter
+from backend.modules.rateLimiter import (
+    RateRule, InMemoryRateLimiter, RedisRateLimiter, limit_by_ip, limit_by_username, SWEEP_EVERY
+)
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+
+class DownRedis:
+    """所有操作都连接失败的Redis客户端"""
+
+    def pipeline(self, **kwargs):
+        raise RedisConnectionError("Connection refused")
+
+    async def get(self, key):
+        raise RedisConnectionError("Connection refused")
+
+    async def aclose(self):
+        pass
+
+RULE = RateRule("test", limit=3, period=30)
+
+
+class LimiterContractMixin:
+    """两种存储实现共用的测试用例"""
+
+    def make_limiter(self, clock):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.now = 1000.0
+        self.limiter = self.make_limiter(lambda: self.now)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.limiter.close())
+        self.loop.close()
+
+    def check(self, key="1.2.3.4", rule=RULE):
+        return self.loop.run_until_complete(self.limiter.check(rule, key))
+
+    def test_burst_then_limit(self):
+        """测试允许突发limit次，之后按period/limit的间隔放行"""
+        self.assertEqual([self.check() for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(self.loop.run_until_complete(self.limiter.retry_after(RULE, "1.2.3.4")), 10)
+        self.now += 9.9
+        self.assertFalse(self.check())
+        self.now += 0.1
+        self.assertEqual([self.check(), self.check()], [True, False])
+        self.now += 30
+        self.assertEqual([self.check() for _ in range(4)], [True, True, True, False])
+
+    def test_keys_and_rules_independent(self):
+        """测试不同键、不同规则分别计数"""
+        for _ in range(3):
+            self.check()
+        self.assertFalse(self.check())
+        self.assertTrue(self.check("5.6.7.8"))
+        self.assertTrue(self.check(rule=RateRule("other", limit=1, period=30)))
+
+
+class TestInMemoryRateLimiter(LimiterContractMixin, unittest.TestCase):
+    """测试内存存储"""
+
+    def make_limiter(self, clock):
+        return InMemoryRateLimiter(shard_count=4, clock=clock)
+
+    def test_lazy_expiry(self):
+        """测试已恢复满额的键被分批清理"""
+        for i in range(100):
+            self.check(f"ip{i}")
+        self.now += 60
+        for _ in range(SWEEP_EVERY * 4):
+            self.check("active")
+        self.assertEqual(len(self.limiter), 1)
+
+
+class TestRedisRateLimiter(LimiterContractMixin, unittest.TestCase):
+    """测试Redis协议存储(fakeredis)"""
+
+    def make_limiter(self, clock):
+        return RedisRateLimiter(fakeredis.FakeAsyncRedis(decode_responses=True), clock=clock)
+
+
+class TestRateLimitDependency(unittest.TestCase):
+    """测试路由依赖"""
+
+    def setUp(self):
+        app = FastAPI()
+
+        @app.post("/login", dependencies=[limit_by_ip(RateRule("ip", 5, 60)),
+                                          limit_by_username(RateRule("user", 2, 60))])
+        async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+            return {"username": form_data.username}
+
+        self.client = TestClient(app)
+        self.patcher = patch.object(rateLimiter, "rate_limiter", InMemoryRateLimiter())
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def login(self, username):
+        return self.client.post("/login", data={"username": username, "password": "x"})
+
+    def test_limits(self):
+        """测试按用户名与按IP限流，超限返回429与Retry-After"""
+        self.assertEqual([self.login("alice").status_code for _ in range(3)], [200, 200, 429])
+        response = self.login("alice")
+        self.assertEqual(response.headers["Retry-After"], "30")
+        # 同一IP第5次请求仍可用其他用户名，第6次被IP规则拒绝
+        self.assertEqual(self.login("bob").status_code, 200)
+        response = self.login("carol")
+        self.assertEqual((response.status_code, response.headers["Retry-After"]), (429, "12"))
+
+    def test_redis_down(self):
+        """测试Redis不可用时默认放行，配置拒绝时返回503"""
+        with patch.object(rateLimiter, "rate_limiter", RedisRateLimiter(DownRedis())):
+            self.assertEqual([self.login("alice").status_code for _ in range(3)], [200, 200, 200])
+            with patch.object(rateLimiter, "FAIL_OPEN", False):
+                self.assertEqual(self.login("alice").status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+回复写入测试模块
+================
+
+测试backend/modules/replyWriter.py中的楼层号块预分配与回复组提交(aiosqlite)
+"""
+
+import os
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from backend.database.models import Base, Reply, Space
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.replyWriter import FloorAllocator, ReplyWriter
+
+
+class TestReplyWriter(unittest.TestCase):
+    """测试楼层号分配与批量写入(文件库，各会话使用独立连接)"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure(f"sqlite+aiosqlite:///{os.path.join(self.tmp.name, 'replies.db')}")
+        self.loop.run_until_complete(self._seed())
+
+    def tearDown(self):
+        self.loop.run_until_complete(AsyncDBOperator.dispose())
+        self.loop.close()
+        self.tmp.cleanup()
+
+    async def _seed(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Space.__table__, Reply.__table__])
+            await conn.execute(insert(Space), [
+                {"id": space_id, "type": "stable", "author_id": "u", "creator_id": "u",
+                 "title": space_id, "content": "内容"}
+                for space_id in ("s1", "s2")
+            ])
+
+    async def _floors(self, space_id):
+        async with AsyncDBOperator.session() as session:
+            return (await session.execute(
+                select(Reply.floor_num).where(Reply.space_id == space_id).order_by(Reply.floor_num)
+            )).scalars().all()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_concurrent_posts(self):
+        """测试并发回复楼层号唯一连续，按批写入"""
+        writer = ReplyWriter(FloorAllocator(block_size=64), batch_size=50, batch_window=0.01)
+
+        async def run():
+            rows = await asyncio.gather(*(writer.post("s1", f"u{i}", f"回复{i}") for i in range(200)))
+            return rows, await self._floors("s1")
+        rows, floors = self.run_async(run())
+        self.assertEqual(sorted(row["floor_num"] for row in rows), list(range(1, 201)))
+        self.assertEqual(floors, list(range(1, 201)))
+        self.assertEqual(writer.stats()["reservations"], 4)
+        self.assertLess(writer.batches, 10)
+
+    def test_workers_get_disjoint_blocks(self):
+        """测试两个worker(各自的分配器)预分配的块互不重叠"""
+        first, second = FloorAllocator(block_size=4), FloorAllocator(block_size=4)
+
+        async def run():
+            return (await first.allocate("s1", 3), await second.allocate("s1", 2),
+                    await first.allocate("s1", 3), await second.allocate("s2"))
+        self.assertEqual(self.run_async(run()), ([1, 2, 3], [5, 6], [4, 9, 10], [1]))
+
+    def test_conflict_reallocates(self):
+        """测试楼层号被外部写入占用时重新分配"""
+        writer = ReplyWriter(FloorAllocator(block_size=8), batch_window=0)
+
+        async def run():
+            await writer.post("s1", "u1", "第一")
+            async with AsyncDBOperator.session() as session:
+                await session.execute(insert(Reply), {"id": "external", "space_id": "s1", "author_id": "u2",
+                                                      "content": "外部写入", "floor_num": 2})
+            row = await writer.post("s1", "u3", "第二")
+            return row, await self._floors("s1")
+        row, floors = self.run_async(run())
+        self.assertEqual(row["floor_num"], 9)
+        self.assertEqual(floors, [1, 2, 9])
+        self.assertEqual(writer.conflicts, 1)
+
+    def test_other_integrity_error_fails_fast(self):
+        """测试楼层号以外的约束错误不重新分配楼层号"""
+        writer = ReplyWriter(FloorAllocator(block_size=8), batch_window=0)
+
+        async def run():
+            await writer.post("s1", "u1", "第一")
+            async with AsyncDBOperator.session() as session:
+                await session.execute(insert(Reply), {"id": "taken", "space_id": "s2", "author_id": "u2",
+                                                      "content": "外部写入", "floor_num": 1})
+            with patch("backend.modules.replyWriter.uuid.uuid4", return_value="taken"):
+                with self.assertRaises(IntegrityError):
+                    await writer.post("s1", "u3", "第二")
+            return await self._floors("s1")
+        self.assertEqual(self.run_async(run()), [1])
+        self.assertEqual(writer.allocator.reservations, 1)
+
+    def test_missing_space(self):
+        """测试空间不存在"""
+        with self.assertRaises(ValueError):
+            self.run_async(ReplyWriter().post("missing", "u1", "内容"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,239 @@
+"""
+服务器配置测试模块
+==================
+
+测试backend/modules/serverConfig.py中的类型转换、加载与默认值、轮询刷新，以及经Redis频道(fakeredis)的变更通知(aiosqlite)
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+import fakeredis
+from sqlalchemy import insert, update
+from backend.database.models import Base, ServerConfig
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.serverConfig import ServerConfigRegistry, coerce
+
+
+class FailingPubSub:
+    """读取时总是失败的订阅(模拟Redis断开)"""
+
+    def __init__(self):
+        self.closed = False
+
+    async def subscribe(self, channel):
+        pass
+
+    async def get_message(self, **kwargs):
+        await asyncio.sleep(0)
+        raise ConnectionError("连接已断开")
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FlakyRedis:
+    """前failures次创建的订阅读取失败，其余操作转发给fakeredis"""
+
+    def __init__(self, redis, failures: int):
+        self.redis = redis
+        self.failures = failures
+        self.pubsubs = []
+
+    def pubsub(self):
+        pubsub = FailingPubSub() if len(self.pubsubs) < self.failures else self.redis.pubsub()
+        self.pubsubs.append(pubsub)
+        return pubsub
+
+    def __getattr__(self, name):
+        return getattr(self.redis, name)
+
+
+class TestCoerce(unittest.TestCase):
+    """测试按data_type转换"""
+
+    def test_types(self):
+        """测试各类型转换与无效值"""
+        self.assertEqual(coerce("42", "int"), 42)
+        self.assertEqual(coerce("0.25", "float"), 0.25)
+        self.assertIs(coerce(" Yes", "bool"), True)
+        self.assertIs(coerce("off", "bool"), False)
+        self.assertEqual(coerce("abc", "string"), "abc")
+        for value, data_type in (("1.5", "int"), ("maybe", "bool"), ("1", "json")):
+            with self.assertRaises(ValueError):
+                coerce(value, data_type)
+
+
+class TestServerConfigRegistry(unittest.TestCase):
+    """测试加载、刷新与写入"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite://")
+        self.loop.run_until_complete(self._seed())
+        self.registry = self._registry()
+
+    def tearDown(self):
+        for registry in getattr(self, "registries", [self.registry]):
+            self.loop.run_until_complete(registry.stop())
+        self.loop.run_until_complete(AsyncDBOperator.dispose())
+        self.loop.close()
+
+    def _registry(self, **kwargs) -> ServerConfigRegistry:
+        registry = ServerConfigRegistry(**kwargs)
+        registry.define('max_energy', 'int', 256)
+        registry.define('zero_energy_weight', 'float', 0.5)
+        registry.define('maintenance', 'bool', False)
+        return registry
+
+    async def _seed(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[ServerConfig.__table__])
+            await conn.execute(insert(ServerConfig), [
+                {"config_key": "max_energy", "config_value": "300", "data_type": "int"},
+                {"config_key": "zero_energy_weight", "config_value": "abc", "data_type": "float"},
+                {"config_key": "motd", "config_value": "你好", "data_type": "string"},
+            ])
+
+    async def _write(self, key, value):
+        async with AsyncDBOperator.session() as session:
+            await session.execute(update(ServerConfig).where(ServerConfig.config_key == key).values(config_value=value))
+
+    def test_load_and_defaults(self):
+        """测试加载后读取转换后的值，缺少或无效的行使用默认值"""
+        self.assertEqual(self.registry.get('max_energy'), 256)
+        self.assertEqual(self.loop.run_until_complete(self.registry.load()), 2)
+        self.assertEqual(self.registry.get('max_energy'), 300)
+        self.assertEqual(self.registry.get(self.registry.options['zero_energy_weight']), 0.5)
+        self.assertIs(self.registry.get('maintenance'), False)
+        self.assertEqual(self.registry['motd'], "你好")
+        self.assertEqual(self.registry.get('missing', 7), 7)
+        with self.assertRaises(KeyError):
+            self.registry['missing']
+
+    def test_refresh_only_on_change(self):
+        """测试轮询在内容未变化时不重新加载"""
+        async def run():
+            await self.registry.load()
+            unchanged = await self.registry.refresh()
+            await self._write('max_energy', '320')
+            return unchanged, await self.registry.refresh()
+        self.assertEqual(self.loop.run_until_complete(run()), (False, True))
+        self.assertEqual(self.registry.get('max_energy'), 320)
+        self.assertEqual(self.registry.stats()["reloads"], 2)
+        self.assertEqual(self.registry.stats()["polls"], 2)
+
+    def test_set(self):
+        """测试写入已有项与新项，值与类型不符时拒绝"""
+        async def run():
+            await self.registry.set('zero_energy_weight', 0.3)
+            await self.registry.set('maintenance', True)
+            with self.assertRaises(ValueError):
+                await self.registry.set('max_energy', 'many')
+            with self.assertRaises(ValueError):
+                await self.registry.set('undeclared', 1)
+        self.loop.run_until_complete(run())
+        self.assertEqual(self.registry.get('zero_energy_weight'), 0.3)
+        self.assertIs(self.registry.get('maintenance'), True)
+        self.assertEqual(self.registry.get('max_energy'), 300)
+
+    def test_set_retries_concurrent_insert(self):
+        """测试新项插入与另一worker冲突(唯一键)时重试为UPDATE"""
+        from sqlalchemy.exc import IntegrityError
+        write = self.registry._write
+        other = self._registry()
+
+        async def racing_write(*args):
+            # 模拟另一个worker先插入了同一新项
+            if racing.call_count == 1:
+                await other.set('maintenance', False)
+                raise IntegrityError("INSERT", {}, Exception("Duplicate entry 'maintenance'"))
+            await write(*args)
+
+        async def run():
+            await self.registry.set('maintenance', True)
+        with patch.object(self.registry, "_write", side_effect=racing_write) as racing:
+            self.loop.run_until_complete(run())
+        self.assertEqual(racing.call_count, 2)
+        self.assertIs(self.registry.get('maintenance'), True)
+
+    def test_polling_task(self):
+        """测试后台任务按间隔轮询到数据库中的修改"""
+        self.registry.poll_interval = 0.02
+
+        async def run():
+            await self.registry.load()
+            self.registry.start()
+            await self._write('max_energy', '400')
+            for _ in range(100):
+                if self.registry.get('max_energy') == 400:
+                    break
+                await asyncio.sleep(0.01)
+            await self.registry.stop()
+        self.loop.run_until_complete(run())
+        self.assertEqual(self.registry.get('max_energy'), 400)
+
+    def test_notification(self):
+        """测试一个worker写入后，另一个worker经频道通知立即重新加载(不等待轮询)"""
+        server = fakeredis.FakeServer()
+        writer, reader = self.registries = [
+            self._registry(redis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+                           poll_interval=3600, read_timeout=0.05)
+            for _ in range(2)
+        ]
+
+        async def run():
+            await reader.load()
+            reader.start()
+            # 等待读取任务完成订阅
+            for _ in range(100):
+                if (await writer.redis.pubsub_numsub(writer.channel))[0][1]:
+                    break
+                await asyncio.sleep(0.01)
+            await writer.set('max_energy', 512)
+            for _ in range(100):
+                if reader.get('max_energy') == 512:
+                    break
+                await asyncio.sleep(0.01)
+        self.loop.run_until_complete(run())
+        self.assertEqual(reader.get('max_energy'), 512)
+        self.assertEqual((reader.stats()["notifications"], reader.stats()["polls"]), (1, 0))
+
+    def test_notification_reconnect(self):
+        """测试频道读取失败时退避并重新订阅，恢复后仍能收到变更，stop()不被阻塞"""
+        server = fakeredis.FakeServer()
+        flaky = FlakyRedis(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), failures=3)
+        writer = self._registry(redis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+        reader = self._registry(redis_client=flaky, poll_interval=3600, read_timeout=0.05)
+        self.registries = [writer]
+
+        async def run():
+            await reader.load()
+            reader.start()
+            await asyncio.sleep(0.5)
+            errors = reader.stats()["errors"]
+            # 等待重新订阅及随后的补偿轮询完成(内存库共用一个连接，避免与写入交错)
+            for _ in range(200):
+                if (await writer.redis.pubsub_numsub(writer.channel))[0][1] and reader.stats()["polls"] == 3:
+                    break
+                await asyncio.sleep(0.01)
+            async with reader._lock:
+                pass
+            await writer.set('max_energy', 512)
+            for _ in range(100):
+                if reader.get('max_energy') == 512:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.wait_for(reader.stop(), 1)
+            return errors
+        errors = self.loop.run_until_complete(run())
+        # 退避0.1、0.2、0.4秒，0.5秒内最多3次失败
+        self.assertLessEqual(errors, 3)
+        self.assertEqual((reader.stats()["errors"], reader.stats()["notifications"]), (3, 1))
+        self.assertEqual(len(flaky.pubsubs), 4)
+        self.assertTrue(all(pubsub.closed for pubsub in flaky.pubsubs[:3]))
+        self.assertEqual(reader.get('max_energy'), 512)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+空间事件推送测试模块
+====================
+
+测试backend/modules/spaceEvents.py中的有界队列合并、扇出、SSE响应体，以及经Redis频道(fakeredis)的跨worker投递
+"""
+
+import asyncio
+import unittest
+import fakeredis
+from backend.modules.spaceEvents import Subscription, SpaceEventHub, encode_event, event_stream
+
+
+class TestSubscription(unittest.TestCase):
+    """测试单连接队列"""
+
+    def test_coalesce_and_bound(self):
+        """测试space_update只保留最新一条，超出上限丢弃最早的事件"""
+        subscription = Subscription("s1", maxsize=3)
+        subscription.push(b"u1", "space_update")
+        subscription.push(b"p1")
+        subscription.push(b"u2", "space_update")
+        subscription.push(b"p2")
+        subscription.push(b"p3")
+        frames = asyncio.run(subscription.get(0))
+        self.assertEqual(frames, [b"u2", b"p2", b"p3"])
+        self.assertEqual(subscription.dropped, 1)
+        self.assertEqual(asyncio.run(subscription.get(0)), [])
+
+
+class TestSpaceEventHub(unittest.TestCase):
+    """测试进程内扇出与SSE响应体"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.hub = SpaceEventHub(queue_size=4)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.hub.close())
+        self.loop.close()
+
+    def test_fan_out(self):
+        """测试事件编码一次后投递到同一空间的所有连接"""
+        async def run():
+            subscriptions = [await self.hub.subscribe("s1") for _ in range(3)]
+            other = await self.hub.subscribe("s2")
+            await self.hub.publish_space_update("s1", turns_left=9)
+            await self.hub.publish_participant("s1", "join", "u1")
+            frames = [await subscription.get(0) for subscription in subscriptions]
+            self.hub.unsubscribe(subscriptions[0])
+            return frames, await other.get(0), self.hub.stats()
+        frames, other_frames, stats = self.loop.run_until_complete(run())
+        expected = [encode_event("space_update", {"turns_left": 9}),
+                    encode_event("participant_update", {"action": "join", "user_id": "u1"})]
+        self.assertEqual(frames, [expected] * 3)
+        self.assertIs(frames[0][0], frames[1][0])
+        self.assertEqual(other_frames, [])
+        self.assertEqual((stats["connections"], stats["delivered"]), (3, 6))
+
+    def test_event_stream(self):
+        """测试SSE响应体: 初始帧、事件、保活，关闭后退订"""
+        async def run():
+            stream = event_stream(self.hub, "s1", b"initial", keepalive=0.01)
+            chunks = [await stream.__anext__()]
+            await self.hub.publish_space_update("s1", turns_left=1)
+            await self.hub.publish_space_update("s1", turns_left=0)
+            chunks.append(await stream.__anext__())
+            chunks.append(await stream.__anext__())
+            await stream.aclose()
+            return chunks, self.hub.subscribers("s1")
+        chunks, subscribers = self.loop.run_until_complete(run())
+        self.assertEqual(chunks, [b"initial", encode_event("space_update", {"turns_left": 0}), b": keepalive\n\n"])
+        self.assertEqual(subscribers, 0)
+
+    def test_waiting_stream_wakes(self):
+        """测试等待中的连接收到事件后立即返回"""
+        async def run():
+            subscription = await self.hub.subscribe("s1")
+            waiting = asyncio.create_task(subscription.get(10))
+            await asyncio.sleep(0)
+            await self.hub.publish_participant("s1", "leave", "u2")
+            return await asyncio.wait_for(waiting, 1)
+        self.assertEqual(self.loop.run_until_complete(run()),
+                         [encode_event("participant_update", {"action": "leave", "user_id": "u2"})])
+
+
+class TestRedisSpaceEventHub(unittest.TestCase):
+    """测试经Redis频道的跨worker投递(fakeredis，两个事件中心模拟两个worker)"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        server = fakeredis.FakeServer()
+        self.hubs = [SpaceEventHub(fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+                                   read_timeout=0.05)
+                     for _ in range(2)]
+
+    def tearDown(self):
+        for hub in self.hubs:
+            self.loop.run_until_complete(hub.close())
+        self.loop.close()
+
+    def test_cross_worker_delivery(self):
+        """测试一个worker发布，另一个worker的连接收到；连接断开后退订频道"""
+        first, second = self.hubs
+
+        async def run():
+            local = await first.subscribe("s1")
+            remote = await second.subscribe("s1")
+            await first.publish_space_update("s1", turns_left=5)
+            frames = (await local.get(1), await remote.get(1))
+            second.unsubscribe(remote)
+            for _ in range(100):
+                if not second._subscribed:
+                    break
+                await asyncio.sleep(0.02)
+            return frames, second._subscribed, await first.redis.pubsub_numsub("hbm:space-events:s1")
+        frames, subscribed, numsub = self.loop.run_until_complete(run())
+        expected = [encode_event("space_update", {"turns_left": 5})]
+        self.assertEqual(frames, (expected, expected))
+        self.assertEqual(subscribed, set())
+        self.assertEqual(numsub, [("hbm:space-events:s1", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+空间热度与稳定度测试模块
+========================
+
+测试backend/modules/spaceHeat.py中的衰减计数、最冷/最热查询、增量写回与数据库衰减(aiosqlite)
+"""
+
+import asyncio
+import unittest
+from sqlalchemy import insert, select
+from backend.database.models import Base, Space, TaskRun
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.spaceHeat import SpaceHeatEngine
+
+HOUR = 3600
+
+
+class TestSpaceHeatEngine(unittest.TestCase):
+    """测试内存计数与查询"""
+
+    def setUp(self):
+        self.now = 1000.0
+        self.engine = SpaceHeatEngine(db_operator=object(), heat_half_life=HOUR,
+                                      stability_half_life=10 * HOUR, clock=lambda: self.now)
+
+    def test_decay(self):
+        """测试热度按半衰期衰减，稳定度限制在[0, 100]"""
+        for _ in range(8):
+            self.engine.record("s1")
+        self.now += HOUR
+        self.assertAlmostEqual(self.engine.heat("s1"), 4.0)
+        self.engine.record("s1", weight=2)
+        self.now += HOUR
+        self.assertAlmostEqual(self.engine.heat("s1"), 3.0)
+        self.assertIsNone(self.engine.stability("s1"))
+        self.assertEqual(self.engine.adjust_stability("s1", 20), 100)
+        self.now += 10 * HOUR
+        self.assertAlmostEqual(self.engine.stability("s1"), 50.0)
+        self.assertEqual(self.engine.adjust_stability("s1", -80), 0)
+
+    def test_hottest_coldest(self):
+        """测试最热/最冷查询，移除的空间不参与"""
+        for i, count in enumerate([5, 1, 9, 3, 7]):
+            self.engine.record(f"s{i}", weight=count)
+        self.assertEqual([space_id for space_id, _ in self.engine.hottest(2)], ["s2", "s4"])
+        self.assertEqual([space_id for space_id, _ in self.engine.coldest(3)], ["s1", "s3", "s0"])
+        self.assertTrue(self.engine.forget("s1"))
+        self.assertEqual([space_id for space_id, _ in self.engine.coldest(10)], ["s3", "s0", "s4", "s2"])
+        self.engine.record("s5")
+        self.assertEqual(self.engine.coldest(1), [("s5", 1.0)])
+        self.assertEqual(len(self.engine), 5)
+
+    def test_rebase_keeps_values(self):
+        """测试长时间运行后折算基准时刻不改变当前值"""
+        self.engine.record("s1", weight=1000)
+        self.now += 50 * HOUR
+        self.engine.record("s2", weight=1)
+        before = (self.engine.heat("s1"), self.engine.heat("s2"))
+        self.engine._rebase()
+        self.assertEqual(self.engine._epoch, self.now)
+        self.assertAlmostEqual(self.engine.heat("s1"), before[0])
+        self.assertAlmostEqual(self.engine.heat("s2"), before[1])
+
+
+class TestSpaceHeatFlush(unittest.TestCase):
+    """测试加载、增量写回与数据库衰减(aiosqlite)"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite://")
+        self.loop.run_until_complete(self._seed())
+        self.now = 0.0
+        self.wall = 1_700_000_000.0
+        self.engine = self._engine()
+
+    def tearDown(self):
+        self.loop.run_until_complete(AsyncDBOperator.dispose())
+        self.loop.close()
+
+    def _engine(self):
+        return SpaceHeatEngine(heat_half_life=HOUR, stability_half_life=HOUR, chunk_size=2, decay_interval=HOUR,
+                               clock=lambda: self.now, wall_clock=lambda: self.wall)
+
+    async def _seed(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Space.__table__, TaskRun.__table__])
+            await conn.execute(insert(Space), [
+                {"id": f"s{i}", "type": "temp", "author_id": "u", "creator_id": "u", "title": f"空间{i}",
+                 "content": "内容", "heat": heat, "stability": 80}
+                for i, heat in enumerate([40, 10, 0])
+            ])
+
+    async def _rows(self):
+        async with AsyncDBOperator.session() as session:
+            rows = (await session.execute(select(Space.id, Space.heat, Space.stability, Space.updated_at))).all()
+        return {row.id: row for row in rows}
+
+    def test_warm_and_flush(self):
+        """测试加载后只写回增量，小数部分留待下次，写回不修改updated_at"""
+        async def run():
+            before = await self._rows()
+            self.assertEqual(await self.engine.warm(), 3)
+            self.assertEqual(await self.engine.flush(), 0)
+            for _ in range(5):
+                self.engine.record("s2")
+            self.engine.record("s1", weight=0.5)
+            self.engine.record("new")
+            self.engine.adjust_stability("s0", 30)
+            self.assertEqual(await self.engine.flush(), 3)
+            self.now += HOUR
+            self.assertEqual(await self.engine.flush(), 0)
+            self.engine.record("s1", weight=0.5)
+            self.assertEqual(await self.engine.flush(), 1)
+            return before, await self._rows()
+        before, after = self.loop.run_until_complete(run())
+        self.assertEqual({space_id: (row.heat, row.stability) for space_id, row in after.items()},
+                         {"s0": (40, 100), "s1": (11, 80), "s2": (5, 80)})
+        self.assertEqual({space_id: row.updated_at for space_id, row in after.items()},
+                         {space_id: row.updated_at for space_id, row in before.items()})
+
+    def test_workers_do_not_overwrite(self):
+        """测试两个worker各自写回增量，结果为两者之和"""
+        async def run():
+            other = self._engine()
+            for engine in (self.engine, other):
+                await engine.warm()
+                for _ in range(5):
+                    engine.record("s2")
+                engine.adjust_stability("s1", -30)
+            self.assertEqual(await asyncio.gather(self.engine.flush(), other.flush()), [2, 2])
+            return await self._rows()
+        rows = self.loop.run_until_complete(run())
+        self.assertEqual((rows["s2"].heat, rows["s1"].stability), (10, 20))
+
+    def test_decay(self):
+        """测试每个周期只由一个worker衰减数据库中的值"""
+        async def run():
+            other = self._engine()
+            self.assertEqual(await self.engine.decay(), 0)
+            self.wall += HOUR / 2
+            self.assertEqual(await other.decay(), 0)
+            self.wall += HOUR / 2
+            updated = await asyncio.gather(self.engine.decay(), other.decay())
+            self.wall += HOUR / 2
+            self.assertEqual(await self.engine.decay(), 0)
+            return sorted(updated), await self._rows()
+        updated, rows = self.loop.run_until_complete(run())
+        self.assertEqual(updated, [0, 3])
+        self.assertEqual({space_id: (row.heat, row.stability) for space_id, row in rows.items()},
+                         {"s0": (20, 40), "s1": (5, 40), "s2": (0, 40)})
+
+    def test_background_task(self):
+        """测试后台任务停止时写回(真实时钟)"""
+        async def run():
+            engine = SpaceHeatEngine(flush_interval=60, decay_interval=0)
+            await engine.warm()
+            engine.start()
+            engine.record("s1", weight=3)
+            await engine.stop()
+            return (await self._rows())["s1"].heat
+        self.assertEqual(self.loop.run_until_complete(run()), 13)
+
+
+if __name__ == "__main__":
+    unittest.main()
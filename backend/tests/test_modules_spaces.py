@@ -0,0 +1,159 @@
+"""
+空间查询测试模块
+================
+
+测试backend/modules/spaces.py中的键集分页接口与回复提交接口(aiosqlite内存库)
+"""
+
+import time
+import asyncio
+import unittest
+from collections import namedtuple
+from unittest.mock import AsyncMock, patch
+import httpx
+import jwt
+from fastapi import FastAPI
+from backend.database.models import Base, Reply, Space
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules import auth, spaces
+from backend.modules.replyWriter import ReplyWriter
+from backend.modules.spaceHeat import SpaceHeatEngine
+from backend.modules.spaces import router, space_page_query
+
+
+class TestSpacesApi(unittest.TestCase):
+    """测试空间列表与行动历史接口"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        AsyncDBOperator.configure("sqlite+aiosqlite://")
+        self.app = FastAPI()
+        self.app.include_router(router, prefix="/api/game")
+        self.run_async(self._seed())
+
+    def tearDown(self):
+        self.run_async(AsyncDBOperator.dispose())
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    async def _seed(self):
+        async with AsyncDBOperator.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Space.__table__, Reply.__table__])
+        await AsyncDBOperator.bulk_create(Space, [
+            {"id": f"s{i:02d}", "type": "fixed" if i % 2 else "temp", "author_id": "u",
+             "creator_id": "u", "title": f"空间{i}", "content": "内容", "heat": i // 3}
+            for i in range(25)
+        ])
+        await AsyncDBOperator.bulk_create(Reply, [
+            {"id": f"r{i}", "space_id": "s00", "author_id": "u", "content": f"楼层{i}", "floor_num": i}
+            for i in range(1, 46)
+        ])
+
+    def get(self, path, **params):
+        async def request():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get(path, params=params)
+        return self.run_async(request())
+
+    def post(self, path, body, headers=None):
+        async def request():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(path, json=body, headers=headers)
+        return self.run_async(request())
+
+    def collect(self, path, key, **params):
+        """跟随游标读取全部页"""
+        items, cursor, pages = [], None, 0
+        while True:
+            body = self.get(path, **params, **({"cursor": cursor} if cursor else {})).json()
+            items.extend(body[key])
+            pages += 1
+            cursor = body["pagination"]["next_cursor"]
+            self.assertEqual(body["pagination"]["has_more"], cursor is not None)
+            if cursor is None:
+                return items, pages
+
+    def test_list_spaces_keyset(self):
+        """测试空间列表按热度降序完整翻页且无重复"""
+        spaces, pages = self.collect("/api/game/spaces", "spaces", limit=10)
+        self.assertEqual(pages, 3)
+        keys = [(s["heat"], s["id"]) for s in spaces]
+        self.assertEqual(len(set(keys)), 25)
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_keyset_predicate_expanded(self):
+        """测试游标条件展开为 heat < h OR (heat = h AND id < id)，不使用行构造器比较"""
+        from sqlalchemy.dialects import mysql
+        sql = str(space_page_query(None, 10, (3, "s09")).compile(dialect=mysql.dialect()))
+        self.assertIn("spaces.heat < ", sql)
+        self.assertIn(" OR spaces.heat = ", sql)
+        self.assertNotIn("(spaces.heat, spaces.id)", sql)
+
+    def test_space_without_heat_pages(self):
+        """测试未指定热度的空间按0参与翻页(heat非空)，游标可解码且不提前结束"""
+        from sqlalchemy import text
+
+        async def insert_raw():
+            async with AsyncDBOperator.session() as session:
+                await session.execute(text(
+                    "INSERT INTO spaces (id, type, author_id, creator_id, title, content) "
+                    "VALUES ('raw', 'temp', 'u', 'u', '无热度', '内容')"))
+        self.run_async(insert_raw())
+        self.assertFalse(Space.__table__.c.heat.nullable)
+        spaces, pages = self.collect("/api/game/spaces", "spaces", limit=2)
+        keys = [(s["heat"], s["id"]) for s in spaces]
+        self.assertEqual(len(keys), 26)
+        self.assertIn((0, "raw"), keys)
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_list_spaces_by_type(self):
+        """测试按类型过滤"""
+        spaces, _ = self.collect("/api/game/spaces", "spaces", type="fixed", limit=4)
+        self.assertEqual(len(spaces), 12)
+        self.assertTrue(all(s["type"] == "fixed" for s in spaces))
+
+    def test_history_keyset(self):
+        """测试行动历史正序与倒序翻页"""
+        history, pages = self.collect("/api/game/actions/history", "history", space_id="s00", limit=20)
+        self.assertEqual(pages, 3)
+        self.assertEqual([h["floor_num"] for h in history], list(range(1, 46)))
+        history, _ = self.collect("/api/game/actions/history", "history",
+                                  space_id="s00", limit=20, order="desc")
+        self.assertEqual([h["floor_num"] for h in history], list(range(45, 0, -1)))
+
+    def test_post_action(self):
+        """测试发表回复经replyWriter写入并计入空间热度，未登录与空间不存在被拒绝"""
+        secret = "spaces-test-secret-0123456789abcdef"
+        token = jwt.encode({"sub": "alice", "exp": int(time.time()) + 600}, secret, algorithm="HS256")
+        headers = {"Authorization": f"Bearer {token}"}
+        heat = SpaceHeatEngine(db_operator=object())
+        writer = ReplyWriter(batch_window=0, heat_engine=heat)
+        with patch.object(auth, "SECRET_KEY", secret), patch.object(spaces, "reply_writer", writer), \
+                patch.object(spaces.AsyncDBOperator, "fetch_one",
+                             new=AsyncMock(return_value=namedtuple("Row", "id")("u1"))):
+            self.assertEqual(self.post("/api/game/actions", {"space_id": "s00", "content": "回复"}).status_code, 401)
+            response = self.post("/api/game/actions", {"space_id": "s00", "content": "回复", "parent_id": "r1"},
+                                 headers)
+            missing = self.post("/api/game/actions", {"space_id": "missing", "content": "回复"}, headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["floor_num"], 46)
+        self.assertEqual(response.json()["parent_id"], "r1")
+        self.assertEqual(missing.status_code, 404)
+        latest = self.get("/api/game/actions/history", space_id="s00", limit=1, order="desc").json()["history"][0]
+        self.assertEqual((latest["action_id"], latest["user_id"], latest["content"]),
+                         (response.json()["action_id"], "u1", "回复"))
+        self.assertEqual(heat.stats()["events"], 1)
+
+    def test_invalid_params(self):
+        """测试无效游标与参数"""
+        self.assertEqual(self.get("/api/game/spaces", cursor="bad").status_code, 400)
+        self.assertEqual(self.get("/api/game/spaces", type="other").status_code, 422)
+        self.assertEqual(self.get("/api/game/actions/history", space_id="s00", limit=1000).status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
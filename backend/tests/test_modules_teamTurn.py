@@ -0,0 +1,229 @@
+"""
+团队回合汇总测试模块
+===================
+
+测试backend/modules/teamTurn.py中的加权计票与回合窗口
+"""
+
+import time
+import asyncio
+import unittest
+from collections import namedtuple
+from unittest.mock import patch, AsyncMock
+import fakeredis
+import jwt
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.modules import auth, teamTurn
+from backend.modules.game import GameCore
+from backend.modules.gameStore import InMemoryGameStateStore, RedisGameStateStore
+from backend.modules.teamTurn import (
+    TeamTurnAggregator, MemberAction, RedisBallotStore, GameNotFound, NotAMember, tally_votes
+)
+
+
+class TestTallyVotes(unittest.TestCase):
+    """测试加权计票"""
+
+    def test_weighting(self):
+        """测试经验/等级加权与无体力降权"""
+        actions = [
+            MemberAction("a", "attack", experience=0, current_level=1),
+            MemberAction("b", "attack", experience=0, current_level=1),
+            MemberAction("c", "explore", experience=1000, current_level=5),
+        ]
+        tallies = tally_votes(actions)
+        self.assertEqual(tallies[0].choice, "explore")
+        self.assertEqual(tallies[1].votes, 2)
+
+        tired = [MemberAction("a", "x", energy=0), MemberAction("b", "y", energy=1)]
+        tallies = tally_votes(tired, zero_energy_weight=0.5)
+        self.assertEqual([t.choice for t in tallies], ["y", "x"])
+        self.assertAlmostEqual(tallies[1].weight, tallies[0].weight * 0.5)
+
+    def test_empty(self):
+        """测试无提交"""
+        self.assertEqual(tally_votes([]), [])
+
+
+class TestTeamTurnAggregator(unittest.TestCase):
+    """测试回合窗口"""
+
+    def setUp(self):
+        self.calls = []
+
+        async def decide(game_id, turn, tallies):
+            self.calls.append((game_id, turn, tallies))
+            return f"执行{tallies[0].choice}"
+        self.decide = decide
+
+    async def _setup_game(self, members):
+        core = GameCore(InMemoryGameStateStore())
+        game_id = await core.create_game(members[0])
+        for member in members[1:]:
+            await core.join_game(game_id, member)
+        return core, game_id
+
+    def test_all_members_close_window(self):
+        """测试全员提交后立即结算且只调用一次AI"""
+        async def run():
+            members = [f"p{i}" for i in range(256)]
+            core, game_id = await self._setup_game(members)
+            aggregator = TeamTurnAggregator(core, self.decide, window_seconds=60)
+            futures = await asyncio.gather(*(
+                aggregator.submit(game_id, MemberAction(m, "attack" if i % 3 else "defend"))
+                for i, m in enumerate(members)
+            ))
+            outcome = await futures[0]
+            self.assertTrue(all(f is futures[0] for f in futures))
+            return outcome, await core.get_state(game_id)
+        outcome, state = asyncio.run(run())
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(outcome.voters, 256)
+        self.assertEqual(outcome.action, "执行attack")
+        self.assertEqual(state.current_turn, 1)
+
+    def test_deadline_closes_window(self):
+        """测试到达截止时间后按已提交内容结算"""
+        async def run():
+            core, game_id = await self._setup_game(["p0", "p1", "p2"])
+            aggregator = TeamTurnAggregator(core, self.decide, window_seconds=0.05)
+            future = await aggregator.submit(game_id, MemberAction("p0", "explore"))
+            return await asyncio.wait_for(future, 1)
+        outcome = asyncio.run(run())
+        self.assertEqual(outcome.voters, 1)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_resubmission_and_non_member(self):
+        """测试重复提交以最后一次为准，非成员被拒绝"""
+        async def run():
+            core, game_id = await self._setup_game(["p0", "p1"])
+            aggregator = TeamTurnAggregator(core, self.decide, window_seconds=60)
+            await aggregator.submit(game_id, MemberAction("p0", "attack"))
+            await aggregator.submit(game_id, MemberAction("p0", "defend"))
+            with self.assertRaises(NotAMember):
+                await aggregator.submit(game_id, MemberAction("stranger", "attack"))
+            with self.assertRaises(GameNotFound):
+                await aggregator.submit("missing", MemberAction("p0", "attack"))
+            future = await aggregator.submit(game_id, MemberAction("p1", "defend"))
+            return await future
+        outcome = asyncio.run(run())
+        self.assertEqual([(t.choice, t.votes) for t in outcome.tallies], [("defend", 2)])
+
+
+
+class TestSharedBallots(unittest.TestCase):
+    """测试两个worker通过Redis共享选票与结算结果"""
+
+    def setUp(self):
+        self.calls = []
+
+        async def decide(game_id, turn, tallies):
+            self.calls.append((game_id, turn, tallies))
+            await asyncio.sleep(0.02)
+            return f"执行{tallies[0].choice}"
+        self.decide = decide
+
+    async def _workers(self, members, window_seconds):
+        server = fakeredis.FakeServer()
+
+        def client():
+            return fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        self.settled = []
+
+        async def on_settled(outcome, actions):
+            self.settled.append(sorted(action.player_id for action in actions))
+        workers = [
+            TeamTurnAggregator(GameCore(RedisGameStateStore([client()])), self.decide,
+                               window_seconds=window_seconds, ballots=RedisBallotStore(client()),
+                               poll_interval=0.01, on_settled=on_settled)
+            for _ in range(2)
+        ]
+        core = workers[0].game_core
+        game_id = await core.create_game(members[0])
+        for member in members[1:]:
+            await core.join_game(game_id, member)
+        return workers, game_id
+
+    def test_votes_split_across_workers(self):
+        """测试选票分散在两个worker时全员到齐即结算，双方得到同一结果且只调用一次AI"""
+        async def run():
+            members = [f"p{i}" for i in range(4)]
+            workers, game_id = await self._workers(members, window_seconds=60)
+            futures = [
+                await workers[i % 2].submit(game_id, MemberAction(m, "defend" if i == 3 else "attack"))
+                for i, m in enumerate(members)
+            ]
+            outcomes = await asyncio.wait_for(asyncio.gather(*futures), 2)
+            state = await workers[1].game_core.get_state(game_id)
+            for worker in workers:
+                await worker.close()
+            return outcomes, state
+        outcomes, state = asyncio.run(run())
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual({o.action for o in outcomes}, {"执行attack"})
+        self.assertEqual({o.voters for o in outcomes}, {4})
+        self.assertEqual(state.current_turn, 1)
+        self.assertEqual(self.settled, [["p0", "p1", "p2", "p3"]])
+
+    def test_shared_deadline(self):
+        """测试截止时间由首个提交决定，两个worker都按全部已提交选票结算"""
+        async def run():
+            workers, game_id = await self._workers(["p0", "p1", "p2"], window_seconds=0.1)
+            first = await workers[0].submit(game_id, MemberAction("p0", "explore"))
+            second = await workers[1].submit(game_id, MemberAction("p1", "explore"))
+            outcomes = await asyncio.wait_for(asyncio.gather(first, second), 2)
+            for worker in workers:
+                await worker.close()
+            return outcomes
+        outcomes = asyncio.run(run())
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(outcomes[0], outcomes[1])
+        self.assertEqual(outcomes[0].voters, 2)
+        self.assertEqual(outcomes[0].action, "执行explore")
+
+
+
+class TestTurnEndpoint(unittest.TestCase):
+    """测试团队回合提交接口"""
+
+    SECRET = "turn-test-secret-0123456789abcdef"
+    Row = namedtuple("Row", "id experience current_level")
+
+    def setUp(self):
+        self.core = GameCore(InMemoryGameStateStore())
+
+        async def decide(game_id, turn, tallies):
+            return f"执行{tallies[0].choice}"
+        self.aggregator = TeamTurnAggregator(self.core, decide, window_seconds=60)
+        app = FastAPI()
+        app.include_router(teamTurn.router, prefix="/game")
+        self.client = TestClient(app)
+        token = jwt.encode({"sub": "alice", "exp": int(time.time()) + 600}, self.SECRET, algorithm="HS256")
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def _post(self, game_id, headers=None):
+        with patch.object(auth, "SECRET_KEY", self.SECRET), \
+                patch.object(teamTurn, "team_turn", self.aggregator), \
+                patch.object(teamTurn.AsyncDBOperator, "fetch_one",
+                             new=AsyncMock(return_value=self.Row("u1", 10, 2))), \
+                patch.object(teamTurn.energy_service, "get_energy", new=AsyncMock(return_value=None)):
+            return self.client.post(f"/game/{game_id}/turn", json={"choice": "attack"}, headers=headers)
+
+    def test_requires_token(self):
+        self.assertEqual(self._post("g1").status_code, 401)
+
+    def test_submit(self):
+        """测试单人空间提交后立即结算，非成员与不存在的游戏被拒绝"""
+        game_id = asyncio.run(self.core.create_game("u1"))
+        response = self._post(game_id, self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["action"], "执行attack")
+        self.assertEqual(response.json()["voters"], 1)
+        self.assertEqual(self._post("missing", self.headers).status_code, 404)
+        other = asyncio.run(self.core.create_game("u2"))
+        self.assertEqual(self._post(other, self.headers).status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
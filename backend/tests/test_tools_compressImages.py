@@ -0,0 +1,109 @@
+"""
+图片压缩工具测试模块
+====================
+
+测试backend/tools/compress_images.py中的清单跳过、参数或内容变化后重新压缩、原子写入与统计(临时目录)
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from PIL import Image, features
+from backend.tools.compress_images import CompressOptions, ImageCompressor
+
+
+def gradient(size: int, shift: int = 0) -> Image.Image:
+    """生成颜色丰富的RGBA渐变图(未量化的PNG体积明显大于量化后)"""
+    image = Image.new("RGBA", (size, size))
+    image.putdata([((x * 4 + shift) % 256, (y * 4) % 256, (x * y + shift) % 256, 255)
+                   for y in range(size) for x in range(size)])
+    return image
+
+
+class TestImageCompressor(unittest.TestCase):
+    """测试目录压缩与清单"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.root, "cards"))
+        self.manifest = os.path.join(self.tmp.name, ".image-manifest.json")
+        gradient(96).save(os.path.join(self.root, "logo.png"), compress_level=0)
+        gradient(64, shift=7).save(os.path.join(self.root, "cards", "card.png"), compress_level=0)
+        gradient(64).save(os.path.join(self.root, "favicon.ico"), sizes=[(64, 64)])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_compressor(self, options: CompressOptions = None, workers: int = 1):
+        return ImageCompressor([self.root], manifest_path=self.manifest, options=options,
+                               workers=workers).compress_images()
+
+    def sizes(self) -> dict:
+        return {name: os.path.getsize(os.path.join(directory, name))
+                for directory, _, names in os.walk(self.root) for name in names}
+
+    def temp_files(self) -> list:
+        return [name for _, _, names in os.walk(self.tmp.name) for name in names if name.endswith(".tmp")]
+
+    def test_first_run_then_skip(self):
+        """测试首次运行压缩全部文件并统计节省字节数，再次运行全部跳过"""
+        before = self.sizes()
+        report = self.run_compressor(workers=2)
+        after = self.sizes()
+        self.assertEqual((report.files, report.compressed, report.skipped, report.failed), (3, 3, 0, 0))
+        self.assertEqual(report.bytes_before, sum(before.values()))
+        self.assertEqual(report.bytes_after, sum(after.values()))
+        self.assertGreater(report.bytes_saved, 0)
+        self.assertLess(after["logo.png"], before["logo.png"])
+        self.assertEqual(self.temp_files(), [])
+        with open(self.manifest, encoding="utf-8") as f:
+            self.assertEqual(sorted(json.load(f)["files"]),
+                             ["public/cards/card.png", "public/favicon.ico", "public/logo.png"])
+
+        report = self.run_compressor()
+        self.assertEqual((report.compressed, report.skipped, report.bytes_saved), (0, 3, 0))
+        self.assertEqual(self.sizes(), after)
+
+    def test_option_change_recompresses(self):
+        """测试压缩参数变化后全部重新压缩"""
+        self.run_compressor()
+        report = self.run_compressor(CompressOptions(colors=16))
+        self.assertEqual((report.compressed, report.skipped), (3, 0))
+        self.assertEqual(self.run_compressor(CompressOptions(colors=16)).skipped, 3)
+
+    def test_content_change_recompresses(self):
+        """测试文件内容变化后只重新压缩该文件"""
+        self.run_compressor()
+        gradient(64, shift=99).save(os.path.join(self.root, "cards", "card.png"), compress_level=0)
+        report = self.run_compressor()
+        self.assertEqual((report.compressed, report.skipped), (1, 2))
+        self.assertGreater(report.bytes_saved, 0)
+        self.assertEqual(self.temp_files(), [])
+
+    @unittest.skipUnless(features.check("webp"), "Pillow不支持WebP")
+    def test_missing_variant_recompresses(self):
+        """测试副本被删除后重新压缩"""
+        options = CompressOptions(variants=("webp",))
+        report = self.run_compressor(options)
+        self.assertGreater(report.variant_bytes, 0)
+        self.assertTrue(os.path.exists(os.path.join(self.root, "logo.webp")))
+        os.unlink(os.path.join(self.root, "logo.webp"))
+        report = self.run_compressor(options)
+        self.assertEqual((report.compressed, report.skipped), (1, 2))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "logo.webp")))
+
+    def test_broken_file(self):
+        """测试无法解码的文件计为失败，不写入清单也不留下临时文件"""
+        with open(os.path.join(self.root, "broken.png"), "wb") as f:
+            f.write(b"not a png")
+        report = self.run_compressor()
+        self.assertEqual((report.compressed, report.failed), (3, 1))
+        self.assertIn("broken.png", report.errors[0])
+        self.assertEqual(self.temp_files(), [])
+        self.assertEqual(self.run_compressor().failed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""
+键集分页游标测试模块
+====================
+
+测试backend/utils/keysetCursor.py中的游标编解码
+"""
+
+import unittest
+from backend.utils.keysetCursor import encode_cursor, decode_cursor
+
+
+class TestKeysetCursor(unittest.TestCase):
+    """测试游标编解码"""
+
+    def test_round_trip(self):
+        """测试编码后可还原"""
+        cursor = encode_cursor((42, "空间-1"))
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor, (int, str)), (42, "空间-1"))
+
+    def test_empty(self):
+        """测试空游标"""
+        self.assertIsNone(decode_cursor(None, (int,)))
+        self.assertIsNone(decode_cursor("", (int,)))
+
+    def test_invalid(self):
+        """测试无效游标"""
+        for cursor in ("!!!", encode_cursor([1]), encode_cursor(["1", "a"]), encode_cursor({"a": 1})):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor, (int, str))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+延迟直方图测试模块
+=================
+
+测试backend/utils/latencyHistogram.py中的LatencyHistogram功能
+"""
+
+import unittest
+from backend.utils.latencyHistogram import LatencyHistogram
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """测试LatencyHistogram"""
+
+    def test_percentiles(self):
+        """测试分位数误差在分桶精度内"""
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertEqual(histogram.total, 1000)
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.5, delta=0.5 / 60)
+        self.assertAlmostEqual(histogram.percentile(0.99), 0.99, delta=0.99 / 60)
+        self.assertLessEqual(histogram.percentile(1.0), 1.0)
+
+    def test_empty(self):
+        """测试空直方图"""
+        self.assertEqual(LatencyHistogram().percentile(0.99), 0.0)
+
+    def test_overflow_clamped(self):
+        """测试超出上限的样本计入最高桶"""
+        histogram = LatencyHistogram(max_value_us=1000)
+        histogram.record(5.0)
+        self.assertEqual(histogram.total, 1)
+        self.assertEqual(sum(histogram.counts), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
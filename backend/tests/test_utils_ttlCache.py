@@ -0,0 +1,51 @@
+"""
+带过期时间的LRU缓存测试模块
+==========================
+
+测试backend/utils/ttlCache.py中的TTLCache功能
+"""
+
+import time
+import unittest
+from backend.utils.ttlCache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """测试TTLCache"""
+
+    def test_hit_and_miss(self):
+        """测试命中与未命中计数"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lru_eviction(self):
+        """测试容量满时淘汰最久未使用条目"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_expiry(self):
+        """测试条目过期"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.put("a", 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self):
+        """测试容量为0时禁用缓存"""
+        cache = TTLCache(maxsize=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+登录状态检查压测
+================
+
+以200个并发客户端压测 /api/auth/check，对比同步DBOperator(事件循环内阻塞查询)
+与AsyncDBOperator两种数据库层的吞吐(requests/sec)。
+
+默认使用临时SQLite文件库(同步: pysqlite，异步: aiosqlite)，
+可通过 --sync-url / --async-url 指向本地MySQL。
+
+用法:
+    python -m backend.tools.benchAuthCheck --clients 200 --duration 5
+"""
+import os
+import io
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from unittest.mock import patch
+
+os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-for-local-load-testing')
+
+import jwt
+import httpx
+from sqlalchemy import create_engine
+
+from backend.app import app
+from backend.modules import auth
+from backend.database.models import Base, User, get_model
+from backend.database.hbm_mysql import SessionLocal, db_session
+from backend.database.hbm_mysql_async import AsyncDBOperator
+
+
+class SyncLayer:
+    """以同步会话在事件循环内直接查询，复现改造前路由的行为"""
+
+    @staticmethod
+    async def get_one(model, **filters):
+        with db_session() as session:
+            instance = session.query(get_model(model)).filter_by(**filters).first()
+            if instance is not None:
+                session.expunge(instance)
+            return instance
+
+
+async def hammer(clients: int, duration: float, token: str) -> int:
+    """并发请求直到超时，返回完成的请求数"""
+    completed = 0
+    deadline = time.perf_counter() + duration
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal completed
+            while time.perf_counter() < deadline:
+                response = await client.get("/api/auth/check", headers=headers)
+                assert response.json()["is_authenticated"]
+                completed += 1
+
+        await asyncio.gather(*(worker() for _ in range(clients)))
+    return completed
+
+
+async def run_async_layer(args, token):
+    """异步数据库层"""
+    AsyncDBOperator.configure(args.async_url)
+    try:
+        return await hammer(args.clients, args.duration, token)
+    finally:
+        await AsyncDBOperator.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/auth/check 吞吐压测")
+    parser.add_argument("--clients", type=int, default=200, help="并发客户端数")
+    parser.add_argument("--duration", type=float, default=5, help="每轮压测时长(秒)")
+    parser.add_argument("--sync-url", help="同步数据库连接串")
+    parser.add_argument("--async-url", help="异步数据库连接串")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "bench.db")
+    args.sync_url = args.sync_url or f"sqlite:///{db_path}"
+    args.async_url = args.async_url or f"sqlite+aiosqlite:///{db_path}"
+
+    sync_engine = create_engine(args.sync_url)
+    Base.metadata.create_all(sync_engine, tables=[User.__table__])
+    SessionLocal.configure(bind=sync_engine)
+    with db_session() as session:
+        session.merge(User(id="bench", username="bench", email="bench@test.com", password_hash="x"))
+
+    token = jwt.encode({"sub": "bench"}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+    # 屏蔽请求日志中间件的输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        with patch.object(auth, "AsyncDBOperator", SyncLayer):
+            sync_count = asyncio.run(hammer(args.clients, args.duration, token))
+        async_count = asyncio.run(run_async_layer(args, token))
+
+    print(f"[sync DBOperator]  {sync_count / args.duration:.1f} req/s")
+    print(f"[AsyncDBOperator]  {async_count / args.duration:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+登录延迟基准测试
+================
+
+在并发 /api/auth/check 流量下测量 /api/auth/token 的p99延迟，
+对比bcrypt在事件循环内同步执行(before)与线程池执行(after)两种模式。
+
+数据库访问以内存中的固定用户代替，仅衡量哈希计算对事件循环的影响。
+
+用法:
+    python -m backend.tools.benchAuthLogin --logins 50 --checkers 20
+"""
+import io
+import time
+import asyncio
+import argparse
+import contextlib
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+
+from backend.app import app
+from backend.modules import auth
+from backend.modules.passwordHasher import PasswordHasher
+
+
+class InlineHasher:
+    """在事件循环内同步执行的哈希器，复现改造前的行为"""
+
+    def __init__(self, hasher: PasswordHasher):
+        self.context = hasher.context
+
+    async def hash(self, password):
+        return self.context.hash(password)
+
+    async def verify_and_update(self, password, password_hash):
+        return self.context.verify_and_update(password, password_hash)
+
+
+def percentile(samples, pct):
+    """计算百分位数(毫秒)"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index] * 1000
+
+
+async def run_scenario(hasher, logins: int, login_concurrency: int, checkers: int):
+    """运行一轮压测，返回登录与状态检查的延迟样本"""
+    user = SimpleNamespace(username="bench", password_hash=hasher.context.hash("BenchPass123!"))
+    login_samples, check_samples = [], []
+    done = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login_worker(count):
+            for _ in range(count):
+                start = time.perf_counter()
+                await client.post("/api/auth/token",
+                                  data={"username": "bench", "password": "BenchPass123!"})
+                login_samples.append(time.perf_counter() - start)
+
+        async def check_worker():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/api/auth/check")
+                check_samples.append(time.perf_counter() - start)
+
+        with patch.object(auth, "password_hasher", hasher), \
+                patch.object(auth.DBOperator, "get_one", return_value=user):
+            checks = [asyncio.create_task(check_worker()) for _ in range(checkers)]
+            per_worker = max(1, logins // login_concurrency)
+            await asyncio.gather(*(login_worker(per_worker) for _ in range(login_concurrency)))
+            done.set()
+            await asyncio.gather(*checks)
+
+    return login_samples, check_samples
+
+
+def report(name, login_samples, check_samples):
+    """打印一轮压测结果"""
+    print(f"[{name}] login  n={len(login_samples)} "
+          f"p50={percentile(login_samples, 50):.1f}ms p99={percentile(login_samples, 99):.1f}ms")
+    print(f"[{name}] check  n={len(check_samples)} "
+          f"p50={percentile(check_samples, 50):.1f}ms p99={percentile(check_samples, 99):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录p99延迟基准测试")
+    parser.add_argument("--logins", type=int, default=40, help="登录请求总数")
+    parser.add_argument("--login-concurrency", type=int, default=4, help="并发登录数")
+    parser.add_argument("--checkers", type=int, default=20, help="并发/auth/check客户端数")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt成本因子")
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(rounds=args.rounds)
+    scenarios = [("before", InlineHasher(hasher)), ("after", hasher)]
+    for name, candidate in scenarios:
+        # 屏蔽请求日志中间件的输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            samples = asyncio.run(run_scenario(
+                candidate, args.logins, args.login_concurrency, args.checkers
+            ))
+        report(name, *samples)
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+候选回复生成基准测试
+====================
+
+在本地模拟Ollama服务上对比生成N个候选回复的墙钟时间:
+- sequential: 依次调用N次(改造前逐个调用agent的方式)
+- concurrent: generate_candidates并发发起N个请求(不同种子)，等待全部N个
+- first-k: generate_candidates只等待前K个候选
+
+模拟服务的每个请求耗时约为 first_token_delay + token_delay × (token数-1)，
+可并行处理多个请求(对应Ollama的OLLAMA_NUM_PARALLEL)。
+
+用法:
+    python -m backend.tools.benchCandidates --n 4 --k 2 --rounds 5
+"""
+import time
+import asyncio
+import argparse
+
+from backend.ai.llmGateway import LLMGateway
+from backend.ai.candidateGenerator import generate_candidates
+from backend.tools.fakeOllamaServer import FakeOllamaServer
+
+MODEL = "fake-model"
+PROMPT = "队伍来到了第三层的岔路口，请给出下一步行动。"
+
+
+async def sequential(gateway: LLMGateway, n: int) -> list:
+    return [await gateway.generate(MODEL, PROMPT, options={"seed": i}) for i in range(n)]
+
+
+async def timed(factory, rounds: int) -> tuple:
+    """执行rounds轮，返回(平均耗时秒, 最后一轮结果)"""
+    result = None
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = await factory()
+    return (time.perf_counter() - start) / rounds, result
+
+
+async def run(args, base_url: str):
+    gateway = LLMGateway([base_url], max_in_flight=args.n)
+    try:
+        await gateway.generate(MODEL, PROMPT)  # 预热连接池
+        seq_time, _ = await timed(lambda: sequential(gateway, args.n), args.rounds)
+        all_time, all_result = await timed(
+            lambda: generate_candidates(gateway, MODEL, PROMPT, n=args.n), args.rounds)
+        first_time, first_result = await timed(
+            lambda: generate_candidates(gateway, MODEL, PROMPT, n=args.n, k=args.k), args.rounds)
+    finally:
+        await gateway.close()
+
+    print(f"n={args.n} k={args.k} rounds={args.rounds} "
+          f"token_delay={args.token_delay}s first_token_delay={args.first_token_delay}s")
+    print(f"[sequential] {seq_time * 1000:8.1f} ms")
+    print(f"[concurrent] {all_time * 1000:8.1f} ms  ({len(all_result)} 个候选, "
+          f"加速 {seq_time / all_time:.2f}x)")
+    print(f"[first-{args.k}]    {first_time * 1000:8.1f} ms  ({len(first_result)} 个候选)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="候选回复生成基准测试")
+    parser.add_argument("--n", type=int, default=4, help="候选数")
+    parser.add_argument("--k", type=int, default=2, help="first-k模式等待的候选数")
+    parser.add_argument("--rounds", type=int, default=5, help="每种模式的轮数")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="模拟token间隔(秒)")
+    parser.add_argument("--first-token-delay", type=float, default=0.1, help="模拟首token延迟(秒)")
+    args = parser.parse_args()
+
+    with FakeOllamaServer(token_delay=args.token_delay, first_token_delay=args.first_token_delay) as server:
+        asyncio.run(run(args, server.base_url))
+
+
+if __name__ == "__main__":
+    main()
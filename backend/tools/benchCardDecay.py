@@ -0,0 +1,117 @@
+"""
+卡牌衰减物化基准测试
+====================
+
+测量backend/modules/cardDecay.py中批量物化任务的吞吐(目标: 每分钟100万张卡牌):
+- 纯计算: NumPy向量化公式的行/秒
+- 首次物化: 所有行effective_strength为NULL，全部写回
+- 次日物化: 时钟推进1天后重新计算，仅写回数值变化的行
+- 同分桶重跑: 无变化，只读不写
+
+默认使用临时SQLite文件库，可通过 --url / --async-url 指向本地MySQL(需已建表)。
+
+用法:
+    python -m backend.tools.benchCardDecay --cards 1000000 --chunk 20000
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine, insert, func, select
+
+from backend.database.models import Base, Treasure
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.cardDecay import CardDecayEngine, DecayParams, decay_strength
+
+BATCH = 20000
+NOW = datetime(2026, 6, 1)
+
+
+def seed(url: str, cards: int):
+    """批量写入测试卡牌(创建时间分布在过去180天内)"""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[Treasure.__table__])
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(Treasure)).scalar():
+            return
+        rng = random.Random(1)
+        batch = []
+        for i in range(cards):
+            replica = rng.random() < 0.3
+            batch.append({
+                "id": f"card{i:08d}", "name": "卡牌", "effect": "效果", "owner_id": f"u{i % 1000}",
+                "strength": rng.randrange(257), "is_replica": replica,
+                "deviation": rng.randrange(101) if replica else 0,
+                "heat": 0 if replica else rng.randrange(2000), "use_count": rng.randrange(5),
+                "created_at": NOW - timedelta(seconds=rng.randrange(180 * 86400)), "updated_at": NOW
+            })
+            if len(batch) >= BATCH:
+                conn.execute(insert(Treasure), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Treasure), batch)
+    engine.dispose()
+
+
+def bench_compute(cards: int, params: DecayParams) -> float:
+    """纯向量化计算吞吐(行/秒)"""
+    rng = np.random.default_rng(1)
+    args = (rng.integers(0, 257, cards), rng.integers(0, 180 * 86400, cards), rng.integers(0, 5, cards),
+            rng.integers(0, 101, cards), rng.integers(0, 2000, cards), rng.random(cards) < 0.3)
+    start = time.perf_counter()
+    decay_strength(*args, params)
+    return cards / (time.perf_counter() - start)
+
+
+async def run(args, params: DecayParams):
+    now = NOW
+    engine = CardDecayEngine(AsyncDBOperator, params, chunk_size=args.chunk, clock=lambda: now)
+    print(f"{'run':<12} {'scanned':>9} {'updated':>9} {'seconds':>8} {'rows/s':>10} {'rows/min':>11}")
+    results = []
+    for label, offset in (("首次物化", 0), ("次日物化", 1), ("同分桶重跑", 1)):
+        now = NOW + timedelta(days=offset)
+        stats = await engine.materialize()
+        results.append(stats)
+        print(f"{label:<12} {stats.scanned:>9} {stats.updated:>9} {stats.seconds:>8.1f} "
+              f"{stats.rows_per_second:>10.0f} {stats.rows_per_second * 60:>11.0f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="卡牌衰减物化基准测试")
+    parser.add_argument("--url", help="数据库连接串(同步驱动，用于写入测试数据)")
+    parser.add_argument("--async-url", help="数据库连接串(异步驱动，用于物化任务)")
+    parser.add_argument("--cards", type=int, default=1000000, help="卡牌数")
+    parser.add_argument("--chunk", type=int, default=20000, help="每块行数")
+    args = parser.parse_args()
+
+    if args.url and args.async_url:
+        url, async_url = args.url, args.async_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        url, async_url = f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}"
+    params = DecayParams()
+
+    print(f"纯计算: {bench_compute(args.cards, params):.0f} 行/秒")
+    start = time.perf_counter()
+    seed(url, args.cards)
+    print(f"数据准备: {args.cards} 张卡牌 ({time.perf_counter() - start:.1f}s)\n")
+
+    AsyncDBOperator.configure(async_url)
+
+    async def runner():
+        try:
+            return await run(args, params)
+        finally:
+            await AsyncDBOperator.dispose()
+    results = asyncio.run(runner())
+    slowest = min(stats.rows_per_second for stats in results) * 60
+    print(f"\n最慢一轮 {slowest:.0f} 行/分钟 (目标 1000000): {'达标' if slowest >= 1000000 else '未达标'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+游戏状态内存基准测试
+====================
+
+对比 10k 局 × 256 名玩家时两种状态表示的内存占用与构建耗时:
+- pydantic: 每局一个GameState，玩家为list[str]
+- compact: 每局一个CompactGameState，玩家为驻留句柄的array('I')
+
+两种表示均从序列化数据构建(与从Redis/请求中加载一致)，
+因此pydantic侧每个玩家ID都是独立的字符串对象。
+
+用法:
+    python -m backend.tools.benchGameStateMemory --games 10000 --players 256
+"""
+import gc
+import json
+import time
+import uuid
+import random
+import argparse
+import tracemalloc
+from datetime import datetime
+
+from backend.modules.game import GameState
+from backend.modules.compactGameState import PlayerRegistry, decode
+
+
+def build_payloads(games: int, players: int, population: int):
+    """生成序列化的游戏数据，玩家从固定人群中抽取"""
+    people = [str(uuid.uuid4()) for _ in range(population)]
+    now = time.time()
+    pydantic_payloads, compact_payloads = [], []
+    for _ in range(games):
+        game_id = str(uuid.uuid4())
+        members = random.sample(people, players)
+        pydantic_payloads.append(json.dumps({
+            "game_id": game_id, "players": members, "current_turn": 0,
+            "status": "playing",
+            "created_at": datetime.fromtimestamp(now).isoformat(),
+            "updated_at": datetime.fromtimestamp(now).isoformat()
+        }))
+        compact_payloads.append(json.dumps([game_id, 1, 0, now, now, members]))
+    return pydantic_payloads, compact_payloads
+
+
+def measure(build):
+    """测量构建函数的内存增量(字节)与耗时(秒)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="游戏状态内存基准测试")
+    parser.add_argument("--games", type=int, default=10000, help="游戏局数")
+    parser.add_argument("--players", type=int, default=256, help="每局玩家数")
+    parser.add_argument("--population", type=int, default=100000, help="玩家总人数")
+    args = parser.parse_args()
+
+    pydantic_payloads, compact_payloads = build_payloads(args.games, args.players, args.population)
+
+    models, pydantic_bytes, pydantic_time = measure(
+        lambda: [GameState.model_validate_json(payload) for payload in pydantic_payloads]
+    )
+    del models
+    registry = PlayerRegistry()
+    states, compact_bytes, compact_time = measure(
+        lambda: (registry, [decode(payload, registry) for payload in compact_payloads])
+    )
+
+    mib = 1024 * 1024
+    print(f"games={args.games} players/game={args.players} population={args.population}")
+    print(f"[pydantic] {pydantic_bytes / mib:8.1f} MiB  build {pydantic_time:6.2f}s")
+    print(f"[compact]  {compact_bytes / mib:8.1f} MiB  build {compact_time:6.2f}s "
+          f"(含驻留表 {len(registry)} 名玩家)")
+    print(f"内存节省: {(1 - compact_bytes / pydantic_bytes) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+排行榜基准测试
+==============
+
+在内存排行索引中构建N个用户(默认100万)，测量:
+- 加载耗时
+- 分数增量更新吞吐(次/秒)
+- rank / top(10) / around(k=5) 单次查询延迟(微秒，p50/p99)
+
+可选 --db-users: 在临时SQLite库中对比"每次查询全表排序"求单个用户名次的耗时，
+以及snapshot_yesterday_rank()单条UPDATE写入昨日排名的耗时。
+
+用法:
+    python -m backend.tools.benchLeaderboard --users 1000000 --queries 20000 --db-users 100000
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from sqlalchemy import create_engine, insert, select, func
+
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.database.models import Base, User
+from backend.modules.leaderboard import InMemoryLeaderboard, LeaderboardService
+
+BATCH = 20000
+
+
+def percentile_us(samples: list, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)] * 1e6
+
+
+async def bench_index(users: int, queries: int, seed: int):
+    rng = random.Random(seed)
+    board = InMemoryLeaderboard()
+    ids = [f"user{i:08d}" for i in range(users)]
+
+    start = time.perf_counter()
+    await board.load((user_id, rng.randrange(100000)) for user_id in ids)
+    print(f"加载: {users} 个用户 {time.perf_counter() - start:.2f}s")
+
+    updates = [(rng.choice(ids), rng.randrange(100000)) for _ in range(queries)]
+    start = time.perf_counter()
+    for user_id, score in updates:
+        await board.set_score(user_id, score)
+    print(f"增量更新: {queries / (time.perf_counter() - start):.0f} 次/秒\n")
+
+    print(f"{'query':<12} {'p50(us)':>10} {'p99(us)':>10}")
+    targets = [rng.choice(ids) for _ in range(queries)]
+    for label, fn in (
+        ("rank", board.rank),
+        ("top(10)", lambda _: board.top(10)),
+        ("around(5)", lambda user_id: board.around(user_id, 5)),
+    ):
+        samples = []
+        for user_id in targets:
+            t0 = time.perf_counter()
+            await fn(user_id)
+            samples.append(time.perf_counter() - t0)
+        print(f"{label:<12} {percentile_us(samples, 0.5):>10.1f} {percentile_us(samples, 0.99):>10.1f}")
+
+
+async def bench_db(users: int, seed: int):
+    rng = random.Random(seed)
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    with engine.begin() as conn:
+        for start in range(0, users, BATCH):
+            conn.execute(insert(User), [
+                {"id": f"user{i:08d}", "username": f"user{i:08d}", "password_hash": "x",
+                 "email": f"user{i:08d}@test.com", "score": rng.randrange(100000)}
+                for i in range(start, min(start + BATCH, users))
+            ])
+        # 全表排序求名次: 统计排在目标用户之前的人数(无score索引时每次全表扫描)
+        target = conn.execute(select(User.id, User.score).where(User.id == "user00000000")).one()
+        start = time.perf_counter()
+        rank = conn.execute(select(func.count()).select_from(User).where(
+            (User.score > target.score) | ((User.score == target.score) & (User.id > target.id))
+        )).scalar() + 1
+        print(f"\n数据库求名次(全表): {(time.perf_counter() - start) * 1e3:.1f}ms (名次 {rank})")
+    engine.dispose()
+
+    AsyncDBOperator.configure(f"sqlite+aiosqlite:///{path}")
+    service = LeaderboardService(InMemoryLeaderboard(), snapshot_hour=-1)
+    start = time.perf_counter()
+    loaded = await service.warm()
+    print(f"服务加载(分块读取): {loaded} 个用户 {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    updated = await service.snapshot_yesterday_rank()
+    print(f"昨日排名快照(单条UPDATE): {updated} 行 {time.perf_counter() - start:.2f}s")
+    await AsyncDBOperator.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="排行榜基准测试")
+    parser.add_argument("--users", type=int, default=1000000, help="内存索引用户数")
+    parser.add_argument("--queries", type=int, default=20000, help="更新与每种查询的次数")
+    parser.add_argument("--db-users", type=int, default=0, help="数据库对比的用户数(0表示跳过)")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    asyncio.run(bench_index(args.users, args.queries, args.seed))
+    if args.db_users:
+        asyncio.run(bench_db(args.db_users, args.seed))
+
+
+if __name__ == "__main__":
+    main()
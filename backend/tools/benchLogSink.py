@@ -0,0 +1,89 @@
+"""
+日志写后缓冲基准测试
+====================
+
+对比逐条写入与写后缓冲批量写入体力日志的吞吐(目标: 单worker每秒5万条):
+- 逐条写入: 每条日志一次AsyncDBOperator.create(开会话、INSERT、提交)
+- 写后缓冲: 生产者持续调用LogSink.log_energy，后台任务按批量大小写入，计时到stop()写完为止
+
+默认使用临时SQLite文件库，可通过 --url 指向本地MySQL(需已建表)。
+
+用法:
+    python -m backend.tools.benchLogSink --rows 200000 --batch-size 1000
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+from sqlalchemy import func, select
+
+from backend.database.models import Base, EnergyLog
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.logSink import LogSink
+
+
+async def count_logs() -> int:
+    async with AsyncDBOperator.session() as session:
+        return (await session.execute(select(func.count()).select_from(EnergyLog))).scalar()
+
+
+async def bench_per_row(rows: int) -> float:
+    start = time.perf_counter()
+    for i in range(rows):
+        await AsyncDBOperator.create(EnergyLog, user_id=f"u{i % 1000}", change_value=-1,
+                                     current_value=100, action_type="explore")
+    return rows / (time.perf_counter() - start)
+
+
+async def bench_sink(rows: int, batch_size: int, flush_ms: int) -> tuple:
+    sink = LogSink(AsyncDBOperator, batch_size=batch_size, flush_interval=flush_ms / 1000,
+                   max_buffer=rows + batch_size)
+    sink.start()
+    start = time.perf_counter()
+    for i in range(rows):
+        sink.log_energy(f"u{i % 1000}", -1, 100, "explore", related_id="space")
+        if i % 100 == 0:
+            await asyncio.sleep(0)  # 模拟请求处理间隙，让出事件循环给写入任务
+    produced = time.perf_counter() - start
+    await sink.stop()
+    return rows / (time.perf_counter() - start), produced / rows * 1e6, sink.stats()
+
+
+async def run(args):
+    async with AsyncDBOperator.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[EnergyLog.__table__])
+    before = await count_logs()
+    per_row = await bench_per_row(args.per_row)
+    print(f"逐条写入: {args.per_row} 条, {per_row:.0f} 条/秒")
+
+    rate, add_us, stats = await bench_sink(args.rows, args.batch_size, args.flush_ms)
+    print(f"写后缓冲: {args.rows} 条, {rate:.0f} 条/秒 (log_energy平均 {add_us:.2f} µs, "
+          f"写入 {stats['flushes']} 次)")
+    written = await count_logs() - before - args.per_row
+    print(f"写入条数校验: {written}/{args.rows}")
+    return rate, written == args.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志写后缓冲基准测试")
+    parser.add_argument("--url", help="数据库连接串(异步驱动)")
+    parser.add_argument("--rows", type=int, default=200000, help="写后缓冲写入条数")
+    parser.add_argument("--per-row", type=int, default=2000, help="逐条写入条数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="批量大小")
+    parser.add_argument("--flush-ms", type=int, default=200, help="最长写入间隔(毫秒)")
+    args = parser.parse_args()
+
+    AsyncDBOperator.configure(args.url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+    async def runner():
+        try:
+            return await run(args)
+        finally:
+            await AsyncDBOperator.dispose()
+    rate, complete = asyncio.run(runner())
+    print(f"结果: {'达标' if rate >= 50000 and complete else '未达标'} (目标 50000 条/秒)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+分页方式基准测试
+================
+
+对比OFFSET分页与键集(游标)分页在深页时的查询耗时:
+- 回复历史: 默认100万条回复，分布在10个空间中(每个空间10万层)
+- 空间列表: 默认10万个空间，按热度降序
+
+两种方式执行backend/modules/spaces.py中的同一组查询构建函数。
+默认使用临时SQLite文件库，可通过 --url 指向本地MySQL(需已建表)。
+
+用法:
+    python -m backend.tools.benchPagination --replies 1000000 --pages 1 500 5000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from sqlalchemy import create_engine, insert, func, select
+
+from backend.database.models import Base, Reply, Space
+from backend.modules.spaces import (
+    space_page_query, reply_page_query, reply_offset_query, SPACE_COLUMNS
+)
+
+BATCH = 20000
+
+
+def seed(engine, replies: int, reply_spaces: int, spaces: int):
+    """批量写入测试数据"""
+    Base.metadata.create_all(engine, tables=[Space.__table__, Reply.__table__])
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(Reply)).scalar():
+            return
+        rng = random.Random(1)
+        rows = [{"id": f"space{i:06d}", "type": ("temp", "stable", "fixed")[i % 3], "author_id": "u",
+                 "creator_id": "u", "title": f"空间{i}", "content": "内容", "heat": rng.randrange(10000)}
+                for i in range(spaces)]
+        for start in range(0, len(rows), BATCH):
+            conn.execute(insert(Space), rows[start:start + BATCH])
+        per_space = replies // reply_spaces
+        batch = []
+        for s in range(reply_spaces):
+            for floor in range(1, per_space + 1):
+                batch.append({"id": f"r{s}-{floor}", "space_id": f"space{s:06d}", "author_id": "u",
+                              "content": "队伍继续沿着石阶向下探索。", "floor_num": floor})
+                if len(batch) >= BATCH:
+                    conn.execute(insert(Reply), batch)
+                    batch = []
+        if batch:
+            conn.execute(insert(Reply), batch)
+
+
+def timed(conn, query, rounds: int) -> float:
+    """平均查询耗时(毫秒)"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        conn.execute(query).all()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OFFSET与键集分页基准测试")
+    parser.add_argument("--url", help="数据库连接串(同步驱动)")
+    parser.add_argument("--replies", type=int, default=1000000, help="回复总数")
+    parser.add_argument("--reply-spaces", type=int, default=10, help="回复分布的空间数")
+    parser.add_argument("--spaces", type=int, default=100000, help="空间总数")
+    parser.add_argument("--limit", type=int, default=20, help="每页条数")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 500, 5000], help="测量的页码")
+    parser.add_argument("--rounds", type=int, default=20, help="每个查询的执行次数")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    start = time.perf_counter()
+    seed(engine, args.replies, args.reply_spaces, args.spaces)
+    print(f"数据准备: {args.replies} 条回复, {args.spaces} 个空间 ({time.perf_counter() - start:.1f}s)")
+    limit = args.limit
+
+    with engine.connect() as conn:
+        ordered = select(*SPACE_COLUMNS).order_by(Space.heat.desc(), Space.id.desc())
+        print(f"\n回复历史 (limit={limit})")
+        print(f"{'page':>6} {'offset ms':>10} {'keyset ms':>10}")
+        for page in args.pages:
+            offset_ms = timed(conn, reply_offset_query("space000000", limit, page), args.rounds)
+            after = (page - 1) * limit or None
+            keyset_ms = timed(conn, reply_page_query("space000000", limit, after), args.rounds)
+            print(f"{page:>6} {offset_ms:>10.3f} {keyset_ms:>10.3f}")
+
+        print(f"\n空间列表 (limit={limit})")
+        print(f"{'page':>6} {'offset ms':>10} {'keyset ms':>10}")
+        for page in args.pages:
+            if (page - 1) * limit >= args.spaces:
+                continue
+            offset_query = ordered.offset((page - 1) * limit).limit(limit)
+            offset_ms = timed(conn, offset_query, args.rounds)
+            after = None
+            if page > 1:
+                # 游标取自上一页最后一行(客户端翻页时由上一页响应给出)
+                last = conn.execute(ordered.offset((page - 1) * limit - 1).limit(1)).first()
+                after = (last.heat, last.id)
+            keyset_ms = timed(conn, space_page_query(None, limit, after), args.rounds)
+            print(f"{page:>6} {offset_ms:>10.3f} {keyset_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
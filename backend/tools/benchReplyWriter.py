@@ -0,0 +1,117 @@
+"""
+热门空间回复写入基准测试
+========================
+
+N个并发写入者(默认256)向同一个空间连续发表回复，对比两种写入方式的回复/秒:
+- 朴素: 每条回复一个事务，SELECT MAX(floor_num)+1 后插入，唯一约束冲突或锁冲突时重试
+- ReplyWriter: 楼层号按块预分配，回复组提交批量插入
+
+默认使用临时SQLite文件库，可通过 --url 指向本地MySQL(需已建表，异步驱动)。
+
+用法:
+    python -m backend.tools.benchReplyWriter --writers 256 --replies 20
+"""
+import os
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+from sqlalchemy import create_engine, insert, select, func, delete
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.database.models import Base, Reply, Space
+from backend.modules.replyWriter import FloorAllocator, ReplyWriter
+
+SPACE_ID = "bench-space"
+
+
+def seed(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Space.__table__, Reply.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Space), {"id": SPACE_ID, "type": "fixed", "author_id": "u", "creator_id": "u",
+                                     "title": "热门空间", "content": "内容"})
+    engine.dispose()
+
+
+async def reset():
+    async with AsyncDBOperator.session() as session:
+        await session.execute(delete(Reply).where(Reply.space_id == SPACE_ID))
+
+
+async def naive_post(author_id: str, stats: dict):
+    while True:
+        try:
+            async with AsyncDBOperator.session() as session:
+                floor = (await session.execute(
+                    select(func.coalesce(func.max(Reply.floor_num), 0) + 1).where(Reply.space_id == SPACE_ID)
+                )).scalar()
+                await session.execute(insert(Reply), {"id": str(uuid.uuid4()), "space_id": SPACE_ID,
+                                                      "author_id": author_id, "content": "回复",
+                                                      "floor_num": floor})
+            return
+        except (IntegrityError, OperationalError):
+            stats["retries"] += 1
+
+
+async def run_writers(writers: int, replies: int, post) -> float:
+    async def writer(i: int):
+        for _ in range(replies):
+            await post(f"user{i}")
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(i) for i in range(writers)))
+    return time.perf_counter() - start
+
+
+async def check_floors(expected: int) -> tuple:
+    async with AsyncDBOperator.session() as session:
+        count, distinct = (await session.execute(
+            select(func.count(), func.count(func.distinct(Reply.floor_num))).where(Reply.space_id == SPACE_ID)
+        )).one()
+    assert count == distinct == expected, (count, distinct, expected)
+    return count
+
+
+async def run(args):
+    if args.url:
+        AsyncDBOperator.configure(args.url)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        seed(path)
+        AsyncDBOperator.configure(f"sqlite+aiosqlite:///{path}")
+    total = args.writers * args.replies
+    print(f"{args.writers} 个写入者 x {args.replies} 条回复 = {total} 条\n")
+    print(f"{'mode':<14} {'replies/s':>10} {'detail':>30}")
+
+    if not args.skip_naive:
+        await reset()
+        stats = {"retries": 0}
+        elapsed = await run_writers(args.writers, args.replies, lambda author: naive_post(author, stats))
+        await check_floors(total)
+        print(f"{'朴素':<14} {total / elapsed:>10.0f} {'重试 ' + str(stats['retries']):>30}")
+
+    await reset()
+    writer = ReplyWriter(FloorAllocator(block_size=args.block_size), batch_size=args.batch_size)
+    elapsed = await run_writers(args.writers, args.replies, lambda author: writer.post(SPACE_ID, author, "回复"))
+    await check_floors(total)
+    stats = writer.stats()
+    detail = f"批次 {stats['batches']} 预分配 {stats['reservations']}"
+    print(f"{'ReplyWriter':<14} {total / elapsed:>10.0f} {detail:>30}")
+    await AsyncDBOperator.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热门空间回复写入基准测试")
+    parser.add_argument("--url", help="数据库连接串(异步驱动)")
+    parser.add_argument("--writers", type=int, default=256, help="并发写入者数")
+    parser.add_argument("--replies", type=int, default=20, help="每个写入者的回复数")
+    parser.add_argument("--block-size", type=int, default=64, help="楼层号预分配块大小")
+    parser.add_argument("--batch-size", type=int, default=256, help="单批插入的最大回复数")
+    parser.add_argument("--skip-naive", action="store_true", help="跳过朴素方式")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+ORM读取与轻量行读取基准测试
+==========================
+
+对比DBOperator两种读取路径读取全部用户的吞吐(行/秒):
+- ORM: get_all，构造User实例并进入会话身份映射
+- 行(全部列): fetch_all，返回命名元组
+- 行(部分列): fetch_all 只查询列表页需要的列
+
+另测单行查询(按用户名)每秒次数。默认使用临时SQLite文件库，可通过 --url 指向本地MySQL(需已建表)。
+
+用法:
+    python -m backend.tools.benchRowRead --users 100000 --rounds 3
+"""
+import os
+import time
+import argparse
+import tempfile
+from sqlalchemy import insert, func, select
+
+from backend.database import hbm_mysql
+from backend.database.hbm_mysql import DBOperator
+from backend.database.models import Base, User
+
+BATCH = 20000
+LIST_COLUMNS = ("id", "username", "score", "yesterday_rank")
+
+
+def seed(engine, users: int):
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(User)).scalar():
+            return
+        for start in range(0, users, BATCH):
+            conn.execute(insert(User), [
+                {"id": f"user{i:08d}", "username": f"user{i:08d}", "password_hash": "x" * 60,
+                 "email": f"user{i:08d}@test.com", "score": i % 5000, "energy": 256, "max_energy": 256}
+                for i in range(start, min(start + BATCH, users))
+            ])
+
+
+def best_rate(fn, rows: int, rounds: int) -> float:
+    """多轮取最快一轮的行/秒"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        assert len(result) == rows
+    return rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM读取与轻量行读取基准测试")
+    parser.add_argument("--url", help="数据库连接串(同步驱动)")
+    parser.add_argument("--users", type=int, default=100000, help="用户数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种方式的执行轮数")
+    parser.add_argument("--lookups", type=int, default=5000, help="单行查询次数")
+    args = parser.parse_args()
+
+    engine = hbm_mysql.configure(args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    start = time.perf_counter()
+    seed(engine, args.users)
+    print(f"数据准备: {args.users} 个用户 ({time.perf_counter() - start:.1f}s)\n")
+
+    print(f"{'mode':<16} {'rows/s':>12}")
+    for label, fn in (
+        ("ORM get_all", lambda: DBOperator.get_all(User)),
+        ("行 全部列", lambda: DBOperator.fetch_all(User)),
+        ("行 部分列", lambda: DBOperator.fetch_all(User, LIST_COLUMNS)),
+    ):
+        print(f"{label:<16} {best_rate(fn, args.users, args.rounds):>12.0f}")
+
+    names = [f"user{i % args.users:08d}" for i in range(0, args.lookups * 7919, 7919)]
+    print(f"\n{'lookup':<16} {'queries/s':>12}")
+    for label, fn in (
+        ("ORM get_one", lambda name: DBOperator.get_one(User, username=name)),
+        ("行 fetch_one", lambda name: DBOperator.fetch_one(User, ("id", "password_hash"), username=name)),
+    ):
+        start = time.perf_counter()
+        for name in names:
+            fn(name)
+        print(f"{label:<16} {len(names) / (time.perf_counter() - start):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
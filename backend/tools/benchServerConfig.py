@@ -0,0 +1,86 @@
+"""
+服务器配置读取基准测试
+======================
+
+在内存SQLite(aiosqlite)中写入 --configs 行配置，比较:
+- 每次读取都查询server_configs表(改造前热路径的做法)
+- ServerConfigRegistry.get()按键名与按ConfigOption读取
+并测量一次轮询(内容未变化)与一次重新加载的耗时，输出重新加载计数
+
+用法:
+    python -m backend.tools.benchServerConfig --reads 1000000 --configs 50
+"""
+import time
+import asyncio
+import argparse
+from sqlalchemy import insert, select, update
+
+from backend.database.models import Base, ServerConfig
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.serverConfig import ServerConfigRegistry
+
+
+async def seed(configs: int):
+    AsyncDBOperator.configure("sqlite+aiosqlite://")
+    async with AsyncDBOperator.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[ServerConfig.__table__])
+        await conn.execute(insert(ServerConfig), [
+            {"config_key": f"key{i}", "config_value": str(i), "data_type": "int"} for i in range(configs)
+        ] + [{"config_key": "zero_energy_weight", "config_value": "0.5", "data_type": "float"}])
+
+
+async def run(args):
+    await seed(args.configs)
+    registry = ServerConfigRegistry()
+    option = registry.define('zero_energy_weight', 'float', 0.5)
+    await registry.load()
+
+    query = select(ServerConfig.config_value).where(ServerConfig.config_key == 'zero_energy_weight')
+    db_reads = max(args.reads // 1000, 100)
+    start = time.perf_counter()
+    for _ in range(db_reads):
+        async with AsyncDBOperator.read_session() as session:
+            float((await session.execute(query)).scalar())
+    per_db_read = (time.perf_counter() - start) / db_reads
+
+    get = registry.get
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        get('zero_energy_weight')
+    per_key_read = (time.perf_counter() - start) / args.reads
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        get(option)
+    per_option_read = (time.perf_counter() - start) / args.reads
+
+    start = time.perf_counter()
+    for _ in range(100):
+        await registry.refresh()
+    per_poll = (time.perf_counter() - start) / 100
+    async with AsyncDBOperator.session() as session:
+        await session.execute(update(ServerConfig).where(ServerConfig.config_key == 'zero_energy_weight')
+                              .values(config_value='0.3'))
+    start = time.perf_counter()
+    reloaded = await registry.refresh()
+    reload_time = time.perf_counter() - start
+    assert reloaded and registry.get(option) == 0.3
+    await AsyncDBOperator.dispose()
+
+    print(f"configs={args.configs + 1} reads={args.reads}")
+    print(f"db query per read: {per_db_read * 1e6:>10.2f} µs")
+    print(f"get(key):          {per_key_read * 1e9:>10.1f} ns")
+    print(f"get(option):       {per_option_read * 1e9:>10.1f} ns")
+    print(f"poll (unchanged):  {per_poll * 1e6:>10.2f} µs")
+    print(f"reload (changed):  {reload_time * 1e6:>10.2f} µs")
+    print(f"stats: {registry.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务器配置读取基准测试")
+    parser.add_argument("--reads", type=int, default=1000000, help="内存读取次数")
+    parser.add_argument("--configs", type=int, default=50, help="配置行数")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
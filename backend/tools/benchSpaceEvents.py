@@ -0,0 +1,72 @@
+"""
+空间事件扇出基准测试
+====================
+
+在一个事件循环中建立N个空闲SSE连接(默认10000，每个连接为一个消费event_stream()响应体的任务，
+等同于服务端发送循环)，测量:
+- 每个空闲连接的内存(tracemalloc，含任务、生成器与订阅)
+- 向同一空间全部连接广播一条事件，直到所有连接都取到该事件的耗时
+- 连接数翻倍后单连接内存是否保持不变
+
+用法:
+    python -m backend.tools.benchSpaceEvents --connections 10000 --spaces 10
+"""
+import time
+import asyncio
+import argparse
+import tracemalloc
+
+from backend.modules.spaceEvents import SpaceEventHub, event_stream
+
+
+async def open_connections(hub: SpaceEventHub, count: int, spaces: int, received: list) -> list:
+    async def consume(space_id: str):
+        async for chunk in event_stream(hub, space_id, keepalive=3600):
+            received[0] += chunk.count(b"event: ")
+
+    tasks = [asyncio.create_task(consume(f"space{i % spaces}")) for i in range(count)]
+    # 让每个连接发送初始帧并进入等待
+    for _ in range(3):
+        await asyncio.sleep(0)
+    return tasks
+
+
+async def measure(connections: int, spaces: int) -> tuple:
+    hub = SpaceEventHub(queue_size=16)
+    received = [0]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = await open_connections(hub, connections, spaces, received)
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / connections
+    tracemalloc.stop()
+
+    listeners = hub.subscribers("space0")
+    start = time.perf_counter()
+    await hub.publish_space_update("space0", turns_left=9)
+    while received[0] < listeners:
+        await asyncio.sleep(0)
+    broadcast = time.perf_counter() - start
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert hub.stats()["connections"] == 0
+    return per_connection, listeners, broadcast
+
+
+async def run(args):
+    print(f"{'connections':>12} {'bytes/conn':>12} {'listeners':>10} {'broadcast(ms)':>14}")
+    for count in (args.connections, args.connections * 2):
+        per_connection, listeners, broadcast = await measure(count, args.spaces)
+        print(f"{count:>12} {per_connection:>12.0f} {listeners:>10} {broadcast * 1e3:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="空间事件扇出基准测试")
+    parser.add_argument("--connections", type=int, default=10000, help="空闲连接数")
+    parser.add_argument("--spaces", type=int, default=1, help="连接分布的空间数(广播发往其中一个空间)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
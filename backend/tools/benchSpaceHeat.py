@@ -0,0 +1,84 @@
+"""
+空间热度引擎基准测试
+====================
+
+测量SpaceHeatEngine在单核上的:
+- 交互事件吞吐(次/秒): 按Zipf分布(少数热门空间占多数交互)在N个空间上记录事件
+- hottest / coldest 查询延迟(毫秒)
+- flush写回耗时: 临时SQLite库中写回全部变化的空间
+
+用法:
+    python -m backend.tools.benchSpaceHeat --spaces 100000 --events 2000000
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+from sqlalchemy import create_engine, insert
+
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.database.models import Base, Space
+from backend.modules.spaceHeat import SpaceHeatEngine
+
+BATCH = 20000
+
+
+def seed(path: str, spaces: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Space.__table__])
+    with engine.begin() as conn:
+        for start in range(0, spaces, BATCH):
+            conn.execute(insert(Space), [
+                {"id": f"space{i:08d}", "type": "temp", "author_id": "u", "creator_id": "u",
+                 "title": f"空间{i}", "content": "内容"}
+                for i in range(start, min(start + BATCH, spaces))
+            ])
+    engine.dispose()
+
+
+async def run(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(path, args.spaces)
+    AsyncDBOperator.configure(f"sqlite+aiosqlite:///{path}")
+    engine = SpaceHeatEngine(heat_half_life=3600)
+    start = time.perf_counter()
+    print(f"加载: {await engine.warm()} 个空间 {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(args.seed)
+    ids = [f"space{i:08d}" for i in range(args.spaces)]
+    targets = [ids[i] for i in (rng.zipf(1.2, args.events) - 1) % args.spaces]
+    record = engine.record
+    start = time.perf_counter()
+    for space_id in targets:
+        record(space_id)
+    elapsed = time.perf_counter() - start
+    print(f"记录事件: {args.events} 次 {elapsed:.2f}s ({args.events / elapsed:.0f} 次/秒)\n")
+
+    print(f"{'query':<14} {'ms':>8}")
+    for label, fn in (("hottest(100)", lambda: engine.hottest(100)),
+                      ("coldest(1000)", lambda: engine.coldest(1000))):
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        print(f"{label:<14} {best * 1e3:>8.2f}")
+
+    start = time.perf_counter()
+    written = await engine.flush()
+    print(f"\n写回: {written} 行 {time.perf_counter() - start:.2f}s")
+    await AsyncDBOperator.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="空间热度引擎基准测试")
+    parser.add_argument("--spaces", type=int, default=100000, help="空间数")
+    parser.add_argument("--events", type=int, default=2000000, help="交互事件数")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
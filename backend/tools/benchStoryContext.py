@@ -0,0 +1,110 @@
+"""
+剧情上下文构建基准测试
+======================
+
+对比楼层数为10/100/1000的空间中两种上下文构建方式的提示token数与延迟:
+- full: 读取整串回复拼接为提示(改造前的做法)
+- window: StoryContextBuilder(摘要 + 最近M条回复 + token预算)
+
+window分别测量首次构建(cold，含摘要并入)与摘要已保存后的构建(warm)。
+摘要函数为即时返回的抽取式摘要，不含模型耗时；
+模型预填充耗时按 --prefill-tps(token/秒)估算。
+
+用法:
+    python -m backend.tools.benchStoryContext --floors 10 100 1000
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+from sqlalchemy import select
+
+from backend.database.models import Base, Reply, Space, SpaceSummary
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.ai.storyContext import StoryContextBuilder, estimate_tokens, format_reply
+
+REPLY_TEXT = "队伍举着火把沿着潮湿的石阶向下，墙上的符文随着脚步逐一亮起，远处传来低沉的回响。"
+
+
+async def extractive_summary(summary, chunk):
+    """抽取式摘要: 保留每块最后一条回复"""
+    return (summary + chunk[-1][1])[-300:]
+
+
+async def seed(floors_list):
+    async with AsyncDBOperator.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all,
+                            tables=[Space.__table__, Reply.__table__, SpaceSummary.__table__])
+    for floors in floors_list:
+        space_id = f"space{floors}"
+        await AsyncDBOperator.create(Space, id=space_id, type="fixed", author_id="u", creator_id="u",
+                                     title=f"遗迹{floors}", content="古老的地下遗迹，传说藏有半数黑金。")
+        await AsyncDBOperator.bulk_create(Reply, [
+            {"id": f"{space_id}-{i}", "space_id": space_id, "author_id": "u",
+             "content": f"{REPLY_TEXT}({i})", "floor_num": i}
+            for i in range(1, floors + 1)
+        ])
+
+
+async def full_prompt(space_id):
+    async with AsyncDBOperator.session() as session:
+        space = (await session.execute(
+            select(Space.title, Space.content).where(Space.id == space_id))).first()
+        replies = (await session.execute(
+            select(Reply.floor_num, Reply.content).where(Reply.space_id == space_id)
+            .order_by(Reply.floor_num))).all()
+    return "\n".join([f"空间: {space.title}\n{space.content}"] +
+                     [format_reply(r.floor_num, r.content) for r in replies])
+
+
+async def timed(factory, rounds):
+    result = None
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = await factory()
+    return (time.perf_counter() - start) / rounds * 1000, result
+
+
+async def run(args):
+    await seed(args.floors)
+    builder = StoryContextBuilder(extractive_summary, AsyncDBOperator, recent_replies=args.recent,
+                                  summarize_every=args.every, token_budget=args.budget)
+    print(f"M={args.recent} K={args.every} budget={args.budget} prefill={args.prefill_tps} token/s")
+    print(f"{'floors':>6} {'mode':>7} {'tokens':>7} {'build ms':>9} {'prefill ms':>11}")
+    for floors in args.floors:
+        space_id = f"space{floors}"
+        full_ms, prompt = await timed(lambda: full_prompt(space_id), args.rounds)
+        cold_ms, _ = await timed(lambda: builder.build(space_id), 1)
+        warm_ms, context = await timed(lambda: builder.build(space_id), args.rounds)
+        full_tokens = estimate_tokens(prompt)
+        for mode, tokens, ms in (("full", full_tokens, full_ms),
+                                 ("cold", context.tokens, cold_ms),
+                                 ("warm", context.tokens, warm_ms)):
+            prefill = tokens / args.prefill_tps * 1000
+            print(f"{floors:>6} {mode:>7} {tokens:>7} {ms:>9.2f} {prefill:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="剧情上下文构建基准测试")
+    parser.add_argument("--floors", type=int, nargs="+", default=[10, 100, 1000], help="各空间楼层数")
+    parser.add_argument("--recent", type=int, default=20, help="最近回复数M")
+    parser.add_argument("--every", type=int, default=20, help="摘要更新间隔K")
+    parser.add_argument("--budget", type=int, default=2048, help="提示token预算")
+    parser.add_argument("--rounds", type=int, default=20, help="每种模式的轮数")
+    parser.add_argument("--prefill-tps", type=float, default=400, help="估算模型预填充速度(token/秒)")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    AsyncDBOperator.configure(f"sqlite+aiosqlite:///{db_path}")
+
+    async def runner():
+        try:
+            await run(args)
+        finally:
+            await AsyncDBOperator.dispose()
+    asyncio.run(runner())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,106 +1,384 @@
+"""
+图片压缩工具
+============
+
+遍历目录压缩前端静态资源与AI生成的卡牌插画:
+- PNG: 调色板量化后优化保存，结果不小于原文件时保留原文件
+- ICO: 按多尺寸重绘
+- 可选为PNG生成WebP/AVIF副本(同名不同扩展名，供浏览器按支持情况选用)
+
+流水线:
+1. 遍历输入路径(文件或目录，递归)收集PNG/ICO
+2. 对照清单(manifest，JSON)跳过内容哈希与压缩参数均未变化、且副本齐全的文件
+3. 其余文件在进程池中并行压缩，每个输出先写入同目录临时文件再原子替换，中断不会留下半个文件
+4. 清单记录压缩后文件的SHA-256，下次运行即可跳过；清单本身同样原子写入
+5. 输出文件数、节省字节数与吞吐量
+
+用法:
+    python -m backend.tools.compress_images frontend/public frontend/src/assets/images --variants webp,avif
+"""
 import os
-from PIL import Image
-from typing import List, Optional, Callable
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterator, List, Optional, Callable, Tuple
+from PIL import Image, features
+
+SUPPORTED_EXTENSIONS = (".png", ".ico")
+VARIANT_FORMATS = {"webp": "WEBP", "avif": "AVIF"}
+DEFAULT_MANIFEST = ".image-manifest.json"
+HASH_CHUNK = 1 << 20
+
+
+@dataclass(frozen=True, slots=True)
+class CompressOptions:
+    """压缩参数(参数变化后清单中的记录失效)"""
+    colors: int = 256
+    method: int = 2
+    optimize: bool = True
+    ico_sizes: Tuple[int, ...] = (16, 32, 48, 64, 128, 256)
+    variants: Tuple[str, ...] = ()
+    webp_quality: int = 80
+    avif_quality: int = 60
+
+    def fingerprint(self) -> str:
+        return json.dumps(asdict(self), sort_keys=True)
+
+
+@dataclass(slots=True)
+class FileResult:
+    """单个文件的压缩结果"""
+    path: str
+    before: int
+    after: int = 0
+    variant_bytes: int = 0
+    digest: str = ""
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class CompressReport:
+    """一次运行的统计"""
+    files: int = 0
+    compressed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    variant_bytes: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def summary(self) -> str:
+        throughput = self.compressed / self.seconds if self.seconds else 0.0
+        megabytes = self.bytes_before / self.seconds / 1e6 if self.seconds else 0.0
+        return (f"共{self.files}个文件: 压缩{self.compressed}，跳过{self.skipped}，失败{self.failed}；"
+                f"节省{self.bytes_saved}字节({self.bytes_before} -> {self.bytes_after})，"
+                f"副本{self.variant_bytes}字节；耗时{self.seconds:.2f}秒，"
+                f"{throughput:.1f}文件/秒，{megabytes:.2f}MB/秒")
+
+
+def file_digest(path: str) -> str:
+    """文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_path(path: str, variant: str) -> str:
+    """PNG对应的副本路径"""
+    return f"{os.path.splitext(path)[0]}.{variant}"
+
+
+def _write_temp(image: Image.Image, path: str, **params) -> str:
+    """
+    保存到目标同目录的临时文件(权限与目标一致，新文件为0644)
+
+    Returns:
+        临时文件路径
+    """
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, **params)
+        os.chmod(temp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def _save_atomic(image: Image.Image, path: str, **params) -> int:
+    """
+    保存到临时文件后原子替换目标
+
+    Returns:
+        写入的字节数
+    """
+    temp_path = _write_temp(image, path, **params)
+    size = os.path.getsize(temp_path)
+    os.replace(temp_path, path)
+    return size
+
+
+def _save_if_smaller(image: Image.Image, path: str, limit: int, **params) -> int:
+    """
+    保存到临时文件，比原文件小时才原子替换目标
+
+    Returns:
+        目标文件最终的字节数
+    """
+    temp_path = _write_temp(image, path, **params)
+    size = os.path.getsize(temp_path)
+    if size < limit:
+        os.replace(temp_path, path)
+        return size
+    os.unlink(temp_path)
+    return limit
+
+
+def compress_file(path: str, options: CompressOptions) -> FileResult:
+    """压缩单个文件并生成副本(进程池中执行，异常记录在结果中)"""
+    result = FileResult(path, before=os.path.getsize(path))
+    try:
+        with Image.open(path) as img:
+            img.load()
+            if path.lower().endswith(".png"):
+                rgba = img.convert("RGBA")
+                quantized = rgba.quantize(colors=options.colors, method=options.method)
+                result.after = _save_if_smaller(quantized, path, result.before, format="PNG",
+                                                optimize=options.optimize)
+                for variant in options.variants:
+                    quality = options.webp_quality if variant == "webp" else options.avif_quality
+                    result.variant_bytes += _save_atomic(rgba, variant_path(path, variant),
+                                                         format=VARIANT_FORMATS[variant], quality=quality)
+            else:
+                sizes = [(size, size) for size in options.ico_sizes if size <= max(img.size)] or [img.size]
+                result.after = _save_if_smaller(img, path, result.before, format="ICO", sizes=sizes)
+        result.digest = file_digest(path)
+    except Exception as e:
+        result.after = result.before
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _compress_job(job: Tuple[str, CompressOptions]) -> FileResult:
+    return compress_file(*job)
 
 
 class ImageCompressor:
     """图片压缩工具类，提供PNG和ICO格式的压缩功能"""
-    
-    def __init__(self, image_paths: Optional[List[str]] = None):
+
+    def __init__(self, image_paths: Optional[List[str]] = None, manifest_path: Optional[str] = None,
+                 options: Optional[CompressOptions] = None, workers: Optional[int] = None):
         """
         初始化图片压缩器
-        
+
         Args:
-            image_paths: 需要压缩的图片路径列表，默认为空
+            image_paths: 需要压缩的图片文件或目录(递归遍历)列表，默认为空
+            manifest_path: 清单文件路径，为None时不使用清单(每次全部压缩)
+            options: 压缩参数
+            workers: 进程数，默认CPU核数；为1时在当前进程中执行
         """
         self.image_paths = image_paths or []
+        self.manifest_path = manifest_path
+        self.options = options or CompressOptions()
+        self.workers = workers or os.cpu_count() or 1
         self.logger: Optional[Callable[[str], None]] = None
-    
+        for variant in self.options.variants:
+            if variant not in VARIANT_FORMATS:
+                raise ValueError(f"不支持的副本格式: {variant}")
+            if not features.check(variant):
+                raise ValueError(f"当前Pillow不支持{variant.upper()}编码")
+
     def set_logger(self, logger_func: Callable[[str], None]) -> None:
         """
         设置日志记录函数
-        
+
         Args:
             logger_func: 接收字符串参数的日志记录函数
         """
         self.logger = logger_func
-    
+
     def _log(self, message: str) -> None:
         """内部日志记录方法"""
         if self.logger:
             self.logger(message)
-    
-    def compress_images(self) -> None:
-        """主程序逻辑：压缩指定的图片文件"""
-        if not self.image_paths:
-            self._log("没有指定需要压缩的图片文件")
-            return
-            
+
+    # ---------- 遍历与清单 ----------
+
+    def iter_images(self) -> Iterator[str]:
+        """遍历输入路径中的PNG/ICO文件(去重，目录内按路径排序)"""
+        seen = set()
         for image_path in self.image_paths:
-            if not os.path.exists(image_path):
+            if os.path.isdir(image_path):
+                found = []
+                for directory, dirnames, filenames in os.walk(image_path):
+                    dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+                    found.extend(os.path.join(directory, name) for name in filenames
+                                 if name.lower().endswith(SUPPORTED_EXTENSIONS))
+                candidates = sorted(found)
+            elif os.path.exists(image_path):
+                if not image_path.lower().endswith(SUPPORTED_EXTENSIONS):
+                    self._log(f"未知的文件类型: {image_path}")
+                    continue
+                candidates = [image_path]
+            else:
                 self._log(f"警告: 文件 {image_path} 不存在，跳过压缩。")
                 continue
-            
-            try:
-                if image_path.lower().endswith(".png"):
-                    self._log(f"正在压缩 PNG: {image_path}")
-                    self.compress_png(image_path)
-                elif image_path.lower().endswith(".ico"):
-                    self._log(f"正在压缩 ICO: {image_path}")
-                    self.compress_ico(image_path)
-                else:
-                    self._log(f"未知的文件类型: {image_path}")
-            except Exception as e:
-                self._log(f"压缩失败 {image_path}: {e}")
-        
-        self._log("压缩完成。")
-    
+            for path in candidates:
+                key = os.path.abspath(path)
+                if key not in seen:
+                    seen.add(key)
+                    yield path
+
+    def _manifest_key(self, path: str) -> str:
+        base = os.path.dirname(os.path.abspath(self.manifest_path))
+        return os.path.relpath(os.path.abspath(path), base).replace(os.sep, "/")
+
+    def load_manifest(self) -> Dict[str, dict]:
+        """读取清单，不存在或损坏时返回空清单"""
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f).get("files", {})
+        except (OSError, ValueError, AttributeError) as e:
+            self._log(f"清单无法读取，将全部重新压缩: {e}")
+            return {}
+
+    def save_manifest(self, entries: Dict[str, dict]) -> None:
+        """原子写入清单"""
+        directory, name = os.path.split(os.path.abspath(self.manifest_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "files": entries}, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(temp_path, self.manifest_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _unchanged(self, path: str, entry: Optional[dict], fingerprint: str) -> bool:
+        """内容哈希与压缩参数均与清单一致，且副本齐全"""
+        if not entry or entry.get("options") != fingerprint or entry.get("size") != os.path.getsize(path):
+            return False
+        if path.lower().endswith(".png") and \
+                not all(os.path.exists(variant_path(path, variant)) for variant in self.options.variants):
+            return False
+        return entry.get("hash") == file_digest(path)
+
+    # ---------- 压缩 ----------
+
+    def compress_images(self) -> CompressReport:
+        """主程序逻辑：压缩输入路径中需要更新的图片文件"""
+        report = CompressReport()
+        if not self.image_paths:
+            self._log("没有指定需要压缩的图片文件")
+            return report
+
+        start = time.perf_counter()
+        manifest = self.load_manifest()
+        fingerprint = self.options.fingerprint()
+        pending = []
+        for path in self.iter_images():
+            report.files += 1
+            key = self._manifest_key(path) if self.manifest_path else path
+            if self.manifest_path and self._unchanged(path, manifest.get(key), fingerprint):
+                report.skipped += 1
+                continue
+            pending.append((key, path))
+
+        jobs = [(path, self.options) for _, path in pending]
+        if self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+                results = list(executor.map(_compress_job, jobs, chunksize=max(len(jobs) // (self.workers * 4), 1)))
+        else:
+            results = [_compress_job(job) for job in jobs]
+
+        for (key, path), result in zip(pending, results):
+            if result.error is not None:
+                report.failed += 1
+                report.errors.append(f"{path}: {result.error}")
+                self._log(f"压缩失败 {path}: {result.error}")
+                continue
+            report.compressed += 1
+            report.bytes_before += result.before
+            report.bytes_after += result.after
+            report.variant_bytes += result.variant_bytes
+            manifest[key] = {"hash": result.digest, "size": result.after, "options": fingerprint}
+
+        if self.manifest_path and report.compressed:
+            self.save_manifest(manifest)
+        report.seconds = time.perf_counter() - start
+        self._log(report.summary())
+        return report
+
     def compress_png(self, image_path: str, colors: int = 256, method: int = 2, optimize: bool = True) -> None:
         """
         压缩PNG图片
-        
+
         Args:
             image_path: 图片文件路径
             colors: 颜色数量，用于调色板量化
             method: 量化方法
             optimize: 是否启用优化
         """
-        with Image.open(image_path) as img:
-            # 转换为 RGBA 并简化调色板
-            img = img.convert("RGBA")
-            img = img.quantize(colors=colors, method=method)
-            # 保存优化后的图片
-            img.save(image_path, optimize=optimize)
-    
+        result = compress_file(image_path, CompressOptions(colors=colors, method=method, optimize=optimize))
+        if result.error is not None:
+            raise RuntimeError(result.error)
+
     def compress_ico(self, image_path: str, sizes: Optional[List[int]] = None) -> None:
         """
         压缩ICO图标
-        
+
         Args:
             image_path: 图标文件路径
             sizes: 不同DPI的尺寸列表
         """
-        sizes = sizes or [16, 32, 48, 64, 128, 256]  # 默认尺寸
-        
-        with Image.open(image_path) as img:
-            # 保留原始尺寸，采用默认质量进行重绘
-            img.save(image_path, format="ICO", sizes=[(size, size) for size in sizes])
+        options = CompressOptions(ico_sizes=tuple(sizes)) if sizes else CompressOptions()
+        result = compress_file(image_path, options)
+        if result.error is not None:
+            raise RuntimeError(result.error)
 
 
-if __name__ == "__main__":
-    # 默认要压缩的图片路径
-    DEFAULT_IMAGES_TO_COMPRESS = [
-        r"frontend\public\favicon.ico",
-        r"frontend\src\assets\images\defcard.png",
-        r"frontend\src\assets\images\logo.png"
-    ]
-    
-    # 创建压缩器实例
-    compressor = ImageCompressor(DEFAULT_IMAGES_TO_COMPRESS)
-    
+# 默认要压缩的前端资源(相对仓库根目录)
+DEFAULT_IMAGES_TO_COMPRESS = [
+    os.path.join("frontend", "public"),
+    os.path.join("frontend", "src", "assets", "images"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片压缩工具")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_IMAGES_TO_COMPRESS, help="图片文件或目录")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="清单文件路径，为空字符串时不使用清单")
+    parser.add_argument("--variants", default="", help="为PNG生成的副本格式(逗号分隔): webp,avif")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认CPU核数")
+    parser.add_argument("--colors", type=int, default=256, help="PNG调色板颜色数")
+    args = parser.parse_args()
+
+    variants = tuple(variant.strip().lower() for variant in args.variants.split(",") if variant.strip())
+    compressor = ImageCompressor(args.paths, manifest_path=args.manifest or None,
+                                 options=CompressOptions(colors=args.colors, variants=variants),
+                                 workers=args.workers)
     # 设置简单的控制台日志输出
-    import sys
     compressor.set_logger(lambda msg: print(f"[ImageCompressor] {msg}"))
-    
-    # 执行压缩
-    compressor.compress_images()
\ No newline at end of file
+    report = compressor.compress_images()
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+本地模拟Ollama HTTP服务
+=======================
+
+用于测试和基准测试，无需真实模型。实现Ollama的部分接口:
+- POST /api/generate: 支持stream=true(NDJSON分块输出)与stream=false
+- GET /api/tags: 返回模型列表
+
+行为:
+- 输出token由responder(请求体)决定，默认根据options.seed生成不同内容
+- 每个token之间等待token_delay秒，首token前等待first_token_delay秒
+- 客户端中途断开时停止生成并计入aborted
+
+用法:
+    python -m backend.tools.fakeOllamaServer --port 11434
+"""
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+
+_ACTIONS = (
+    ["向", "左侧", "通道", "前进"],
+    ["原地", "扎营", "休整"],
+    ["返回", "上一层", "补给"],
+    ["调查", "墙上", "的", "符文"],
+    ["分头", "搜索", "宝箱"],
+)
+
+
+def default_responder(body: dict) -> List[str]:
+    """默认输出: 按种子生成不同的句子，拆分为token"""
+    seed = (body.get("options") or {}).get("seed")
+    tag = seed if seed is not None else len(body.get("prompt", ""))
+    return ["队伍", "决定", *_ACTIONS[tag % len(_ACTIONS)], f"(第{tag}号方案)", "。"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, payload: dict):
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.server.model_name}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        if self.path != "/api/generate":
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        with server.lock:
+            server.requests.append(body)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            tokens = server.responder(body)
+            model = body.get("model", server.model_name)
+            time.sleep(server.first_token_delay)
+            if body.get("stream", True) is False:
+                time.sleep(server.token_delay * max(len(tokens) - 1, 0))
+                self._send_json(self._final(model, "".join(tokens), len(tokens)))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for index, token in enumerate(tokens):
+                if index:
+                    time.sleep(server.token_delay)
+                self._write_chunk({
+                    "model": model, "created_at": self._now(),
+                    "response": token, "done": False
+                })
+            self._write_chunk(self._final(model, "", len(tokens)))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with server.lock:
+                server.aborted += 1
+            self.close_connection = True
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def _final(self, model: str, response: str, count: int) -> dict:
+        return {
+            "model": model, "created_at": self._now(), "response": response,
+            "done": True, "done_reason": "stop", "eval_count": count
+        }
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """模拟Ollama服务(后台线程运行)"""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, token_delay: float = 0.0, first_token_delay: float = 0.0,
+                 responder: Optional[Callable[[dict], List[str]]] = None,
+                 model_name: str = "fake-model"):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.responder = responder or default_responder
+        self.model_name = model_name
+        self.lock = threading.Lock()
+        self.requests: list = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.aborted = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟Ollama服务")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-delay", type=float, default=0.05, help="token间隔(秒)")
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="首token延迟(秒)")
+    args = parser.parse_args()
+    server = FakeOllamaServer(args.port, args.token_delay, args.first_token_delay)
+    print(f"模拟Ollama服务已启动: {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
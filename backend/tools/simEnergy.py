@@ -0,0 +1,154 @@
+"""
+体力惰性恢复模拟
+================
+
+模拟10万用户(其中部分为活跃用户)在一天内的随机体力消耗，验证:
+1. 无后台写入: 空闲时段及全量读取体力时不产生任何写语句
+2. 写入次数: 仅每次成功消耗产生1条UPDATE与1条EnergyLog INSERT
+3. 结果正确: 所有用户的当前体力与独立实现的逐步恢复模型一致
+
+时间由模拟时钟推进，无需真实等待。默认使用临时SQLite文件库。
+
+用法:
+    python -m backend.tools.simEnergy --users 100000 --actions 20000
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, select
+
+from backend.database.models import Base, User, EnergyLog
+from backend.database.hbm_mysql_async import AsyncDBOperator
+from backend.modules.energy import EnergyService, InsufficientEnergy, compute_energy
+
+START = datetime(2026, 1, 1)
+
+
+class ReferenceUser:
+    """独立的逐步恢复模型: 累计恢复进度，每满一个间隔恢复1点"""
+    __slots__ = ("energy", "progress", "last")
+
+    def __init__(self, energy: int):
+        self.energy = energy
+        self.progress = 0
+        self.last = START
+
+    def advance(self, now: datetime, interval: int, max_energy: int):
+        if self.energy < max_energy:
+            self.progress += int((now - self.last).total_seconds())
+            gained = min(self.progress // interval, max_energy - self.energy)
+            self.energy += gained
+            self.progress = 0 if self.energy >= max_energy else self.progress - gained * interval
+        self.last = now
+
+
+class WriteCounter:
+    """统计引擎执行的写语句"""
+
+    def __init__(self, engine):
+        self.writes = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE", "REPLACE"):
+            self.writes += len(parameters) if executemany else 1
+
+
+async def run(args):
+    async with AsyncDBOperator.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[User.__table__, EnergyLog.__table__])
+    users = [f"user{i:06d}" for i in range(args.users)]
+    for start in range(0, len(users), 20000):
+        await AsyncDBOperator.bulk_create(User, [
+            {"id": uid, "username": uid, "password_hash": "x", "energy": args.max_energy,
+             "max_energy": args.max_energy}
+            for uid in users[start:start + 20000]
+        ])
+
+    now = START
+    service = EnergyService(AsyncDBOperator, interval=args.interval, clock=lambda: now)
+    counter = WriteCounter(AsyncDBOperator.engine)
+    reference = {uid: ReferenceUser(args.max_energy) for uid in users}
+
+    rng = random.Random(args.seed)
+    active = users[:args.active]  # 活跃用户集中消耗，覆盖体力耗尽与部分恢复的情况
+    actions = sorted(
+        (START + timedelta(seconds=rng.randrange(args.hours * 3600)),
+         rng.choice(active), rng.randint(1, 40))
+        for _ in range(args.actions)
+    )
+    spent = rejected = mismatched = 0
+    start_time = time.perf_counter()
+    for at, uid, cost in actions:
+        now = at
+        ref = reference[uid]
+        ref.advance(now, args.interval, args.max_energy)
+        expected_ok = ref.energy >= cost
+        try:
+            await service.spend(uid, cost, "explore")
+            spent += 1
+            ok = True
+        except InsufficientEnergy:
+            rejected += 1
+            ok = False
+        mismatched += ok != expected_ok
+        if expected_ok:
+            ref.energy -= cost
+    spend_seconds = time.perf_counter() - start_time
+    spend_writes = counter.writes
+
+    # 空闲时段: 推进时钟后全量读取，不应产生写入
+    now = START + timedelta(hours=args.hours + args.idle_hours)
+    async with AsyncDBOperator.session() as session:
+        rows = (await session.execute(
+            select(User.id, User.energy, User.max_energy, User.energy_recovery_at))).all()
+    total = 0
+    for row in rows:
+        current, _ = compute_energy(row.energy, row.max_energy, row.energy_recovery_at, now, args.interval)
+        ref = reference[row.id]
+        ref.advance(now, args.interval, args.max_energy)
+        mismatched += current != ref.energy
+        total += current
+    idle_writes = counter.writes - spend_writes
+
+    print(f"users={args.users} actions={args.actions} interval={args.interval}s "
+          f"模拟时长={args.hours}h+空闲{args.idle_hours}h")
+    print(f"成功消耗 {spent} 次, 体力不足 {rejected} 次, 耗时 {spend_seconds:.1f}s "
+          f"({args.actions / spend_seconds:.0f} 次/秒)")
+    print(f"消耗期间写语句 {spend_writes} 条 (期望 {spent * 2}: UPDATE + EnergyLog)")
+    print(f"空闲与全量读取期间写语句 {idle_writes} 条 (期望 0)")
+    print(f"体力总和 {total}, 与参考模型不一致 {mismatched} 处")
+    return mismatched == 0 and idle_writes == 0 and spend_writes == spent * 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="体力惰性恢复模拟")
+    parser.add_argument("--users", type=int, default=100000, help="用户数")
+    parser.add_argument("--actions", type=int, default=20000, help="消耗次数")
+    parser.add_argument("--active", type=int, default=1000, help="发起消耗的活跃用户数")
+    parser.add_argument("--hours", type=int, default=24, help="活动时段(小时)")
+    parser.add_argument("--idle-hours", type=int, default=6, help="活动结束后的空闲时段(小时)")
+    parser.add_argument("--interval", type=int, default=600, help="恢复间隔(秒)")
+    parser.add_argument("--max-energy", type=int, default=256, help="最大体力")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "sim.db")
+    AsyncDBOperator.configure(f"sqlite+aiosqlite:///{db_path}")
+
+    async def runner():
+        try:
+            return await run(args)
+        finally:
+            await AsyncDBOperator.dispose()
+    ok = asyncio.run(runner())
+    print("结果: 通过" if ok else "结果: 失败")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+键集分页游标
+============
+
+将排序键的值(如 (热度, ID) 或楼层号)编码为不透明的URL安全字符串，
+客户端原样回传以获取下一页。
+
+说明:
+- 编码为JSON数组的base64url(去除填充)
+- 解码失败或格式不符时抛出ValueError，由路由转换为400
+"""
+import json
+import base64
+from typing import Optional, Sequence
+
+
+def encode_cursor(values: Sequence) -> str:
+    """编码排序键"""
+    raw = json.dumps(list(values), separators=(',', ':'), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str], types: Sequence[type]) -> Optional[tuple]:
+    """
+    解码游标
+
+    参数:
+    - cursor: encode_cursor生成的字符串，为空时返回None
+    - types: 各排序键的类型，用于校验
+
+    异常:
+    - ValueError: 游标无效
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("无效的分页游标") from e
+    if not isinstance(values, list) or len(values) != len(types) or \
+            not all(type(value) is expected for value, expected in zip(values, types)):
+        raise ValueError("无效的分页游标")
+    return tuple(values)
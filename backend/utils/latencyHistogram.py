@@ -0,0 +1,82 @@
+"""
+HDR风格延迟直方图
+=================
+
+对数-线性分桶的延迟直方图，记录为O(1)，内存固定，与样本数量无关。
+
+分桶说明:
+- 以微秒为单位记录
+- 每个2的幂区间再线性划分为 2^(SUB_BUCKET_BITS-1) 个子桶，相对误差约 1/64
+- 超过 max_value_us 的样本计入最高桶
+"""
+from typing import Iterable
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def _bucket_index(value: int) -> int:
+    """计算样本所属桶下标"""
+    if value < SUB_BUCKET_COUNT:
+        return value
+    exponent = value.bit_length() - SUB_BUCKET_BITS
+    sub_bucket = value >> exponent
+    return SUB_BUCKET_COUNT + (exponent - 1) * SUB_BUCKET_HALF + (sub_bucket - SUB_BUCKET_HALF)
+
+
+def _bucket_upper(index: int) -> int:
+    """计算桶所覆盖的最大值"""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    exponent, offset = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF)
+    exponent += 1
+    return ((offset + SUB_BUCKET_HALF + 1) << exponent) - 1
+
+
+class LatencyHistogram:
+    """延迟直方图"""
+
+    def __init__(self, max_value_us: int = 60_000_000):
+        """
+        初始化直方图
+
+        参数:
+        - max_value_us: 可区分的最大延迟(微秒)，默认60秒
+        """
+        self._max_index = _bucket_index(max_value_us)
+        self.counts = [0] * (self._max_index + 1)
+        self.total = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        """记录一次延迟(秒)"""
+        value = int(seconds * 1_000_000)
+        index = _bucket_index(value) if value > 0 else 0
+        self.counts[min(index, self._max_index)] += 1
+        self.total += 1
+        self.sum_us += value
+        if value > self.max_us:
+            self.max_us = value
+
+    def percentile(self, quantile: float) -> float:
+        """返回分位数延迟(秒)，取所在桶的上界"""
+        if not self.total:
+            return 0.0
+        target = max(1, int(quantile * self.total + 0.999999))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(_bucket_upper(index), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def percentiles(self, quantiles: Iterable[float]) -> dict:
+        """批量计算分位数"""
+        return {q: self.percentile(q) for q in quantiles}
+
+    @property
+    def sum_seconds(self) -> float:
+        """延迟总和(秒)"""
+        return self.sum_us / 1_000_000
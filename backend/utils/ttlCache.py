@@ -0,0 +1,86 @@
+"""
+带过期时间的LRU缓存
+===================
+
+有界LRU缓存，每个条目携带独立的过期时间，并统计命中/未命中次数。
+
+说明:
+- 基于OrderedDict，get/put均为O(1)
+- 过期条目在访问时惰性淘汰，容量满时淘汰最久未使用的条目
+- 非线程安全，设计为在事件循环线程中使用
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """有界LRU缓存(条目级TTL)"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60, name: str = "cache"):
+        """
+        初始化缓存
+
+        参数:
+        - maxsize: 最大条目数，<=0 表示禁用缓存
+        - ttl: 默认存活时间(秒)
+        - name: 缓存名称，用于统计输出
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取条目，未命中或已过期时返回default"""
+        item = self._data.get(key)
+        if item is not None:
+            value, expires_at = item
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入条目，ttl为空时使用默认存活时间"""
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """移除条目"""
+        item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self) -> None:
+        """清空缓存(保留统计)"""
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """返回命中统计"""
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,16 @@
+"""
+UTC时间工具
+===========
+
+项目中的时间统一以无时区信息的UTC时间保存和比较(与数据库DATETIME列一致)。
+
+说明:
+- MySQL连接建立时会话时区设为UTC(见hbm_mysql.utc_session)，
+  server_default=func.now()写入的时间与utcnow()处于同一时区
+"""
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    """当前UTC时间(无时区信息，精确到秒，与数据库DATETIME一致)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
@@ -114,7 +114,9 @@ def to_init_sql():
         f.write("INSERT INTO server_configs (config_key, config_value, data_type, description) VALUES\n")
         f.write("('space_stability_threshold', '80', 'int', '空间稳定转化线'),\n")
         f.write("('energy_recovery_rate', '10', 'int', '体力恢复时间(分钟)'),\n")
-        f.write("('max_energy', '256', 'int', '最大体力值');\n")
+        f.write("('max_energy', '256', 'int', '最大体力值'),\n")
+        f.write("('zero_energy_weight', '0.5', 'float', '无体力成员的投票权重系数'),\n")
+        f.write("('turn_score', '1', 'int', '每回合提交行动的成员获得的分数');\n")
     
     print(f"SQL file generated: {file_path}")
 
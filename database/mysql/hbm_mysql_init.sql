@@ -8,7 +8,7 @@ CREATE TABLE server_configs (
   id INT AUTO_INCREMENT PRIMARY KEY COMMENT '配置ID',
   config_key VARCHAR(50) NOT NULL COMMENT '配置键名',
   config_value VARCHAR(255) NOT NULL COMMENT '配置值',
-  data_type ENUM('int','string','bool') NOT NULL COMMENT '数据类型',
+  data_type ENUM('int','float','string','bool') NOT NULL COMMENT '数据类型',
   description VARCHAR(255) COMMENT '配置说明',
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
@@ -22,14 +22,16 @@ CREATE TABLE spaces (
   author_id VARCHAR(36) NOT NULL COMMENT '作者ID',
   title VARCHAR(100) NOT NULL COMMENT '标题',
   content TEXT NOT NULL COMMENT '内容',
-  heat INT DEFAULT 0 COMMENT '热度值',
+  heat INT NOT NULL DEFAULT 0 COMMENT '热度值',
   stability INT DEFAULT 100 COMMENT '稳定度(0-100)',
   turns_left INT DEFAULT 10 COMMENT '剩余轮次',
   creator_id VARCHAR(36) NOT NULL COMMENT '创建者ID',
+  floor_reserved INT NOT NULL DEFAULT 0 COMMENT '已预分配的最大楼层号',
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
   INDEX idx_creator (creator_id),
-  INDEX idx_type (type)
+  INDEX idx_type_heat (type, heat, id),
+  INDEX idx_heat (heat, id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='空间表';
 
 -- 回复表
@@ -42,7 +44,6 @@ CREATE TABLE replies (
   floor_num INT NOT NULL COMMENT '楼层号',
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
-  INDEX idx_space (space_id),
   INDEX idx_parent (parent_id),
   UNIQUE INDEX idx_space_floor (space_id, floor_num)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='回复表';
@@ -56,6 +57,8 @@ CREATE TABLE treasures (
   is_replica BOOLEAN DEFAULT FALSE COMMENT '是否为复制品',
   deviation INT DEFAULT 0 COMMENT '故事线偏离度减值',
   heat INT DEFAULT 0 COMMENT '热度加值',
+  use_count INT NOT NULL DEFAULT 0 COMMENT '使用次数',
+  effective_strength INT COMMENT '衰减后强度(定时物化)',
   owner_id VARCHAR(36) NOT NULL COMMENT '拥有者ID',
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
@@ -123,11 +126,38 @@ CREATE TABLE experience_logs (
   INDEX idx_source (source_type, source_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='资历变动日志表';
 
+-- 游戏状态快照表
+CREATE TABLE game_snapshots (
+  game_id VARCHAR(36) PRIMARY KEY COMMENT '游戏ID',
+  status VARCHAR(16) NOT NULL COMMENT '游戏状态',
+  current_turn INT NOT NULL DEFAULT 0 COMMENT '当前回合',
+  version INT NOT NULL DEFAULT 0 COMMENT '状态版本号',
+  state TEXT NOT NULL COMMENT '序列化的游戏状态(JSON)',
+  snapshot_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '快照时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='游戏状态快照表';
+
+-- 空间剧情摘要表
+CREATE TABLE space_summaries (
+  space_id VARCHAR(36) PRIMARY KEY COMMENT '空间ID',
+  summary TEXT NOT NULL COMMENT '剧情摘要',
+  summarized_floor INT NOT NULL DEFAULT 0 COMMENT '摘要已覆盖的最大楼层号',
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='空间剧情摘要表';
+
+-- 后台任务协调表
+CREATE TABLE task_runs (
+  name VARCHAR(64) PRIMARY KEY COMMENT '任务名',
+  last_run_at BIGINT NOT NULL COMMENT '上次执行时刻(Unix秒)',
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='后台任务协调表';
+
 -- 初始化配置数据
 INSERT INTO server_configs (config_key, config_value, data_type, description) VALUES
 ('space_stability_threshold', '80', 'int', '空间稳定转化线'),
 ('energy_recovery_rate', '10', 'int', '体力恢复时间(分钟)'),
-('max_energy', '256', 'int', '最大体力值');
+('max_energy', '256', 'int', '最大体力值'),
+('zero_energy_weight', '0.5', 'float', '无体力成员的投票权重系数'),
+('turn_score', '1', 'int', '每回合提交行动的成员获得的分数');
 
 -- 用户测试数据
 INSERT INTO users (id, username, password_hash, email, status, experience, energy) VALUES
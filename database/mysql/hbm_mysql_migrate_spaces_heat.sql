@@ -0,0 +1,4 @@
+-- 空间热度改为非空(空间列表按 (heat, id) 键集分页，NULL热度会使翻页提前结束)
+-- 已有库执行一次；回填不修改updated_at
+UPDATE spaces SET heat = 0, updated_at = updated_at WHERE heat IS NULL;
+ALTER TABLE spaces MODIFY heat INT NOT NULL DEFAULT 0 COMMENT '热度值';
@@ -0,0 +1,8 @@
+-- 后台任务协调表(空间热度衰减等每个周期只由一个worker执行的任务)
+-- 已有库执行一次；同时移除早先记录在server_configs中的衰减时刻
+CREATE TABLE IF NOT EXISTS task_runs (
+  name VARCHAR(64) PRIMARY KEY COMMENT '任务名',
+  last_run_at BIGINT NOT NULL COMMENT '上次执行时刻(Unix秒)',
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='后台任务协调表';
+DELETE FROM server_configs WHERE config_key = 'space_heat_decayed_at';